@@ -2,100 +2,478 @@ import json
 import logging
 import os
 import csv
-from io import StringIO
+import uuid
 from datetime import datetime
+from itertools import chain
 
-from product_generator.services.dynamodb_service import DynamoDBService
+from botocore.exceptions import ClientError
+
+from product_generator.services.clients import get_client
+from product_generator.services.dynamodb_service import DynamoDBService, now_millis
 from product_generator.services.s3_service import S3Service
+from product_generator.services.similarity_index import build_index
+from product_generator.utils.concurrency import run_bounded
+from product_generator.utils.export_formats import EXPORT_FORMATS, export_format_for
+from product_generator.utils.export_schema import DESCRIPTION_SCHEMA, INCREMENTAL_SCHEMA
+from product_generator.utils.metrics import payload_logging_sampled
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 PRODUCT_DESCRIPTIONS_TABLE = os.environ.get("PRODUCT_DESCRIPTIONS_TABLE")
 EXPORTS_S3_BUCKET = os.environ.get("EXPORTS_S3_BUCKET")
+EXPORT_PART_SIZE = int(os.environ.get("EXPORT_PART_SIZE_BYTES", str(8 * 1024 * 1024)))
+# Parallel scan segments used when a request does not ask for a specific count
+EXPORT_SCAN_SEGMENTS = int(os.environ.get("EXPORT_SCAN_SEGMENTS", "1"))
+MAX_SCAN_SEGMENTS = 64
+# Pages each segment may read ahead in ordered mode while earlier segments drain
+EXPORT_ORDERED_PREFETCH_PAGES = int(os.environ.get("EXPORT_ORDERED_PREFETCH_PAGES", "4"))
+# mode=sharded fans a sharded export out over asynchronous invocations of this
+# function, each scanning this many segments; the shard that completes the set
+# starts the stitch
+EXPORT_SHARD_SEGMENTS = int(os.environ.get("EXPORT_SHARD_SEGMENTS", "4"))
+# Output format when a request does not name one (see utils/export_formats.py)
+EXPORT_FORMAT = os.environ.get("EXPORT_FORMAT", "csv")
 
-def lambda_handler(event, context):
-    logger.info("Received event for CSV export: %s", json.dumps(event))
+# Incremental exports: a manifest under this prefix records the current
+# snapshot, the delta files written since, and the high-water mark. Exports
+# stop this far behind "now" so writes still in flight (and GSI propagation)
+# are picked up by the next run instead of being skipped.
+EXPORT_INCREMENTAL_PREFIX = os.environ.get("EXPORT_INCREMENTAL_PREFIX", "exports/incremental")
+EXPORT_SAFETY_LAG_MS = int(os.environ.get("EXPORT_SAFETY_LAG_SECONDS", "60")) * 1000
 
-    if not PRODUCT_DESCRIPTIONS_TABLE or not EXPORTS_S3_BUCKET:
-        logger.error("Environment variables for DynamoDB table or S3 bucket not set.")
+# Where mode=similarity-index writes the near-duplicate index GenerateDescriptionLambda loads
+EXPORT_SIMILARITY_INDEX_KEY = os.environ.get("EXPORT_SIMILARITY_INDEX_KEY", "similarity/index.bin")
+# Entries past this are left out of the index; containers load no more than
+# their own SIMILARITY_INDEX_MAX_ENTRIES anyway
+EXPORT_SIMILARITY_INDEX_MAX_ENTRIES = int(os.environ.get("EXPORT_SIMILARITY_INDEX_MAX_ENTRIES", "100000"))
+
+CSV_HEADERS = DESCRIPTION_SCHEMA.names
+INCREMENTAL_CSV_HEADERS = INCREMENTAL_SCHEMA.names
+# Incremental snapshots and deltas are always CSV: compaction merges them row by row
+INCREMENTAL_FORMAT = EXPORT_FORMATS["csv"]
+
+def scan_pages(dynamodb_service, total_segments, ordered, segments=None):
+    if total_segments == 1:
+        return dynamodb_service.scan_pages()
+    if ordered:
+        return dynamodb_service.parallel_scan_pages(total_segments, segments=segments, ordered=True,
+                                                    queue_depth=EXPORT_ORDERED_PREFETCH_PAGES)
+    return dynamodb_service.parallel_scan_pages(total_segments, segments=segments)
+
+def export_full(dynamodb_service, s3_service, total_segments, ordered, export_format):
+    pages = scan_pages(dynamodb_service, total_segments, ordered)
+
+    # Peek for the first non-empty page so an empty table never starts an upload
+    first_page = next((page for page in pages if page), None)
+    if first_page is None:
+        pages.close()
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'No descriptions found to export.'})
+        }
+
+    # Define S3 object key
+    timestamp_str = datetime.now().strftime("%Y%m%d-%H%M%S")
+    object_key = f"product_descriptions_export_{timestamp_str}.{export_format.extension}"
+
+    try:
+        with s3_service.open_multipart_upload(EXPORTS_S3_BUCKET, object_key, content_type=export_format.content_type,
+                                              part_size=EXPORT_PART_SIZE) as upload:
+            row_count = export_format.write(upload, chain([first_page], pages), DESCRIPTION_SCHEMA)
+    finally:
+        # Stops any parallel scan workers if the upload failed part-way
+        pages.close()
+
+    logger.info("Exported %d items from DynamoDB as %s (%d bytes) using %d scan segment(s).",
+                row_count, export_format.name, upload.bytes_written, total_segments)
+
+    if upload.completed:
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Export written successfully to S3.',
+                'bucket': EXPORTS_S3_BUCKET,
+                'key': object_key,
+                'format': export_format.name,
+                'rows': row_count,
+                'bytes': upload.bytes_written,
+                'url': f"https://{EXPORTS_S3_BUCKET}.s3.amazonaws.com/{object_key}"
+            } )
+        }
+    else:
         return {
             'statusCode': 500,
-            'body': json.dumps({'message': 'Configuration error: DynamoDB table or S3 bucket not set.'})
+            'body': json.dumps({'message': 'Failed to upload export to S3.'})
         }
 
-    dynamodb_service = DynamoDBService(PRODUCT_DESCRIPTIONS_TABLE)
-    s3_service = S3Service()
+def shard_part_key(export_id, segment, export_format):
+    return f"exports/{export_id}/part-{segment:05d}.{export_format.extension}"
 
+def shard_run_key(export_id):
+    return f"exports/{export_id}/run.json"
+
+def shard_done_key(export_id, segment):
+    return f"exports/{export_id}/done/segment-{segment:05d}.json"
+
+def stitch_claim_key(export_id):
+    return f"exports/{export_id}/stitch.json"
+
+def invoke_self(context, payload):
+    get_client("lambda").invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload)
+    )
+
+def start_sharded_export(s3_service, context, export_id, total_segments, shard_size, export_format):
+    # Records the run, then hands every group of shard_size segments to its own
+    # asynchronous invocation in shard mode
+    if not getattr(context, "invoked_function_arn", None):
+        raise ValueError("Sharded exports fan out through this function's ARN; invoke it through Lambda.")
+    s3_service.write_json({"exportId": export_id, "totalSegments": total_segments, "format": export_format.name,
+                           "startedAt": now_millis()}, EXPORTS_S3_BUCKET, shard_run_key(export_id))
+    shards = [list(range(first, min(first + shard_size, total_segments)))
+              for first in range(0, total_segments, shard_size)]
+    for shard in shards:
+        invoke_self(context, {"mode": "shard", "exportId": export_id, "totalSegments": total_segments,
+                              "shardSegments": shard, "format": export_format.name})
+    logger.info("Started sharded export %s: %d shard(s) over %d segment(s).", export_id, len(shards), total_segments)
+
+    return {
+        'statusCode': 202,
+        'body': json.dumps({
+            'message': f'Sharded export started with {len(shards)} shard(s).',
+            'exportId': export_id,
+            'bucket': EXPORTS_S3_BUCKET,
+            'partsPrefix': f"exports/{export_id}/",
+            # Written once every shard is in; parquet parts are the finished dataset
+            'key': stitched_key(export_id, export_format) if export_format.concatenable else None,
+        })
+    }
+
+def finish_sharded_export(s3_service, context, export_id, total_segments, export_format):
+    # Starts the stitch once every segment of a run started with mode=sharded
+    # is in. Shards finishing together may all see the full set; the
+    # conditional write of the claim lets exactly one of them go on.
+    if not export_format.concatenable or not getattr(context, "invoked_function_arn", None):
+        return False
+    if s3_service.read_json(EXPORTS_S3_BUCKET, shard_run_key(export_id)) is None:
+        return False
+    if any(s3_service.read_json(EXPORTS_S3_BUCKET, shard_done_key(export_id, segment)) is None
+           for segment in range(total_segments)):
+        return False
+    if not s3_service.write_json_if_absent({"claimedAt": now_millis()}, EXPORTS_S3_BUCKET, stitch_claim_key(export_id)):
+        return False
+    invoke_self(context, {"mode": "stitch", "exportId": export_id, "totalSegments": total_segments,
+                          "format": export_format.name})
+    logger.info("All %d segment(s) of export %s are in; started the stitch.", total_segments, export_id)
+    return True
+
+def export_shard(dynamodb_service, s3_service, export_id, total_segments, segments, export_format, context=None):
+    # One invocation of a sharded export: every assigned segment is scanned in
+    # parallel and written to its own header-less part object. Parquet parts
+    # are complete files, meant to be loaded together as one dataset.
+    def export_segment(segment):
+        part_key = shard_part_key(export_id, segment, export_format)
+        pages = dynamodb_service.scan_pages(Segment=segment, TotalSegments=total_segments)
+        with s3_service.open_multipart_upload(EXPORTS_S3_BUCKET, part_key, content_type=export_format.content_type,
+                                              part_size=EXPORT_PART_SIZE) as upload:
+            row_count = export_format.write(upload, pages, DESCRIPTION_SCHEMA, include_header=False)
+        return {"segment": segment, "key": part_key, "rows": row_count}
+
+    outcomes = run_bounded(export_segment, segments, len(segments))
+    failed = [segment for segment, (_, error) in zip(segments, outcomes) if error is not None]
+    if failed:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': f'Failed to export segments: {failed}', 'exportId': export_id})
+        }
+
+    parts = [part for part, _ in outcomes]
+    for part in parts:
+        s3_service.write_json({"key": part["key"], "rows": part["rows"]}, EXPORTS_S3_BUCKET,
+                              shard_done_key(export_id, part["segment"]))
+    stitching = finish_sharded_export(s3_service, context, export_id, total_segments, export_format)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Export shard written to S3.',
+            'exportId': export_id,
+            'parts': parts,
+            'stitching': stitching
+        })
+    }
+
+def stitched_key(export_id, export_format):
+    return f"product_descriptions_export_{export_id}.{export_format.extension}"
+
+def stitch_export(s3_service, export_id, total_segments, export_format):
+    # Concatenates the part objects of a sharded export, in segment order,
+    # behind a single header. Parts are streamed, never loaded whole.
+    if not export_format.concatenable:
+        raise ValueError(f"{export_format.name} parts cannot be stitched; load exports/{export_id}/ as one dataset.")
+    object_key = stitched_key(export_id, export_format)
     try:
-        # Fetch all items from DynamoDB (for simplicity; for large tables, use pagination)
-        # Note: This is a full table scan, which can be expensive for large tables.
-        # In a real application, you might filter by a specific productId or use a query.
-        response = dynamodb_service.table.scan() # Accessing table directly for scan
-        items = response.get('Items', [])
-        logger.info("Fetched %d items from DynamoDB.", len(items))
-
-        if not items:
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'No descriptions found to export.'})
-            }
+        with s3_service.open_multipart_upload(EXPORTS_S3_BUCKET, object_key, content_type=export_format.content_type,
+                                              part_size=EXPORT_PART_SIZE) as upload:
+            # Header-only part; compressed formats write it as its own gzip member or zstd frame
+            export_format.write(upload, [], DESCRIPTION_SCHEMA)
+            for segment in range(total_segments):
+                part_key = shard_part_key(export_id, segment, export_format)
+                for chunk in s3_service.iter_object_chunks(EXPORTS_S3_BUCKET, part_key):
+                    upload.write(chunk)
+    except ClientError as e:
+        logger.error("Cannot stitch export %s: %s", export_id, e)
+        return {
+            'statusCode': 409,
+            'body': json.dumps({'message': f'Export {export_id} is incomplete: {e}'})
+        }
 
-        # Prepare CSV data
-        csv_buffer = StringIO()
-        csv_writer = csv.writer(csv_buffer)
-
-        # Define CSV headers - adjust based on what you want in your CSV
-        # This example flattens the 'descriptions' dictionary
-        headers = ["productId", "timestamp", "title", "category", "features", "audience", "short_description", "detailed_description", "social_caption", "seo_description"]
-        csv_writer.writerow(headers)
-
-        for item in items:
-            row = [
-                item.get("productId", ""),
-                item.get("timestamp", ""),
-                item.get("metadata", {}).get("title", ""),
-                item.get("metadata", {}).get("category", ""),
-                ", ".join(item.get("metadata", {}).get("features", [])),
-                item.get("metadata", {}).get("audience", ""),
-                item.get("descriptions", {}).get("short", ""),
-                item.get("descriptions", {}).get("detailed", ""),
-                item.get("descriptions", {}).get("social", ""),
-                item.get("descriptions", {}).get("seo", "")
-            ]
-            csv_writer.writerow(row)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Export written successfully to S3.',
+            'bucket': EXPORTS_S3_BUCKET,
+            'key': object_key,
+            'format': export_format.name,
+            'url': f"https://{EXPORTS_S3_BUCKET}.s3.amazonaws.com/{object_key}"
+        })
+    }
 
-        csv_content = csv_buffer.getvalue()
-        
-        # Define S3 object key
-        timestamp_str = datetime.now().strftime("%Y%m%d-%H%M%S")
-        object_key = f"product_descriptions_export_{timestamp_str}.csv"
+def manifest_key():
+    return f"{EXPORT_INCREMENTAL_PREFIX}/manifest.json"
 
-        # Upload to S3
-        success = s3_service.upload_file(csv_content, EXPORTS_S3_BUCKET, object_key)
+def export_incremental(dynamodb_service, s3_service, total_segments, now_ms=None):
+    # Writes everything changed since the manifest's high-water mark to a delta
+    # file. The first run has no mark yet and writes a full snapshot instead.
+    # The manifest is only updated after the file is complete, so a failed run
+    # is simply repeated by the next one.
+    until_ms = (now_millis() if now_ms is None else now_ms) - EXPORT_SAFETY_LAG_MS
+    manifest = s3_service.read_json(EXPORTS_S3_BUCKET, manifest_key())
 
-        if success:
+    if manifest is None:
+        object_key = f"{EXPORT_INCREMENTAL_PREFIX}/snapshot-{until_ms}.csv"
+        pages = scan_pages(dynamodb_service, total_segments, ordered=False)
+        manifest = {"highWaterMark": until_ms, "snapshot": None, "deltas": []}
+        kind = "snapshot"
+    else:
+        since_ms = manifest["highWaterMark"]
+        if until_ms <= since_ms:
             return {
                 'statusCode': 200,
-                'body': json.dumps({
-                    'message': 'CSV exported successfully to S3.',
-                    'bucket': EXPORTS_S3_BUCKET,
-                    'key': object_key,
-                    'url': f"https://{EXPORTS_S3_BUCKET}.s3.amazonaws.com/{object_key}"
-                } )
+                'body': json.dumps({'message': 'Incremental export is up to date.', 'rows': 0,
+                                    'highWaterMark': since_ms})
             }
+        object_key = f"{EXPORT_INCREMENTAL_PREFIX}/delta-{since_ms}-{until_ms}.csv"
+        pages = dynamodb_service.changed_since_pages(since_ms, until_ms)
+        kind = "delta"
+
+    # Peek for the first non-empty page so a quiet period never starts an upload
+    first_page = next((page for page in pages if page), None)
+    row_count = 0
+    if first_page is not None:
+        try:
+            with s3_service.open_multipart_upload(EXPORTS_S3_BUCKET, object_key, part_size=EXPORT_PART_SIZE) as upload:
+                row_count = INCREMENTAL_FORMAT.write(upload, chain([first_page], pages), INCREMENTAL_SCHEMA)
+        finally:
+            pages.close()
+        entry = {"key": object_key, "rows": row_count, "highWaterMark": until_ms}
+        if kind == "snapshot":
+            manifest["snapshot"] = entry
         else:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'message': 'Failed to upload CSV to S3.'})
-            }
+            manifest["deltas"].append({**entry, "since": since_ms})
+    else:
+        pages.close()
+        object_key = None
+
+    manifest["highWaterMark"] = until_ms
+    s3_service.write_json(manifest, EXPORTS_S3_BUCKET, manifest_key())
+    logger.info("Incremental export (%s) wrote %d row(s) up to %d.", kind, row_count, until_ms)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f'Incremental export ({kind}) written to S3.' if object_key else 'No changes to export.',
+            'bucket': EXPORTS_S3_BUCKET,
+            'key': object_key,
+            'rows': row_count,
+            'highWaterMark': until_ms,
+            'deltas': len(manifest["deltas"])
+        })
+    }
+
+def read_incremental_rows(s3_service, object_key):
+    rows = csv.reader(s3_service.iter_object_lines(EXPORTS_S3_BUCKET, object_key))
+    next(rows, None)  # header
+    return rows
+
+def compact_incremental(s3_service):
+    # Folds the deltas into a new snapshot. Only the deltas are held in memory
+    # (latest row per key); the old snapshot is streamed through once.
+    manifest = s3_service.read_json(EXPORTS_S3_BUCKET, manifest_key())
+    if manifest is None or not manifest["deltas"]:
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'Nothing to compact.'})
+        }
+
+    key_columns = (INCREMENTAL_CSV_HEADERS.index("productId"), INCREMENTAL_CSV_HEADERS.index("formatType"))
+    latest = {}
+    for delta in manifest["deltas"]:
+        for row in read_incremental_rows(s3_service, delta["key"]):
+            latest[tuple(row[i] for i in key_columns)] = row
+
+    high_water_mark = manifest["highWaterMark"]
+    object_key = f"{EXPORT_INCREMENTAL_PREFIX}/snapshot-{high_water_mark}.csv"
+    row_count = 0
+    with s3_service.open_multipart_upload(EXPORTS_S3_BUCKET, object_key, part_size=EXPORT_PART_SIZE) as upload:
+        csv_writer = csv.writer(upload)
+        csv_writer.writerow(INCREMENTAL_CSV_HEADERS)
+        if manifest["snapshot"]:
+            for row in read_incremental_rows(s3_service, manifest["snapshot"]["key"]):
+                csv_writer.writerow(latest.pop(tuple(row[i] for i in key_columns), row))
+                row_count += 1
+        for row in latest.values():
+            csv_writer.writerow(row)
+            row_count += 1
+
+    compacted = len(manifest["deltas"])
+    manifest = {
+        "highWaterMark": high_water_mark,
+        "snapshot": {"key": object_key, "rows": row_count, "highWaterMark": high_water_mark},
+        "deltas": []
+    }
+    s3_service.write_json(manifest, EXPORTS_S3_BUCKET, manifest_key())
+    logger.info("Compacted %d delta(s) into %s (%d rows).", compacted, object_key, row_count)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f'Compacted {compacted} delta(s) into a new snapshot.',
+            'bucket': EXPORTS_S3_BUCKET,
+            'key': object_key,
+            'rows': row_count,
+            'highWaterMark': high_water_mark
+        })
+    }
+
+def export_similarity_index(dynamodb_service, s3_service, total_segments):
+    pages = scan_pages(dynamodb_service, total_segments, ordered=False)
+    try:
+        entries = build_index((item for page in pages for item in page),
+                              f"s3://{EXPORTS_S3_BUCKET}/{EXPORT_SIMILARITY_INDEX_KEY}", s3_service,
+                              max_entries=EXPORT_SIMILARITY_INDEX_MAX_ENTRIES)
+    finally:
+        # Stops any parallel scan workers once the index is full
+        pages.close()
+    logger.info("Wrote similarity index with %d entries.", entries)
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': f'Similarity index written with {entries} entries.',
+            'bucket': EXPORTS_S3_BUCKET,
+            'key': EXPORT_SIMILARITY_INDEX_KEY,
+            'entries': entries
+        })
+    }
+
+def parse_options(event):
+    # API Gateway passes options as query string parameters; direct invocations
+    # (e.g. from an orchestrator fanning out shards) pass them at the top level.
+    options = dict(event.get("queryStringParameters") or {})
+    options.update({k: v for k, v in event.items()
+                    if k in ("mode", "segments", "ordered", "exportId", "totalSegments", "shardSegments", "shardSize",
+                             "format")})
+
+    total_segments = int(options.get("totalSegments", options.get("segments", EXPORT_SCAN_SEGMENTS)))
+    if not 1 <= total_segments <= MAX_SCAN_SEGMENTS:
+        raise ValueError(f"segments must be between 1 and {MAX_SCAN_SEGMENTS}.")
+
+    ordered = str(options.get("ordered", "false")).lower() == "true"
+
+    shard_segments = options.get("shardSegments")
+    if isinstance(shard_segments, str):
+        shard_segments = [int(s) for s in shard_segments.split(",") if s]
+    if shard_segments is not None and not all(0 <= s < total_segments for s in shard_segments):
+        raise ValueError("shardSegments must be between 0 and totalSegments - 1.")
 
+    shard_size = int(options.get("shardSize", EXPORT_SHARD_SEGMENTS))
+    if not 1 <= shard_size <= MAX_SCAN_SEGMENTS:
+        raise ValueError(f"shardSize must be between 1 and {MAX_SCAN_SEGMENTS}.")
+
+    return {
+        "mode": options.get("mode", "full"),
+        "total_segments": total_segments,
+        "ordered": ordered,
+        "export_id": options.get("exportId"),
+        "shard_segments": shard_segments,
+        "shard_size": shard_size,
+        # None when the request did not ask for a format
+        "format": options.get("format"),
+    }
+
+def lambda_handler(event, context):
+    if payload_logging_sampled():
+        logger.info("Received event for export: %s", json.dumps(event))
+
+    if not PRODUCT_DESCRIPTIONS_TABLE or not EXPORTS_S3_BUCKET:
+        logger.error("Environment variables for DynamoDB table or S3 bucket not set.")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Configuration error: DynamoDB table or S3 bucket not set.'})
+        }
+
+    dynamodb_service = DynamoDBService(PRODUCT_DESCRIPTIONS_TABLE)
+    s3_service = S3Service()
+
+    try:
+        options = parse_options(event)
+        mode = options["mode"]
+
+        if mode in ("incremental", "compact"):
+            if options["format"] not in (None, INCREMENTAL_FORMAT.name):
+                raise ValueError("Incremental exports are written as csv only.")
+        elif mode != "similarity-index":
+            export_format = export_format_for(options["format"] or EXPORT_FORMAT)
+
+        if mode == "full":
+            return export_full(dynamodb_service, s3_service, options["total_segments"], options["ordered"], export_format)
+        if mode == "sharded":
+            return start_sharded_export(s3_service, context, options["export_id"] or uuid.uuid4().hex,
+                                        options["total_segments"], options["shard_size"], export_format)
+        if mode == "shard":
+            if not options["shard_segments"]:
+                raise ValueError("Shard mode requires shardSegments.")
+            export_id = options["export_id"] or uuid.uuid4().hex
+            return export_shard(dynamodb_service, s3_service, export_id, options["total_segments"],
+                                options["shard_segments"], export_format, context)
+        if mode == "stitch":
+            if not options["export_id"]:
+                raise ValueError("Stitch mode requires exportId.")
+            return stitch_export(s3_service, options["export_id"], options["total_segments"], export_format)
+        if mode == "incremental":
+            return export_incremental(dynamodb_service, s3_service, options["total_segments"])
+        if mode == "compact":
+            return compact_incremental(s3_service)
+        if mode == "similarity-index":
+            return export_similarity_index(dynamodb_service, s3_service, options["total_segments"])
+        raise ValueError(f"Unsupported export mode: {mode}. "
+                         "Supported: full, sharded, shard, stitch, incremental, compact, similarity-index.")
+
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': str(ve)})
+        }
     except Exception as e:
         logger.error("Error in ExportDescriptionLambda handler: %s", e)
         return {
             'statusCode': 500,
             'body': json.dumps({
-                'message': f'Failed to perform CSV export: {e}'
+                'message': f'Failed to perform export: {e}'
             })
         }
 
@@ -1,111 +1,563 @@
 import json
 import logging
 import os 
-import boto3
+import time
 
 from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.clients import get_client
+from product_generator.services.description_store import DescriptionStore, product_id_for, requested_formats
+from product_generator.services.dynamodb_service import now_millis
+from product_generator.services.generation_cache import GenerationCache, DynamoDBCacheTier
+from product_generator.services.job_store import JobStore
+from product_generator.services.model_backends import ModelRouter, backend_for
+from product_generator.services.queue_service import QueueService
+from product_generator.services.resilience import ModelInvocationError
+from product_generator.services.s3_service import S3Service
+from product_generator.services.similarity_index import SimilarityIndex, load_index, substitute, substitution_pairs
+from product_generator.services.single_flight import DynamoDBLease
 from product_generator.utils.description_formatter import DescriptionFormatter
-
-# Set the AWS region
-os.environ["AWS_REGION"] = "us-east-2"
+from product_generator.utils.concurrency import run_bounded
+from product_generator.utils.metrics import MILLISECONDS, NONE, RequestMetrics, default_sink
+from product_generator.utils.prompt_builder import STRUCTURED_FORMATS, plan_prompt
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Get the ARN of the StoreDescriptionLambda from environment variables
 STORE_DESCRIPTION_LAMBDA_ARN = os.environ.get("STORE_DESCRIPTION_LAMBDA_ARN")
+# When set, storage items are published to this SQS queue and drained in batches
+# by StoreDescriptionLambda instead of invoking it once per request
+STORAGE_QUEUE_URL = os.environ.get("STORAGE_QUEUE_URL")
 
-def lambda_handler(event, context):
-    logger.info("Received event: %s", json.dumps(event))
+SUPPORTED_FORMATS = ("short", "detailed", "social", "seo", "all")
+# The formatter builds these from the product metadata alone, so they never call the model
+METADATA_FORMATS = ("social", "seo")
+
+# Format "all" asks the model for every format as one JSON object; set to
+# "false" to derive them from a single free-form generation instead
+STRUCTURED_OUTPUT = os.environ.get("STRUCTURED_OUTPUT", "true").lower() == "true"
+
+# Batch mode limits; a request may lower the concurrency but never raise it past the cap
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "50"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+
+# Generation cache settings; the shared DynamoDB tier is only used when a table is configured
+GENERATION_CACHE_TABLE = os.environ.get("GENERATION_CACHE_TABLE")
+GENERATION_CACHE_MAX_ENTRIES = int(os.environ.get("GENERATION_CACHE_MAX_ENTRIES", "256"))
+GENERATION_CACHE_TTL_SECONDS = int(os.environ.get("GENERATION_CACHE_TTL_SECONDS", "86400"))
+
+# Module-level so the in-process tier survives across warm invocations
+generation_cache = GenerationCache(
+    max_entries=GENERATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=GENERATION_CACHE_TTL_SECONDS,
+    shared_tier=DynamoDBCacheTier(GENERATION_CACHE_TABLE) if GENERATION_CACHE_TABLE else None,
+)
+
+# Model routing: short formats go to the cheapest model that supports them.
+# Module-level so observed latency and error rates survive across warm invocations.
+MODEL_ROUTING = os.environ.get("MODEL_ROUTING", "true").lower() == "true"
+MODEL_ROUTER_MODELS = os.environ.get(
+    "MODEL_ROUTER_MODELS", "meta.llama3-3-70b-instruct-v1:0,meta.llama3-1-8b-instruct-v1:0"
+)
+MODEL_MAX_LATENCY_MS = os.environ.get("MODEL_MAX_LATENCY_MS")
+
+model_router = ModelRouter(
+    [backend_for(model_id.strip()) for model_id in MODEL_ROUTER_MODELS.split(",") if model_id.strip()],
+    max_latency_ms=float(MODEL_MAX_LATENCY_MS) if MODEL_MAX_LATENCY_MS else None,
+) if MODEL_ROUTING else None
+
+# Identical generations running in other containers are waited for through a
+# short-lived lease in the cache table rather than generated again
+GENERATION_LEASE_SECONDS = int(os.environ.get("GENERATION_LEASE_SECONDS", "30"))
+GENERATION_LEASE_WAIT_SECONDS = float(os.environ.get("GENERATION_LEASE_WAIT_SECONDS", "20"))
+generation_lease = DynamoDBLease(
+    GENERATION_CACHE_TABLE,
+    lease_seconds=GENERATION_LEASE_SECONDS,
+    wait_timeout=GENERATION_LEASE_WAIT_SECONDS,
+) if GENERATION_CACHE_TABLE else None
+
+# Single requests are answered from the ProductDescriptions table, without a
+# model call, when a stored copy for the same metadata is at most this old.
+# 0 disables the lookup; a request can opt out with "use_stored": false.
+PRODUCT_DESCRIPTIONS_TABLE = os.environ.get("PRODUCT_DESCRIPTIONS_TABLE")
+STORED_DESCRIPTION_MAX_AGE_SECONDS = int(os.environ.get("STORED_DESCRIPTION_MAX_AGE_SECONDS", "86400"))
+description_store = DescriptionStore(PRODUCT_DESCRIPTIONS_TABLE) if PRODUCT_DESCRIPTIONS_TABLE else None
+
+# Near-duplicate reuse: a product whose metadata embeds within
+# SIMILARITY_THRESHOLD (cosine) of one generated before reuses that
+# description, by substituting the differing title, category, audience and
+# features ("template") or by one cheap rewrite call ("adapt"). The index
+# starts from SIMILARITY_INDEX_URI (a path or s3:// URI, see the export
+# lambda's similarity-index mode) and grows with every full generation.
+# SIMILARITY_ANN searches the loaded entries through an LSH index instead of
+# scanning them all, trading a little recall for latency on large indexes.
+SIMILARITY_REUSE = os.environ.get("SIMILARITY_REUSE", "false").lower() == "true"
+SIMILARITY_INDEX_URI = os.environ.get("SIMILARITY_INDEX_URI")
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", "0.9"))
+SIMILARITY_REUSE_MODE = os.environ.get("SIMILARITY_REUSE_MODE", "template")
+SIMILARITY_INDEX_MAX_ENTRIES = int(os.environ.get("SIMILARITY_INDEX_MAX_ENTRIES", "50000"))
+SIMILARITY_ANN = os.environ.get("SIMILARITY_ANN", "false").lower() == "true"
+
+def open_similarity_index():
+    if not SIMILARITY_REUSE:
+        return None
+    if SIMILARITY_INDEX_URI:
+        try:
+            s3_service = S3Service() if SIMILARITY_INDEX_URI.startswith("s3://") else None
+            return load_index(SIMILARITY_INDEX_URI, s3_service, max_entries=SIMILARITY_INDEX_MAX_ENTRIES,
+                              ann=SIMILARITY_ANN)
+        except Exception as load_e:
+            logger.error("Failed to load similarity index from %s; starting empty: %s", SIMILARITY_INDEX_URI, load_e)
+    return SimilarityIndex(max_entries=SIMILARITY_INDEX_MAX_ENTRIES)
+
+# Module-level so the index is loaded once per container
+similarity_index = open_similarity_index()
+
+# Async mode ({"async": true}): the request is saved as a job, queued for
+# JobWorkerLambda and answered at once with 202 and the job id to poll at
+# GET /jobs/{jobId}, so long generations never hit the API's 30 s limit
+JOBS_TABLE = os.environ.get("JOBS_TABLE")
+JOB_QUEUE_URL = os.environ.get("JOB_QUEUE_URL")
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", str(7 * 86400)))
+job_store = JobStore(JOBS_TABLE, ttl_seconds=JOB_TTL_SECONDS) if JOBS_TABLE else None
+
+def usage_headers(bedrock_service):
+    # This request's own counts; bedrock_service is created per invocation
+    usage = bedrock_service.usage_snapshot()
+    return {
+        "X-Cache-Hits": str(usage["cache_hits"]),
+        "X-Cache-Misses": str(usage["cache_misses"]),
+        "X-Model-Calls": str(usage["calls"]),
+        "X-Prompt-Tokens": str(usage["prompt_tokens"]),
+        "X-Generation-Tokens": str(usage["generation_tokens"]),
+        "X-Model-Latency-Ms": str(round(usage["latency_ms"])),
+    }
+
+def response_headers(bedrock_service):
+    return usage_headers(bedrock_service)
+
+def model_error_response(error):
+    # Throttles, timeouts and an open circuit map to 429/504/503 with a retry hint
+    headers = {}
+    if error.retry_after is not None:
+        headers["Retry-After"] = str(max(1, int(round(error.retry_after))))
+    return {
+        'statusCode': error.status_code,
+        'headers': headers,
+        'body': json.dumps({
+            'message': f'Failed to generate description: {error}',
+            'error': error.code
+        })
+    }
+
+def record_prompt(metrics, prompt):
+    # Budgets next to the actual GenerationTokens show the savings per format
+    metrics.add("PromptTokensEstimate", prompt.input_tokens)
+    metrics.add("MaxGenLen", prompt.max_gen_len)
+    if prompt.dropped_features:
+        metrics.add("PromptFeaturesDropped", prompt.dropped_features)
+
+def format_descriptions(full_generated_description, product_metadata, format_type):
+    formatter = DescriptionFormatter(full_generated_description, product_metadata)
+
+    response_descriptions = {}
+    if format_type == "short":
+        response_descriptions["short"] = formatter.get_short_description()
+    elif format_type == "detailed":
+        response_descriptions["detailed"] = formatter.get_detailed_description()
+    elif format_type == "social":
+        response_descriptions["social"] = formatter.get_social_caption()
+    elif format_type == "seo":
+        response_descriptions["seo"] = formatter.get_seo_rich_description()
+    elif format_type == "all":
+        response_descriptions["short"] = formatter.get_short_description()
+        response_descriptions["detailed"] = formatter.get_detailed_description()
+        response_descriptions["social"] = formatter.get_social_caption()
+        response_descriptions["seo"] = formatter.get_seo_rich_description()
+    else:
+        raise ValueError(f"Unsupported format type: {format_type}. Supported: {', '.join(SUPPORTED_FORMATS)}.")
+    return response_descriptions
+
+def generate_descriptions(bedrock_service, product, metrics=None):
+    # Generates and formats descriptions for one product metadata object.
+    # Returns (product_metadata, response_descriptions, format_type).
+    metrics = metrics or RequestMetrics()
+    title = product.get("title")
+    category = product.get("category")
+    features = product.get("features", [])
+    audience = product.get("audience")
+    format_type = product.get("format", "detailed")
+    refresh_cache = product.get("refresh_cache", False)
+
+    if not all([title, category, features, audience]):
+        raise ValueError("Missing required product metadata: title, category, features, or audience.")
+    # Reject unknown formats before paying for a model call
+    if format_type not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format type: {format_type}. Supported: {', '.join(SUPPORTED_FORMATS)}.")
+
+    product_metadata = {
+        "title": title,
+        "category": category,
+        "features": features,
+        "audience": audience
+    }
+
+    if format_type in METADATA_FORMATS:
+        with metrics.timer("Format"):
+            return product_metadata, format_descriptions("", product_metadata, format_type), format_type
+
+    if similarity_index is not None and not refresh_cache and product.get("use_similar", True):
+        reused = reuse_similar(bedrock_service, product_metadata, format_type, metrics)
+        if reused is not None:
+            return product_metadata, reused, format_type
+
+    start = time.perf_counter()
+    if format_type == "all" and STRUCTURED_OUTPUT:
+        response_descriptions = generate_structured_descriptions(bedrock_service, product_metadata, refresh_cache, metrics)
+    else:
+        response_descriptions = generate_unstructured(bedrock_service, product_metadata, format_type, refresh_cache,
+                                                      metrics)
+    if similarity_index is not None:
+        similarity_index.observe_generation((time.perf_counter() - start) * 1000)
+        similarity_index.add(product_metadata, response_descriptions)
+    return product_metadata, response_descriptions, format_type
+
+def generate_unstructured(bedrock_service, product_metadata, format_type, refresh_cache=False, metrics=None):
+    metrics = metrics or RequestMetrics()
+
+    with metrics.timer("PromptBuild"):
+        prompt = plan_prompt(product_metadata, format_type)
+    record_prompt(metrics, prompt)
+
+    # Explicit invalidation: drop any cached generation and ask the model again
+    if refresh_cache:
+        bedrock_service.invalidate_cached(prompt.text, prompt.max_gen_len, prompt.stop)
+
+    with metrics.timer("Model"):
+        full_generated_description = bedrock_service.invoke_model(
+            prompt.text, format_type=format_type, max_gen_len=prompt.max_gen_len, stop=prompt.stop
+        )
+    if metrics.log_payloads:
+        logger.info("Full Generated Description: %s", full_generated_description)
+
+    with metrics.timer("Format"):
+        return format_descriptions(full_generated_description, product_metadata, format_type)
+
+def reuse_similar(bedrock_service, product_metadata, format_type, metrics):
+    # Returns descriptions built from the nearest earlier generation, or None
+    # when nothing is similar enough (or it cannot be reused safely)
+    start = time.perf_counter()
+    with metrics.timer("SimilarityLookup"):
+        match = similarity_index.search(product_metadata, requested_formats(format_type), SIMILARITY_THRESHOLD)
+    if match is None:
+        metrics.add("SimilarityMisses", 1)
+        return None
+    score, entry = match
+    source_metadata, source_descriptions = entry["metadata"], entry["descriptions"]
+
+    if SIMILARITY_REUSE_MODE == "adapt":
+        structured = format_type == "all" and STRUCTURED_OUTPUT
+        if structured:
+            source_text = json.dumps({fmt: source_descriptions[fmt] for fmt in STRUCTURED_FORMATS})
+        else:
+            source_text = source_descriptions.get("detailed") or source_descriptions[requested_formats(format_type)[0]]
+        try:
+            prompt = plan_prompt(product_metadata, format_type, structured=structured,
+                                 adapt_from=(source_text, source_metadata))
+        except ValueError as ve:
+            logger.info("Similar description too long to adapt; generating instead: %s", ve)
+            metrics.add("SimilarityMisses", 1)
+            return None
+        if structured:
+            # Every format rewritten in one call, with the structured path's validation and fallback
+            response_descriptions = generate_structured_descriptions(bedrock_service, product_metadata,
+                                                                     metrics=metrics, prompt=prompt)
+        else:
+            record_prompt(metrics, prompt)
+            with metrics.timer("Model"):
+                adapted = bedrock_service.invoke_model(prompt.text, format_type=format_type,
+                                                       max_gen_len=prompt.max_gen_len, stop=prompt.stop)
+            with metrics.timer("Format"):
+                response_descriptions = format_descriptions(adapted, product_metadata, format_type)
+    else:
+        pairs = substitution_pairs(source_metadata, product_metadata)
+        if pairs is None:
+            metrics.add("SimilarityMisses", 1)
+            return None
+        response_descriptions = {fmt: substitute(source_descriptions[fmt], pairs)
+                                 for fmt in requested_formats(format_type)}
+        # Same length limits the formatter applies
+        for fmt, limit in (("social", 280), ("seo", 160)):
+            if fmt in response_descriptions:
+                response_descriptions[fmt] = response_descriptions[fmt][:limit]
+
+    metrics.add("SimilarityHits", 1)
+    metrics.add("SimilarityScore", round(score, 4), NONE)
+    if similarity_index.generation_ms is not None:
+        saved = similarity_index.generation_ms - (time.perf_counter() - start) * 1000
+        metrics.add("SimilarityLatencySaved", max(saved, 0.0), MILLISECONDS)
+    return response_descriptions
 
-    bedrock_service = BedrockService()
+def generate_structured_descriptions(bedrock_service, product_metadata, refresh_cache=False, metrics=None,
+                                     prompt=None):
+    # One model call returns every format as JSON. Any format that is missing
+    # or invalid falls back to the formatter, run over the generated detailed
+    # text (or the raw generation when nothing parsed). prompt: an already
+    # planned structured prompt, such as a rewrite of a similar product's copy.
+    metrics = metrics or RequestMetrics()
+    if prompt is None:
+        with metrics.timer("PromptBuild"):
+            prompt = plan_prompt(product_metadata, "all", structured=True)
+    record_prompt(metrics, prompt)
+    if refresh_cache:
+        bedrock_service.invalidate_cached(prompt.text, bedrock_service.structured_max_gen_len)
 
+    with metrics.timer("Model"):
+        fields, raw_generation = bedrock_service.invoke_model_structured(prompt.text, STRUCTURED_FORMATS)
+    if metrics.log_payloads:
+        logger.info("Structured Generation: %s", raw_generation)
+
+    with metrics.timer("Format"):
+        response_descriptions = dict(fields)
+        if len(fields) < len(STRUCTURED_FORMATS):
+            logger.warning("Structured generation incomplete (valid: %s); using formatter fallback.", sorted(fields))
+            metrics.add("StructuredFallbacks", 1)
+            fallback = format_descriptions(fields.get("detailed") or raw_generation, product_metadata, "all")
+            for key in STRUCTURED_FORMATS:
+                response_descriptions.setdefault(key, fallback[key])
+
+        # Same length limits the formatter applies
+        response_descriptions["social"] = response_descriptions["social"][:280]
+        response_descriptions["seo"] = response_descriptions["seo"][:160]
+    return {key: response_descriptions[key] for key in STRUCTURED_FORMATS}
+
+def stored_descriptions(body):
+    # Returns the stored descriptions when a fresh copy exists, else None
+    if description_store is None or STORED_DESCRIPTION_MAX_AGE_SECONDS <= 0:
+        return None
+    if body.get("refresh_cache") or not body.get("use_stored", True):
+        return None
+    format_type = body.get("format", "detailed")
+    if format_type not in SUPPORTED_FORMATS or not body.get("title"):
+        return None
+    product_metadata = {key: body.get(key) for key in ("title", "category", "features", "audience")}
+    try:
+        # Only copies generated for exactly this metadata are served
+        record = description_store.lookup(product_id_for(body["title"]), format_type, product_metadata)
+    except Exception as lookup_e:
+        logger.warning("Stored description lookup failed; generating instead: %s", lookup_e)
+        return None
+    if record is None:
+        return None
+    if now_millis() - record["updatedAt"] > STORED_DESCRIPTION_MAX_AGE_SECONDS * 1000:
+        return None
+    return record["descriptions"]
+
+def build_storage_item(product_metadata, response_descriptions, format_type):
+    # Prepare payload for StoreDescriptionLambda. "timestamp" is the generation
+    # time in epoch millis; the write time is stamped by StoreDescriptionLambda.
+    return {
+        "productId": product_id_for(product_metadata["title"]),
+        "timestamp": now_millis(),
+        "metadata": product_metadata,
+        "descriptions": response_descriptions,
+        "formatType": format_type
+    }
+
+def storage_configured():
+    return bool(STORAGE_QUEUE_URL or STORE_DESCRIPTION_LAMBDA_ARN)
+
+def dispatch_storage(storage_items):
+    if STORAGE_QUEUE_URL:
+        publish_storage(storage_items)
+    elif STORE_DESCRIPTION_LAMBDA_ARN:
+        invoke_storage(storage_items)
+
+def publish_storage(storage_items):
+    # Queue-based storage: one message per item, consumed in batches by StoreDescriptionLambda
     try:
-        # Support both API Gateway and direct Lambda console invocation
-        if "body" in event:
-            body = json.loads(event["body"])
+        failed = QueueService(STORAGE_QUEUE_URL).send_items(storage_items)
+        if failed:
+            logger.error("Failed to queue %d of %d storage item(s).", len(failed), len(storage_items))
         else:
-            body = event  # For direct Lambda console invocation
-
-        title = body.get("title")
-        category = body.get("category")
-        features = body.get("features", [])
-        audience = body.get("audience")
-        format_type = body.get("format", "detailed")
-        store_result = body.get("store_result", False)
-
-        if not all([title, category, features, audience]):
-            raise ValueError("Missing required product metadata: title, category, features, or audience.")
-
-        features_str = ", ".join(features)
-        dynamic_prompt = (
-            f"\n\nHuman: Write a product description for a {title} in the {category} category. "
-            f"It has the following key features: {features_str}. "
-            f"The target audience is {audience}.\n\nAssistant:"
+            logger.info("Queued %d storage item(s).", len(storage_items))
+    except Exception as store_e:
+        logger.error("Failed to queue storage items: %s", store_e)
+
+def invoke_storage(storage_items):
+    # Asynchronously invoke StoreDescriptionLambda once for all items: a single
+    # item goes as {"item": ...}, several as {"items": [...]} for its batch write path
+    try:
+        lambda_client = get_client("lambda")  # <-- Reused across warm invocations
+        if len(storage_items) == 1:
+            storage_payload = {"item": storage_items[0]}
+        else:
+            storage_payload = {"items": storage_items}
+
+        lambda_client.invoke(
+            FunctionName=STORE_DESCRIPTION_LAMBDA_ARN,
+            InvocationType='Event',
+            Payload=json.dumps(storage_payload)
         )
+        logger.info("Asynchronously invoked StoreDescriptionLambda for %d item(s).", len(storage_items))
+    except Exception as store_e:
+        logger.error("Failed to asynchronously invoke StoreDescriptionLambda: %s", store_e)
 
-        full_generated_description = bedrock_service.invoke_model(dynamic_prompt)
-        logger.info("Full Generated Description: %s", full_generated_description)
+def generate_batch(bedrock_service, products, max_concurrency, defaults=None, metrics=None):
+    # Fans the Bedrock calls out over a bounded thread pool. Each product inherits
+    # batch-level settings (format, refresh_cache) unless it overrides them.
+    defaults = defaults or {}
+    items = [{**defaults, **product} if isinstance(product, dict) else product for product in products]
+
+    def generate_one(product):
+        if not isinstance(product, dict):
+            raise ValueError("Each product must be a JSON object.")
+        return generate_descriptions(bedrock_service, product, metrics)
+
+    return run_bounded(generate_one, items, max_concurrency)
+
+def handle_batch(bedrock_service, body, metrics=None):
+    products = body.get("products")
+    if not isinstance(products, list) or not products:
+        raise ValueError("'products' must be a non-empty list of product metadata objects.")
+    if len(products) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Batch too large: {len(products)} products (max {BATCH_MAX_ITEMS}).")
+
+    try:
+        max_concurrency = int(body.get("max_concurrency", BATCH_MAX_CONCURRENCY))
+    except (TypeError, ValueError):
+        raise ValueError("'max_concurrency' must be an integer.")
+    max_concurrency = max(1, min(max_concurrency, BATCH_MAX_CONCURRENCY))
+
+    defaults = {k: body[k] for k in ("format", "refresh_cache") if k in body}
+    outcomes = generate_batch(bedrock_service, products, max_concurrency, defaults, metrics)
 
-        product_metadata = {
-            "title": title,
-            "category": category,
-            "features": features,
-            "audience": audience
+    results = []
+    storage_items = []
+    for index, (outcome, error) in enumerate(outcomes):
+        if error is not None:
+            result = {"index": index, "status": "failed", "error": str(error)}
+            if isinstance(error, ModelInvocationError):
+                result["errorCode"] = error.code
+                result["retryable"] = error.retryable
+            results.append(result)
+            continue
+        product_metadata, response_descriptions, format_type = outcome
+        results.append({"index": index, "status": "succeeded", "descriptions": response_descriptions})
+        if products[index].get("store_result", body.get("store_result", False)) and storage_configured():
+            storage_items.append(build_storage_item(product_metadata, response_descriptions, format_type))
+
+    # Storage for the whole batch is dispatched once, from the handler thread
+    if storage_items:
+        with (metrics or RequestMetrics()).timer("StoreDispatch"):
+            dispatch_storage(storage_items)
+
+    succeeded = sum(1 for result in results if result["status"] == "succeeded")
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
+
+def generate_response(bedrock_service, body, metrics):
+    # Batch mode: {"products": [...], "max_concurrency": n}
+    if "products" in body:
+        metrics.put_property("Mode", "batch")
+        batch_response = handle_batch(bedrock_service, body, metrics)
+        metrics.add("Products", len(batch_response["results"]))
+        return {
+            'statusCode': 200,
+            'headers': response_headers(bedrock_service),
+            'body': json.dumps(batch_response)
         }
 
-        formatter = DescriptionFormatter(full_generated_description, product_metadata)
-
-        response_descriptions = {}
-        if format_type == "short":
-            response_descriptions["short"] = formatter.get_short_description()
-        elif format_type == "detailed":
-            response_descriptions["detailed"] = formatter.get_detailed_description()
-        elif format_type == "social":
-            response_descriptions["social"] = formatter.get_social_caption()
-        elif format_type == "seo":
-            response_descriptions["seo"] = formatter.get_seo_rich_description()
-        elif format_type == "all":
-            response_descriptions["short"] = formatter.get_short_description()
-            response_descriptions["detailed"] = formatter.get_detailed_description()
-            response_descriptions["social"] = formatter.get_social_caption()
-            response_descriptions["seo"] = formatter.get_seo_rich_description()
-        else:
-            raise ValueError(f"Unsupported format type: {format_type}. Supported: short, detailed, all.")
-
-        # Asynchronously invoke StoreDescriptionLambda
-        if store_result and STORE_DESCRIPTION_LAMBDA_ARN:
-            try:
-                lambda_client = boto3.client("lambda")  # <-- Only create here
-                # Prepare payload for StoreDescriptionLambda
-                storage_item = {
-                    "productId": title.replace(" ", "-").lower(),
-                    "timestamp": context.get_remaining_time_in_millis(),
-                    "metadata": {
-                        "title": title,
-                        "category": category,
-                        "features": features,
-                        "audience": audience
-                    },
-                    "descriptions": response_descriptions,
-                    "formatType": format_type
-                }
-                # Wrap in 'item' key if that's what StoreDescriptionLambda expects
-                storage_payload = {"item": storage_item}
-
-                lambda_client.invoke(
-                    FunctionName=STORE_DESCRIPTION_LAMBDA_ARN,
-                    InvocationType='Event',
-                    Payload=json.dumps(storage_payload)
-                )
-                logger.info("Asynchronously invoked StoreDescriptionLambda.")
-            except Exception as store_e:
-                logger.error("Failed to asynchronously invoke StoreDescriptionLambda: %s", store_e)
+    metrics.put_property("Mode", "single")
+    store_result = body.get("store_result", False)
 
+    with metrics.timer("StoredLookup"):
+        stored = stored_descriptions(body)
+    if stored is not None:
+        metrics.put_property("Format", body.get("format", "detailed"))
+        metrics.put_property("Source", "stored")
+        metrics.add("StoredHits", 1)
         return {
             'statusCode': 200,
-            'body': json.dumps(response_descriptions)
+            'headers': {**response_headers(bedrock_service), "X-Description-Source": "stored"},
+            'body': json.dumps(stored)
         }
+    metrics.put_property("Source", "generated")
+
+    product_metadata, response_descriptions, format_type = generate_descriptions(bedrock_service, body, metrics)
+    metrics.put_property("Format", format_type)
+    headers = response_headers(bedrock_service)
+    if metrics.value("SimilarityHits"):
+        metrics.put_property("Source", "similar")
+        headers["X-Description-Source"] = "similar"
+        headers["X-Similarity-Score"] = str(metrics.value("SimilarityScore"))
+
+    if store_result and storage_configured():
+        with metrics.timer("StoreDispatch"):
+            dispatch_storage([build_storage_item(product_metadata, response_descriptions, format_type)])
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(response_descriptions)
+    }
+
+def submit_job(body, metrics):
+    if job_store is None or not JOB_QUEUE_URL:
+        raise ValueError("Async generation is not configured.")
+    metrics.put_property("Mode", "async")
+    request = {key: value for key, value in body.items() if key != "async"}
+    with metrics.timer("JobSubmit"):
+        job = job_store.create(request)
+        if QueueService(JOB_QUEUE_URL).send_items([{"jobId": job["jobId"]}]):
+            # Nothing will pick the job up, so it is not left looking queued
+            job_store.fail(job["jobId"], "Failed to queue the job.")
+            raise RuntimeError("Failed to queue the generation job.")
+    metrics.put_property("JobId", job["jobId"])
+    return {
+        'statusCode': 202,
+        'headers': {"Location": f"/jobs/{job['jobId']}"},
+        'body': json.dumps({'jobId': job["jobId"], 'status': job["status"], 'statusUrl': f"/jobs/{job['jobId']}"})
+    }
+
+def lambda_handler(event, context):
+    # One EMF record per request: stage timings, model usage, cache and retry outcomes
+    metrics = RequestMetrics(default_sink, dimensions={"Operation": "Generate"})
+    metrics.put_property("RequestId", getattr(context, "aws_request_id", None))
+    if metrics.log_payloads:
+        logger.info("Received event: %s", json.dumps(event))
+    else:
+        logger.info("Received generation request.")
+
+    with metrics.timer("Total"):
+        response = handle_request(event, metrics)
+
+    metrics.put_property("StatusCode", response["statusCode"])
+    metrics.add("ServerErrors", 1 if response["statusCode"] >= 500 else 0)
+    metrics.add("ClientErrors", 1 if 400 <= response["statusCode"] < 500 else 0)
+    metrics.flush()
+    return response
+
+def handle_request(event, metrics):
+    try:
+        with metrics.timer("Parse"):
+            # Support both API Gateway and direct Lambda console invocation
+            if "body" in event:
+                body = json.loads(event["body"])
+            else:
+                body = event  # For direct Lambda console invocation
+
+        if body.get("async"):
+            return submit_job(body, metrics)
+
+        bedrock_service = BedrockService(cache=generation_cache, router=model_router, lease=generation_lease)
+        try:
+            return generate_response(bedrock_service, body, metrics)
+        finally:
+            metrics.record_usage(bedrock_service.usage_snapshot())
     except json.JSONDecodeError:
         logger.error("Invalid JSON in request body.")
         return {
@@ -118,6 +570,9 @@ def lambda_handler(event, context):
             'statusCode': 400,
             'body': json.dumps({'message': str(ve)})
         }
+    except ModelInvocationError as me:
+        logger.error("Model invocation failed (%s): %s", me.code, me)
+        return model_error_response(me)
     except Exception as e:
         logger.error("Error in Lambda handler: %s", e)
         return {
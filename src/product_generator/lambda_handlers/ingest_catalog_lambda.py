@@ -0,0 +1,462 @@
+import csv
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from itertools import islice
+
+from product_generator.lambda_handlers.generate_description_lambda import (
+    SUPPORTED_FORMATS,
+    build_storage_item,
+    generate_batch,
+    generation_cache,
+    generation_lease,
+    model_router,
+)
+from product_generator.lambda_handlers.store_description_lambda import store_items
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.clients import get_client
+from product_generator.services.dynamodb_service import DynamoDBService, now_millis
+from product_generator.services.item_codec import codec_from_env
+from product_generator.services.resilience import ModelInvocationError
+from product_generator.services.s3_service import S3Service
+from product_generator.utils.metrics import RequestMetrics, default_sink, payload_logging_sampled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Bulk ingestion: a product feed (CSV or JSON Lines) is streamed from S3 and
+# generated in chunks. After every chunk its results are written to S3, its
+# descriptions to DynamoDB, and a checkpoint recording the byte offset reached.
+# An invocation that runs low on time stops between chunks and, when deployed,
+# re-invokes itself with the job id to carry on from the checkpoint.
+INGEST_S3_BUCKET = os.environ.get("INGEST_S3_BUCKET")
+INGEST_PREFIX = os.environ.get("INGEST_PREFIX", "ingestion")
+PRODUCT_DESCRIPTIONS_TABLE = os.environ.get("PRODUCT_DESCRIPTIONS_TABLE")
+INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", "25"))
+INGEST_MAX_CHUNK_SIZE = 500
+INGEST_MAX_CONCURRENCY = int(os.environ.get("INGEST_MAX_CONCURRENCY", "8"))
+# Stop starting chunks once less than this is left; must cover one chunk's work
+INGEST_TIME_RESERVE_MS = int(os.environ.get("INGEST_TIME_RESERVE_SECONDS", "120")) * 1000
+INGEST_CONTINUE_ASYNC = os.environ.get("INGEST_CONTINUE_ASYNC", "true").lower() == "true"
+# A job paused by a throttled or unavailable model re-invokes itself too, and
+# the next invocation waits out the pause before it starts: the model's retry
+# hint, or INGEST_PAUSE_BASE_SECONDS doubled per consecutive pause, capped at
+# INGEST_PAUSE_MAX_SECONDS. After INGEST_MAX_PAUSES pauses in a row without
+# progress the job stays paused until it is resubmitted.
+INGEST_PAUSE_BASE_SECONDS = int(os.environ.get("INGEST_PAUSE_BASE_SECONDS", "15"))
+INGEST_PAUSE_MAX_SECONDS = int(os.environ.get("INGEST_PAUSE_MAX_SECONDS", "120"))
+INGEST_MAX_PAUSES = int(os.environ.get("INGEST_MAX_PAUSES", "5"))
+# Compact item encoding for the descriptions written (ITEM_CODEC)
+item_codec = codec_from_env()
+
+FEED_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+RUNNING = "running"
+PAUSED = "paused"
+COMPLETED = "completed"
+
+def job_prefix(job_id):
+    return f"{INGEST_PREFIX}/{job_id}"
+
+def checkpoint_key(job_id):
+    return f"{job_prefix(job_id)}/checkpoint.json"
+
+def results_key(job_id, chunk_index):
+    return f"{job_prefix(job_id)}/results/part-{chunk_index:06d}.jsonl"
+
+def feed_format_for(key, feed_format=None):
+    feed_format = feed_format or next((f for ext, f in FEED_FORMATS.items() if key.lower().endswith(ext)), None)
+    if feed_format not in ("csv", "jsonl"):
+        raise ValueError("Cannot tell the feed format from the key; pass feedFormat as csv or jsonl.")
+    return feed_format
+
+def counted_lines(lines, start_byte):
+    # Yields (line, offset just past it), so a record's end offset is known
+    # as soon as the parser has consumed it
+    offset = start_byte
+    for line in lines:
+        offset += len(line.encode("utf-8"))
+        yield line, offset
+
+def read_csv_header(s3_service, bucket, key):
+    # Returns (column names, byte offset of the first data row)
+    lines = counted_lines(s3_service.iter_object_lines(bucket, key), 0)
+    offset = 0
+
+    def tracked():
+        nonlocal offset
+        for line, offset in lines:
+            yield line
+
+    header = next(csv.reader(tracked()), None)
+    lines.close()
+    if not header:
+        raise ValueError(f"Feed s3://{bucket}/{key} is empty.")
+    # A byte order mark from spreadsheet exports ends up in the first name
+    header[0] = header[0].lstrip("\ufeff")
+    return [name.strip() for name in header], offset
+
+def parse_features(value):
+    # CSV feeds carry features as a JSON array or a comma-separated list (the
+    # way exports write them)
+    if isinstance(value, list):
+        return value
+    value = (value or "").strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [feature.strip() for feature in value.split(",") if feature.strip()]
+
+def iter_feed(s3_service, job):
+    # Yields (product, parse_error, end_offset) per record from the checkpoint
+    # offset on. Blank lines are skipped; a record that cannot be parsed is
+    # reported rather than stopping the job.
+    source = job["source"]
+    start_byte = job["offset"]
+    lines = counted_lines(s3_service.iter_object_lines(source["bucket"], source["key"], start_byte=start_byte),
+                          start_byte)
+    try:
+        if source["feedFormat"] == "jsonl":
+            for line, offset in lines:
+                if not line.strip():
+                    continue
+                try:
+                    product = json.loads(line)
+                    if not isinstance(product, dict):
+                        raise ValueError("Each line must be a JSON object.")
+                    yield product, None, offset
+                except ValueError as e:
+                    yield None, f"Unreadable record: {e}", offset
+            return
+
+        offset = start_byte
+
+        def tracked():
+            nonlocal offset
+            for line, offset in lines:
+                yield line
+
+        header = job["header"]
+        for row in csv.reader(tracked()):
+            if not row:
+                continue
+            if len(row) > len(header):
+                yield None, f"Unreadable record: {len(row)} fields for {len(header)} columns.", offset
+                continue
+            # Empty cells fall back to the job defaults
+            product = {name: value for name, value in zip(header, row) if value != ""}
+            try:
+                if "features" in product:
+                    product["features"] = parse_features(product["features"])
+                yield product, None, offset
+            except ValueError as e:
+                yield None, f"Unreadable record: {e}", offset
+    finally:
+        lines.close()
+
+def new_job(s3_service, options):
+    source = {
+        "bucket": options["bucket"],
+        "key": options["key"],
+        "feedFormat": feed_format_for(options["key"], options["feedFormat"]),
+    }
+    header, offset = None, 0
+    if source["feedFormat"] == "csv":
+        header, offset = read_csv_header(s3_service, source["bucket"], source["key"])
+    return {
+        "jobId": options["job_id"],
+        "source": source,
+        "header": header,
+        "format": options["format"],
+        "chunkSize": options["chunk_size"],
+        "maxConcurrency": options["max_concurrency"],
+        "store": options["store"],
+        "backfill": options["backfill"],
+        "status": RUNNING,
+        "offset": offset,
+        "records": 0,
+        "chunks": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "storeFailed": 0,
+        # Consecutive pauses without progress
+        "pauses": 0,
+        "startedAt": now_millis(),
+        "updatedAt": now_millis(),
+    }
+
+def process_chunk(bedrock_service, dynamodb_service, job, chunk, metrics):
+    # Returns (result rows, storage failures, pause error). Rows stop at the
+    # first product that failed on a retryable model error, so the checkpoint
+    # never moves past it; that error (the one with the longest retry hint in
+    # the chunk) is returned to pause the job. When nothing precedes it the
+    # chunk is not worth recording and the error is raised instead. Products
+    # generated after the cut are generated again on resume, from the cache.
+    products = [product for product, error, _ in chunk if error is None]
+    outcomes = iter(generate_batch(bedrock_service, products, job["maxConcurrency"],
+                                   {"format": job["format"]}, metrics))
+
+    rows = []
+    storage_items = []
+    retryable_errors = []
+    cut = None
+    for number, (product, parse_error, _) in enumerate(chunk, start=job["records"]):
+        if parse_error is not None:
+            rows.append({"record": number, "status": "failed", "error": parse_error})
+            continue
+        outcome, error = next(outcomes)
+        if error is not None:
+            row = {"record": number, "status": "failed", "error": str(error)}
+            if isinstance(error, ModelInvocationError):
+                row["errorCode"] = error.code
+                row["retryable"] = error.retryable
+                if error.retryable:
+                    retryable_errors.append(error)
+                    if cut is None:
+                        cut = len(rows)
+            rows.append(row)
+            continue
+        product_metadata, response_descriptions, format_type = outcome
+        storage_item = build_storage_item(product_metadata, response_descriptions, format_type)
+        if product.get("productId"):
+            # Feeds that carry their own identifiers keep them
+            storage_item["productId"] = str(product["productId"])
+        rows.append({"record": number, "productId": storage_item["productId"], "status": "succeeded",
+                     "descriptions": response_descriptions})
+        storage_items.append((len(rows) - 1, storage_item))
+
+    pause_error = None
+    if cut is not None:
+        pause_error = max(retryable_errors, key=lambda e: e.retry_after or 0)
+        if cut == 0:
+            raise pause_error
+        rows = rows[:cut]
+        storage_items = [(row_index, item) for row_index, item in storage_items if row_index < cut]
+
+    store_failed = 0
+    if storage_items and job["store"] and dynamodb_service is not None:
+        with metrics.timer("Store"):
+            outcomes = store_items(dynamodb_service, [item for _, item in storage_items], metrics,
+                                   conditional=not job.get("backfill", False))
+        for (row_index, _), outcome in zip(storage_items, outcomes):
+            # Items skipped as already stored count as stored
+            rows[row_index]["stored"] = outcome["status"] != "failed"
+            if not rows[row_index]["stored"]:
+                rows[row_index]["storeError"] = outcome.get("error")
+                store_failed += 1
+    return rows, store_failed, pause_error
+
+def write_results(s3_service, job, rows):
+    body = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+    object_key = results_key(job["jobId"], job["chunks"])
+    if not s3_service.upload_file(body, INGEST_S3_BUCKET, object_key, content_type="application/x-ndjson"):
+        raise RuntimeError(f"Failed to write chunk results to s3://{INGEST_S3_BUCKET}/{object_key}.")
+
+def remaining_millis(context):
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    return remaining() if remaining is not None else None
+
+def run_job(job, bedrock_service, dynamodb_service, s3_service, context, metrics):
+    # Works through chunks until the feed ends, time runs short or the model
+    # keeps refusing. The checkpoint advances past whole chunks, or up to the
+    # first retryable failure of a chunk that pauses the job, so a resumed run
+    # repeats at most the records that were in flight (writes are idempotent).
+    retry_after = None
+    job["status"] = RUNNING
+    chunks_run = 0
+    feed = iter_feed(s3_service, job)
+    try:
+        while True:
+            # At least one chunk per invocation, so a misjudged reserve cannot stall the job
+            remaining = remaining_millis(context) if chunks_run else None
+            if remaining is not None and remaining < INGEST_TIME_RESERVE_MS:
+                logger.info("Job %s stopping with %d ms left.", job["jobId"], remaining)
+                break
+            with metrics.timer("Read"):
+                chunk = list(islice(feed, job["chunkSize"]))
+            if not chunk:
+                job["status"] = COMPLETED
+                break
+
+            try:
+                rows, store_failed, pause_error = process_chunk(bedrock_service, dynamodb_service, job, chunk,
+                                                                metrics)
+            except ModelInvocationError as me:
+                # The model is throttled or unavailable; leave the checkpoint where it is
+                rows, pause_error = [], me
+
+            if rows:
+                with metrics.timer("ResultWrite"):
+                    write_results(s3_service, job, rows)
+                succeeded = sum(1 for row in rows if row["status"] == "succeeded")
+                job.update({
+                    # End of the last record kept, which is the whole chunk unless it was cut short
+                    "offset": chunk[len(rows) - 1][2],
+                    "records": job["records"] + len(rows),
+                    "chunks": job["chunks"] + 1,
+                    "succeeded": job["succeeded"] + succeeded,
+                    "failed": job["failed"] + len(rows) - succeeded,
+                    "storeFailed": job["storeFailed"] + store_failed,
+                    "pauses": 0,
+                    "updatedAt": now_millis(),
+                })
+                s3_service.write_json(job, INGEST_S3_BUCKET, checkpoint_key(job["jobId"]))
+                chunks_run += 1
+                metrics.add("Records", len(rows))
+                metrics.add("Chunks", 1)
+
+            if pause_error is not None:
+                job["status"] = PAUSED
+                job["pauses"] = job.get("pauses", 0) + 1
+                retry_after = pause_error.retry_after
+                logger.warning("Job %s paused at record %d: %s", job["jobId"], job["records"], pause_error.code)
+                break
+    finally:
+        feed.close()
+
+    job["updatedAt"] = now_millis()
+    s3_service.write_json(job, INGEST_S3_BUCKET, checkpoint_key(job["jobId"]))
+    return retry_after
+
+def pause_seconds(job, retry_after=None):
+    backoff = INGEST_PAUSE_BASE_SECONDS * 2 ** (max(job.get("pauses", 1), 1) - 1)
+    return min(max(retry_after or 0, backoff), INGEST_PAUSE_MAX_SECONDS)
+
+def continue_async(context, job_id, wait_seconds=0):
+    # Hands the rest of the job to a fresh invocation of this function, which
+    # first waits wait_seconds when the job was paused
+    function_arn = getattr(context, "invoked_function_arn", None)
+    if not INGEST_CONTINUE_ASYNC or not function_arn:
+        return False
+    payload = {"jobId": job_id}
+    if wait_seconds:
+        payload["resumeAfterSeconds"] = wait_seconds
+    get_client("lambda").invoke(
+        FunctionName=function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload)
+    )
+    logger.info("Re-invoked %s to continue job %s.", function_arn, job_id)
+    return True
+
+def job_response(job, retry_after=None, continued=False):
+    status = job["status"]
+    body = {
+        "message": f"Ingestion job {status}: {job['records']} record(s) processed.",
+        "jobId": job["jobId"],
+        "status": status,
+        "records": job["records"],
+        "succeeded": job["succeeded"],
+        "failed": job["failed"],
+        "storeFailed": job["storeFailed"],
+        "chunks": job["chunks"],
+        "offset": job["offset"],
+        "continued": continued,
+        "bucket": INGEST_S3_BUCKET,
+        "resultsPrefix": f"{job_prefix(job['jobId'])}/results/",
+    }
+    if status == COMPLETED:
+        return {'statusCode': 200, 'body': json.dumps(body)}
+    if status == PAUSED and not continued:
+        headers = {"Retry-After": str(max(1, int(round(retry_after or 0))))}
+        return {'statusCode': 503, 'headers': headers, 'body': json.dumps(body)}
+    return {'statusCode': 202, 'body': json.dumps(body)}
+
+def parse_options(event):
+    options = json.loads(event["body"]) if "body" in event else event
+
+    job_id = options.get("jobId") or uuid.uuid4().hex
+    if not JOB_ID_PATTERN.match(str(job_id)):
+        raise ValueError("jobId may only contain letters, digits, '-' and '_' (at most 64).")
+
+    format_type = options.get("format", "detailed")
+    if format_type not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format type: {format_type}. Supported: {', '.join(SUPPORTED_FORMATS)}.")
+
+    chunk_size = int(options.get("chunkSize", INGEST_CHUNK_SIZE))
+    if not 1 <= chunk_size <= INGEST_MAX_CHUNK_SIZE:
+        raise ValueError(f"chunkSize must be between 1 and {INGEST_MAX_CHUNK_SIZE}.")
+
+    max_concurrency = int(options.get("maxConcurrency", INGEST_MAX_CONCURRENCY))
+    return {
+        "job_id": str(job_id),
+        "resume": "jobId" in options,
+        "bucket": options.get("bucket", INGEST_S3_BUCKET),
+        "key": options.get("key"),
+        "feedFormat": options.get("feedFormat"),
+        "format": format_type,
+        "chunk_size": chunk_size,
+        "max_concurrency": max(1, min(max_concurrency, INGEST_MAX_CONCURRENCY)),
+        "store": str(options.get("store", "true")).lower() == "true",
+        # Initial loads into an empty table: store with BatchWriteItem instead of conditional puts
+        "backfill": str(options.get("backfill", "false")).lower() == "true",
+        # Set by a paused job's own re-invocation
+        "resume_after": min(float(options.get("resumeAfterSeconds", 0)), INGEST_PAUSE_MAX_SECONDS),
+    }
+
+def lambda_handler(event, context):
+    if payload_logging_sampled():
+        logger.info("Received event for ingestion: %s", json.dumps(event))
+
+    if not INGEST_S3_BUCKET:
+        logger.error("INGEST_S3_BUCKET environment variable not set.")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Configuration error: ingestion bucket not set.'})
+        }
+
+    s3_service = S3Service()
+    metrics = RequestMetrics(default_sink, dimensions={"Operation": "Ingest"})
+    metrics.put_property("RequestId", getattr(context, "aws_request_id", None))
+
+    try:
+        options = parse_options(event)
+        job = s3_service.read_json(INGEST_S3_BUCKET, checkpoint_key(options["job_id"])) if options["resume"] else None
+        if job is None:
+            if not options["key"]:
+                raise ValueError("A new ingestion job requires the feed's key (and bucket).")
+            job = new_job(s3_service, options)
+            logger.info("Starting ingestion job %s from s3://%s/%s.", job["jobId"], options["bucket"], options["key"])
+        elif job["status"] == COMPLETED:
+            return job_response(job)
+        metrics.put_property("JobId", job["jobId"])
+
+        dynamodb_service = DynamoDBService(PRODUCT_DESCRIPTIONS_TABLE, codec=item_codec) \
+            if PRODUCT_DESCRIPTIONS_TABLE else None
+        bedrock_service = BedrockService(cache=generation_cache, router=model_router, lease=generation_lease)
+        if options["resume_after"] > 0:
+            logger.info("Job %s waiting %.0f s before resuming after a pause.", job["jobId"], options["resume_after"])
+            time.sleep(options["resume_after"])
+        try:
+            with metrics.timer("Total"):
+                retry_after = run_job(job, bedrock_service, dynamodb_service, s3_service, context, metrics)
+        finally:
+            metrics.record_usage(bedrock_service.usage_snapshot())
+            metrics.flush()
+
+        if job["status"] == RUNNING:
+            continued = continue_async(context, job["jobId"])
+        elif job["status"] == PAUSED and job.get("pauses", 0) <= INGEST_MAX_PAUSES:
+            continued = continue_async(context, job["jobId"], pause_seconds(job, retry_after))
+        else:
+            continued = False
+        logger.info("Ingestion job %s %s after %d record(s).", job["jobId"], job["status"], job["records"])
+        return job_response(job, retry_after, continued)
+
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': str(ve)})
+        }
+    except Exception as e:
+        logger.error("Error in IngestCatalogLambda handler: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'message': f'Failed to run ingestion job: {e}'
+            })
+        }
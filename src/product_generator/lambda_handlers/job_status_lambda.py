@@ -0,0 +1,77 @@
+import json
+import logging
+import os
+
+from product_generator.services.job_store import TERMINAL_STATUSES, JobStore, job_view, wait_for_job
+from product_generator.utils.metrics import payload_logging_sampled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# GET /jobs/{jobId}?wait=20 returns the job, waiting up to "wait" seconds for
+# it to finish first (long polling), so clients need few requests per job.
+JOBS_TABLE = os.environ.get("JOBS_TABLE")
+# Kept under the API's 30 s integration timeout
+JOB_MAX_WAIT_SECONDS = float(os.environ.get("JOB_MAX_WAIT_SECONDS", "20"))
+# Time kept back for answering before the function itself times out
+JOB_WAIT_RESERVE_MS = 1000
+
+job_store = JobStore(JOBS_TABLE) if JOBS_TABLE else None
+
+def wait_seconds(event, context):
+    query = event.get("queryStringParameters") or {}
+    try:
+        wait = float(query.get("wait", 0))
+    except ValueError:
+        raise ValueError("wait must be a number of seconds.")
+    wait = max(0.0, min(wait, JOB_MAX_WAIT_SECONDS))
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        wait = min(wait, max(0.0, (context.get_remaining_time_in_millis() - JOB_WAIT_RESERVE_MS) / 1000))
+    return wait
+
+def lambda_handler(event, context):
+    if payload_logging_sampled():
+        logger.info("Received event for job status: %s", json.dumps(event))
+
+    if job_store is None:
+        logger.error("JOBS_TABLE environment variable not set.")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'Jobs table not configured.'})
+        }
+
+    try:
+        job_id = (event.get("pathParameters") or {}).get("jobId") or event.get("jobId")
+        if not job_id:
+            raise ValueError("Pass the jobId in the path.")
+        job = wait_for_job(job_store, job_id, wait_seconds(event, context))
+        if job is None:
+            return {
+                'statusCode': 404,
+                'body': json.dumps({'message': f'Unknown job: {job_id}.'})
+            }
+
+        headers = {}
+        if job["status"] not in TERMINAL_STATUSES:
+            # Hint for clients that poll without waiting
+            headers["Retry-After"] = "2"
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps(job_view(job))
+        }
+
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': str(ve)})
+        }
+    except Exception as e:
+        logger.error("Error in JobStatusLambda handler: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'message': f'Failed to read job: {e}'
+            })
+        }
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import random
+from decimal import Decimal
+
+from product_generator.lambda_handlers import generate_description_lambda
+from product_generator.services.job_store import JobBusyError, JobStore, job_request
+from product_generator.services.queue_service import QueueService
+from product_generator.utils.concurrency import run_bounded
+from product_generator.utils.metrics import RequestMetrics, default_sink
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Runs queued generation jobs. Each SQS message is {"item": {"jobId": ...}};
+# the job's request goes through the same path as a synchronous /generate
+# call and its response is saved on the job. Throttles, timeouts and an open
+# circuit put the job back to "queued" and report the message as failed, with
+# its visibility shortened to a backoff so SQS redelivers it soon; other
+# errors fail the job.
+JOBS_TABLE = os.environ.get("JOBS_TABLE")
+JOB_QUEUE_URL = os.environ.get("JOB_QUEUE_URL")
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "4"))
+# Messages of one SQS batch generated at the same time
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", "4"))
+# How long a running job is left to its worker before a redelivery may take
+# it over; longer than this function's timeout
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "330"))
+# Redelivery delay after a retryable failure: doubles per attempt, capped
+JOB_RETRY_BASE_SECONDS = int(os.environ.get("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_RETRY_MAX_SECONDS = int(os.environ.get("JOB_RETRY_MAX_SECONDS", "120"))
+
+RETRYABLE_STATUS_CODES = (429, 503, 504)
+
+job_store = JobStore(JOBS_TABLE, lease_seconds=JOB_LEASE_SECONDS) if JOBS_TABLE else None
+
+def parse_job_id(record):
+    payload = json.loads(record["body"])
+    payload = payload.get("item", payload)
+    return payload["jobId"]
+
+def retry_delay_seconds(attempts):
+    # Jittered between half and all of the exponential cap, so requeued jobs
+    # throttled together do not all come back at once
+    cap = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return int(random.uniform(cap / 2, cap))
+
+def delay_redelivery(receipt_handle, seconds):
+    if not JOB_QUEUE_URL or not receipt_handle:
+        # The message comes back after the queue's visibility timeout instead
+        return
+    QueueService(JOB_QUEUE_URL).delay_redelivery(receipt_handle, seconds)
+
+def run_job(job_id, receipt_handle=None):
+    # Returns True when the message is done with (job finished, or nothing to
+    # do), False when it should be redelivered
+    try:
+        job = job_store.start(job_id)
+    except JobBusyError:
+        # A duplicate delivery while another worker runs the job; it comes
+        # back after the visibility timeout in case that worker dies
+        logger.info("Job %s is running elsewhere; leaving the message for later.", job_id)
+        return False
+    if job is None:
+        logger.info("Job %s is unknown or already finished; skipping.", job_id)
+        return True
+
+    metrics = RequestMetrics(default_sink, dimensions={"Operation": "GenerateJob"})
+    metrics.put_property("JobId", job_id)
+    metrics.put_property("Attempt", int(job["attempts"]))
+    with metrics.timer("Total"):
+        response = generate_description_lambda.handle_request(job_request(job), metrics)
+    status_code = response["statusCode"]
+    metrics.put_property("StatusCode", status_code)
+    metrics.flush()
+
+    # The body is saved on the job item, and boto3 takes Decimal, not float
+    body = json.loads(response["body"], parse_float=Decimal)
+    if status_code < 400:
+        job_store.succeed(job_id, body, status_code)
+        return True
+    error = body.get("message", "Generation failed.")
+    if status_code in RETRYABLE_STATUS_CODES and int(job["attempts"]) < JOB_MAX_ATTEMPTS:
+        logger.info("Job %s hit a retryable error (%d); requeueing.", job_id, status_code)
+        job_store.requeue(job_id, error)
+        delay_redelivery(receipt_handle, retry_delay_seconds(int(job["attempts"])))
+        return False
+    job_store.fail(job_id, error, status_code)
+    return True
+
+def lambda_handler(event, context):
+    if not job_store:
+        logger.error("JOBS_TABLE environment variable not set.")
+        raise RuntimeError("JOBS_TABLE environment variable not set.")
+
+    records = event.get("Records", [])
+    failures = []
+    jobs = []
+    message_ids = []
+    for record in records:
+        try:
+            jobs.append((parse_job_id(record), record.get("receiptHandle")))
+            message_ids.append(record["messageId"])
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            # Unreadable messages can never succeed, so they are dropped
+            logger.error("Unreadable job message %s: %s", record.get("messageId"), e)
+
+    outcomes = run_bounded(lambda job: run_job(*job), jobs, JOB_WORKER_CONCURRENCY)
+    for message_id, (done, error) in zip(message_ids, outcomes):
+        if error is not None or not done:
+            failures.append({"itemIdentifier": message_id})
+
+    logger.info("Processed %d job message(s); %d to be redelivered.", len(records), len(failures))
+    # Partial batch failures need ReportBatchItemFailures on the event source mapping
+    return {"batchItemFailures": failures}
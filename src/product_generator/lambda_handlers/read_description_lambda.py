@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+
+from product_generator.services.description_store import DescriptionStore
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.utils.metrics import payload_logging_sampled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Read path for stored descriptions, so showing one never costs a model call:
+#   GET /descriptions/{productId}?format=short
+#   GET /descriptions?productIds=a,b,c&format=seo
+# Responses carry an ETag; a matching If-None-Match gets a bodiless 304.
+PRODUCT_DESCRIPTIONS_TABLE = os.environ.get("PRODUCT_DESCRIPTIONS_TABLE")
+READ_MAX_PRODUCTS = int(os.environ.get("READ_MAX_PRODUCTS", "50"))
+# How long a container (and, through Cache-Control, a client) may reuse a read
+READ_CACHE_TTL_SECONDS = int(os.environ.get("READ_CACHE_TTL_SECONDS", "60"))
+READ_CACHE_MAX_ENTRIES = int(os.environ.get("READ_CACHE_MAX_ENTRIES", "1024"))
+
+# Module-level so the read-through cache survives across warm invocations
+description_store = DescriptionStore(
+    PRODUCT_DESCRIPTIONS_TABLE,
+    cache=GenerationCache(max_entries=READ_CACHE_MAX_ENTRIES, ttl_seconds=READ_CACHE_TTL_SECONDS),
+) if PRODUCT_DESCRIPTIONS_TABLE else None
+
+def entity_tag(body: str) -> str:
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+def header(event, name):
+    # HTTP APIs lower-case header names; REST APIs keep the client's casing
+    headers = event.get("headers") or {}
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+def etag_matches(if_none_match, etag) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as If-None-Match requires
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def conditional_response(event, payload):
+    # DynamoDB numbers come back as Decimal
+    body = json.dumps(payload, sort_keys=True, default=str)
+    etag = entity_tag(body)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={READ_CACHE_TTL_SECONDS}"}
+    if etag_matches(header(event, "if-none-match"), etag):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': {**headers, "Content-Type": "application/json"}, 'body': body}
+
+def parse_request(event):
+    path_parameters = event.get("pathParameters") or {}
+    query = event.get("queryStringParameters") or {}
+    format_type = query.get("format", "all")
+
+    if path_parameters.get("productId"):
+        return [path_parameters["productId"]], format_type, True
+    product_ids = [p.strip() for p in (query.get("productIds") or "").split(",") if p.strip()]
+    if not product_ids:
+        raise ValueError("Pass a productId in the path or productIds in the query string.")
+    if len(product_ids) > READ_MAX_PRODUCTS:
+        raise ValueError(f"Too many productIds: {len(product_ids)} (max {READ_MAX_PRODUCTS}).")
+    return product_ids, format_type, False
+
+def lambda_handler(event, context):
+    if payload_logging_sampled():
+        logger.info("Received event for reading descriptions: %s", json.dumps(event))
+
+    if description_store is None:
+        logger.error("PRODUCT_DESCRIPTIONS_TABLE environment variable not set.")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': 'DynamoDB table name not configured.'})
+        }
+
+    try:
+        product_ids, format_type, single = parse_request(event)
+        records = description_store.lookup_many(product_ids, format_type)
+
+        if single:
+            record = records.get(product_ids[0])
+            if record is None:
+                return {
+                    'statusCode': 404,
+                    'body': json.dumps({'message': f'No stored {format_type} description for {product_ids[0]}.'})
+                }
+            return conditional_response(event, record)
+
+        return conditional_response(event, {
+            "items": [records[p] for p in product_ids if p in records],
+            "missing": [p for p in product_ids if p not in records],
+        })
+
+    except ValueError as ve:
+        logger.error("Validation Error: %s", ve)
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': str(ve)})
+        }
+    except Exception as e:
+        logger.error("Error in ReadDescriptionLambda handler: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'message': f'Failed to read descriptions: {e}'
+            })
+        }
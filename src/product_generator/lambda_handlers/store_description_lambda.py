@@ -1,16 +1,169 @@
 import json
 import logging
 import os
-from product_generator.services.dynamodb_service import DynamoDBService
+from decimal import Decimal
+
+from product_generator.services.dynamodb_service import (
+    CONTENT_HASH_ATTRIBUTE, DynamoDBService, content_hash, now_millis, stamp_change
+)
+from product_generator.services.item_codec import codec_from_env
+from product_generator.utils.concurrency import run_bounded
+from product_generator.utils.metrics import RequestMetrics, default_sink, payload_logging_sampled
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Get table name from environment variables (set in template.yaml)
 PRODUCT_DESCRIPTIONS_TABLE = os.environ.get("PRODUCT_DESCRIPTIONS_TABLE")
+# Compact item encoding for writes (ITEM_CODEC); readers unpack either form
+item_codec = codec_from_env()
+# Conditional puts in flight at once (BatchWriteItem cannot carry conditions,
+# so it is only used for unconditional writes)
+STORE_WRITE_CONCURRENCY = int(os.environ.get("STORE_WRITE_CONCURRENCY", "8"))
+
+REQUIRED_KEYS = ["productId", "timestamp", "metadata", "descriptions", "formatType"]
+
+# Writes are idempotent and ordered by "timestamp" (generation time, epoch
+# millis). An item is skipped when the stored copy has the same content hash
+# ("unchanged") or a later timestamp ("stale"), so retried invokes, queue
+# redeliveries and catalog re-runs spend no write capacity.
+SKIPPED_UNCHANGED = "unchanged"
+SKIPPED_STALE = "stale"
+# What the pre-write read fetches of each stored copy
+VERSION_ATTRIBUTES = ["productId", "formatType", "timestamp", CONTENT_HASH_ATTRIBUTE]
+
+def is_valid_item(item):
+    # boto3 rejects float attributes, so timestamps must be whole epoch millis
+    return (isinstance(item, dict) and all(k in item for k in REQUIRED_KEYS)
+            and isinstance(item["timestamp"], (int, Decimal)) and not isinstance(item["timestamp"], bool))
+
+def newer_condition(item):
+    # Holds when the key is new, or the stored copy is older and differs
+    from boto3.dynamodb.conditions import Attr
+
+    differs = Attr(CONTENT_HASH_ATTRIBUTE).not_exists() | Attr(CONTENT_HASH_ATTRIBUTE).ne(item[CONTENT_HASH_ATTRIBUTE])
+    return Attr("productId").not_exists() | (Attr("timestamp").lte(item["timestamp"]) & differs)
+
+def stored_versions(dynamodb_service, keys):
+    # The stored hash and timestamp per key. A failed read only costs the
+    # skip; the conditional puts still keep stale writes out.
+    try:
+        found = dynamodb_service.batch_get_items(keys, VERSION_ATTRIBUTES)
+    except Exception as e:
+        logger.warning("Could not read stored versions; writing conditionally without them: %s", e)
+        return {}
+    return {(item["productId"], item["formatType"]): item for item in found}
+
+def skip_reason(item, stored):
+    if stored is None:
+        return None
+    if stored.get(CONTENT_HASH_ATTRIBUTE) == item[CONTENT_HASH_ATTRIBUTE]:
+        return SKIPPED_UNCHANGED
+    if stored.get("timestamp", 0) > item["timestamp"]:
+        return SKIPPED_STALE
+    return None
+
+def store_items(dynamodb_service, items, metrics=None, conditional=True):
+    # Validates every item, skips the ones already stored or superseded, and
+    # writes the rest with conditional puts. Returns one outcome per input
+    # item, in input order: "stored", "skipped" (with a reason) or "failed".
+    # conditional=False writes them with BatchWriteItem instead, 25 per call:
+    # far fewer requests, but a copy written between the pre-read and the
+    # batch is overwritten. Meant for backfills into keys nothing else writes.
+    outcomes = [None] * len(items)
+    # Only the last item per (productId, formatType) is written; earlier ones share its outcome
+    latest_by_key = {}
+    for index, item in enumerate(items):
+        if is_valid_item(item):
+            latest_by_key[(item["productId"], item["formatType"])] = index
+        else:
+            logger.error("Invalid item structure for storage: %s", item)
+            outcomes[index] = {
+                "index": index,
+                "status": "failed",
+                "error": f"Invalid item structure. Requires keys: {', '.join(REQUIRED_KEYS)} (integer timestamp)."
+            }
+
+    # Every write carries its write time, for incremental exports
+    write_time = now_millis()
+    prepared = {
+        index: stamp_change({**items[index], CONTENT_HASH_ATTRIBUTE: content_hash(items[index])}, write_time)
+        for index in sorted(latest_by_key.values())
+    }
+    stored = stored_versions(dynamodb_service, [
+        {"productId": item["productId"], "formatType": item["formatType"]} for item in prepared.values()
+    ])
+
+    pending = []
+    for index, item in prepared.items():
+        reason = skip_reason(item, stored.get((item["productId"], item["formatType"])))
+        if reason:
+            outcomes[index] = {"index": index, "status": "skipped", "reason": reason}
+        else:
+            pending.append(index)
+
+    if not conditional:
+        batch_outcomes = dynamodb_service.batch_write_items([prepared[index] for index in pending])
+        for index, outcome in zip(pending, batch_outcomes):
+            outcomes[index] = {**outcome, "index": index}
+        written = []
+    else:
+        written = run_bounded(
+            lambda index: dynamodb_service.put_item_if(prepared[index], newer_condition(prepared[index])),
+            pending, STORE_WRITE_CONCURRENCY
+        )
+    for index, (accepted, error) in zip(pending, written):
+        if error is not None:
+            outcomes[index] = {"index": index, "status": "failed", "error": str(error)}
+        elif accepted:
+            outcomes[index] = {"index": index, "status": "stored"}
+        else:
+            # A newer or identical copy landed between the read and the write
+            outcomes[index] = {"index": index, "status": "skipped", "reason": SKIPPED_STALE}
+
+    for index, item in enumerate(items):
+        if outcomes[index] is None:
+            winner = outcomes[latest_by_key[(item["productId"], item["formatType"])]]
+            outcomes[index] = {**winner, "index": index}
+
+    if metrics is not None:
+        written_outcomes = [outcomes[index] for index in prepared]
+        metrics.add("Stored", sum(1 for o in written_outcomes if o["status"] == "stored"))
+        metrics.add("SkippedUnchanged", sum(1 for o in written_outcomes if o.get("reason") == SKIPPED_UNCHANGED))
+        metrics.add("SkippedStale", sum(1 for o in written_outcomes if o.get("reason") == SKIPPED_STALE))
+        metrics.add("StoreFailed", sum(1 for o in outcomes if o["status"] == "failed"))
+    return outcomes
+
+def parse_sqs_record(record):
+    # Message bodies carry the same payload as a direct invoke: {"item": {...}}
+    payload = json.loads(record["body"])
+    return payload.get("item", payload) if isinstance(payload, dict) else payload
+
+def handle_sqs_batch(dynamodb_service, records, metrics=None):
+    # Reports partial batch failures so SQS only redelivers the failed messages
+    # (requires ReportBatchItemFailures on the event source mapping).
+    items = []
+    message_ids = []
+    failures = []
+    for record in records:
+        try:
+            items.append(parse_sqs_record(record))
+            message_ids.append(record["messageId"])
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error("Unreadable SQS message %s: %s", record.get("messageId"), e)
+            failures.append({"itemIdentifier": record.get("messageId")})
+
+    # Skipped items are done with, so only failed ones are redelivered
+    for message_id, outcome in zip(message_ids, store_items(dynamodb_service, items, metrics)):
+        if outcome["status"] == "failed":
+            failures.append({"itemIdentifier": message_id})
+
+    logger.info("Processed %d of %d SQS messages.", len(records) - len(failures), len(records))
+    return {"batchItemFailures": failures}
 
 def lambda_handler(event, context):
-    logger.info("Received event for storing description: %s", json.dumps(event))
+    if payload_logging_sampled():
+        logger.info("Received event for storing description: %s", json.dumps(event))
 
     if not PRODUCT_DESCRIPTIONS_TABLE:
         logger.error("PRODUCT_DESCRIPTIONS_TABLE environment variable not set.")
@@ -19,36 +172,75 @@ def lambda_handler(event, context):
             'body': json.dumps({'message': 'DynamoDB table name not configured.'})
         }
 
-    dynamodb_service = DynamoDBService(PRODUCT_DESCRIPTIONS_TABLE)
+    dynamodb_service = DynamoDBService(PRODUCT_DESCRIPTIONS_TABLE, codec=item_codec)
+    metrics = RequestMetrics(default_sink, dimensions={"Operation": "StoreDescription"})
 
     try:
+        # SQS event source: {"Records": [{"messageId": ..., "body": ...}, ...]}
+        if "Records" in event:
+            response = handle_sqs_batch(dynamodb_service, event["Records"], metrics)
+            metrics.flush()
+            return response
+
+        # Batch payload: {"items": [{...}, ...]}
+        if "items" in event:
+            items = event["items"]
+            if not isinstance(items, list) or not items:
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({'message': "'items' must be a non-empty list."})
+                }
+            # "conditional": false batch-writes them (see store_items)
+            results = store_items(dynamodb_service, items, metrics,
+                                  conditional=str(event.get("conditional", "true")).lower() == "true")
+            metrics.flush()
+            stored = sum(1 for result in results if result["status"] == "stored")
+            skipped = sum(1 for result in results if result["status"] == "skipped")
+            failed = len(results) - stored - skipped
+            return {
+                'statusCode': 200 if not failed else 207,
+                'body': json.dumps({
+                    'message': f'Stored {stored} of {len(results)} descriptions ({skipped} already up to date).',
+                    'stored': stored,
+                    'skipped': skipped,
+                    'failed': failed,
+                    'results': results
+                })
+            }
+
         # Accepts payload in the form {"item": {...}}
         if "item" not in event:
             logger.error("Missing 'item' key in event: %s", event)
             return {
                 'statusCode': 400,
-                'body': json.dumps({'message': "Payload must contain 'item' key."})
+                'body': json.dumps({'message': "Payload must contain 'item' or 'items' key."})
             }
 
         item_to_store = event["item"]
 
         # Validate required keys in item_to_store
-        required_keys = ["productId", "timestamp", "metadata", "descriptions", "formatType"]
-        if not all(k in item_to_store for k in required_keys):
+        if not is_valid_item(item_to_store):
             logger.error("Invalid item structure for storage: %s", item_to_store)
             return {
                 'statusCode': 400,
-                'body': json.dumps({'message': f"Invalid item structure. Requires keys: {', '.join(required_keys)}."})
+                'body': json.dumps({'message': f"Invalid item structure. Requires keys: {', '.join(REQUIRED_KEYS)} (integer timestamp)."})
             }
 
-        # Store the whole item as-is
-        success = dynamodb_service.put_item(item_to_store)
+        # Same conditional write as a batch of one
+        outcome = store_items(dynamodb_service, [item_to_store], metrics)[0]
+        metrics.flush()
 
-        if success:
+        if outcome["status"] == "stored":
             return {
                 'statusCode': 200,
                 'body': json.dumps({'message': 'Description stored successfully.'})
             }
+        elif outcome["status"] == "skipped":
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'message': f'Description not written ({outcome["reason"]}).',
+                                    'skipped': outcome["reason"]})
+            }
         else:
             return {
                 'statusCode': 500,
@@ -56,10 +248,12 @@ def lambda_handler(event, context):
             }
     except Exception as e:
         logger.error("Error in StoreDescriptionLambda handler: %s", e)
+        if "Records" in event:
+            # Any other response shape would make SQS delete the whole batch
+            return {"batchItemFailures": [{"itemIdentifier": r.get("messageId")} for r in event["Records"]]}
         return {
             'statusCode': 500,
             'body': json.dumps({
                 'message': f'Failed to process storage request: {e}'
             })
         }
-
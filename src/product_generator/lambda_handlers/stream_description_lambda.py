@@ -0,0 +1,164 @@
+import itertools
+import json
+import logging
+
+from product_generator.lambda_handlers.generate_description_lambda import (
+    METADATA_FORMATS,
+    SUPPORTED_FORMATS,
+    format_descriptions,
+    generation_cache,
+    model_error_response,
+    model_router,
+)
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.resilience import ModelInvocationError
+from product_generator.utils.description_formatter import ShortDescriptionAccumulator
+from product_generator.utils.prompt_builder import plan_prompt
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Streaming variant of GenerateDescriptionLambda. Output is newline-delimited JSON:
+#   {"event": "short", "short": ...}         as soon as the first sentence is complete
+#   {"event": "token", "text": ...}          for every generated chunk (not for format "short")
+#   {"event": "done", "descriptions": {...}} once the requested formats are final
+#   {"event": "error", "message": ...}       if generation fails part-way; model
+#                                            failures also carry "error" and "retryable"
+
+def parse_request(event):
+    # Support both API Gateway and direct Lambda console invocation
+    if "body" in event:
+        body = json.loads(event["body"])
+    else:
+        body = event
+
+    title = body.get("title")
+    category = body.get("category")
+    features = body.get("features", [])
+    audience = body.get("audience")
+    format_type = body.get("format", "detailed")
+
+    if not all([title, category, features, audience]):
+        raise ValueError("Missing required product metadata: title, category, features, or audience.")
+    if format_type not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format type: {format_type}. Supported: {', '.join(SUPPORTED_FORMATS)}.")
+
+    product_metadata = {
+        "title": title,
+        "category": category,
+        "features": features,
+        "audience": audience
+    }
+    return product_metadata, format_type
+
+def stream_events(bedrock_service, product_metadata, format_type):
+    if format_type in METADATA_FORMATS:
+        yield {"event": "done", "descriptions": format_descriptions("", product_metadata, format_type)}
+        return
+
+    prompt = plan_prompt(product_metadata, format_type)
+    chunks = bedrock_service.invoke_model_stream(prompt.text, format_type=format_type,
+                                                 max_gen_len=prompt.max_gen_len, stop=prompt.stop)
+    accumulator = ShortDescriptionAccumulator()
+    wants_short = format_type in ("short", "all")
+
+    if format_type == "short":
+        # Finish early: stop reading from Bedrock once the first sentence is in
+        for chunk in chunks:
+            short_desc = accumulator.feed(chunk)
+            if short_desc is not None:
+                break
+        else:
+            short_desc = accumulator.finish()
+        chunks.close()
+        yield {"event": "short", "short": short_desc}
+        yield {"event": "done", "descriptions": {"short": short_desc}}
+        return
+
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        if wants_short and accumulator.short_description is None:
+            if accumulator.feed(chunk) is not None:
+                yield {"event": "short", "short": accumulator.short_description}
+        yield {"event": "token", "text": chunk}
+
+    full_generated_description = "".join(parts)
+    if wants_short and accumulator.short_description is None:
+        yield {"event": "short", "short": accumulator.finish()}
+
+    descriptions = format_descriptions(full_generated_description, product_metadata, format_type)
+    yield {"event": "done", "descriptions": descriptions}
+
+def stream_handler(event, context):
+    # Generator of encoded NDJSON lines, suitable for a streaming response writer
+    try:
+        product_metadata, format_type = parse_request(event)
+    except json.JSONDecodeError:
+        yield encode_event({"event": "error", "message": "Invalid JSON in request body."})
+        return
+    except ValueError as ve:
+        yield encode_event({"event": "error", "message": str(ve)})
+        return
+
+    bedrock_service = BedrockService(cache=generation_cache, router=model_router)
+    yield from encode_stream(stream_events(bedrock_service, product_metadata, format_type))
+
+def encode_stream(stream):
+    try:
+        for stream_event in stream:
+            yield encode_event(stream_event)
+    except ModelInvocationError as me:
+        logger.error("Model invocation failed while streaming (%s): %s", me.code, me)
+        yield encode_event({
+            "event": "error",
+            "message": f"Failed to generate description: {me}",
+            "error": me.code,
+            "retryable": me.retryable
+        })
+    except Exception as e:
+        logger.error("Error while streaming description: %s", e)
+        yield encode_event({"event": "error", "message": f"Failed to generate description: {e}"})
+
+def encode_event(stream_event):
+    return (json.dumps(stream_event) + "\n").encode("utf-8")
+
+def lambda_handler(event, context):
+    # The managed Python runtime cannot stream responses, so this entry point
+    # buffers the NDJSON. It still finishes early for format "short".
+    logger.info("Received streaming generation request.")
+
+    try:
+        product_metadata, format_type = parse_request(event)
+    except json.JSONDecodeError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': 'Invalid JSON in request body.'})
+        }
+    except ValueError as ve:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': str(ve)})
+        }
+
+    bedrock_service = BedrockService(cache=generation_cache, router=model_router)
+    stream = stream_events(bedrock_service, product_metadata, format_type)
+    try:
+        # Pull the first event before committing to a 200, so a throttled or
+        # unavailable model is reported with its own status code
+        first_event = next(stream)
+    except ModelInvocationError as me:
+        logger.error("Model invocation failed (%s): %s", me.code, me)
+        return model_error_response(me)
+    except Exception as e:
+        logger.error("Error while streaming description: %s", e)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'message': f'Failed to generate description: {e}'})
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/x-ndjson'},
+        'body': b"".join(encode_stream(itertools.chain([first_event], stream))).decode("utf-8")
+    }
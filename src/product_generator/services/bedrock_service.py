@@ -1,44 +1,264 @@
-import boto3
 import json
-from botocore.exceptions import ClientError
+import os
+import threading
+import time
+
+from product_generator.services.clients import get_client
+from product_generator.services.generation_cache import make_cache_key
+from product_generator.services.model_backends import Llama3Backend
+from product_generator.services.resilience import classify_error, invoker_from_env
+from product_generator.services.single_flight import SingleFlight, wait_for_leader
+from product_generator.utils.prompt_builder import STRUCTURED_MAX_GEN_LEN, estimate_tokens
+
+# Region for Bedrock calls; unset means the Lambda's own region
+BEDROCK_REGION = os.environ.get("BEDROCK_REGION")
+
+# One invoker per model, shared by every BedrockService in the container, so
+# the rate limiter and circuit breaker state survive across warm invocations
+_invokers = {}
+_invokers_lock = threading.Lock()
+
+# Coalesces identical in-flight generations across every BedrockService in the container
+default_single_flight = SingleFlight()
+
+def invoker_for(model_id):
+    with _invokers_lock:
+        if model_id not in _invokers:
+            _invokers[model_id] = invoker_from_env()
+        return _invokers[model_id]
+
+def parse_structured_generation(text, required_keys):
+    # Extracts the first JSON object from a generation, tolerating any preamble
+    # or code fences the model adds around it. Returns the subset of
+    # required_keys that hold non-empty strings (an empty dict when nothing parses).
+    start = text.find("{")
+    if start == -1:
+        return {}
+    try:
+        parsed, _ = json.JSONDecoder().raw_decode(text[start:])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {
+        key: parsed[key].strip()
+        for key in required_keys
+        if isinstance(parsed.get(key), str) and parsed[key].strip()
+    }
 
 class BedrockService:
-    def __init__(self, region="us-east-2"):
-        # Create a Bedrock Runtime client in the specified AWS Region.
-        self.client = boto3.client("bedrock-runtime", region_name=region)
-
-    def invoke_model(self, prompt):
-        # Set the model ID for Llama 3 70b Instruct.
-        model_id = "meta.llama3-3-70b-instruct-v1:0"
-
-        # Embed the prompt in Llama 3's instruction format.
-        formatted_prompt = f"""
-<|begin_of_text|><|start_header_id|>user<|end_header_id|>
-{prompt}
-<|eot_id|>
-<|start_header_id|>assistant<|end_header_id|>
-"""
-
-        # Format the request payload using the model's native structure.
-        native_request = {
-            "prompt": formatted_prompt,
-            "max_gen_len": 512,
-            "temperature": 0.5,
-        }
-
-        # Convert the native request to JSON.
-        request_payload = json.dumps(native_request)
+    def __init__(self, region=None, cache=None, client=None, invoker=None, backend=None, router=None,
+                 single_flight=None, lease=None):
+        # Create a Bedrock Runtime client in the configured AWS Region (falling
+        # back to the Lambda's own region), unless one is injected (e.g. a local stand-in).
+        self.client = client or get_client("bedrock-runtime", region_name=region or BEDROCK_REGION)
+
+        # Optional GenerationCache consulted before every model call.
+        self.cache = cache
+
+        # Rate limiting, retries and circuit breaking around every model call.
+        # Unless one is injected, each model gets its own shared invoker so one
+        # degraded model does not open the circuit for the others.
+        self.invoker = invoker
+
+        # Model used when no router is configured, or when it has no opinion.
+        self.backend = backend or Llama3Backend()
+        # Optional ModelRouter choosing a backend per request.
+        self.router = router
+
+        # Identical concurrent generations share one model call: in-process
+        # through single_flight, across containers through the optional lease
+        # (followers wait for the leader's result to land in the shared cache).
+        self.single_flight = single_flight or default_single_flight
+        self.lease = lease
+
+        # A JSON object holding every format needs more room than one description
+        self.structured_max_gen_len = STRUCTURED_MAX_GEN_LEN
+
+        # Cumulative model usage for this service instance (one per invocation),
+        # including cache and retry outcomes, for response headers and metrics
+        self._usage_lock = threading.Lock()
+        self.usage = {"calls": 0, "prompt_tokens": 0, "generation_tokens": 0, "latency_ms": 0.0,
+                      "cache_hits": 0, "cache_misses": 0, "retries": 0, "failures": 0}
+
+    @property
+    def model_id(self):
+        return self.backend.model_id
+
+    @property
+    def max_gen_len(self):
+        return self.backend.max_gen_len
+
+    @property
+    def temperature(self):
+        return self.backend.temperature
+
+    def select_backend(self, prompt, format_type=None, max_gen_len=None):
+        if self.router is None:
+            return self.backend
+        return self.router.choose(format_type, max_gen_len or self.backend.max_gen_len, estimate_tokens(prompt))
+
+    def cache_key(self, prompt, max_gen_len=None, backend=None, stop=()):
+        backend = backend or self.backend
+        return make_cache_key(prompt, backend.model_id, max_gen_len or backend.max_gen_len, backend.temperature, stop)
+
+    def invalidate_cached(self, prompt, max_gen_len=None, stop=()):
+        # Drops the entry for every model the request could have been routed to
+        if self.cache is not None:
+            backends = self.router.backends if self.router is not None else [self.backend]
+            for backend in backends:
+                self.cache.invalidate(self.cache_key(prompt, max_gen_len, backend, stop))
+
+    def build_request_payload(self, prompt, max_gen_len=None, stop=()):
+        return self.backend.build_request_payload(prompt, max_gen_len, stop)
+
+    def invoke_model(self, prompt, format_type=None, max_gen_len=None, stop=()):
+        # max_gen_len and stop come from the prompt builder's per-format budget;
+        # without them the backend's default budget applies
+        backend = self.select_backend(prompt, format_type, max_gen_len)
+        cache_key = self.cache_key(prompt, max_gen_len, backend, stop)
+
+        if self.cache is not None:
+            cached_text = self._cached(cache_key)
+            if cached_text is not None:
+                return cached_text
+
+        def generate():
+            response_text = self._call_model(backend, prompt, max_gen_len, stop)
+            # Only cache non-empty generations so a bad response is retried next time.
+            if self.cache is not None and response_text:
+                self.cache.put(cache_key, response_text)
+            return response_text
+
+        return self.single_flight.do(cache_key, lambda: self._lead_or_follow(cache_key, generate))
+
+    def invoke_model_structured(self, prompt, required_keys):
+        # Asks for a JSON object in one call and validates it. Returns
+        # (fields, raw_text): fields holds the keys that came back valid, so the
+        # caller can fall back to the formatter for anything missing. Only fully
+        # valid generations are cached.
+        max_gen_len = self.structured_max_gen_len
+        backend = self.select_backend(prompt, "all", max_gen_len)
+        cache_key = self.cache_key(prompt, max_gen_len, backend)
+
+        if self.cache is not None:
+            cached_text = self._cached(cache_key)
+            if cached_text is not None:
+                return parse_structured_generation(cached_text, required_keys), cached_text
+
+        def generate():
+            response_text = self._call_model(backend, prompt, max_gen_len)
+            fields = parse_structured_generation(response_text, required_keys)
+            if self.cache is not None and len(fields) == len(required_keys):
+                self.cache.put(cache_key, response_text)
+            return response_text
+
+        response_text = self.single_flight.do(cache_key, lambda: self._lead_or_follow(cache_key, generate))
+        return parse_structured_generation(response_text, required_keys), response_text
+
+    def _lead_or_follow(self, cache_key, generate):
+        # Cross-container coalescing; needs the shared cache tier to hand the result over
+        if self.lease is None or self.cache is None:
+            return generate()
+
+        owner = self.lease.acquire(cache_key)
+        if owner is None:
+            # Polls without counting; the wait as a whole is one hit or miss
+            cached_text = wait_for_leader(self.lease, cache_key, lambda: self.cache.peek(cache_key))
+            self.cache.record_poll(cached_text is not None)
+            if cached_text is not None:
+                return cached_text
+            owner = self.lease.acquire(cache_key)
 
         try:
-            # Invoke the model with the request.
-            response = self.client.invoke_model(modelId=model_id, body=request_payload)
-        except (ClientError, Exception) as e:
-            print(f"ERROR: Can't invoke '{model_id}'. Reason: {e}")
-            exit(1)
-
-        # Decode the response body.
-        model_response = json.loads(response["body"].read())
-
-        # Extract and print the response text.
-        response_text = model_response.get("generation", "")    
-        return response_text
\ No newline at end of file
+            return generate()
+        finally:
+            if owner is not None:
+                self.lease.release(cache_key, owner)
+
+    def usage_snapshot(self):
+        with self._usage_lock:
+            return dict(self.usage)
+
+    def _count(self, name, amount=1):
+        with self._usage_lock:
+            self.usage[name] += amount
+
+    def _cached(self, cache_key):
+        cached_text = self.cache.get(cache_key)
+        self._count("cache_hits" if cached_text is not None else "cache_misses")
+        return cached_text
+
+    def _invoker_for(self, backend):
+        return self.invoker or invoker_for(backend.model_id)
+
+    def _call_model(self, backend, prompt, max_gen_len=None, stop=()):
+        model_id = backend.model_id
+        start = time.perf_counter()
+
+        # Invoke the model with the request; failures raise a ModelInvocationError.
+        try:
+            response_text, prompt_tokens, generation_tokens = self._invoker_for(backend).call(
+                lambda: backend.invoke(self.client, prompt, max_gen_len, stop),
+                model_id,
+                on_retry=lambda: self._count("retries")
+            )
+        except Exception:
+            self._observe(model_id, start, success=False)
+            self._count("failures")
+            raise
+        latency_ms = self._observe(model_id, start, success=True)
+
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["generation_tokens"] += generation_tokens
+            self.usage["latency_ms"] += latency_ms
+
+        return response_text
+
+    def _observe(self, model_id, start, success):
+        latency_ms = (time.perf_counter() - start) * 1000
+        if self.router is not None:
+            self.router.record(model_id, latency_ms, success)
+        return latency_ms
+
+    def invoke_model_stream(self, prompt, format_type=None, max_gen_len=None, stop=()):
+        # Yields generated text chunks as Bedrock streams them back. A cached
+        # generation is yielded as a single chunk. The full text is only cached
+        # when the stream is consumed to the end, never when a caller stops early.
+        backend = self.select_backend(prompt, format_type, max_gen_len)
+        model_id = backend.model_id
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache_key(prompt, max_gen_len, backend, stop)
+            cached_text = self._cached(cache_key)
+            if cached_text is not None:
+                yield cached_text
+                return
+
+        # Only opening the stream is retried; once text has been yielded a
+        # mid-stream error is surfaced as-is.
+        start = time.perf_counter()
+        try:
+            stream = self._invoker_for(backend).call(lambda: backend.open_stream(self.client, prompt, max_gen_len, stop),
+                                                     model_id, on_retry=lambda: self._count("retries"))
+        except Exception:
+            self._observe(model_id, start, success=False)
+            self._count("failures")
+            raise
+        # Time to first byte is what the router compares for streams
+        self._observe(model_id, start, success=True)
+
+        chunks = []
+        try:
+            for text in stream:
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            raise classify_error(e, model_id) from e
+
+        response_text = "".join(chunks)
+        if cache_key is not None and response_text:
+            self.cache.put(cache_key, response_text)
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Per-container registry of boto3 clients and resources. Each one is built on
+# first use and reused by every later (warm) invocation, so session setup and
+# endpoint resolution happen once per container. boto3 itself is only imported
+# when the first client is requested, which keeps handler import time low.
+
+MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "16"))
+# Below the 30 s function and API Gateway timeout, so a hung generation fails
+# while the handler still has time to answer
+BEDROCK_READ_TIMEOUT = int(os.environ.get("BEDROCK_READ_TIMEOUT_SECONDS", "25"))
+
+# Tuned per service; everything else gets the defaults below
+SERVICE_CONFIG = {
+    # Generations can take tens of seconds. Retries are left to the resilience
+    # layer so throttles feed its rate limiter and circuit breaker.
+    "bedrock-runtime": {"read_timeout": BEDROCK_READ_TIMEOUT, "retries": {"mode": "standard", "max_attempts": 1}},
+    "dynamodb": {"read_timeout": 10},
+    "lambda": {"read_timeout": 10},
+}
+DEFAULT_CONFIG = {
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    "max_pool_connections": MAX_POOL_CONNECTIONS,
+    "tcp_keepalive": True,
+    "retries": {"mode": "standard", "max_attempts": 3},
+}
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+
+def get_session():
+    # boto3's default session is not thread-safe to build clients from, so the
+    # registry owns its own session and only touches it under the lock
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import boto3
+                _session = boto3.session.Session()
+    return _session
+
+def get_client(service_name: str, region_name: str = None):
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        session = get_session()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = session.client(service_name, region_name=region_name, config=_config_for(service_name))
+                _clients[key] = client
+    return client
+
+def get_resource(service_name: str, region_name: str = None):
+    key = (service_name, region_name)
+    resource = _resources.get(key)
+    if resource is None:
+        session = get_session()
+        with _lock:
+            resource = _resources.get(key)
+            if resource is None:
+                resource = session.resource(service_name, region_name=region_name, config=_config_for(service_name))
+                _resources[key] = resource
+    return resource
+
+def register(service_name: str, client=None, resource=None, region_name: str = None):
+    # Installs a ready-made client or resource, e.g. a local stand-in
+    with _lock:
+        if client is not None:
+            _clients[(service_name, region_name)] = client
+        if resource is not None:
+            _resources[(service_name, region_name)] = resource
+
+def use_session(session):
+    # Builds every later client and resource from session, e.g. one handing out
+    # local stand-ins; reset() goes back to boto3's
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _session = session
+
+def reset():
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _session = None
+
+def _config_for(service_name: str):
+    from botocore.config import Config
+    return Config(**{**DEFAULT_CONFIG, **SERVICE_CONFIG.get(service_name, {})})
@@ -0,0 +1,125 @@
+import logging
+
+from product_generator.services.dynamodb_service import CHANGE_TIME_ATTRIBUTE, DynamoDBService
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Read side of the ProductDescriptions table. A format can be stored on its own
+# item (formatType "short", ...) or inside an "all" item, so every lookup reads
+# both candidates in one BatchGetItem, projected down to the requested
+# descriptions, and keeps the freshest copy of each format.
+
+DESCRIPTION_FORMATS = ("short", "detailed", "social", "seo")
+RECORD_ATTRIBUTES = ("productId", "formatType", "timestamp", CHANGE_TIME_ATTRIBUTE, "metadata")
+
+def product_id_for(title: str) -> str:
+    return title.replace(" ", "-").lower()
+
+def requested_formats(format_type: str) -> tuple:
+    if format_type == "all":
+        return DESCRIPTION_FORMATS
+    if format_type not in DESCRIPTION_FORMATS:
+        raise ValueError(f"Unsupported format type: {format_type}. "
+                         f"Supported: {', '.join(DESCRIPTION_FORMATS + ('all',))}.")
+    return (format_type,)
+
+def freshness(item: dict) -> int:
+    # Write time when stamped, else generation time
+    return int(item.get(CHANGE_TIME_ATTRIBUTE) or item.get("timestamp") or 0)
+
+def merge_record(product_id: str, format_type: str, items: list, metadata=None):
+    # Builds {"productId", "formatType", "descriptions", "metadata", "updatedAt"}
+    # from the candidate items, or None when any requested format is missing.
+    # Only items written for one metadata are merged: the given metadata, else
+    # that of the freshest candidate. A copy generated for an older title or
+    # feature list never supplies a format next to a newer one.
+    formats = requested_formats(format_type)
+    candidates = [item for item in items if any(fmt in (item.get("descriptions") or {}) for fmt in formats)]
+    if not candidates:
+        return None
+    if metadata is None:
+        metadata = max(candidates, key=freshness).get("metadata")
+    candidates = [item for item in candidates if item.get("metadata") == metadata]
+
+    descriptions = {}
+    newest = None
+    for fmt in formats:
+        holders = [item for item in candidates if fmt in (item.get("descriptions") or {})]
+        if not holders:
+            return None
+        source = max(holders, key=freshness)
+        descriptions[fmt] = source["descriptions"][fmt]
+        if newest is None or freshness(source) > freshness(newest):
+            newest = source
+    return {
+        "productId": product_id,
+        "formatType": format_type,
+        "descriptions": descriptions,
+        "metadata": metadata,
+        "updatedAt": freshness(newest),
+    }
+
+class DescriptionStore:
+    # Optional cache: a GenerationCache (in-process tier only) used as a
+    # read-through cache of the candidate items read per product and format,
+    # merged on every lookup. Misses are not cached, so a newly stored
+    # description shows up on the next read.
+    def __init__(self, table_name: str, cache=None, dynamodb_service=None):
+        self.table_name = table_name
+        self.cache = cache
+        self._service = dynamodb_service
+
+    @property
+    def service(self):
+        # Resolved on first use so importing a handler does not build a boto3 resource
+        if self._service is None:
+            self._service = DynamoDBService(self.table_name)
+        return self._service
+
+    def lookup(self, product_id: str, format_type: str, metadata=None):
+        return self.lookup_many([product_id], format_type, metadata).get(product_id)
+
+    def lookup_many(self, product_ids, format_type: str, metadata=None) -> dict:
+        # Returns {productId: record} for the products found. metadata: only
+        # copies written for exactly this metadata count (see merge_record)
+        formats = requested_formats(format_type)
+        candidates = {}
+        misses = []
+        for product_id in dict.fromkeys(product_ids):
+            items = self.cache.get(self._cache_key(product_id, format_type)) if self.cache is not None else None
+            if items is not None:
+                candidates[product_id] = items
+            else:
+                misses.append(product_id)
+
+        if misses:
+            keys = [{"productId": product_id, "formatType": candidate}
+                    for product_id in misses for candidate in formats + ("all",)]
+            attributes = list(RECORD_ATTRIBUTES) + [f"descriptions.{fmt}" for fmt in formats]
+            items_by_product = {}
+            for item in self.service.batch_get_items(keys, attributes):
+                items_by_product.setdefault(item["productId"], []).append(item)
+            for product_id in misses:
+                items = items_by_product.get(product_id)
+                if not items:
+                    continue
+                candidates[product_id] = items
+                if self.cache is not None:
+                    self.cache.put(self._cache_key(product_id, format_type), items)
+
+        records = {}
+        for product_id, items in candidates.items():
+            record = merge_record(product_id, format_type, items, metadata)
+            if record is not None:
+                records[product_id] = record
+        return records
+
+    def invalidate(self, product_id: str) -> None:
+        if self.cache is not None:
+            for format_type in DESCRIPTION_FORMATS + ("all",):
+                self.cache.invalidate(self._cache_key(product_id, format_type))
+
+    @staticmethod
+    def _cache_key(product_id, format_type):
+        return f"{product_id}\x1f{format_type}"
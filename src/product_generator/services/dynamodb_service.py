@@ -1,18 +1,121 @@
-import boto3
+import hashlib
+import json
 import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from botocore.exceptions import ClientError
 
+from product_generator.services.clients import get_resource
+from product_generator.services.item_codec import COLD_ATTRIBUTES, PACKED_ATTRIBUTE, unpack_item
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Marks the end of one segment's pages on a worker queue
+_SEGMENT_DONE = object()
+
+# BatchWriteItem accepts at most 25 put/delete requests per call
+MAX_BATCH_WRITE_ITEMS = 25
+# BatchGetItem accepts at most 100 keys per call
+MAX_BATCH_GET_KEYS = 100
+
+# Change tracking: every write is stamped with its write time (epoch millis) and
+# the UTC day it falls on. The ChangesByDay index (changeBucket HASH, updatedAt
+# RANGE) lets incremental exports query only what changed since a given time.
+CHANGE_INDEX_NAME = "ChangesByDay"
+CHANGE_BUCKET_ATTRIBUTE = "changeBucket"
+CHANGE_TIME_ATTRIBUTE = "updatedAt"
+
+# Idempotent writes: items carry a hash of their content, so a write that
+# would store the same content again can be skipped
+CONTENT_HASH_ATTRIBUTE = "contentHash"
+CONTENT_ATTRIBUTES = ("metadata", "descriptions")
+
+# Error codes worth retrying a single write on
+THROTTLING_ERROR_CODES = ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded")
+
+def now_millis() -> int:
+    return int(time.time() * 1000)
+
+def change_bucket(epoch_millis: int) -> str:
+    return datetime.fromtimestamp(epoch_millis / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+def change_buckets(since_millis: int, until_millis: int) -> list:
+    # Every UTC day bucket touched by the (since, until] window
+    day = datetime.fromtimestamp(since_millis / 1000, tz=timezone.utc).date()
+    last_day = datetime.fromtimestamp(until_millis / 1000, tz=timezone.utc).date()
+    buckets = []
+    while day <= last_day:
+        buckets.append(day.strftime("%Y-%m-%d"))
+        day += timedelta(days=1)
+    return buckets
+
+def projection(attributes) -> dict:
+    # ProjectionExpression arguments for attribute paths such as
+    # "descriptions.short". Every name goes through a placeholder, which also
+    # covers reserved words like "timestamp".
+    names = {}
+    paths = []
+    for attribute in attributes:
+        placeholders = []
+        for part in attribute.split("."):
+            placeholder = next((p for p, name in names.items() if name == part), None)
+            if placeholder is None:
+                placeholder = f"#p{len(names)}"
+                names[placeholder] = part
+            placeholders.append(placeholder)
+        paths.append(".".join(placeholders))
+    return {"ProjectionExpression": ", ".join(paths), "ExpressionAttributeNames": names}
+
+def select_paths(item: dict, attributes) -> dict:
+    # Keeps only the given attribute paths, as a ProjectionExpression would
+    selected = {}
+    for attribute in attributes:
+        parts = attribute.split(".")
+        source, target = item, selected
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if source is None:
+                break
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return selected
+
+def stamp_change(item: dict, epoch_millis: int = None) -> dict:
+    epoch_millis = now_millis() if epoch_millis is None else epoch_millis
+    return {**item, CHANGE_TIME_ATTRIBUTE: epoch_millis, CHANGE_BUCKET_ATTRIBUTE: change_bucket(epoch_millis)}
+
+def _json_number(value):
+    # An item read back holds Decimals; they hash like the numbers written
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+def content_hash(item: dict) -> str:
+    content = {key: item.get(key) for key in CONTENT_ATTRIBUTES}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_json_number)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 class DynamoDBService:
-    def __init__(self, table_name: str):
-        self.dynamodb = boto3.resource("dynamodb")
+    # codec: an item_codec.CompactItemCodec that packs items on write. Reads
+    # unpack packed items whether or not a codec is set.
+    def __init__(self, table_name: str, dynamodb=None, codec=None):
+        self.dynamodb = dynamodb or get_resource("dynamodb")
         self.table = self.dynamodb.Table(table_name)
+        self.codec = codec
+
+    def pack(self, item: dict) -> dict:
+        return self.codec.pack_item(item) if self.codec is not None else item
 
     def put_item(self, item: dict) -> bool:
         try:
-            response = self.table.put_item(Item=item)
+            response = self.table.put_item(Item=self.pack(item))
             logger.info("Successfully put item into DynamoDB: %s", response)
             return True
         except ClientError as e:
@@ -22,3 +125,277 @@ class DynamoDBService:
             logger.error("Unexpected error putting item into DynamoDB: %s", e)
             return False
 
+    def put_item_if(self, item: dict, condition, max_attempts: int = 6, base_delay: float = 0.05,
+                    max_delay: float = 2.0, sleep=time.sleep) -> bool:
+        # Conditional PutItem. Returns False when the condition does not hold;
+        # throttled calls are retried with backoff and other errors are raised.
+        item = self.pack(item)
+        for attempt in range(max_attempts):
+            if attempt:
+                sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+            try:
+                self.table.put_item(Item=item, ConditionExpression=condition)
+                return True
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                if code == "ConditionalCheckFailedException":
+                    return False
+                if code not in THROTTLING_ERROR_CODES or attempt == max_attempts - 1:
+                    raise
+                logger.info("Conditional put throttled (attempt %d); retrying.", attempt + 1)
+
+    def batch_get_items(self, keys: list, attributes=None, max_attempts: int = 6, base_delay: float = 0.05,
+                        max_delay: float = 2.0, sleep=time.sleep) -> list:
+        # Reads keys with BatchGetItem in chunks of 100, retrying UnprocessedKeys
+        # (and throttled calls) with exponential backoff and full jitter; any
+        # other error is raised at once. Returns the items found, in no
+        # particular order. A projection should include the key attributes so
+        # callers can match items back to their keys.
+        table_name = self.table.name
+        request = {}
+        if attributes:
+            # Packed items hold the cold attributes in one binary attribute
+            packed = any(attribute.split(".")[0] in COLD_ATTRIBUTES for attribute in attributes)
+            request = projection(list(attributes) + ([PACKED_ATTRIBUTE] if packed else []))
+        items = []
+        for start in range(0, len(keys), MAX_BATCH_GET_KEYS):
+            pending = keys[start:start + MAX_BATCH_GET_KEYS]
+            for attempt in range(max_attempts):
+                if attempt:
+                    sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+                try:
+                    response = self.dynamodb.batch_get_item(RequestItems={table_name: {**request, "Keys": pending}})
+                except ClientError as e:
+                    if e.response.get("Error", {}).get("Code") not in THROTTLING_ERROR_CODES:
+                        raise
+                    logger.error("Error batch reading from DynamoDB (attempt %d): %s", attempt + 1, e)
+                    continue
+                for item in response.get("Responses", {}).get(table_name, []):
+                    if PACKED_ATTRIBUTE in item:
+                        item = unpack_item(item)
+                        item = select_paths(item, attributes) if attributes else item
+                    items.append(item)
+                pending = response.get("UnprocessedKeys", {}).get(table_name, {}).get("Keys", [])
+                if not pending:
+                    break
+                logger.info("Retrying %d unprocessed key(s).", len(pending))
+            else:
+                # A partial answer would read as "not found", so it is an error
+                raise RuntimeError(f"BatchGetItem left {len(pending)} key(s) unprocessed after {max_attempts} attempts.")
+        return items
+
+    def batch_write_items(self, items: list, max_attempts: int = 6, base_delay: float = 0.05,
+                          max_delay: float = 2.0, sleep=time.sleep) -> list:
+        # Writes items with BatchWriteItem in chunks of 25. UnprocessedItems (and
+        # throttled calls) are retried with exponential backoff and full jitter.
+        # Returns one outcome per input item, in input order:
+        #   {"index": i, "status": "stored"} or {"index": i, "status": "failed", "error": ...}
+        outcomes = [None] * len(items)
+        items = [self.pack(item) for item in items]
+        for start in range(0, len(items), MAX_BATCH_WRITE_ITEMS):
+            chunk = list(range(start, min(start + MAX_BATCH_WRITE_ITEMS, len(items))))
+            self._write_chunk(items, chunk, outcomes, max_attempts, base_delay, max_delay, sleep)
+        return outcomes
+
+    def batch_writer(self, flush_size: int = MAX_BATCH_WRITE_ITEMS) -> "BufferedBatchWriter":
+        return BufferedBatchWriter(self, flush_size)
+
+    def _write_chunk(self, items, pending, outcomes, max_attempts, base_delay, max_delay, sleep):
+        table_name = self.table.name
+        last_error = "Unprocessed after retries"
+        for attempt in range(max_attempts):
+            if attempt:
+                # Full jitter: a random delay up to the exponential cap
+                sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+            try:
+                response = self.dynamodb.batch_write_item(RequestItems={
+                    table_name: [{"PutRequest": {"Item": items[i]}} for i in pending]
+                })
+            except ClientError as e:
+                # A throttled or failed call leaves the whole chunk pending
+                logger.error("Error batch writing to DynamoDB (attempt %d): %s", attempt + 1, e)
+                last_error = str(e)
+                continue
+
+            unprocessed = response.get("UnprocessedItems", {}).get(table_name, [])
+            unprocessed_signatures = {}
+            for request in unprocessed:
+                signature = _item_signature(request["PutRequest"]["Item"])
+                unprocessed_signatures[signature] = unprocessed_signatures.get(signature, 0) + 1
+
+            still_pending = []
+            for i in pending:
+                signature = _item_signature(items[i])
+                if unprocessed_signatures.get(signature):
+                    unprocessed_signatures[signature] -= 1
+                    still_pending.append(i)
+                else:
+                    outcomes[i] = {"index": i, "status": "stored"}
+            pending = still_pending
+            if not pending:
+                return
+            logger.info("Retrying %d unprocessed item(s).", len(pending))
+
+        for i in pending:
+            outcomes[i] = {"index": i, "status": "failed", "error": last_error}
+
+    def scan_pages(self, **scan_kwargs):
+        # Yields one page of items per Scan call, following LastEvaluatedKey
+        # until the table is exhausted. Only one page is held at a time.
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            yield [unpack_item(item) for item in response.get("Items", [])]
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                return
+            scan_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    def query_pages(self, **query_kwargs):
+        # Same as scan_pages, for Query
+        while True:
+            response = self.table.query(**query_kwargs)
+            yield [unpack_item(item) for item in response.get("Items", [])]
+            last_evaluated_key = response.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                return
+            query_kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    def changed_since_pages(self, since_millis: int, until_millis: int):
+        # Pages of items written in (since, until], one Query chain per day
+        # bucket, so the cost follows the number of changes rather than the table size.
+        from boto3.dynamodb.conditions import Key
+
+        for bucket in change_buckets(since_millis, until_millis):
+            yield from self.query_pages(
+                IndexName=CHANGE_INDEX_NAME,
+                KeyConditionExpression=(
+                    Key(CHANGE_BUCKET_ATTRIBUTE).eq(bucket)
+                    & Key(CHANGE_TIME_ATTRIBUTE).between(since_millis + 1, until_millis)
+                ),
+            )
+
+    def scan_items(self, **scan_kwargs):
+        for page in self.scan_pages(**scan_kwargs):
+            yield from page
+
+    def parallel_scan_pages(self, total_segments: int, segments=None, ordered: bool = False,
+                            queue_depth: int = 2, **scan_kwargs):
+        # Parallel scan: one worker thread per segment, each following its own
+        # LastEvaluatedKey chain. Pages are handed over through bounded queues so
+        # memory stays at a few pages per worker.
+        #   ordered=False yields pages as soon as any segment produces them.
+        #   ordered=True yields every page of segment 0, then segment 1, and so on;
+        #   later segments keep scanning until their queue fills up.
+        segments = list(range(total_segments)) if segments is None else list(segments)
+        if total_segments == 1 and segments == [0]:
+            yield from self.scan_pages(**scan_kwargs)
+            return
+
+        stop = threading.Event()
+        if ordered:
+            queues = {segment: queue.Queue(maxsize=queue_depth) for segment in segments}
+        else:
+            shared_queue = queue.Queue(maxsize=queue_depth * len(segments))
+            queues = {segment: shared_queue for segment in segments}
+
+        def put(segment, value):
+            # Give up if the consumer went away, instead of blocking forever
+            while not stop.is_set():
+                try:
+                    queues[segment].put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_segment(segment):
+            try:
+                for page in self.scan_pages(Segment=segment, TotalSegments=total_segments, **scan_kwargs):
+                    if not put(segment, page):
+                        return
+            except Exception as e:
+                logger.error("Error scanning segment %d of %d: %s", segment, total_segments, e)
+                put(segment, e)
+                return
+            put(segment, _SEGMENT_DONE)
+
+        workers = [threading.Thread(target=scan_segment, args=(segment,), daemon=True) for segment in segments]
+        for worker in workers:
+            worker.start()
+
+        try:
+            if ordered:
+                for segment in segments:
+                    yield from self._drain(queues[segment], 1)
+            else:
+                yield from self._drain(shared_queue, len(segments))
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+    @staticmethod
+    def _drain(page_queue, producers: int):
+        remaining = producers
+        while remaining:
+            page = page_queue.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield page
+
+
+class BufferedBatchWriter:
+    # Buffers put requests and flushes them through batch_write_items once
+    # flush_size items are queued (and on exit). Outcomes accumulate in
+    # self.outcomes, indexed by the order items were added.
+    def __init__(self, service: DynamoDBService, flush_size: int = MAX_BATCH_WRITE_ITEMS):
+        self.service = service
+        self.flush_size = flush_size
+        self.outcomes = []
+        self._buffer = []
+
+    def put_item(self, item: dict) -> None:
+        self._buffer.append(item)
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        offset = len(self.outcomes)
+        for outcome in self.service.batch_write_items(self._buffer):
+            self.outcomes.append({**outcome, "index": outcome["index"] + offset})
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+
+def _item_signature(item: dict) -> str:
+    # Matches UnprocessedItems back to the submitted items. boto3 hands numbers
+    # back as Decimal and binary values as Binary, so both are normalized before comparing.
+    return json.dumps(_normalize(item), sort_keys=True, default=str)
+
+
+def _normalize(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return str(Decimal(str(value)).normalize())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_normalize(v) for v in value)
+    if isinstance(value, (bytes, bytearray)) or type(value).__name__ == "Binary":
+        # Packed items come back wrapped in boto3's Binary
+        return bytes(getattr(value, "value", value)).hex()
+    return value
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+from product_generator.services.clients import get_resource
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def make_cache_key(prompt: str, model_id: str, max_gen_len: int, temperature: float, stop=()) -> str:
+    # Collapse whitespace so cosmetic differences in the prompt map to the same entry
+    normalized_prompt = " ".join(prompt.split())
+    key_fields = {
+        "prompt": normalized_prompt,
+        "model_id": model_id,
+        "max_gen_len": max_gen_len,
+        "temperature": temperature,
+    }
+    # Only part of the key when set, so entries written without one stay valid
+    if stop:
+        key_fields["stop"] = list(stop)
+    key_material = json.dumps(key_fields, sort_keys=True)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class InMemoryCacheTier:
+    # Local stand-in for the shared tier, used in tests and local runs
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DynamoDBCacheTier:
+    # Shared tier backed by a DynamoDB table keyed on "cacheKey" with TTL on "expiresAt"
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        self._table = None
+
+    @property
+    def table(self):
+        # Resolved on first use so importing a handler does not build a boto3 resource
+        if self._table is None:
+            self._table = get_resource("dynamodb").Table(self.table_name)
+        return self._table
+
+    def get(self, key: str):
+        try:
+            response = self.table.get_item(Key={"cacheKey": key})
+        except ClientError as e:
+            logger.error("Error reading generation cache entry: %s", e)
+            return None
+        item = response.get("Item")
+        if not item:
+            return None
+        return item["generation"], float(item["expiresAt"])
+
+    def put(self, key: str, value: str, expires_at: float) -> None:
+        try:
+            self.table.put_item(Item={
+                "cacheKey": key,
+                "generation": value,
+                "expiresAt": int(expires_at),
+            })
+        except ClientError as e:
+            logger.error("Error writing generation cache entry: %s", e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.table.delete_item(Key={"cacheKey": key})
+        except ClientError as e:
+            logger.error("Error deleting generation cache entry: %s", e)
+
+
+class GenerationCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 86400, shared_tier=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_tier = shared_tier
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        value, tier = self._lookup(key)
+        self._record(tier)
+        return value
+
+    def peek(self, key: str):
+        # Same lookup as get without counting a hit or miss, for callers that poll
+        return self._lookup(key)[0]
+
+    def record_poll(self, found: bool) -> None:
+        # One hit or miss for a caller that polled with peek. What it waited for
+        # was written by another container, so a hit counts as shared.
+        self._record("shared" if found else None)
+
+    def put(self, key: str, value: str) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        self._store_local(key, value, expires_at)
+        if self.shared_tier is not None:
+            self.shared_tier.put(key, value, expires_at)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared_tier is not None:
+            self.shared_tier.delete(key)
+
+    def clear(self) -> None:
+        # Only drops the in-process tier; shared entries expire through their TTL
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.local_hits + self.shared_hits,
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    def _lookup(self, key: str):
+        # Returns (value, tier), tier being "local", "shared" or None on a miss
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value, "local"
+                del self._entries[key]
+
+        if self.shared_tier is not None:
+            # DynamoDB TTL deletion is lazy, so expiry is checked here as well
+            entry = self.shared_tier.get(key)
+            if entry is not None and entry[1] > now:
+                self._store_local(key, entry[0], entry[1])
+                return entry[0], "shared"
+        return None, None
+
+    def _record(self, tier) -> None:
+        with self._lock:
+            if tier == "local":
+                self.local_hits += 1
+            elif tier == "shared":
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+
+    def _store_local(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
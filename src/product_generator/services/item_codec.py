@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import zlib
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Compact encoding for ProductDescriptions items. The large, rarely filtered
+# attributes ("descriptions" and "metadata", with the features list) are
+# packed into one compressed binary attribute; keys and the small attributes
+# scans and the change index work with (timestamps, formatType) stay as they
+# are. Reads through DynamoDBService unpack items whatever the writer's
+# setting, so old plain items and packed ones can share the table.
+
+PACKED_ATTRIBUTE = "packed"
+COLD_ATTRIBUTES = ("descriptions", "metadata")
+
+# "none" writes plain items; "zlib" (standard library) or "zstd" (needs zstandard) packs them
+ITEM_CODEC = os.environ.get("ITEM_CODEC", "none")
+# Items whose cold attributes serialize smaller than this are left plain
+ITEM_CODEC_MIN_BYTES = int(os.environ.get("ITEM_CODEC_MIN_BYTES", "256"))
+ITEM_CODEC_LEVEL = int(os.environ.get("ITEM_CODEC_LEVEL", "6"))
+
+# First byte of a packed value names its compression
+_ZLIB = b"\x01"
+_ZSTD = b"\x02"
+
+def _json_default(value):
+    # DynamoDB hands numbers back as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot pack {type(value).__name__}")
+
+def _raw_bytes(value) -> bytes:
+    # boto3 returns binary attributes wrapped in boto3.dynamodb.types.Binary
+    return bytes(getattr(value, "value", value))
+
+def unpack_item(item: dict) -> dict:
+    if PACKED_ATTRIBUTE not in item:
+        return item
+    data = _raw_bytes(item[PACKED_ATTRIBUTE])
+    marker, payload = data[:1], data[1:]
+    if marker == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif marker == _ZSTD:
+        import zstandard
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raise ValueError(f"Unknown packed attribute encoding: {marker!r}")
+    unpacked = {key: value for key, value in item.items() if key != PACKED_ATTRIBUTE}
+    unpacked.update(json.loads(payload))
+    return unpacked
+
+class CompactItemCodec:
+    def __init__(self, algorithm: str = "zlib", min_bytes: int = ITEM_CODEC_MIN_BYTES, level: int = ITEM_CODEC_LEVEL):
+        if algorithm not in ("zlib", "zstd"):
+            raise ValueError(f"Unsupported item codec: {algorithm}. Supported: none, zlib, zstd.")
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.level = level
+        self._zstd = None
+        if algorithm == "zstd":
+            import zstandard
+            self._zstd = zstandard.ZstdCompressor(level=level)
+
+    def pack_item(self, item: dict) -> dict:
+        cold = {key: item[key] for key in COLD_ATTRIBUTES if key in item}
+        if not cold:
+            return item
+        payload = json.dumps(cold, separators=(",", ":"), default=_json_default).encode("utf-8")
+        if len(payload) < self.min_bytes:
+            return item
+        if self._zstd is not None:
+            packed = _ZSTD + self._zstd.compress(payload)
+        else:
+            packed = _ZLIB + zlib.compress(payload, self.level)
+        hot = {key: value for key, value in item.items() if key not in COLD_ATTRIBUTES}
+        return {**hot, PACKED_ATTRIBUTE: packed}
+
+def codec_from_env():
+    # The codec writers of ProductDescriptions use; None writes plain items
+    if ITEM_CODEC == "none":
+        return None
+    return CompactItemCodec(ITEM_CODEC)
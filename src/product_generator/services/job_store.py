@@ -0,0 +1,170 @@
+import json
+import logging
+import time
+import uuid
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from product_generator.services.dynamodb_service import DynamoDBService, now_millis
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Asynchronous generation jobs, one item per job keyed on "jobId":
+#
+#   queued -> running -> succeeded
+#                     -> failed
+#             running -> queued    (retryable failure, redelivered by the queue)
+#
+# Every transition is a put conditioned on the version read, so two workers
+# handed the same message cannot both move a job along.
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED)
+
+TRANSITIONS = {
+    QUEUED: (RUNNING, FAILED),
+    # running -> running: the message came back after a worker died mid-job;
+    # only allowed once the running worker's lease has run out
+    RUNNING: (RUNNING, QUEUED, SUCCEEDED, FAILED),
+}
+
+class JobConflictError(Exception):
+    # The job changed between the read and the conditional write
+    pass
+
+class JobBusyError(Exception):
+    # Another worker holds the job and its lease has not run out yet
+    pass
+
+def plain(value):
+    # DynamoDB hands numbers back as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [plain(v) for v in value]
+    return value
+
+def job_request(job: dict) -> dict:
+    # The request is kept as JSON text: boto3 cannot write the floats a
+    # request body may hold, and the worker wants them back as floats
+    request = job["request"]
+    return json.loads(request) if isinstance(request, str) else plain(request)
+
+def job_view(job: dict) -> dict:
+    # What GET /jobs/{id} shows; the request stays internal
+    view = {key: job[key] for key in ("jobId", "status", "createdAt", "updatedAt", "attempts") if key in job}
+    for key in ("result", "statusCode", "error"):
+        if key in job:
+            view[key] = job[key]
+    return plain(view)
+
+class JobStore:
+    # lease_seconds: how long a running job belongs to its worker; it should
+    # outlast the worker's function timeout
+    def __init__(self, table_name: str, ttl_seconds: int = 7 * 86400, lease_seconds: int = 330,
+                 dynamodb_service=None, clock=now_millis):
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._service = dynamodb_service
+        self._clock = clock
+
+    @property
+    def service(self):
+        # Resolved on first use so importing a handler does not build a boto3 resource
+        if self._service is None:
+            self._service = DynamoDBService(self.table_name)
+        return self._service
+
+    def create(self, request: dict, job_id: str = None) -> dict:
+        from boto3.dynamodb.conditions import Attr
+
+        now = self._clock()
+        job = {
+            "jobId": job_id or uuid.uuid4().hex,
+            "status": QUEUED,
+            "request": json.dumps(request),
+            "attempts": 0,
+            "version": 0,
+            "createdAt": now,
+            "updatedAt": now,
+            # Finished jobs are cleaned up by the table's TTL
+            "expiresAt": int(now / 1000) + self.ttl_seconds,
+        }
+        self.service.table.put_item(Item=job, ConditionExpression=Attr("jobId").not_exists())
+        return job
+
+    def get(self, job_id: str):
+        response = self.service.table.get_item(Key={"jobId": job_id}, ConsistentRead=True)
+        return response.get("Item")
+
+    def transition(self, job_id: str, status: str, max_attempts: int = 3, **fields):
+        # Moves a job to status, setting fields. Returns the updated job, or None
+        # when the job does not exist or its current status does not allow the
+        # move (e.g. it already finished). Raises JobBusyError when taking over
+        # a running job whose lease is still held.
+        for _ in range(max_attempts):
+            job = self.get(job_id)
+            if job is None or status not in TRANSITIONS.get(job["status"], ()):
+                return None
+            if job["status"] == RUNNING and status == RUNNING and self._lease_held(job):
+                raise JobBusyError(f"Job {job_id} is already running.")
+            try:
+                return self._write(job, status, fields)
+            except JobConflictError:
+                logger.info("Job %s changed while updating it; retrying.", job_id)
+        raise JobConflictError(f"Job {job_id} kept changing while moving it to {status}.")
+
+    def start(self, job_id: str):
+        # Claims a job for a worker and counts the attempt
+        job = self.get(job_id)
+        if job is None:
+            return None
+        return self.transition(job_id, RUNNING, attempts=int(job.get("attempts", 0)) + 1)
+
+    def succeed(self, job_id: str, result, status_code: int = 200):
+        return self.transition(job_id, SUCCEEDED, result=result, statusCode=status_code)
+
+    def fail(self, job_id: str, error: str, status_code: int = 500):
+        return self.transition(job_id, FAILED, error=error, statusCode=status_code)
+
+    def requeue(self, job_id: str, error: str):
+        return self.transition(job_id, QUEUED, error=error)
+
+    def _lease_held(self, job):
+        return self._clock() - int(job["updatedAt"]) < self.lease_seconds * 1000
+
+    def _write(self, job, status, fields):
+        from boto3.dynamodb.conditions import Attr
+
+        updated = {**job, **fields, "status": status, "version": int(job["version"]) + 1,
+                   "updatedAt": max(self._clock(), int(job["updatedAt"]))}
+        try:
+            self.service.table.put_item(Item=updated, ConditionExpression=Attr("version").eq(job["version"]))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                raise JobConflictError(str(e)) from e
+            raise
+        return updated
+
+def wait_for_job(job_store, job_id, wait_seconds, poll_interval=0.25, max_poll_interval=2.0,
+                 clock=time.monotonic, sleep=time.sleep):
+    # Long-poll: re-reads the job, backing off between reads, until it
+    # finishes or wait_seconds pass. Returns the last job read (None if unknown).
+    deadline = clock() + wait_seconds
+    job = job_store.get(job_id)
+    while job is not None and job["status"] not in TERMINAL_STATUSES:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            break
+        sleep(min(poll_interval, remaining))
+        poll_interval = min(poll_interval * 2, max_poll_interval)
+        job = job_store.get(job_id)
+    return job
@@ -0,0 +1,205 @@
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Each backend knows one model family's prompt template, request body and
+# response shape. BedrockService sends the request through its client and
+# resilience layer; ModelRouter picks the backend per request.
+
+
+class ModelBackend:
+    model_id = None
+    # On-demand price in USD per 1,000 tokens, used by the router to compare models
+    input_cost_per_1k = 0.0
+    output_cost_per_1k = 0.0
+    # Largest max_gen_len worth asking this model for
+    max_output_tokens = 2048
+    # Formats this model writes well enough; "all" also covers structured output
+    formats = ("short", "detailed", "social", "seo", "all")
+
+    def __init__(self, model_id=None, max_gen_len=512, temperature=0.5):
+        self.model_id = model_id or self.model_id
+        self.max_gen_len = max_gen_len
+        self.temperature = temperature
+
+    def build_request_payload(self, prompt, max_gen_len=None, stop=()):
+        raise NotImplementedError
+
+    def parse_response(self, model_response):
+        # Returns (text, prompt_tokens, generation_tokens)
+        raise NotImplementedError
+
+    def parse_stream_chunk(self, chunk):
+        raise NotImplementedError
+
+    def invoke(self, client, prompt, max_gen_len=None, stop=()):
+        response = client.invoke_model(modelId=self.model_id,
+                                       body=self.build_request_payload(prompt, max_gen_len, stop))
+        return self.parse_response(json.loads(response["body"].read()))
+
+    def open_stream(self, client, prompt, max_gen_len=None, stop=()):
+        response = client.invoke_model_with_response_stream(
+            modelId=self.model_id, body=self.build_request_payload(prompt, max_gen_len, stop)
+        )
+        return self._stream_text(response["body"])
+
+    def _stream_text(self, events):
+        for event in events:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            text = self.parse_stream_chunk(json.loads(chunk["bytes"]))
+            if text:
+                yield text
+
+    def estimate_cost(self, prompt_tokens, max_gen_len):
+        return (prompt_tokens * self.input_cost_per_1k + max_gen_len * self.output_cost_per_1k) / 1000
+
+
+class Llama3Backend(ModelBackend):
+    model_id = "meta.llama3-3-70b-instruct-v1:0"
+    input_cost_per_1k = 0.00072
+    output_cost_per_1k = 0.00072
+
+    def build_request_payload(self, prompt, max_gen_len=None, stop=()):
+        # Embed the prompt in Llama 3's instruction format. The Bedrock Llama
+        # API has no stop sequences; max_gen_len is the only bound.
+        formatted_prompt = f"""
+<|begin_of_text|><|start_header_id|>user<|end_header_id|>
+{prompt}
+<|eot_id|>
+<|start_header_id|>assistant<|end_header_id|>
+"""
+        return json.dumps({
+            "prompt": formatted_prompt,
+            "max_gen_len": max_gen_len or self.max_gen_len,
+            "temperature": self.temperature,
+        })
+
+    def parse_response(self, model_response):
+        return (
+            model_response.get("generation", ""),
+            model_response.get("prompt_token_count", 0),
+            model_response.get("generation_token_count", 0),
+        )
+
+    def parse_stream_chunk(self, chunk):
+        return chunk.get("generation", "")
+
+
+class Llama3SmallBackend(Llama3Backend):
+    # Fast and cheap; good enough for one-line and caption formats
+    model_id = "meta.llama3-1-8b-instruct-v1:0"
+    input_cost_per_1k = 0.00022
+    output_cost_per_1k = 0.00022
+    max_output_tokens = 512
+    formats = ("short", "social", "seo")
+
+
+class MistralBackend(ModelBackend):
+    model_id = "mistral.mistral-7b-instruct-v0:2"
+    input_cost_per_1k = 0.00015
+    output_cost_per_1k = 0.0002
+    max_output_tokens = 512
+    formats = ("short", "social", "seo")
+
+    def build_request_payload(self, prompt, max_gen_len=None, stop=()):
+        request = {
+            "prompt": f"<s>[INST] {prompt} [/INST]",
+            "max_tokens": max_gen_len or self.max_gen_len,
+            "temperature": self.temperature,
+        }
+        if stop:
+            request["stop"] = list(stop)
+        return json.dumps(request)
+
+    def parse_response(self, model_response):
+        # Mistral does not report token counts in the body
+        outputs = model_response.get("outputs") or [{}]
+        return outputs[0].get("text", ""), 0, 0
+
+    def parse_stream_chunk(self, chunk):
+        outputs = chunk.get("outputs") or [{}]
+        return outputs[0].get("text", "")
+
+
+BACKENDS = {
+    backend.model_id: backend
+    for backend in (Llama3Backend, Llama3SmallBackend, MistralBackend)
+}
+
+def backend_for(model_id):
+    if model_id not in BACKENDS:
+        raise ValueError(f"Unknown model: {model_id}. Known: {', '.join(BACKENDS)}.")
+    return BACKENDS[model_id]()
+
+
+class ModelRouter:
+    # Picks the cheapest backend that supports the requested format and length
+    # budget, skipping models whose observed error rate or latency (both tracked
+    # as exponentially weighted moving averages) is over the configured limits.
+    # A skipped model gets another chance once it has gone unused for
+    # retry_after_seconds, so a recovered model is picked up again.
+    def __init__(self, backends, max_error_rate=0.2, max_latency_ms=None, alpha=0.2,
+                 retry_after_seconds=30.0, clock=time.monotonic):
+        self.backends = list(backends)
+        self.max_error_rate = max_error_rate
+        self.max_latency_ms = max_latency_ms
+        self.alpha = alpha
+        self.retry_after_seconds = retry_after_seconds
+        self._clock = clock
+        self._stats = {
+            backend.model_id: {"latency_ms": None, "error_rate": 0.0, "last_used": None}
+            for backend in self.backends
+        }
+        self._lock = threading.Lock()
+
+    def choose(self, format_type=None, max_gen_len=None, prompt_tokens=0):
+        candidates = [
+            backend for backend in self.backends
+            if (format_type is None or format_type in backend.formats)
+            and (max_gen_len is None or max_gen_len <= backend.max_output_tokens)
+        ]
+        if not candidates:
+            raise ValueError(f"No model supports format {format_type} with max_gen_len {max_gen_len}.")
+
+        with self._lock:
+            stats = {model_id: dict(entry) for model_id, entry in self._stats.items()}
+
+        # Degraded models are only used when every candidate is degraded
+        now = self._clock()
+        healthy = [b for b in candidates if self._usable(stats[b.model_id], now)]
+        candidates = healthy or candidates
+
+        budget = max_gen_len or 512
+        return min(
+            candidates,
+            key=lambda b: (b.estimate_cost(prompt_tokens, budget), stats[b.model_id]["latency_ms"] or 0.0)
+        )
+
+    def _usable(self, entry, now):
+        if entry["last_used"] is not None and now - entry["last_used"] >= self.retry_after_seconds:
+            return True
+        if entry["error_rate"] > self.max_error_rate:
+            return False
+        return self.max_latency_ms is None or entry["latency_ms"] is None or entry["latency_ms"] <= self.max_latency_ms
+
+    def record(self, model_id, latency_ms, success):
+        with self._lock:
+            entry = self._stats.get(model_id)
+            if entry is None:
+                return
+            entry["last_used"] = self._clock()
+            if entry["latency_ms"] is None:
+                entry["latency_ms"] = latency_ms
+            else:
+                entry["latency_ms"] += self.alpha * (latency_ms - entry["latency_ms"])
+            entry["error_rate"] += self.alpha * ((0.0 if success else 1.0) - entry["error_rate"])
+
+    def stats(self):
+        with self._lock:
+            return {model_id: dict(entry) for model_id, entry in self._stats.items()}
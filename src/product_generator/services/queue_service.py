@@ -0,0 +1,54 @@
+import json
+import logging
+from botocore.exceptions import ClientError
+
+from product_generator.services.clients import get_client
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# SendMessageBatch accepts at most 10 entries per call
+MAX_SEND_BATCH_ENTRIES = 10
+
+class QueueService:
+    def __init__(self, queue_url: str, sqs_client=None):
+        self.queue_url = queue_url
+        self.sqs_client = sqs_client or get_client("sqs")
+
+    def send_items(self, items: list, max_attempts: int = 3) -> list:
+        # Publishes each item as its own message ({"item": ...}) using
+        # SendMessageBatch. Entries SQS reports as failed are retried.
+        # Returns the indices of items that could not be sent.
+        failed = []
+        for start in range(0, len(items), MAX_SEND_BATCH_ENTRIES):
+            pending = list(range(start, min(start + MAX_SEND_BATCH_ENTRIES, len(items))))
+            for attempt in range(max_attempts):
+                pending = self._send_batch(items, pending)
+                if not pending:
+                    break
+                logger.info("Retrying %d unsent message(s) (attempt %d).", len(pending), attempt + 1)
+            failed.extend(pending)
+        return failed
+
+    def delay_redelivery(self, receipt_handle: str, seconds: int) -> bool:
+        # Makes a received message visible again after seconds instead of the
+        # queue's visibility timeout. Returns False if SQS refused.
+        try:
+            self.sqs_client.change_message_visibility(
+                QueueUrl=self.queue_url, ReceiptHandle=receipt_handle, VisibilityTimeout=seconds
+            )
+            return True
+        except ClientError as e:
+            logger.error("Error changing message visibility: %s", e)
+            return False
+
+    def _send_batch(self, items, pending):
+        entries = [{"Id": str(i), "MessageBody": json.dumps({"item": items[i]})} for i in pending]
+        try:
+            response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+        except ClientError as e:
+            logger.error("Error sending messages to SQS: %s", e)
+            return pending
+        for failure in response.get("Failed", []):
+            logger.error("SQS rejected message %s: %s", failure.get("Id"), failure.get("Message"))
+        return [int(failure["Id"]) for failure in response.get("Failed", [])]
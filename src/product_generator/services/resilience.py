@@ -0,0 +1,233 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Error codes Bedrock returns when it is overloaded or slow; worth retrying.
+# Compared lowercased, since streamed errors arrive as e.g. "throttlingException".
+THROTTLING_CODES = {"throttlingexception", "toomanyrequestsexception", "servicequotaexceededexception"}
+TIMEOUT_CODES = {"modeltimeoutexception"}
+UNAVAILABLE_CODES = {"serviceunavailableexception", "internalserverexception", "modelnotreadyexception"}
+
+
+class ModelInvocationError(Exception):
+    # Structured failure surfaced to handlers instead of exiting the process.
+    # status_code is the HTTP status a handler should answer with.
+    status_code = 502
+    code = "ModelInvocationError"
+    retryable = False
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ModelThrottledError(ModelInvocationError):
+    status_code = 429
+    code = "ModelThrottled"
+    retryable = True
+
+
+class ModelTimeoutError(ModelInvocationError):
+    status_code = 504
+    code = "ModelTimeout"
+    retryable = True
+
+
+class ModelUnavailableError(ModelInvocationError):
+    # Raised while the circuit is open, and for 5xx responses from Bedrock
+    status_code = 503
+    code = "ModelUnavailable"
+    retryable = True
+
+
+def classify_error(error, model_id):
+    # Maps a botocore/client error onto the ModelInvocationError hierarchy
+    message = f"Can't invoke '{model_id}'. Reason: {error}"
+    if isinstance(error, ModelInvocationError):
+        return error
+    if isinstance(error, (ReadTimeoutError, ConnectTimeoutError, EndpointConnectionError)):
+        return ModelTimeoutError(message)
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "").lower()
+        if code in THROTTLING_CODES:
+            return ModelThrottledError(message)
+        if code in TIMEOUT_CODES:
+            return ModelTimeoutError(message)
+        if code in UNAVAILABLE_CODES:
+            return ModelUnavailableError(message)
+    return ModelInvocationError(message)
+
+
+class TokenBucket:
+    # Client-side rate limiter. The refill rate adapts AIMD-style: it halves on
+    # every throttle and creeps back up by increase_step on every success.
+    def __init__(self, rate: float, capacity: float, min_rate: float = 0.1, increase_step: float = 0.1,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.increase_step = increase_step
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        # Waits for a token for at most timeout seconds; False means shed the call
+        deadline = self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive availability failures and fails
+    # fast for recovery_timeout seconds, then lets a single trial call through.
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.recovery_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.error("Circuit opened after %d consecutive failure(s).", self._failures)
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+
+class ResilientInvoker:
+    # Wraps a model call with rate limiting, retries with jittered exponential
+    # backoff on throttles/timeouts/5xx, and a circuit breaker. Always raises a
+    # ModelInvocationError subclass on failure.
+    def __init__(self, rate_limiter: TokenBucket = None, circuit_breaker: CircuitBreaker = None,
+                 max_attempts: int = 4, base_delay: float = 0.2, max_delay: float = 4.0,
+                 acquire_timeout: float = 5.0, sleep=time.sleep):
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = acquire_timeout
+        self._sleep = sleep
+        self.retries = 0
+
+    def call(self, func, model_id: str, on_retry=None):
+        # on_retry, if given, is called before each retry (per-request accounting;
+        # self.retries counts every retry through this shared invoker)
+        for attempt in range(self.max_attempts):
+            if self.circuit_breaker is not None and not self.circuit_breaker.allow():
+                raise ModelUnavailableError(
+                    f"Model '{model_id}' is temporarily unavailable (circuit open).",
+                    retry_after=self.circuit_breaker.retry_after()
+                )
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(self.acquire_timeout):
+                raise ModelThrottledError(f"Client-side rate limit reached for '{model_id}'.",
+                                          retry_after=self.acquire_timeout)
+
+            try:
+                result = func()
+            except Exception as e:
+                error = classify_error(e, model_id)
+                if not error.retryable:
+                    # The endpoint answered; a bad request says nothing about its health
+                    if self.circuit_breaker is not None:
+                        self.circuit_breaker.record_success()
+                    raise error from e
+                if isinstance(error, ModelThrottledError) and self.rate_limiter is not None:
+                    self.rate_limiter.on_throttle()
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure()
+                if attempt == self.max_attempts - 1:
+                    raise error from e
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                logger.info("Retrying '%s' in %.2fs after %s.", model_id, delay, error.code)
+                self.retries += 1
+                if on_retry is not None:
+                    on_retry()
+                self._sleep(delay)
+                continue
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.on_success()
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            return result
+
+
+def invoker_from_env() -> ResilientInvoker:
+    # Client-side rate limiting is off unless BEDROCK_MAX_REQUESTS_PER_SECOND is set
+    rate = float(os.environ.get("BEDROCK_MAX_REQUESTS_PER_SECOND", "0"))
+    return ResilientInvoker(
+        rate_limiter=TokenBucket(rate=rate, capacity=max(rate, 1.0)) if rate > 0 else None,
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get("BEDROCK_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            recovery_timeout=float(os.environ.get("BEDROCK_CIRCUIT_RECOVERY_SECONDS", "30")),
+        ),
+        max_attempts=int(os.environ.get("BEDROCK_MAX_ATTEMPTS", "4")),
+    )
@@ -1,13 +1,20 @@
-import boto3
+import codecs
+import json
 import logging
 from botocore.exceptions import ClientError
 
+from product_generator.services.clients import get_client
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
 class S3Service:
-    def __init__(self):
-        self.s3_client = boto3.client("s3")
+    def __init__(self, s3_client=None):
+        self.s3_client = s3_client or get_client("s3")
 
     def upload_file(self, file_content: str, bucket_name: str, object_key: str, content_type: str = "text/csv") -> bool:
         try:
@@ -26,3 +33,179 @@ class S3Service:
             logger.error("Unexpected error uploading file to S3: %s", e)
             return False
 
+    def iter_object_chunks(self, bucket_name: str, object_key: str, chunk_size: int = 1024 * 1024,
+                           start_byte: int = 0):
+        # Streams an object's bytes without reading it fully into memory,
+        # optionally starting part-way through (a ranged GET)
+        get_kwargs = {"Range": f"bytes={start_byte}-"} if start_byte else {}
+        response = self.s3_client.get_object(Bucket=bucket_name, Key=object_key, **get_kwargs)
+        yield from response["Body"].iter_chunks(chunk_size)
+
+    def iter_object_lines(self, bucket_name: str, object_key: str, chunk_size: int = 1024 * 1024,
+                          start_byte: int = 0):
+        # Streams an object as text lines with their line endings kept, so
+        # csv.reader can rebuild fields that span several lines. start_byte
+        # must fall on a line boundary.
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+        for chunk in self.iter_object_chunks(bucket_name, object_key, chunk_size, start_byte):
+            pending += decoder.decode(chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                yield line + "\n"
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield pending
+
+    def read_json(self, bucket_name: str, object_key: str):
+        # Returns None when the object does not exist
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=object_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return json.loads(response["Body"].read())
+
+    def write_json(self, document, bucket_name: str, object_key: str) -> None:
+        self.s3_client.put_object(
+            Bucket=bucket_name,
+            Key=object_key,
+            Body=json.dumps(document),
+            ContentType="application/json"
+        )
+
+    def write_json_if_absent(self, document, bucket_name: str, object_key: str) -> bool:
+        # Conditional create; returns False when the object already exists, so
+        # only one of several racing writers wins
+        try:
+            self.s3_client.put_object(
+                Bucket=bucket_name,
+                Key=object_key,
+                Body=json.dumps(document),
+                ContentType="application/json",
+                IfNoneMatch="*"
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict", "412"):
+                return False
+            raise
+        return True
+
+    def open_multipart_upload(self, bucket_name: str, object_key: str, content_type: str = "text/csv",
+                              part_size: int = DEFAULT_PART_SIZE) -> "MultipartUploadWriter":
+        return MultipartUploadWriter(self.s3_client, bucket_name, object_key, content_type, part_size)
+
+
+class MultipartUploadWriter:
+    # File-like writer that pushes fixed-size parts to S3 as they fill up, so
+    # memory stays around one part regardless of the object size. Used as a
+    # context manager: a clean exit completes the upload, an exception aborts it.
+    # Objects smaller than one part are sent with a single put_object instead.
+    def __init__(self, s3_client, bucket_name: str, object_key: str, content_type: str, part_size: int,
+                 encoding: str = "utf-8"):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes.")
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.encoding = encoding
+        self.bytes_written = 0
+        self.completed = False
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            # Hand the full buffer over as the part and carry only the overflow
+            # forward, so a part is never copied
+            part, self._buffer = self._buffer, bytearray()
+            self._buffer += part[self.part_size:]
+            del part[self.part_size:]
+            self._upload_part(part)
+        return len(data)
+
+    # Enough of the io interface for compressors and pyarrow to write through it
+    @property
+    def closed(self) -> bool:
+        return self.completed
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        # Parts go out as they fill up
+        pass
+
+    def close(self) -> None:
+        if self.completed:
+            return
+        if self._upload_id is None:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type
+            )
+        else:
+            if self._buffer:
+                self._upload_part(self._buffer)
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+        self._buffer = bytearray()
+        self.completed = True
+        logger.info("Successfully uploaded %d bytes in %d part(s) to s3://%s/%s",
+                    self.bytes_written, max(len(self._parts), 1), self.bucket_name, self.object_key)
+
+    def abort(self) -> None:
+        self._buffer = bytearray()
+        if self._upload_id is None:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self._upload_id
+            )
+        except ClientError as e:
+            logger.error("Error aborting multipart upload: %s", e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _upload_part(self, body: bytearray) -> None:
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                ContentType=self.content_type
+            )
+            self._upload_id = response["UploadId"]
+        part_number = len(self._parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.object_key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
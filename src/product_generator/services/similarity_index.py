@@ -0,0 +1,353 @@
+import array
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Near-duplicate lookup for product metadata. Metadata is embedded locally
+# (signed feature hashing of normalized field tokens, so no model call and no
+# extra dependency) and searched by cosine similarity, brute-force or, with
+# ann, over the candidates a hyperplane LSH finds. NumPy ships in the
+# SimilarityLayer and is what makes large indexes practical; without it the
+# scan is plain Python and the index is capped at FALLBACK_MAX_ENTRIES. A saved
+# index is memory-mapped on load, vectors and entries alike, each entry read
+# only when a search returns it.
+
+EMBEDDING_DIM = 256
+# Features carry most of what a description says; title, category and audience less
+FIELD_WEIGHTS = {"title": 1.0, "features": 1.5, "category": 1.0, "audience": 1.0}
+
+# File layout (little-endian hosts only, as Lambda is):
+#   magic | dim, count (uint32 each) | count x dim float32 vectors
+#   | count + 1 uint64 entry offsets, relative to the entries section
+#   | entries, one UTF-8 JSON document each
+INDEX_MAGIC = b"PGSIDX2\n"
+INDEX_HEADER = struct.Struct("<II")
+
+# A plain-Python scan of 5000 vectors takes about as long as a search is worth
+FALLBACK_MAX_ENTRIES = 5000
+# Hyperplane LSH: a vector 0.9 similar to the query shares a bucket with it in
+# at least one of 16 tables of 8 bits over 99% of the time
+ANN_TABLES = 16
+ANN_BITS = 8
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def normalize_tokens(metadata: dict) -> list:
+    # (field, token, weight) triples; case, punctuation and order do not matter
+    tokens = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = metadata.get(field) or ""
+        texts = value if isinstance(value, (list, tuple)) else [value]
+        for text in texts:
+            for token in _TOKEN.findall(str(text).lower()):
+                tokens.append((field, token, weight))
+    return tokens
+
+def embed(metadata: dict, dim: int = EMBEDDING_DIM) -> array.array:
+    vector = [0.0] * dim
+    for field, token, weight in normalize_tokens(metadata):
+        digest = hashlib.blake2b(f"{field}:{token}".encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest, "little")
+        vector[bucket % dim] += weight if bucket >> 63 else -weight
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return array.array("f", (v / norm for v in vector))
+
+class _EntryTable:
+    # Read-only sequence over the entries section of a mapped index file
+    def __init__(self, mapped, offsets_start, entries_start, count):
+        self._mapped = mapped
+        self._entries_start = entries_start
+        self._offsets = array.array("Q")
+        self._offsets.frombytes(mapped[offsets_start:offsets_start + (count + 1) * 8])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        start = self._entries_start + self._offsets[i]
+        return json.loads(self._mapped[start:self._entries_start + self._offsets[i + 1]])
+
+class _HyperplaneLSH:
+    # Approximate candidate lookup over a fixed set of vectors. Each table keys
+    # a vector by the signs of its projections on bits random hyperplanes; a
+    # search takes the vectors sharing a key with the query in any table.
+    # NumPy only. Building it reads every vector once.
+    def __init__(self, vectors, dim, tables=ANN_TABLES, bits=ANN_BITS, seed=0):
+        rng = numpy.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables, bits, dim)).astype(numpy.float32)
+        self._weights = numpy.left_shift(1, numpy.arange(bits, dtype=numpy.int64))
+        matrix = numpy.asarray(vectors, dtype=numpy.float32).reshape(-1, dim)
+        self._tables = []
+        for planes in self._planes:
+            keys = self._keys(matrix, planes)
+            order = numpy.argsort(keys, kind="stable")
+            self._tables.append((keys[order], order))
+
+    def _keys(self, matrix, planes):
+        return ((matrix @ planes.T) > 0) @ self._weights
+
+    def candidates(self, query):
+        query = numpy.asarray(query, dtype=numpy.float32).reshape(1, -1)
+        found = []
+        for planes, (keys, order) in zip(self._planes, self._tables):
+            key = self._keys(query, planes)[0]
+            found.append(order[numpy.searchsorted(keys, key, "left"):numpy.searchsorted(keys, key, "right")])
+        return numpy.unique(numpy.concatenate(found))
+
+class SimilarityIndexWriter:
+    # Streams entries into an index file: vectors go straight to the file and
+    # entry JSON to a spool file appended on close, so memory holds one entry
+    # plus the offset table (8 bytes per entry). Stops at max_entries.
+    def __init__(self, path: str, dim: int = EMBEDDING_DIM, max_entries: int = 100000):
+        self.dim = dim
+        self.max_entries = max_entries
+        self.count = 0
+        self._offsets = array.array("Q", [0])
+        self._path = path
+        self._file = open(path, "wb")
+        self._file.write(INDEX_MAGIC + INDEX_HEADER.pack(dim, 0))
+        self._spool = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+
+    def add(self, metadata: dict, descriptions: dict) -> bool:
+        entry = {"metadata": metadata, "descriptions": dict(descriptions)}
+        return self.write(embed(metadata, self.dim).tobytes(), entry)
+
+    def write(self, vector: bytes, entry: dict) -> bool:
+        if self.count >= self.max_entries:
+            return False
+        encoded = json.dumps(entry).encode("utf-8")
+        self._file.write(vector)
+        self._spool.write(encoded)
+        self._offsets.append(self._offsets[-1] + len(encoded))
+        self.count += 1
+        return True
+
+    def close(self) -> None:
+        self._offsets.tofile(self._file)
+        self._spool.seek(0)
+        shutil.copyfileobj(self._spool, self._file, 1024 * 1024)
+        self._spool.close()
+        self._file.seek(len(INDEX_MAGIC))
+        self._file.write(INDEX_HEADER.pack(self.dim, self.count))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # A partial index is never left behind
+            self._spool.close()
+            self._file.close()
+            os.remove(self._path)
+        return False
+
+class SimilarityIndex:
+    # Entries are {"metadata": {...}, "descriptions": {format: text}}. Entries
+    # loaded from a file stay read-only and mapped; entries added afterwards
+    # are kept in memory. max_entries bounds the total, loaded ones included.
+    # ann searches loaded entries through a hyperplane LSH rather than a full
+    # scan; added entries are always scanned.
+    def __init__(self, dim: int = EMBEDDING_DIM, max_entries: int = 100000, ann: bool = False):
+        if numpy is None and max_entries > FALLBACK_MAX_ENTRIES:
+            logger.warning("NumPy is not installed; keeping the similarity index to %d entries.",
+                           FALLBACK_MAX_ENTRIES)
+            max_entries = FALLBACK_MAX_ENTRIES
+        if numpy is None and ann:
+            logger.warning("NumPy is not installed; similarity searches scan every entry.")
+            ann = False
+        self.dim = dim
+        self.max_entries = max_entries
+        self.ann = ann
+        self._ann_index = None
+        self._base_vectors = None
+        self._base_entries = []
+        self._vectors = array.array("f")
+        self._entries = []
+        self._lock = threading.Lock()
+        # Average full generation time, the baseline for the latency reuse saves
+        self.generation_ms = None
+
+    def __len__(self):
+        return len(self._base_entries) + len(self._entries)
+
+    def add(self, metadata: dict, descriptions: dict) -> bool:
+        vector = embed(metadata, self.dim)
+        with self._lock:
+            if len(self) >= self.max_entries:
+                return False
+            self._vectors.extend(vector)
+            self._entries.append({"metadata": metadata, "descriptions": dict(descriptions)})
+        return True
+
+    def search(self, metadata: dict, formats=(), threshold: float = 0.0):
+        # Returns (score, entry) for the most similar entry holding every one of
+        # formats and scoring at least threshold, else None
+        query = embed(metadata, self.dim)
+        candidates = [(score, self._base_entries, i)
+                      for i, score in self._base_scores(query) if score >= threshold]
+        with self._lock:
+            # Scored under the lock: added vectors may grow while a search runs
+            candidates.extend((score, self._entries, i)
+                              for i, score in enumerate(self._scores(self._vectors, query)) if score >= threshold)
+        # Entries are only read (and decoded, for loaded ones) best match first
+        for score, entries, i in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
+            entry = entries[i]
+            if all(fmt in entry["descriptions"] for fmt in formats):
+                return float(score), entry
+        return None
+
+    def observe_generation(self, elapsed_ms: float, alpha: float = 0.2) -> None:
+        with self._lock:
+            if self.generation_ms is None:
+                self.generation_ms = elapsed_ms
+            else:
+                self.generation_ms += alpha * (elapsed_ms - self.generation_ms)
+
+    def _base_scores(self, query):
+        # (position, score) pairs for the loaded entries
+        if self._ann_index is None:
+            return enumerate(self._scores(self._base_vectors, query))
+        positions = self._ann_index.candidates(query)
+        matrix = self._base_vectors.reshape(-1, self.dim)
+        scores = matrix[positions] @ numpy.asarray(query, dtype=numpy.float32)
+        return zip(positions.tolist(), scores.tolist())
+
+    def _scores(self, vectors, query):
+        if vectors is None or not len(vectors):
+            return []
+        if numpy is not None:
+            matrix = numpy.asarray(vectors, dtype=numpy.float32).reshape(-1, self.dim)
+            return (matrix @ numpy.asarray(query, dtype=numpy.float32)).tolist()
+        dim = self.dim
+        return [sum(a * b for a, b in zip(vectors[start:start + dim], query))
+                for start in range(0, len(vectors), dim)]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            added = list(self._entries)
+            added_vectors = array.array("f", self._vectors)
+        dim = self.dim
+        with SimilarityIndexWriter(path, dim, max_entries=len(self)) as writer:
+            for i in range(len(self._base_entries)):
+                writer.write(self._base_vectors[i * dim:(i + 1) * dim].tobytes(), self._base_entries[i])
+            for i, entry in enumerate(added):
+                writer.write(added_vectors[i * dim:(i + 1) * dim].tobytes(), entry)
+
+    @classmethod
+    def load(cls, path: str, max_entries: int = 100000, ann: bool = False) -> "SimilarityIndex":
+        # Entries past max_entries are left out, so a large file cannot take
+        # over a small function's memory
+        with open(path, "rb") as index_file:
+            if index_file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"Not a similarity index: {path}")
+            dim, count = INDEX_HEADER.unpack(index_file.read(INDEX_HEADER.size))
+            # The mapping outlives the file object
+            mapped = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        index = cls(dim=dim, max_entries=max_entries, ann=ann)
+        kept = min(count, index.max_entries)
+        if kept < count:
+            logger.warning("Similarity index %s holds %d entries; loading the first %d.", path, count, kept)
+        vectors_start = len(INDEX_MAGIC) + INDEX_HEADER.size
+        offsets_start = vectors_start + count * dim * 4
+        # Pages are read on first touch, so a cold start does not load every vector
+        if numpy is not None:
+            index._base_vectors = numpy.frombuffer(mapped, dtype="<f4", count=kept * dim, offset=vectors_start)
+        else:
+            index._base_vectors = memoryview(mapped)[vectors_start:vectors_start + kept * dim * 4].cast("f")
+        if index.ann and kept:
+            index._ann_index = _HyperplaneLSH(index._base_vectors, dim)
+        index._base_entries = _EntryTable(mapped, offsets_start, offsets_start + (count + 1) * 8, kept)
+        return index
+
+def substitution_pairs(source: dict, target: dict):
+    # (old, new) strings that turn a description of source into one of target:
+    # the title, category and audience, and the features that differ, paired in
+    # order. None when the features do not pair up one to one.
+    source_only = [f for f in source.get("features", []) if f not in target.get("features", [])]
+    target_only = [f for f in target.get("features", []) if f not in source.get("features", [])]
+    if len(source_only) != len(target_only):
+        return None
+    pairs = [(source.get(field), target.get(field)) for field in ("title", "category", "audience")]
+    pairs += list(zip(source_only, target_only))
+    # Longest first, so a title is replaced before a feature it contains
+    return sorted(((old, new) for old, new in pairs if old and new and old != new),
+                  key=lambda pair: len(pair[0]), reverse=True)
+
+def substitute(text: str, pairs) -> str:
+    if not pairs:
+        return text
+    pattern = re.compile("|".join(re.escape(old) for old, _ in pairs), re.IGNORECASE)
+    replacements = {old.lower(): new for old, new in pairs}
+    return pattern.sub(lambda match: replacements[match.group(0).lower()], text)
+
+def parse_s3_uri(uri: str):
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
+
+def load_index(uri: str, s3_service=None, local_dir=None, max_entries: int = 100000,
+               ann: bool = False) -> SimilarityIndex:
+    # Loads from a local path, or from s3://bucket/key by way of a local copy
+    # (/tmp on Lambda) that can then be memory-mapped
+    if not uri.startswith("s3://"):
+        return SimilarityIndex.load(uri, max_entries, ann)
+    bucket, key = parse_s3_uri(uri)
+    local_path = os.path.join(local_dir or tempfile.gettempdir(), "similarity-" + os.path.basename(key))
+    with open(local_path, "wb") as local_file:
+        for chunk in s3_service.iter_object_chunks(bucket, key):
+            local_file.write(chunk)
+    index = SimilarityIndex.load(local_path, max_entries, ann)
+    logger.info("Loaded similarity index with %d entries from %s.", len(index), uri)
+    return index
+
+def save_index(index: SimilarityIndex, uri: str, s3_service=None, local_dir=None) -> None:
+    if not uri.startswith("s3://"):
+        index.save(uri)
+        return
+    with tempfile.TemporaryDirectory(dir=local_dir) as directory:
+        local_path = os.path.join(directory, "index.bin")
+        index.save(local_path)
+        upload_index_file(local_path, uri, s3_service)
+
+def build_index(items, uri: str, s3_service=None, local_dir=None, dim: int = EMBEDDING_DIM,
+                max_entries: int = 100000) -> int:
+    # Writes an index of stored ProductDescriptions items to uri without
+    # holding it in memory: entries stream to a local file (/tmp on Lambda),
+    # which is then uploaded in parts. Returns the number of entries written.
+    with tempfile.TemporaryDirectory(dir=local_dir) as directory:
+        local_path = uri if not uri.startswith("s3://") else os.path.join(directory, "index.bin")
+        with SimilarityIndexWriter(local_path, dim, max_entries) as writer:
+            for item in items:
+                if not (item.get("metadata") and item.get("descriptions")):
+                    continue
+                if not writer.add(item["metadata"], item["descriptions"]):
+                    logger.warning("Similarity index reached %d entries; the rest are left out.", max_entries)
+                    break
+        if uri.startswith("s3://"):
+            upload_index_file(local_path, uri, s3_service)
+        return writer.count
+
+def upload_index_file(local_path: str, uri: str, s3_service, part_size: int = 8 * 1024 * 1024) -> None:
+    bucket, key = parse_s3_uri(uri)
+    with open(local_path, "rb") as local_file:
+        with s3_service.open_multipart_upload(bucket, key, content_type="application/octet-stream",
+                                              part_size=part_size) as upload:
+            shutil.copyfileobj(local_file, upload, 1024 * 1024)
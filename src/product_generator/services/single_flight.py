@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from product_generator.services.clients import get_resource
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Lease records share the generation cache table, under their own key prefix
+LEASE_KEY_PREFIX = "lease#"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Collapses concurrent calls for the same key inside one process: the first
+    # caller runs fn, every caller that arrives while it is running waits for
+    # and shares its result (or its exception).
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class InMemoryLease:
+    # Local stand-in for DynamoDBLease, shared between services to mimic containers
+    def __init__(self, lease_seconds=30, wait_timeout=25, poll_interval=0.2, clock=time.time, sleep=time.sleep):
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        owner = uuid.uuid4().hex
+        with self._lock:
+            holder = self._leases.get(key)
+            if holder is not None and holder[1] > self.clock():
+                return None
+            self._leases[key] = (owner, self.clock() + self.lease_seconds)
+        return owner
+
+    def is_held(self, key):
+        with self._lock:
+            holder = self._leases.get(key)
+        return holder is not None and holder[1] > self.clock()
+
+    def release(self, key, owner):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == owner:
+                del self._leases[key]
+
+
+class DynamoDBLease:
+    # Cross-container lease: a conditional put on "lease#<key>" succeeds for one
+    # container only (or once the previous lease has expired). Leases carry the
+    # table's TTL attribute, so abandoned ones are cleaned up as well.
+    def __init__(self, table_name, lease_seconds=30, wait_timeout=25, poll_interval=0.2,
+                 clock=time.time, sleep=time.sleep):
+        self.table_name = table_name
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = get_resource("dynamodb").Table(self.table_name)
+        return self._table
+
+    def acquire(self, key):
+        # Returns an owner token when this caller is the leader, None when
+        # another container holds the lease. Fails open: if DynamoDB itself
+        # errors, the caller generates on its own.
+        from boto3.dynamodb.conditions import Attr
+
+        owner = uuid.uuid4().hex
+        now = self.clock()
+        try:
+            self.table.put_item(
+                Item={
+                    "cacheKey": LEASE_KEY_PREFIX + key,
+                    "leaseOwner": owner,
+                    "expiresAt": int(now + self.lease_seconds),
+                },
+                ConditionExpression=Attr("cacheKey").not_exists() | Attr("expiresAt").lt(int(now)),
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return None
+            logger.error("Error acquiring generation lease: %s", e)
+        return owner
+
+    def is_held(self, key):
+        try:
+            response = self.table.get_item(Key={"cacheKey": LEASE_KEY_PREFIX + key}, ConsistentRead=True)
+        except ClientError as e:
+            logger.error("Error reading generation lease: %s", e)
+            return False
+        item = response.get("Item")
+        return item is not None and float(item["expiresAt"]) >= self.clock()
+
+    def release(self, key, owner):
+        from boto3.dynamodb.conditions import Attr
+
+        try:
+            self.table.delete_item(
+                Key={"cacheKey": LEASE_KEY_PREFIX + key},
+                ConditionExpression=Attr("leaseOwner").eq(owner),
+            )
+        except ClientError as e:
+            # Expired and taken over by someone else; theirs to release
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                logger.error("Error releasing generation lease: %s", e)
+
+
+def wait_for_leader(lease, key, fetch):
+    # Polls fetch() until the leader's result shows up. Gives up (returns None)
+    # when the lease is released or expires without a result, or on timeout,
+    # so the caller can generate on its own.
+    deadline = lease.clock() + lease.wait_timeout
+    while lease.clock() < deadline:
+        lease.sleep(lease.poll_interval)
+        result = fetch()
+        if result is not None:
+            return result
+        if not lease.is_held(key):
+            return fetch()
+    logger.info("Timed out waiting for the generation lease holder.")
+    return None
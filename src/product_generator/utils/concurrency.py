@@ -0,0 +1,27 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def run_bounded(func, items, max_concurrency: int) -> list:
+    # Runs func over items on at most max_concurrency threads.
+    # Returns one (result, error) pair per item, in input order, so a single
+    # failing item never fails the whole batch.
+    def run_one(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            logger.error("Batch item failed: %s", e)
+            return None, e
+
+    if not items:
+        return []
+
+    workers = max(1, min(max_concurrency, len(items)))
+    if workers == 1:
+        return [run_one(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # executor.map yields results in submission order regardless of completion order
+        return list(executor.map(run_one, items))
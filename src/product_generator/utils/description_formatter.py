@@ -3,6 +3,66 @@ import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+FORMATS = ("short", "detailed", "social", "seo")
+
+SHORT_MAX_WORDS = 30
+SOCIAL_MAX_CHARS = 280
+SEO_MAX_CHARS = 160
+
+def shorten_sentence(short_desc: str) -> str:
+    words = short_desc.split()
+    if len(words) > SHORT_MAX_WORDS: # If first sentence is too long, truncate
+        short_desc = " ".join(words[:SHORT_MAX_WORDS]) + "..."
+    return short_desc.strip() + "."
+
+class ShortDescriptionAccumulator:
+    # Incremental form of get_short_description for streamed text: feed() returns
+    # the short description once the first ". " boundary has arrived.
+    def __init__(self):
+        self._buffer = ""
+        self.short_description = None
+
+    def feed(self, chunk: str):
+        if self.short_description is not None:
+            return self.short_description
+        # Only rescan the tail that could complete a new ". " boundary
+        search_from = max(len(self._buffer) - 1, 0)
+        self._buffer += chunk
+        index = self._buffer.find(". ", search_from)
+        if index != -1:
+            self.short_description = shorten_sentence(self._buffer[:index])
+        return self.short_description
+
+    def finish(self) -> str:
+        # The stream ended without a sentence boundary: the whole text is the first sentence
+        if self.short_description is None:
+            self.short_description = shorten_sentence(self._buffer)
+        return self.short_description
+
+def short_description(text: str) -> str:
+    # Same as shorten_sentence(text.split(". ")[0]), finding the first sentence
+    # with one scan instead of splitting the whole text
+    end = text.find(". ")
+    return shorten_sentence(text if end == -1 else text[:end])
+
+def social_caption(title, features) -> str:
+    caption = f"Discover the amazing {title}! "
+    if features:
+        caption += f"Featuring {features[0].lower()} and more. "
+    caption += "Get yours today! #" + title.replace(" ", "") + " #Innovation"
+    return caption[:SOCIAL_MAX_CHARS]
+
+def seo_description(title, category, features) -> str:
+    seo_description = (
+        f"Buy the best {title} in the {category}. Key features include: {', '.join(features)}. "
+        f"Experience quality and innovation with our {title}. "
+    )
+    # The keyword list only matters when the text so far leaves room for it
+    if len(seo_description) < SEO_MAX_CHARS:
+        keywords = {title.lower(), category.lower(), *(f.lower() for f in features)}
+        seo_description += f"Keywords: {', '.join(sorted(keywords))}."
+    return seo_description[:SEO_MAX_CHARS]
+
 class DescriptionFormatter:
     def __init__(self, full_description: str, product_metadata: dict):
         self.full_description = full_description
@@ -10,13 +70,18 @@ class DescriptionFormatter:
 
     def get_short_description(self) -> str:
         # Simple approach: take the first sentence or a fixed number of words
-        sentences = self.full_description.split(". ")
-        if sentences:
-            short_desc = sentences[0]
-            if len(short_desc.split()) > 30: # If first sentence is too long, truncate
-                short_desc = " ".join(short_desc.split()[:30]) + "..."
-            return short_desc.strip() + "."
-        return ""
+        return short_description(self.full_description)
+
+    @staticmethod
+    def short_description_from_stream(chunks) -> str:
+        # Same result as get_short_description, but stops consuming the stream
+        # as soon as the first sentence is complete.
+        accumulator = ShortDescriptionAccumulator()
+        for chunk in chunks:
+            short_desc = accumulator.feed(chunk)
+            if short_desc is not None:
+                return short_desc
+        return accumulator.finish()
 
     def get_detailed_description(self) -> str:
         # For detailed, you might just return the full description
@@ -25,28 +90,55 @@ class DescriptionFormatter:
 
 
     def get_social_caption(self) -> str:
-        title = self.product_metadata.get("title", "product")
-        features = self.product_metadata.get("features", [])
-
-        caption = f"Discover the amazing {title}! "
-        if features:
-            caption += f"Featuring {features[0].lower()} and more. "
-        caption += "Get yours today! #" + title.replace(" ", "") + " #Innovation"
-
-        return caption[:280]
+        return social_caption(self.product_metadata.get("title", "product"),
+                              self.product_metadata.get("features", []))
 
     def get_seo_rich_description(self) -> str:
-        title = self.product_metadata.get("title", "product")
-        category = self.product_metadata.get("category", "category")
-        features = self.product_metadata.get("features", [])
+        return seo_description(self.product_metadata.get("title", "product"),
+                               self.product_metadata.get("category", "category"),
+                               self.product_metadata.get("features", []))
 
-        keywords = [title.lower(), category.lower()] + [f.lower() for f in features]
-        keywords_str = ", ".join(sorted(list(set(keywords))))
+# Batch formatting for bulk and re-export workloads. Output is identical to the
+# DescriptionFormatter methods, but everything that depends only on the
+# metadata (social caption, SEO text) is built once per distinct metadata in
+# the batch.
 
-        seo_description = (
-            f"Buy the best {title} in the {category}. Key features include: {', '.join(features)}. "\
-            f"Experience quality and innovation with our {title}. "\
-            f"Keywords: {keywords_str}."
-        )
+def format_batch(pairs, formats=FORMATS) -> list:
+    # pairs: iterable of (full_description, product_metadata). Returns one
+    # {format: text} dict per pair, in input order, with the requested formats.
+    formats = tuple(formats)
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unsupported format type: {unknown[0]}. Supported: {', '.join(FORMATS)}.")
+    want_short = "short" in formats
+    want_detailed = "detailed" in formats
+    want_social = "social" in formats
+    want_seo = "seo" in formats
 
-        return seo_description[:160]
+    social_by_metadata = {}
+    seo_by_metadata = {}
+    results = []
+    for full_description, product_metadata in pairs:
+        result = {}
+        if want_short:
+            result["short"] = short_description(full_description)
+        if want_detailed:
+            result["detailed"] = full_description.strip()
+        if want_social or want_seo:
+            title = product_metadata.get("title", "product")
+            features = product_metadata.get("features", [])
+            if want_social:
+                key = (title, features[0] if features else None)
+                social = social_by_metadata.get(key)
+                if social is None:
+                    social = social_by_metadata[key] = social_caption(title, features)
+                result["social"] = social
+            if want_seo:
+                category = product_metadata.get("category", "category")
+                key = (title, category, tuple(features))
+                seo = seo_by_metadata.get(key)
+                if seo is None:
+                    seo = seo_by_metadata[key] = seo_description(title, category, features)
+                result["seo"] = seo
+        results.append(result)
+    return results
@@ -0,0 +1,178 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+
+from product_generator.utils.export_schema import INTEGER, STRING_LIST
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Rows buffered per Parquet row group; bounds writer memory on large exports
+PARQUET_ROW_GROUP_ROWS = int(os.environ.get("EXPORT_PARQUET_ROW_GROUP_ROWS", "10000"))
+PARQUET_COMPRESSION = os.environ.get("EXPORT_PARQUET_COMPRESSION", "zstd")
+GZIP_LEVEL = int(os.environ.get("EXPORT_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.environ.get("EXPORT_ZSTD_LEVEL", "3"))
+
+# Every format streams into a file-like sink (a MultipartUploadWriter) page by
+# page. write() returns the number of rows written.
+
+class ExportFormat:
+    name = None
+    extension = None
+    content_type = None
+    # Header-less parts written with include_header=False can be concatenated
+    # byte for byte behind a header-only part (gzip members and zstd frames
+    # concatenate too), which is what sharded exports rely on
+    concatenable = True
+    # Optional module this format needs at runtime
+    requires = None
+
+    def write(self, sink, pages, schema, include_header=True) -> int:
+        raise NotImplementedError
+
+    def available(self) -> bool:
+        if self.requires is None:
+            return True
+        try:
+            __import__(self.requires)
+        except ImportError:
+            return False
+        return True
+
+class _TextFormat(ExportFormat):
+    # Text encodings with an optional streaming compressor in front of the sink
+    compression = None
+
+    def write(self, sink, pages, schema, include_header=True) -> int:
+        if self.compression is None:
+            return self.encode(sink, pages, schema, include_header)
+        compressor = self._open_compressor(sink)
+        # Batches small row writes into larger compressor writes
+        text = io.TextIOWrapper(compressor, encoding="utf-8", newline="")
+        try:
+            return self.encode(text, pages, schema, include_header)
+        finally:
+            # Flushes the final block and writes the trailer; the sink stays open
+            text.close()
+
+    def _open_compressor(self, sink):
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+        import zstandard
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(sink, closefd=False)
+
+    def encode(self, text, pages, schema, include_header) -> int:
+        raise NotImplementedError
+
+class CsvFormat(_TextFormat):
+    name = "csv"
+    extension = "csv"
+    content_type = "text/csv"
+
+    def encode(self, text, pages, schema, include_header) -> int:
+        csv_writer = csv.writer(text)
+        if include_header:
+            csv_writer.writerow(schema.names)
+        row_count = 0
+        for page in pages:
+            csv_writer.writerows(schema.csv_row(item) for item in page)
+            row_count += len(page)
+        return row_count
+
+class JsonLinesFormat(_TextFormat):
+    name = "jsonl"
+    extension = "jsonl"
+    content_type = "application/x-ndjson"
+
+    def encode(self, text, pages, schema, include_header) -> int:
+        # Self-describing: there is no header line
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        row_count = 0
+        for page in pages:
+            text.write("".join(encoder.encode(schema.record(item)) + "\n" for item in page))
+            row_count += len(page)
+        return row_count
+
+class GzipCsvFormat(CsvFormat):
+    name = extension = "csv.gz"
+    content_type = "application/gzip"
+    compression = "gzip"
+
+class ZstdCsvFormat(CsvFormat):
+    name = extension = "csv.zst"
+    content_type = "application/zstd"
+    compression = "zstd"
+    requires = "zstandard"
+
+class GzipJsonLinesFormat(JsonLinesFormat):
+    name = extension = "jsonl.gz"
+    content_type = "application/gzip"
+    compression = "gzip"
+
+class ZstdJsonLinesFormat(JsonLinesFormat):
+    name = extension = "jsonl.zst"
+    content_type = "application/zstd"
+    compression = "zstd"
+    requires = "zstandard"
+
+class ParquetFormat(ExportFormat):
+    name = extension = "parquet"
+    content_type = "application/vnd.apache.parquet"
+    # The footer describes the whole file, so parts cannot be concatenated
+    concatenable = False
+    requires = "pyarrow"
+
+    def __init__(self, row_group_rows=None, compression=None):
+        self.row_group_rows = row_group_rows or PARQUET_ROW_GROUP_ROWS
+        self.compression = compression or PARQUET_COMPRESSION
+
+    def arrow_schema(self, schema):
+        import pyarrow as pa
+        types = {INTEGER: pa.int64(), STRING_LIST: pa.list_(pa.string())}
+        return pa.schema([pa.field(column.name, types.get(column.kind, pa.string())) for column in schema.columns])
+
+    def write(self, sink, pages, schema, include_header=True) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrow_schema = self.arrow_schema(schema)
+        columns = [[] for _ in schema.columns]
+        row_count = 0
+
+        def flush_row_group(writer):
+            writer.write_batch(pa.record_batch(columns, schema=arrow_schema), row_group_size=self.row_group_rows)
+            for column in columns:
+                column.clear()
+
+        # PythonFile tracks the write position itself, so the sink only needs write()
+        with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), arrow_schema, compression=self.compression) as writer:
+            for page in pages:
+                for item in page:
+                    for column, value in zip(columns, schema.values(item)):
+                        column.append(value)
+                    row_count += 1
+                    if len(columns[0]) >= self.row_group_rows:
+                        flush_row_group(writer)
+            if columns[0]:
+                flush_row_group(writer)
+        return row_count
+
+EXPORT_FORMATS = {
+    export_format.name: export_format
+    for export_format in (
+        CsvFormat(), GzipCsvFormat(), ZstdCsvFormat(),
+        JsonLinesFormat(), GzipJsonLinesFormat(), ZstdJsonLinesFormat(),
+        ParquetFormat(),
+    )
+}
+
+def export_format_for(name: str) -> ExportFormat:
+    export_format = EXPORT_FORMATS.get(name)
+    if export_format is None:
+        raise ValueError(f"Unsupported export format: {name}. Supported: {', '.join(EXPORT_FORMATS)}.")
+    if not export_format.available():
+        raise ValueError(f"Export format {name} requires the {export_format.requires} package, which is not installed.")
+    return export_format
@@ -0,0 +1,84 @@
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Column types. Every export format maps these onto its own representation:
+# CSV joins lists with ", ", JSON Lines and Parquet keep them as lists.
+STRING = "string"
+INTEGER = "integer"
+STRING_LIST = "string_list"
+
+class Column:
+    def __init__(self, name: str, kind: str, getter):
+        self.name = name
+        self.kind = kind
+        self.getter = getter
+
+def _field(name):
+    return lambda item: item.get(name)
+
+def _metadata(name):
+    return lambda item: (item.get("metadata") or {}).get(name)
+
+def _description(format_type):
+    return lambda item: (item.get("descriptions") or {}).get(format_type)
+
+def _typed(value, kind):
+    # DynamoDB hands numbers back as Decimal; missing values become None
+    if value is None:
+        return None
+    if kind == INTEGER:
+        return int(value)
+    if kind == STRING_LIST:
+        return [str(v) for v in value]
+    return str(value)
+
+class ExportSchema:
+    # Flattened view of a stored description item (metadata and descriptions
+    # mapped to columns), shared by every export format.
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.names = [column.name for column in self.columns]
+        self._readers = [(column.getter, column.kind) for column in self.columns]
+
+    def extend(self, columns) -> "ExportSchema":
+        return ExportSchema(self.columns + list(columns))
+
+    def values(self, item: dict) -> list:
+        return [_typed(getter(item), kind) for getter, kind in self._readers]
+
+    def record(self, item: dict) -> dict:
+        return dict(zip(self.names, self.values(item)))
+
+    def csv_row(self, item: dict) -> list:
+        row = []
+        for getter, kind in self._readers:
+            value = getter(item)
+            if value is None:
+                row.append("")
+            elif kind == STRING_LIST:
+                row.append(", ".join(value))
+            else:
+                row.append(value)
+        return row
+
+DESCRIPTION_SCHEMA = ExportSchema([
+    Column("productId", STRING, _field("productId")),
+    Column("timestamp", INTEGER, _field("timestamp")),
+    Column("title", STRING, _metadata("title")),
+    Column("category", STRING, _metadata("category")),
+    Column("features", STRING_LIST, _metadata("features")),
+    Column("audience", STRING, _metadata("audience")),
+    Column("short_description", STRING, _description("short")),
+    Column("detailed_description", STRING, _description("detailed")),
+    Column("social_caption", STRING, _description("social")),
+    Column("seo_description", STRING, _description("seo")),
+])
+
+# Incremental snapshots and deltas also carry the sort key and write time, so
+# deltas can be merged into a snapshot by (productId, formatType)
+INCREMENTAL_SCHEMA = DESCRIPTION_SCHEMA.extend([
+    Column("formatType", STRING, _field("formatType")),
+    Column("updatedAt", INTEGER, _field("updatedAt")),
+])
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Request metrics are written as CloudWatch Embedded Metric Format (EMF) log
+# lines: CloudWatch Logs extracts the metrics, and the same line stays
+# queryable in Logs Insights with its properties.
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "ProductDescriptionGenerator")
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+# Share of requests whose full event and generated text are logged. Payloads
+# can be large and serializing them is not free, so production sets this to 0.
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get("PAYLOAD_LOG_SAMPLE_RATE", "1.0"))
+
+MILLISECONDS = "Milliseconds"
+COUNT = "Count"
+NONE = "None"
+
+class StdoutSink:
+    # Lambda ships stdout to CloudWatch Logs, where EMF lines become metrics
+    def emit(self, record: dict) -> None:
+        print(json.dumps(record, separators=(",", ":")), flush=True)
+
+class InMemorySink:
+    # Keeps emitted records, for local runs and tests
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+default_sink = StdoutSink() if METRICS_ENABLED else None
+
+def payload_logging_sampled(rate=None) -> bool:
+    rate = PAYLOAD_LOG_SAMPLE_RATE if rate is None else rate
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+class RequestMetrics:
+    # Collects stage timings, counts and properties for one request and emits
+    # them as a single EMF record. Safe to share between the threads of a batch:
+    # repeated stages and counts accumulate.
+    def __init__(self, sink=None, namespace=None, dimensions=None, log_payloads=None, clock=time.perf_counter):
+        self.sink = sink
+        self.namespace = namespace or METRICS_NAMESPACE
+        self.dimensions = dict(dimensions or {})
+        # Decided once per request so a request is logged in full or not at all
+        self.log_payloads = payload_logging_sampled() if log_payloads is None else log_payloads
+        self._clock = clock
+        self._metrics = {}
+        self._properties = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.add(f"{stage}Time", (self._clock() - start) * 1000, MILLISECONDS)
+
+    def add(self, name: str, value, unit: str = COUNT) -> None:
+        with self._lock:
+            total, _ = self._metrics.get(name, (0, unit))
+            self._metrics[name] = (total + value, unit)
+
+    def put_property(self, name: str, value) -> None:
+        with self._lock:
+            self._properties[name] = value
+
+    def value(self, name: str):
+        with self._lock:
+            return self._metrics.get(name, (None, None))[0]
+
+    def record_usage(self, usage: dict) -> None:
+        # Model usage as tracked by BedrockService.usage_snapshot()
+        self.add("ModelCalls", usage["calls"])
+        self.add("ModelLatency", usage["latency_ms"], MILLISECONDS)
+        self.add("PromptTokens", usage["prompt_tokens"])
+        self.add("GenerationTokens", usage["generation_tokens"])
+        self.add("CacheHits", usage["cache_hits"])
+        self.add("CacheMisses", usage["cache_misses"])
+        self.add("ModelRetries", usage["retries"])
+        self.add("ModelFailures", usage["failures"])
+
+    def to_emf(self, timestamp_ms=None) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            properties = dict(self._properties)
+        record = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000) if timestamp_ms is None else timestamp_ms,
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [sorted(self.dimensions)],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()],
+                }],
+            },
+            **properties,
+            **self.dimensions,
+        }
+        for name, (value, _) in metrics.items():
+            record[name] = round(value, 3) if isinstance(value, float) else value
+        return record
+
+    def flush(self) -> None:
+        if self.sink is None:
+            return
+        try:
+            self.sink.emit(self.to_emf())
+        except Exception as e:
+            # Metrics must never fail the request
+            logger.error("Failed to emit metrics: %s", e)
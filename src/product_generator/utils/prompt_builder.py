@@ -0,0 +1,144 @@
+import logging
+import math
+import os
+
+from product_generator.utils.description_formatter import SEO_MAX_CHARS, SHORT_MAX_WORDS, SOCIAL_MAX_CHARS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Prompt templates and generation budgets. Templates are plain instructions;
+# each model backend wraps them in its own chat format.
+
+# Rough size of a token in English text; good enough for budgets and limits
+CHARS_PER_TOKEN = 4
+
+# Output budget per format, sized to what the formatter keeps of the
+# generation: the first sentence (at most SHORT_MAX_WORDS words) for "short".
+# Detailed copy, and "all" when it is derived from one free-form generation,
+# keep the full budget. "social" and "seo" are built from the metadata alone
+# and never reach the model.
+MAX_GEN_LEN = {
+    "short": 64,
+    "detailed": 512,
+    "all": 512,
+}
+# A JSON object holding every format needs more room than one description
+STRUCTURED_MAX_GEN_LEN = 1024
+
+# Generation stops at the end of the first sentence for "short", on models that
+# accept stop sequences (the Bedrock Llama API does not; the budget bounds it there)
+STOP_SEQUENCES = {
+    "short": (". ",),
+}
+
+# Prompts estimated above this many input tokens have their feature list cut
+# down from the end ("truncate") or are refused ("reject") before any model call
+PROMPT_MAX_INPUT_TOKENS = int(os.environ.get("PROMPT_MAX_INPUT_TOKENS", "1000"))
+PROMPT_OVERSIZE_POLICY = os.environ.get("PROMPT_OVERSIZE_POLICY", "truncate")
+
+STRUCTURED_FORMATS = ("short", "detailed", "social", "seo")
+STRUCTURED_FORMAT_INSTRUCTIONS = {
+    "short": f"a single sentence of at most {SHORT_MAX_WORDS} words",
+    "detailed": "two or three paragraphs covering what it is, its key features and who it is for",
+    "social": f"a social media caption of at most {SOCIAL_MAX_CHARS} characters, ending with two or three hashtags",
+    "seo": f"a meta description of at most {SEO_MAX_CHARS} characters that names the product and its category",
+}
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def build_prompt(title, category, features, audience):
+    features_str = ", ".join(features)
+    return (
+        f"Write a product description for a {title} in the {category} category. "
+        f"It has the following key features: {features_str}. "
+        f"The target audience is {audience}."
+    )
+
+def build_structured_prompt(title, category, features, audience):
+    features_str = ", ".join(features)
+    fields = "\n".join(f'- "{key}": {STRUCTURED_FORMAT_INSTRUCTIONS[key]}' for key in STRUCTURED_FORMATS)
+    return (
+        f"Write product copy for a {title} in the {category} category. "
+        f"It has the following key features: {features_str}. "
+        f"The target audience is {audience}.\n"
+        f"Respond with only a JSON object with these string fields:\n{fields}"
+    )
+
+def build_adapt_prompt(source_text, source_metadata, title, category, features, audience):
+    # Rewrites a description of a near-identical product instead of writing one from scratch
+    features_str = ", ".join(features)
+    return (
+        f"Here is a product description for a {source_metadata['title']}. "
+        f"Rewrite it for a {title} in the {category} category with the following key features: "
+        f"{features_str}. The target audience is {audience}. Keep the length, tone and structure, "
+        f"change only what differs, and respond with only the rewritten description.\n\n{source_text}"
+    )
+
+def build_adapt_structured_prompt(source_copy, source_metadata, title, category, features, audience):
+    # Same rewrite for every format at once; source_copy is the earlier JSON object
+    features_str = ", ".join(features)
+    fields = "\n".join(f'- "{key}": {STRUCTURED_FORMAT_INSTRUCTIONS[key]}' for key in STRUCTURED_FORMATS)
+    return (
+        f"Here is product copy for a {source_metadata['title']} as a JSON object. "
+        f"Rewrite it for a {title} in the {category} category with the following key features: "
+        f"{features_str}. The target audience is {audience}. Keep the length, tone and structure of each "
+        f"field and change only what differs.\n"
+        f"Respond with only a JSON object with these string fields:\n{fields}\n\n{source_copy}"
+    )
+
+class Prompt:
+    # A rendered prompt with the generation settings chosen for it
+    def __init__(self, text, max_gen_len, stop=(), input_tokens=0, dropped_features=0):
+        self.text = text
+        self.max_gen_len = max_gen_len
+        self.stop = tuple(stop)
+        self.input_tokens = input_tokens
+        # Trailing features left out to fit PROMPT_MAX_INPUT_TOKENS
+        self.dropped_features = dropped_features
+
+def plan_prompt(product_metadata, format_type, structured=False, max_input_tokens=None, policy=None,
+                adapt_from=None) -> Prompt:
+    # adapt_from: (source_text, source_metadata) of a near-duplicate to rewrite;
+    # when structured, source_text is its copy as a JSON object
+    max_input_tokens = max_input_tokens or PROMPT_MAX_INPUT_TOKENS
+    policy = policy or PROMPT_OVERSIZE_POLICY
+    if adapt_from is not None:
+        adapt_template = build_adapt_structured_prompt if structured else build_adapt_prompt
+        def template(*fields):
+            return adapt_template(*adapt_from, *fields)
+    else:
+        template = build_structured_prompt if structured else build_prompt
+    features = list(product_metadata["features"])
+
+    def render(kept):
+        return template(product_metadata["title"], product_metadata["category"], kept, product_metadata["audience"])
+
+    text = render(features)
+    input_tokens = estimate_tokens(text)
+    kept = len(features)
+    if input_tokens > max_input_tokens:
+        if policy == "reject":
+            raise ValueError(f"Product metadata too large: about {input_tokens} prompt tokens "
+                             f"(max {max_input_tokens}). Shorten the feature list.")
+        # Prompt size grows with every feature kept, so search for the most that fit
+        low, high = 0, len(features) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(render(features[:middle])) <= max_input_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        kept = low
+        text = render(features[:kept])
+        input_tokens = estimate_tokens(text)
+        if kept == 0 or input_tokens > max_input_tokens:
+            raise ValueError(f"Product metadata too large: about {input_tokens} prompt tokens "
+                             f"(max {max_input_tokens}) even with a single feature.")
+        logger.warning("Prompt over %d tokens; kept %d of %d features.", max_input_tokens, kept, len(features))
+
+    if structured:
+        return Prompt(text, STRUCTURED_MAX_GEN_LEN, (), input_tokens, len(features) - kept)
+    return Prompt(text, MAX_GEN_LEN[format_type], STOP_SEQUENCES.get(format_type, ()), input_tokens,
+                  len(features) - kept)
@@ -0,0 +1,102 @@
+# Run in a fresh interpreter by test_startup.py: imports one handler, then
+# times its first (cold) and subsequent (warm) invocations. Real boto3 clients
+# are built through the registry, but HTTP requests are answered locally
+# through botocore's before-send hook, so nothing leaves the machine.
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+os.environ.update({
+    "AWS_REGION": "us-east-2",
+    "AWS_DEFAULT_REGION": "us-east-2",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "PRODUCT_DESCRIPTIONS_TABLE": "ProductDescriptions",
+    "EXPORTS_S3_BUCKET": "exports-bucket",
+    # Keep the generation cache out of the way so warm calls exercise Bedrock
+    "GENERATION_CACHE_MAX_ENTRIES": "0",
+})
+
+ITEM = {
+    "productId": "smart-mug",
+    "timestamp": 1,
+    "metadata": {"title": "Smart Mug", "category": "Kitchen", "features": ["Heated"], "audience": "Commuters"},
+    "descriptions": {"short": "A mug."},
+    "formatType": "short",
+}
+
+EVENTS = {
+    "generate_description_lambda": {"body": json.dumps({
+        "title": "Smart Mug", "category": "Kitchen", "features": ["Heated"], "audience": "Commuters", "format": "all"
+    })},
+    "store_description_lambda": {"items": [ITEM, {**ITEM, "formatType": "all"}]},
+    "export_description_lambda": {},
+}
+
+RESPONSES = {
+    "bedrock-runtime.InvokeModel": {"generation": "A heated mug. It keeps coffee warm."},
+    "dynamodb.BatchWriteItem": {"UnprocessedItems": {}},
+    "dynamodb.BatchGetItem": {"Responses": {"ProductDescriptions": []}, "UnprocessedKeys": {}},
+    "dynamodb.PutItem": {},
+    "dynamodb.Scan": {"Items": [{"productId": {"S": "smart-mug"}, "formatType": {"S": "short"}}], "Count": 1, "ScannedCount": 1},
+    "s3.PutObject": {},
+}
+
+class RawBody:
+    def __init__(self, data):
+        self._data = data
+
+    def stream(self, **kwargs):
+        yield self._data
+
+    def read(self, *args, **kwargs):
+        data, self._data = self._data, b""
+        return data
+
+def answer_locally(request, event_name=None, **kwargs):
+    from botocore.awsrequest import AWSResponse
+    operation = event_name.split(".", 1)[1]
+    body = json.dumps(RESPONSES[operation]).encode("utf-8") if operation != "s3.PutObject" else b""
+    headers = {"content-type": "application/json", "ETag": '"etag"'}
+    return AWSResponse(request.url, 200, headers, RawBody(body))
+
+def main(handler_name):
+    start = time.perf_counter()
+    module = importlib.import_module(f"product_generator.lambda_handlers.{handler_name}")
+    import_seconds = time.perf_counter() - start
+    boto3_imported_by_handler = "boto3" in sys.modules
+
+    from product_generator.services import clients
+    clients.get_session().events.register("before-send", answer_locally)
+
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 30000
+
+    event = EVENTS[handler_name]
+    start = time.perf_counter()
+    response = module.lambda_handler(event, Context())
+    first_call_seconds = time.perf_counter() - start
+    assert response.get("statusCode", 200) == 200, response
+
+    warm_calls = []
+    for _ in range(10):
+        start = time.perf_counter()
+        module.lambda_handler(event, Context())
+        warm_calls.append(time.perf_counter() - start)
+
+    print(json.dumps({
+        "handler": handler_name,
+        "import_ms": import_seconds * 1000,
+        "boto3_imported_by_handler": boto3_imported_by_handler,
+        "first_call_ms": first_call_seconds * 1000,
+        "warm_call_ms": statistics.median(warm_calls) * 1000,
+    }))
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,42 @@
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers.generate_description_lambda import generate_batch
+from product_generator.local.fakes import FakeBedrockClient
+from product_generator.services.bedrock_service import BedrockService
+
+MODEL_LATENCY_SECONDS = 0.02
+BATCH_SIZE = 32
+
+def run_batch(max_concurrency):
+    bedrock_service = BedrockService(client=FakeBedrockClient(latency=MODEL_LATENCY_SECONDS))
+    products = [
+        {
+            "title": f"Water Bottle {i}",
+            "category": "Outdoors",
+            "features": ["Insulated", "BPA-free"],
+            "audience": "Hikers",
+            "format": "all"
+        }
+        for i in range(BATCH_SIZE)
+    ]
+
+    start = time.perf_counter()
+    outcomes = generate_batch(bedrock_service, products, max_concurrency)
+    elapsed = time.perf_counter() - start
+
+    assert all(error is None for _, error in outcomes)
+    return BATCH_SIZE / elapsed
+
+def test_batch_throughput_scales_with_concurrency():
+    throughput = {c: run_batch(c) for c in (1, 4, 8)}
+    for concurrency, items_per_second in throughput.items():
+        print(f"concurrency={concurrency}: {items_per_second:.1f} items/s")
+
+    # Bedrock latency dominates, so throughput should grow close to linearly
+    assert throughput[4] > 2.5 * throughput[1]
+    assert throughput[8] > throughput[4]
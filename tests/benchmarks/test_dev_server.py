@@ -0,0 +1,83 @@
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.local.dev_server import LocalStack, serve
+
+CONCURRENCY = 8
+BEDROCK_LATENCY_MS = 50.0
+COLD_START_MS = 100.0
+
+def request(base_url, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    http_request = urllib.request.Request(base_url + path, data=data, method=method)
+    try:
+        with urllib.request.urlopen(http_request, timeout=10) as response:
+            return response.status, dict(response.headers), json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read())
+
+def generate_body(i):
+    return {"title": f"Desk Lamp {i}", "category": "Lighting", "features": ["Dimmable"],
+            "audience": "Readers", "format": "short", "store_result": True}
+
+def test_concurrent_requests_warm_containers_and_store_asynchronously():
+    with LocalStack(bedrock_latency_ms=BEDROCK_LATENCY_MS, bedrock_jitter=0.0, cold_start_ms=COLD_START_MS,
+                    seed_items=20) as stack, serve(stack, port=0) as server:
+        base_url = "http://%s:%d" % server.server_address[:2]
+
+        def timed(i):
+            start = time.perf_counter()
+            status, headers, _ = request(base_url, "POST", "/generate", generate_body(i))
+            return status, headers["X-Local-Cold-Start"], time.perf_counter() - start
+
+        with ThreadPoolExecutor(CONCURRENCY) as pool:
+            burst = list(pool.map(timed, range(CONCURRENCY)))
+            warm = list(pool.map(timed, range(CONCURRENCY, 4 * CONCURRENCY)))
+        stack.wait_for_async()
+
+        status, _, stored = request(base_url, "GET", "/descriptions/desk-lamp-3?format=short")
+        export_status, _, export = request(base_url, "GET", "/export-csv")
+        stats = request(base_url, "GET", "/_local/stats")[2]
+
+    generate = stats["functions"]["GenerateDescriptionLambda"]
+    burst_seconds = sorted(seconds for _, _, seconds in burst)[len(burst) // 2]
+    warm_seconds = sorted(seconds for _, _, seconds in warm)[len(warm) // 2]
+    print(f"burst p50={burst_seconds * 1000:.0f} ms, warm p50={warm_seconds * 1000:.0f} ms, "
+          f"containers={generate['coldStarts']} peak={generate['peakConcurrency']}")
+
+    assert all(status == 200 for status, _, _ in burst + warm)
+    # A burst starts one container per concurrent request; later traffic reuses them
+    assert generate["coldStarts"] == generate["peakConcurrency"] <= CONCURRENCY
+    assert all(cold == "false" for _, cold, _ in warm)
+    assert warm_seconds < burst_seconds
+    # Generated descriptions reached the table through the asynchronous store invoke
+    assert stats["asyncErrors"] == 0
+    assert stats["tableItems"] == 20 + 4 * CONCURRENCY
+    assert status == 200 and stored["descriptions"]["short"]
+    assert export_status == 200 and export["rows"] == 20 + 4 * CONCURRENCY
+
+def test_reserved_concurrency_throttles_and_unknown_routes_are_rejected():
+    with LocalStack(bedrock_latency_ms=BEDROCK_LATENCY_MS, bedrock_jitter=0.0,
+                    reserved_concurrency=2) as stack, serve(stack, port=0) as server:
+        base_url = "http://%s:%d" % server.server_address[:2]
+        with ThreadPoolExecutor(CONCURRENCY) as pool:
+            statuses = list(pool.map(lambda i: request(base_url, "POST", "/generate", generate_body(i))[0],
+                                     range(CONCURRENCY)))
+        missing = request(base_url, "GET", "/generate")
+        # The burst's store invokes count against the same reserved concurrency
+        stack.wait_for_async()
+        invoked = request(base_url, "POST", "/_local/invoke/StoreDescriptionLambda", {"item": {"productId": "x"}})
+
+    assert statuses.count(200) >= 2
+    assert set(statuses) <= {200, 429} and 429 in statuses
+    assert missing[0] == 403
+    # Direct invokes return the handler's own response
+    assert invoked[0] == 200 and invoked[2]["statusCode"] == 400
@@ -0,0 +1,75 @@
+import time
+from decimal import Decimal
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from product_generator.utils.export_formats import EXPORT_FORMATS
+from product_generator.utils.export_schema import DESCRIPTION_SCHEMA
+
+ITEM_COUNT = 50_000
+PAGE_SIZE = 1_000
+WORDS = "durable light compact elegant ergonomic sturdy washable vibrant modern classic".split()
+
+def synthetic_pages(count):
+    # Varied text so compression ratios are not flattered by identical rows
+    page = []
+    for i in range(count):
+        words = " ".join(WORDS[(i + k) % len(WORDS)] for k in range(12))
+        page.append({
+            "productId": f"product-{i}",
+            "formatType": "all",
+            "timestamp": Decimal(1_700_000_000_000 + i),
+            "metadata": {"title": f"Product {i}", "category": "Home", "features": WORDS[i % 5:i % 5 + 3], "audience": "Everyone"},
+            "descriptions": {
+                "short": f"A {words[:40]} product, \"number {i}\".",
+                "detailed": f"Product {i} is {words}. " * 4,
+                "social": f"Meet product {i}! #{WORDS[i % len(WORDS)]}",
+                "seo": f"Buy product {i}: {words}."
+            }
+        })
+        if len(page) == PAGE_SIZE:
+            yield page
+            page = []
+    if page:
+        yield page
+
+class CountingSink:
+    # Stands in for the multipart upload; only counts bytes
+    closed = False
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data.encode("utf-8") if isinstance(data, str) else data)
+        return len(data)
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+def test_bytes_written_and_encode_time_per_format():
+    pages = list(synthetic_pages(ITEM_COUNT))
+    results = {}
+    for name, export_format in EXPORT_FORMATS.items():
+        if not export_format.available():
+            continue
+        sink = CountingSink()
+        start = time.perf_counter()
+        rows = export_format.write(sink, iter(pages), DESCRIPTION_SCHEMA)
+        results[name] = (sink.bytes_written, time.perf_counter() - start)
+        assert rows == ITEM_COUNT
+
+    csv_bytes = results["csv"][0]
+    for name, (size, seconds) in results.items():
+        print(f"{name:10} {size / 2**20:7.2f} MiB ({size / csv_bytes:5.1%} of csv) "
+              f"{seconds:6.2f}s {ITEM_COUNT / seconds:>10,.0f} rows/s")
+
+    assert results["csv.gz"][0] < csv_bytes / 3
+    assert results["jsonl.gz"][0] < results["jsonl"][0] / 3
+    if "parquet" in results:
+        assert results["parquet"][0] < results["csv.gz"][0]
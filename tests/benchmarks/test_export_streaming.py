@@ -0,0 +1,65 @@
+import json
+import time
+import tracemalloc
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import export_description_lambda
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable, FakeS3Client
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.s3_service import MIN_PART_SIZE, S3Service
+
+ITEM_COUNT = 100_000
+
+def synthetic_items(count):
+    for i in range(count):
+        yield {
+            "productId": f"product-{i}",
+            "formatType": "all",
+            "timestamp": i,
+            "metadata": {"title": f"Product {i}", "category": "Home", "features": ["Durable", "Light"], "audience": "Everyone"},
+            "descriptions": {
+                "short": "A short description.",
+                "detailed": "A detailed description that goes on for a while. " * 4,
+                "social": "Discover the amazing product! #Product #Innovation",
+                "seo": "Buy the best product in the Home category."
+            }
+        }
+
+def test_export_memory_stays_flat_for_100k_items(mocker):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    table.load(synthetic_items(ITEM_COUNT))
+    s3_client = FakeS3Client(keep_data=False)
+
+    mocker.patch.object(export_description_lambda, 'PRODUCT_DESCRIPTIONS_TABLE', table.name)
+    mocker.patch.object(export_description_lambda, 'EXPORTS_S3_BUCKET', "exports-bucket")
+    mocker.patch.object(export_description_lambda, 'EXPORT_PART_SIZE', MIN_PART_SIZE)
+    mocker.patch.object(export_description_lambda, 'logger')
+    mocker.patch(
+        'product_generator.lambda_handlers.export_description_lambda.DynamoDBService',
+        side_effect=lambda name: DynamoDBService(name, dynamodb=FakeDynamoDBResource([table]))
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.export_description_lambda.S3Service',
+        side_effect=lambda: S3Service(s3_client=s3_client)
+    )
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = export_description_lambda.lambda_handler({}, {})
+    elapsed = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    response_body = json.loads(response["body"])
+    csv_bytes = s3_client.object_sizes[("exports-bucket", response_body["key"])]
+    print(f"rows={response_body['rows']} csv={csv_bytes / 2**20:.1f} MiB "
+          f"peak={peak_bytes / 2**20:.1f} MiB rows/s={ITEM_COUNT / elapsed:,.0f}")
+
+    assert response_body["rows"] == ITEM_COUNT
+    # Peak is bounded by the part buffer, not by the size of the export
+    assert csv_bytes > 5 * MIN_PART_SIZE
+    assert peak_bytes < 3 * MIN_PART_SIZE
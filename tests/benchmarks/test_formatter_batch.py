@@ -0,0 +1,69 @@
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+
+from product_generator.utils.description_formatter import DescriptionFormatter, format_batch
+
+ITEMS = 20000
+# Re-export workloads format several descriptions of the same product
+PRODUCTS = 2000
+
+def pairs():
+    text = (
+        "This insulated water bottle keeps drinks cold for a full day of hiking and fits every standard cup "
+        "holder in cars, bikes and strollers. It is made from BPA-free materials. A leak-proof lid means it "
+        "can ride in any pack."
+    )
+    return [
+        (f"{text} Batch {i}.", {
+            "title": f"Water Bottle {i % PRODUCTS}",
+            "category": "Outdoors",
+            "features": ["Insulated", "BPA-free", "Leak-proof"],
+            "audience": "Hikers",
+        })
+        for i in range(ITEMS)
+    ]
+
+def run_per_item(items):
+    results = []
+    for text, metadata in items:
+        formatter = DescriptionFormatter(text, metadata)
+        results.append({
+            "short": formatter.get_short_description(),
+            "detailed": formatter.get_detailed_description(),
+            "social": formatter.get_social_caption(),
+            "seo": formatter.get_seo_rich_description(),
+        })
+    return results
+
+def run_per_item_metadata_formats(items):
+    return [{"social": formatter.get_social_caption(), "seo": formatter.get_seo_rich_description()}
+            for formatter in (DescriptionFormatter(text, metadata) for text, metadata in items)]
+
+def best_of(funcs, items, rounds=5):
+    # Rounds alternate between the functions, so a slow patch of a loaded run
+    # hits both rather than only one
+    best = [None] * len(funcs)
+    for _ in range(rounds):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            func(items)
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+def test_batch_formatter_outpaces_per_item_formatting():
+    items = pairs()
+    assert format_batch(items) == run_per_item(items)
+
+    # Short and detailed cost the same either way; the batch saves on the
+    # metadata-only formats, built once per distinct product
+    per_item_seconds, batch_seconds = best_of(
+        [run_per_item_metadata_formats, lambda batch: format_batch(batch, ("social", "seo"))], items)
+
+    print(f"per-item: {ITEMS / per_item_seconds:,.0f} items/s, batch: {ITEMS / batch_seconds:,.0f} items/s "
+          f"({per_item_seconds / batch_seconds:.1f}x)")
+
+    assert batch_seconds < per_item_seconds
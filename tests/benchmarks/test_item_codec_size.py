@@ -0,0 +1,115 @@
+import json
+import math
+import time
+from decimal import Decimal
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import export_description_lambda
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable, FakeS3Client
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.item_codec import CompactItemCodec
+from product_generator.services.s3_service import MIN_PART_SIZE, S3Service
+
+ITEM_COUNT = 5000
+# DynamoDB returns at most 1 MB per Scan page; each page costs a round trip
+SCAN_PAGE_BYTES = 1024 * 1024
+SCAN_PAGE_LATENCY_SECONDS = 0.05
+
+DETAILED = (
+    "The Trailhead Insulated Bottle keeps water cold for twenty-four hours and coffee hot for twelve. "
+    "Its double-wall vacuum steel shell never sweats, the powder coat grips in wet hands, and the "
+    "leak-proof lid clicks shut with one thumb. It fits standard cup holders and bike cages, and the "
+    "wide mouth takes ice cubes and a cleaning brush. Made for hikers, commuters and anyone who wants "
+    "one bottle for every day of the week. "
+) * 3
+
+def synthetic_item(i):
+    return {
+        "productId": f"trailhead-bottle-{i}",
+        "formatType": "all",
+        "timestamp": 1700000000000 + i,
+        "updatedAt": 1700000000000 + i,
+        "changeBucket": "2023-11-14",
+        "metadata": {"title": f"Trailhead Bottle {i}", "category": "Outdoors",
+                     "features": ["Insulated", "Leak-proof lid", "BPA-free", "Fits cup holders", "Powder coat"],
+                     "audience": "Hikers and commuters"},
+        "descriptions": {
+            "short": "The Trailhead Insulated Bottle keeps water cold for twenty-four hours.",
+            "detailed": DETAILED,
+            "social": "Cold for 24h, hot for 12, never sweats. Meet your new everyday bottle. #Hiking #Outdoors",
+            "seo": "Trailhead Insulated Bottle: leak-proof, BPA-free steel bottle that keeps drinks cold 24h.",
+        },
+    }
+
+def attribute_size(value):
+    # DynamoDB item size rules: UTF-8 length for strings, raw length for
+    # binary, roughly one byte per two digits for numbers, and 3 bytes plus one
+    # per element for maps and lists
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (int, float, Decimal)):
+        return len(str(value)) // 2 + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(k.encode("utf-8")) + attribute_size(v) + 1 for k, v in value.items())
+    if isinstance(value, list):
+        return 3 + sum(attribute_size(v) + 1 for v in value)
+    return 1
+
+def item_size(item):
+    return sum(len(name.encode("utf-8")) + attribute_size(value) for name, value in item.items())
+
+def export_seconds(mocker, items, page_size):
+    table = FakeDynamoDBTable("ProductDescriptions", page_size=page_size, latency=SCAN_PAGE_LATENCY_SECONDS)
+    table.load(items)
+    s3_client = FakeS3Client(keep_data=False)
+    mocker.patch.object(export_description_lambda, 'PRODUCT_DESCRIPTIONS_TABLE', table.name)
+    mocker.patch.object(export_description_lambda, 'EXPORTS_S3_BUCKET', "exports-bucket")
+    mocker.patch.object(export_description_lambda, 'EXPORT_PART_SIZE', MIN_PART_SIZE)
+    mocker.patch.object(export_description_lambda, 'logger')
+    mocker.patch(
+        'product_generator.lambda_handlers.export_description_lambda.DynamoDBService',
+        side_effect=lambda name: DynamoDBService(name, dynamodb=FakeDynamoDBResource([table]))
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.export_description_lambda.S3Service',
+        side_effect=lambda: S3Service(s3_client=s3_client)
+    )
+    start = time.perf_counter()
+    response = export_description_lambda.lambda_handler({}, {})
+    elapsed = time.perf_counter() - start
+    body = json.loads(response["body"])
+    return elapsed, body["rows"], s3_client.object_sizes[("exports-bucket", body["key"])]
+
+def test_compact_items_are_smaller_and_scan_faster(mocker):
+    codec = CompactItemCodec()
+    plain_items = [synthetic_item(i) for i in range(ITEM_COUNT)]
+    packed_items = [codec.pack_item(item) for item in plain_items]
+
+    plain_size = sum(map(item_size, plain_items)) / ITEM_COUNT
+    packed_size = sum(map(item_size, packed_items)) / ITEM_COUNT
+    # A write costs one unit per 1 KB (or part) of the item; an eventually
+    # consistent scan reads 4 KB per half read unit
+    plain_wcu, packed_wcu = math.ceil(plain_size / 1024), math.ceil(packed_size / 1024)
+    plain_rcu = ITEM_COUNT * plain_size / 4096 / 2
+    packed_rcu = ITEM_COUNT * packed_size / 4096 / 2
+
+    plain_seconds, plain_rows, plain_bytes = export_seconds(
+        mocker, plain_items, max(1, int(SCAN_PAGE_BYTES // plain_size)))
+    packed_seconds, packed_rows, packed_bytes = export_seconds(
+        mocker, packed_items, max(1, int(SCAN_PAGE_BYTES // packed_size)))
+
+    print(f"item size: {plain_size:,.0f} B -> {packed_size:,.0f} B ({plain_size / packed_size:.1f}x), "
+          f"WCU/write: {plain_wcu} -> {packed_wcu}, scan RCU: {plain_rcu:,.0f} -> {packed_rcu:,.0f}, "
+          f"export: {plain_seconds:.2f}s -> {packed_seconds:.2f}s")
+
+    # Readers see the same rows either way
+    assert (plain_rows, plain_bytes) == (packed_rows, packed_bytes)
+    assert packed_size < plain_size / 2
+    assert packed_wcu < plain_wcu
+    assert packed_seconds < plain_seconds
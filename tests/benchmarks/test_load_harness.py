@@ -0,0 +1,75 @@
+import json
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.local.load_harness import (
+    ExportScenario,
+    GenerateScenario,
+    LoadProfile,
+    StoreScenario,
+    compare_to_baseline,
+    format_report,
+    percentile,
+    run_all,
+    run_scenario,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'load_baseline.json')
+# Timings vary with the machine and whatever else it runs; set to compare them too
+CHECK_TIMINGS = os.environ.get("LOAD_HARNESS_CHECK_TIMINGS", "false").lower() == "true"
+
+def test_percentiles_use_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+def test_regressions_are_reported_per_metric():
+    baseline = {"generate": {"p95_ms": 30.0, "throughput_rps": 300.0, "alloc_kib_per_request": 10.0}}
+    results = {"generate": {"p95_ms": 45.0, "throughput_rps": 290.0, "alloc_kib_per_request": 10.5}}
+
+    regressions = compare_to_baseline(results, baseline, tolerance=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("generate.p95_ms")
+    assert compare_to_baseline(results, baseline, tolerance=0.25, tolerances={"p95_ms": 1.0}) == []
+    assert compare_to_baseline(results, baseline, tolerance=0.25, timings=False) == []
+
+def test_counters_must_match_exactly():
+    baseline = {"store": {"counters": {"dynamodb_requests": 260, "client_builds": 1}}}
+    results = {"store": {"counters": {"dynamodb_requests": 261, "client_builds": 1}}}
+
+    regressions = compare_to_baseline(results, baseline, timings=False)
+
+    assert regressions == ["store.dynamodb_requests: 261 vs baseline 260"]
+
+def test_injected_errors_are_retried_and_show_up_in_latency():
+    profile = LoadProfile(requests=60, concurrency=4, bedrock_latency_ms=5.0, bedrock_jitter=0.0,
+                          bedrock_error_rate=0.2, allocation_samples=0)
+
+    result = run_scenario(GenerateScenario(profile))
+
+    assert result["failures"] == 0
+    # A retried request waits out at least one backoff on top of the model call
+    assert result["p99_ms"] > result["p50_ms"]
+
+def test_handlers_stay_within_the_stored_baseline():
+    with open(BASELINE_PATH) as baseline_file:
+        baseline = json.load(baseline_file)
+    profile = LoadProfile(**baseline["profile"])
+
+    results = run_all(profile)
+    print(format_report(results))
+
+    assert all(result["failures"] == 0 for result in results.values())
+    # Model calls, AWS requests and client builds are exact for a given
+    # profile. Tail latency of threads sharing one interpreter is noisy, so
+    # timings are only compared on request, and loosely.
+    regressions = compare_to_baseline(results, baseline, tolerance=0.5, tolerances={"p95_ms": 1.0},
+                                      timings=CHECK_TIMINGS)
+    assert not regressions, "\n".join(regressions)
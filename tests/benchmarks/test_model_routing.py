@@ -0,0 +1,68 @@
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.local.fakes import FakeBackend, FakeBedrockClient, bedrock_error
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.model_backends import Llama3Backend, Llama3SmallBackend, ModelRouter
+from product_generator.services.resilience import ModelInvocationError, ResilientInvoker
+
+# Fake stand-ins priced like the real catalog; the small model answers faster
+FORMATS = ["short", "social", "seo", "detailed"] * 10
+
+def make_backends(small_errors=None):
+    large = FakeBackend(
+        Llama3Backend.model_id, latency=0.02,
+        input_cost_per_1k=Llama3Backend.input_cost_per_1k, output_cost_per_1k=Llama3Backend.output_cost_per_1k
+    )
+    small = FakeBackend(
+        Llama3SmallBackend.model_id, formats=Llama3SmallBackend.formats, max_output_tokens=512, latency=0.005,
+        input_cost_per_1k=Llama3SmallBackend.input_cost_per_1k,
+        output_cost_per_1k=Llama3SmallBackend.output_cost_per_1k, errors=small_errors
+    )
+    return large, small
+
+def run(bedrock_service):
+    start = time.perf_counter()
+    failures = 0
+    for index, format_type in enumerate(FORMATS):
+        try:
+            bedrock_service.invoke_model(f"Describe product {index}.", format_type=format_type)
+        except ModelInvocationError:
+            failures += 1
+    return time.perf_counter() - start, failures
+
+def estimated_cost(backends):
+    return sum(b.calls * b.estimate_cost(10, b.max_gen_len) for b in backends)
+
+def test_routing_cuts_cost_and_latency_for_short_formats():
+    large, small = make_backends()
+    baseline_seconds, _ = run(BedrockService(client=FakeBedrockClient(), backend=large, invoker=ResilientInvoker()))
+    baseline_cost = estimated_cost([large])
+
+    large, small = make_backends()
+    router = ModelRouter([large, small])
+    routed_seconds, _ = run(BedrockService(client=FakeBedrockClient(), router=router, invoker=ResilientInvoker()))
+    routed_cost = estimated_cost([large, small])
+
+    print(f"70B only: {baseline_seconds:.2f}s, ${baseline_cost:.4f}")
+    print(f"routed:   {routed_seconds:.2f}s, ${routed_cost:.4f} ({small.calls} calls to the small model)")
+
+    assert small.calls == 30
+    assert routed_cost < 0.5 * baseline_cost
+    assert routed_seconds < 0.6 * baseline_seconds
+
+def test_router_fails_over_when_the_small_model_degrades():
+    # The small model fails every call after the first few
+    large, small = make_backends(small_errors=lambda call: bedrock_error("ServiceUnavailableException") if call > 3 else None)
+    router = ModelRouter([large, small], max_error_rate=0.3)
+    _, failures = run(BedrockService(client=FakeBedrockClient(), router=router, invoker=ResilientInvoker(max_attempts=1)))
+
+    print(f"failures={failures}, small calls={small.calls}, large calls={large.calls}")
+
+    # Only the calls it takes for the error rate to cross the limit fail
+    assert failures <= 3
+    assert large.calls > 10
@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers.generate_description_lambda import format_descriptions
+from product_generator.local.fakes import FakeBedrockClient
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.utils.prompt_builder import plan_prompt
+
+PRODUCTS = 20
+# "social" and "seo" are built from metadata and never call the model
+FORMATS = ("short", "detailed")
+
+# A model that always writes at length; the fake stops at the request's budget
+GENERATION = " ".join(
+    ["This insulated bottle keeps drinks cold through a full day on the trail."]
+    + ["It is built from BPA-free steel and fits standard cup holders in cars and bikes."] * 60
+)
+
+def product(i):
+    return {"title": f"Water Bottle {i}", "category": "Outdoors", "features": ["Insulated", "BPA-free"],
+            "audience": "Hikers"}
+
+def run(format_type, budgeted):
+    # Returns (generation tokens, formatted results) over PRODUCTS requests
+    bedrock_service = BedrockService(client=FakeBedrockClient(generation=GENERATION))
+    results = []
+    for i in range(PRODUCTS):
+        metadata = product(i)
+        prompt = plan_prompt(metadata, format_type)
+        if budgeted:
+            text = bedrock_service.invoke_model(prompt.text, format_type=format_type,
+                                                max_gen_len=prompt.max_gen_len, stop=prompt.stop)
+        else:
+            # Previous behaviour: the backend's flat 512-token budget for every format
+            text = bedrock_service.invoke_model(prompt.text, format_type=format_type)
+        results.append(format_descriptions(text, metadata, format_type))
+    return bedrock_service.usage_snapshot()["generation_tokens"], results
+
+def test_per_format_budgets_cut_generated_tokens_without_changing_output():
+    for format_type in FORMATS:
+        flat_tokens, flat_results = run(format_type, budgeted=False)
+        budget_tokens, budget_results = run(format_type, budgeted=True)
+        print(f"{format_type}: {flat_tokens / PRODUCTS:.0f} -> {budget_tokens / PRODUCTS:.0f} generated tokens/request "
+              f"({1 - budget_tokens / flat_tokens:.0%} saved)")
+
+        assert budget_results == flat_results
+        if format_type == "detailed":
+            assert budget_tokens == flat_tokens
+        else:
+            assert budget_tokens < flat_tokens / 4
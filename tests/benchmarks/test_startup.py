@@ -0,0 +1,30 @@
+import json
+import subprocess
+import pytest
+
+import sys
+import os
+
+PROBE = os.path.join(os.path.dirname(__file__), "startup_probe.py")
+
+def probe(handler_name):
+    output = subprocess.run(
+        [sys.executable, PROBE, handler_name],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+@pytest.mark.parametrize("handler_name", [
+    "generate_description_lambda",
+    "store_description_lambda",
+    "export_description_lambda",
+])
+def test_handler_startup(handler_name):
+    result = probe(handler_name)
+    print(f"{handler_name}: import={result['import_ms']:.1f} ms "
+          f"first_call={result['first_call_ms']:.1f} ms warm_call={result['warm_call_ms']:.2f} ms")
+
+    # boto3 is only imported when the first client is built, not at handler import
+    assert result["boto3_imported_by_handler"] is False
+    # Warm calls reuse the registry's clients instead of rebuilding them
+    assert result["warm_call_ms"] * 5 < result["first_call_ms"]
@@ -0,0 +1,103 @@
+import json
+import math
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import generate_description_lambda, store_description_lambda
+from product_generator.local.fakes import FakeBedrockClient, FakeDynamoDBResource, FakeDynamoDBTable, FakeSQSClient
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.services.queue_service import QueueService
+
+REQUEST_COUNT = 200
+# Per-call overheads standing in for a Lambda invocation and a DynamoDB round trip
+INVOCATION_OVERHEAD_SECONDS = 0.002
+WRITE_LATENCY_SECONDS = 0.002
+
+def generate_requests(mocker, sqs_client):
+    mocker.patch.object(generate_description_lambda, 'STORAGE_QUEUE_URL', "https://sqs.local/storage")
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch.object(generate_description_lambda, 'logger')
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.QueueService',
+        side_effect=lambda url: QueueService(url, sqs_client=sqs_client)
+    )
+    bedrock_client = FakeBedrockClient()
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=bedrock_client, **kwargs)
+    )
+    context = mocker.MagicMock(get_remaining_time_in_millis=lambda: 1000)
+    for i in range(REQUEST_COUNT):
+        response = generate_description_lambda.lambda_handler({"body": json.dumps({
+            "title": f"Lamp {i}",
+            "category": "Lighting",
+            "features": ["Dimmable"],
+            "audience": "Readers",
+            "format": "short",
+            "store_result": True
+        })}, context)
+        assert response["statusCode"] == 200
+
+def drain(mocker, sqs_client, batch_size, table=None):
+    if table is None:
+        table = FakeDynamoDBTable("ProductDescriptions", latency=WRITE_LATENCY_SECONDS)
+    resource = FakeDynamoDBResource([table], latency=WRITE_LATENCY_SECONDS)
+    puts_before = table.put_calls
+    mocker.patch.object(store_description_lambda, 'PRODUCT_DESCRIPTIONS_TABLE', table.name)
+    mocker.patch.object(store_description_lambda, 'logger')
+    mocker.patch(
+        'product_generator.lambda_handlers.store_description_lambda.DynamoDBService',
+        side_effect=lambda name, **kwargs: DynamoDBService(name, dynamodb=resource, **kwargs)
+    )
+
+    def invoke(event, context):
+        time.sleep(INVOCATION_OVERHEAD_SECONDS)
+        return store_description_lambda.lambda_handler(event, context)
+
+    start = time.perf_counter()
+    invocations = sqs_client.deliver(invoke, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    assert len(table) == REQUEST_COUNT
+    return invocations, resource.batch_get_calls, table.put_calls - puts_before, REQUEST_COUNT / elapsed
+
+def test_store_throughput_scales_with_batch_size(mocker):
+    results = {}
+    for batch_size in (1, 10, 100):
+        sqs_client = FakeSQSClient()
+        generate_requests(mocker, sqs_client)
+        assert len(sqs_client.messages) == REQUEST_COUNT
+        results[batch_size] = drain(mocker, sqs_client, batch_size)
+
+    for batch_size, (invocations, read_calls, puts, rate) in results.items():
+        print(f"batch_size={batch_size}: invocations={invocations} batch_get_calls={read_calls} "
+              f"puts={puts} items/s={rate:,.0f}")
+        assert invocations == math.ceil(REQUEST_COUNT / batch_size)
+        assert puts == REQUEST_COUNT
+
+    # One version read per batch
+    assert results[100][1] == math.ceil(REQUEST_COUNT / 100)
+    assert results[10][3] > 3 * results[1][3]
+    assert results[100][3] > results[10][3]
+
+def test_rerunning_a_catalog_writes_nothing(mocker):
+    table = FakeDynamoDBTable("ProductDescriptions", latency=WRITE_LATENCY_SECONDS)
+    runs = []
+    for _ in range(2):
+        sqs_client = FakeSQSClient()
+        generate_requests(mocker, sqs_client)
+        runs.append(drain(mocker, sqs_client, 10, table))
+
+    (_, _, first_puts, first_rate), (_, _, second_puts, second_rate) = runs
+    print(f"first run: puts={first_puts} items/s={first_rate:,.0f}; "
+          f"re-run: puts={second_puts} items/s={second_rate:,.0f}")
+
+    # Same content, newer timestamps: every write is skipped before it costs capacity
+    assert (first_puts, second_puts) == (REQUEST_COUNT, 0)
+    assert second_rate > first_rate
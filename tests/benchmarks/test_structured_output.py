@@ -0,0 +1,76 @@
+import json
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers.generate_description_lambda import STRUCTURED_FORMATS, generate_descriptions
+from product_generator.local.fakes import FakeBedrockClient
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.utils.prompt_builder import STRUCTURED_FORMAT_INSTRUCTIONS, build_prompt
+
+MODEL_LATENCY_SECONDS = 0.03
+PRODUCTS = 10
+
+COPY = {
+    "short": "A bottle that keeps drinks cold all day on the trail.",
+    "detailed": (
+        "This insulated water bottle keeps drinks cold for a full day of hiking. "
+        "It is made from BPA-free materials and fits standard cup holders. "
+        "A leak-proof lid means it can ride in any pack."
+    ),
+    "social": "Cold water at the summit. #Hiking #Outdoors",
+    "seo": "Insulated BPA-free water bottle for hikers. Keeps drinks cold all day.",
+}
+
+def generation(native_request):
+    prompt = native_request["prompt"]
+    if "JSON object" in prompt:
+        return json.dumps(COPY)
+    fmt = next(key for key in STRUCTURED_FORMATS if STRUCTURED_FORMAT_INSTRUCTIONS[key] in prompt)
+    return COPY[fmt]
+
+def product(i):
+    return {
+        "title": f"Water Bottle {i}",
+        "category": "Outdoors",
+        "features": ["Insulated", "BPA-free"],
+        "audience": "Hikers",
+        "format": "all"
+    }
+
+def run_structured():
+    bedrock_service = BedrockService(client=FakeBedrockClient(latency=MODEL_LATENCY_SECONDS, generation=generation))
+    start = time.perf_counter()
+    for i in range(PRODUCTS):
+        generate_descriptions(bedrock_service, product(i))
+    return time.perf_counter() - start, bedrock_service.usage_snapshot()
+
+def run_n_calls():
+    # Baseline: one model call per format
+    bedrock_service = BedrockService(client=FakeBedrockClient(latency=MODEL_LATENCY_SECONDS, generation=generation))
+    start = time.perf_counter()
+    for i in range(PRODUCTS):
+        p = product(i)
+        base_prompt = build_prompt(p["title"], p["category"], p["features"], p["audience"])
+        for fmt in STRUCTURED_FORMATS:
+            bedrock_service.invoke_model(f"{base_prompt} Write {STRUCTURED_FORMAT_INSTRUCTIONS[fmt]}.")
+    return time.perf_counter() - start, bedrock_service.usage_snapshot()
+
+def test_structured_all_beats_one_call_per_format():
+    structured_seconds, structured_usage = run_structured()
+    baseline_seconds, baseline_usage = run_n_calls()
+
+    for name, seconds, usage in (("structured", structured_seconds, structured_usage),
+                                 ("n-calls", baseline_seconds, baseline_usage)):
+        print(
+            f"{name}: {seconds / PRODUCTS * 1000:.1f} ms/product, {usage['calls']} calls, "
+            f"{usage['prompt_tokens']} prompt tokens, {usage['generation_tokens']} generation tokens"
+        )
+
+    assert structured_usage["calls"] == PRODUCTS
+    assert baseline_usage["calls"] == PRODUCTS * len(STRUCTURED_FORMATS)
+    assert structured_usage["prompt_tokens"] < baseline_usage["prompt_tokens"]
+    assert structured_seconds < baseline_seconds / 2
@@ -0,0 +1,350 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import export_description_lambda
+from product_generator.lambda_handlers.export_description_lambda import CSV_HEADERS, INCREMENTAL_CSV_HEADERS, lambda_handler
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable, FakeLambdaClient, FakeS3Client
+from product_generator.services.dynamodb_service import DynamoDBService, stamp_change
+from product_generator.services.s3_service import MIN_PART_SIZE, S3Service
+from product_generator.services.similarity_index import load_index
+
+BUCKET = "exports-bucket"
+
+def make_item(i, detailed="A detailed description."):
+    return {
+        "productId": f"product-{i}",
+        "formatType": "all",
+        "timestamp": i,
+        "metadata": {"title": f"Product {i}", "category": "Home", "features": ["Durable", "Light"], "audience": "Everyone"},
+        "descriptions": {"short": "Short.", "detailed": detailed, "social": "Social!", "seo": "SEO."}
+    }
+
+@pytest.fixture
+def stand_ins(mocker):
+    table = FakeDynamoDBTable("ProductDescriptions", page_size=7, indexes={"ChangesByDay": ("changeBucket", "updatedAt")})
+    s3_client = FakeS3Client()
+    mocker.patch.object(export_description_lambda, 'PRODUCT_DESCRIPTIONS_TABLE', table.name)
+    mocker.patch.object(export_description_lambda, 'EXPORTS_S3_BUCKET', BUCKET)
+    mocker.patch.object(export_description_lambda, 'EXPORT_PART_SIZE', MIN_PART_SIZE)
+    mocker.patch(
+        'product_generator.lambda_handlers.export_description_lambda.DynamoDBService',
+        side_effect=lambda name: DynamoDBService(name, dynamodb=FakeDynamoDBResource([table]))
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.export_description_lambda.S3Service',
+        side_effect=lambda: S3Service(s3_client=s3_client)
+    )
+    return table, s3_client
+
+def read_rows(s3_client, key):
+    return list(csv.reader(io.StringIO(s3_client.objects[(BUCKET, key)].decode("utf-8"))))
+
+def test_export_follows_pagination_past_first_page(stand_ins):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(50))
+
+    response = lambda_handler({}, {})
+    response_body = json.loads(response["body"])
+    rows = read_rows(s3_client, response_body["key"])
+
+    assert response["statusCode"] == 200
+    assert response_body["rows"] == 50
+    assert rows[0] == CSV_HEADERS
+    assert [row[0] for row in rows[1:]] == [f"product-{i}" for i in range(50)]
+    assert rows[1][4] == "Durable, Light"
+
+def test_large_export_is_uploaded_in_fixed_size_parts(stand_ins):
+    table, s3_client = stand_ins
+    # ~12 MiB of CSV so the upload spans several parts
+    table.load(make_item(i, detailed="x" * 4000) for i in range(3000))
+
+    response_body = json.loads(lambda_handler({}, {})["body"])
+    part_sizes = s3_client.part_sizes[(BUCKET, response_body["key"])]
+
+    assert len(part_sizes) == 3
+    assert part_sizes[:-1] == [MIN_PART_SIZE, MIN_PART_SIZE]
+    assert len(read_rows(s3_client, response_body["key"])) == 3001
+
+def test_empty_table_skips_upload(stand_ins):
+    _, s3_client = stand_ins
+
+    response = lambda_handler({}, {})
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["message"] == "No descriptions found to export."
+    assert s3_client.objects == {}
+
+def test_failed_scan_aborts_multipart_upload(stand_ins, mocker):
+    table, s3_client = stand_ins
+    table.load(make_item(i, detailed="x" * 4000) for i in range(3000))
+    original_scan = table.scan
+    calls = []
+
+    def failing_scan(**kwargs):
+        calls.append(kwargs)
+        if len(calls) > 300:
+            raise RuntimeError("scan failed")
+        return original_scan(**kwargs)
+
+    mocker.patch.object(table, 'scan', side_effect=failing_scan)
+
+    response = lambda_handler({}, {})
+
+    assert response["statusCode"] == 500
+    assert s3_client.objects == {}
+    assert s3_client._uploads == {}
+
+def test_parallel_export_contains_every_row_once(stand_ins):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(200))
+
+    response_body = json.loads(lambda_handler({"queryStringParameters": {"segments": "4"}}, {})["body"])
+    rows = read_rows(s3_client, response_body["key"])
+
+    assert response_body["rows"] == 200
+    assert sorted(row[0] for row in rows[1:]) == sorted(f"product-{i}" for i in range(200))
+
+def test_ordered_parallel_export_emits_segments_in_order(stand_ins):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(200))
+
+    response_body = json.loads(lambda_handler({"queryStringParameters": {"segments": "4", "ordered": "true"}}, {})["body"])
+    exported_ids = [row[0] for row in read_rows(s3_client, response_body["key"])[1:]]
+
+    dynamodb_service = DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]))
+    expected_ids = []
+    for segment in range(4):
+        expected_ids += [item["productId"] for item in dynamodb_service.scan_items(Segment=segment, TotalSegments=4)]
+    assert exported_ids == expected_ids
+
+def test_sharded_export_is_stitched_into_one_csv(stand_ins):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(120))
+
+    for shard in ([0, 1], [2], [3, 4]):
+        response = lambda_handler({"mode": "shard", "exportId": "run-1", "totalSegments": 5, "shardSegments": shard}, {})
+        assert response["statusCode"] == 200
+
+    response = lambda_handler({"mode": "stitch", "exportId": "run-1", "totalSegments": 5}, {})
+    rows = read_rows(s3_client, json.loads(response["body"])["key"])
+
+    assert response["statusCode"] == 200
+    assert rows[0] == CSV_HEADERS
+    assert sorted(row[0] for row in rows[1:]) == sorted(f"product-{i}" for i in range(120))
+
+def test_stitch_reports_missing_parts(stand_ins):
+    table, _ = stand_ins
+    table.load(make_item(i) for i in range(10))
+    lambda_handler({"mode": "shard", "exportId": "run-2", "totalSegments": 2, "shardSegments": [0]}, {})
+
+    response = lambda_handler({"mode": "stitch", "exportId": "run-2", "totalSegments": 2}, {})
+
+    assert response["statusCode"] == 409
+
+FUNCTION_ARN = "arn:aws:lambda:us-east-1:123456789012:function:ExportDescriptions"
+
+class Context:
+    invoked_function_arn = FUNCTION_ARN
+
+@pytest.fixture
+def lambda_client(mocker):
+    client = FakeLambdaClient({FUNCTION_ARN: lambda_handler}, context_factory=lambda name: Context())
+    mocker.patch.object(export_description_lambda, 'get_client', return_value=client)
+    yield client
+    client.shutdown()
+
+def test_sharded_mode_fans_out_shards_and_stitches_once(stand_ins, lambda_client, mocker):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(120))
+    invoke = mocker.spy(lambda_client, "invoke")
+
+    response = lambda_handler({"mode": "sharded", "exportId": "run-4", "totalSegments": 5, "shardSize": 2}, Context())
+    lambda_client.wait()
+    modes = [json.loads(call.kwargs["Payload"])["mode"] for call in invoke.call_args_list]
+    rows = read_rows(s3_client, json.loads(response["body"])["key"])
+
+    assert response["statusCode"] == 202
+    assert lambda_client.errors == []
+    assert modes.count("shard") == 3
+    assert modes.count("stitch") == 1
+    assert rows[0] == CSV_HEADERS
+    assert sorted(row[0] for row in rows[1:]) == sorted(f"product-{i}" for i in range(120))
+
+def test_rerun_shard_completes_a_sharded_export(stand_ins, lambda_client, mocker):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(30))
+    s3_service = S3Service(s3_client=s3_client)
+    s3_service.write_json({"exportId": "run-5", "totalSegments": 2, "format": "csv"}, BUCKET, "exports/run-5/run.json")
+
+    first = json.loads(lambda_handler({"mode": "shard", "exportId": "run-5", "totalSegments": 2,
+                                       "shardSegments": [0]}, Context())["body"])
+    second = json.loads(lambda_handler({"mode": "shard", "exportId": "run-5", "totalSegments": 2,
+                                        "shardSegments": [1]}, Context())["body"])
+    lambda_client.wait()
+
+    assert (first["stitching"], second["stitching"]) == (False, True)
+    assert len(read_rows(s3_client, "product_descriptions_export_run-5.csv")) == 31
+    # A repeated shard does not stitch again
+    again = json.loads(lambda_handler({"mode": "shard", "exportId": "run-5", "totalSegments": 2,
+                                       "shardSegments": [1]}, Context())["body"])
+    assert again["stitching"] is False
+
+def test_sharded_mode_needs_a_function_arn(stand_ins):
+    response = lambda_handler({"mode": "sharded", "totalSegments": 2}, {})
+
+    assert response["statusCode"] == 400
+
+def test_invalid_segment_count_is_rejected(stand_ins):
+    response = lambda_handler({"queryStringParameters": {"segments": "0"}}, {})
+
+    assert response["statusCode"] == 400
+
+def test_export_format_is_picked_per_request(stand_ins):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(20))
+
+    response_body = json.loads(lambda_handler({"queryStringParameters": {"format": "jsonl.gz"}}, {})["body"])
+    lines = gzip.decompress(s3_client.objects[(BUCKET, response_body["key"])]).decode("utf-8").splitlines()
+
+    assert response_body["key"].endswith(".jsonl.gz")
+    assert response_body["format"] == "jsonl.gz"
+    assert response_body["bytes"] == len(s3_client.objects[(BUCKET, response_body["key"])])
+    assert [json.loads(line)["productId"] for line in lines] == [f"product-{i}" for i in range(20)]
+    assert json.loads(lines[0])["features"] == ["Durable", "Light"]
+
+def test_compressed_sharded_export_is_stitched(stand_ins):
+    table, s3_client = stand_ins
+    table.load(make_item(i) for i in range(60))
+
+    lambda_handler({"mode": "shard", "exportId": "run-3", "totalSegments": 3, "shardSegments": [0, 1, 2], "format": "csv.gz"}, {})
+    response = lambda_handler({"mode": "stitch", "exportId": "run-3", "totalSegments": 3, "format": "csv.gz"}, {})
+    data = gzip.decompress(s3_client.objects[(BUCKET, json.loads(response["body"])["key"])])
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+
+    assert response["statusCode"] == 200
+    assert rows[0] == CSV_HEADERS
+    assert sorted(row[0] for row in rows[1:]) == sorted(f"product-{i}" for i in range(60))
+
+def test_unsupported_export_format_is_rejected(stand_ins):
+    response = lambda_handler({"queryStringParameters": {"format": "xlsx"}}, {})
+    assert response["statusCode"] == 400
+
+    response = lambda_handler({"mode": "incremental", "format": "parquet"}, {})
+    assert response["statusCode"] == 400
+
+# 2024-03-01T00:00:00Z; the tests run the export well past the safety lag
+DAY_MS = 86_400_000
+T0 = 1_709_251_200_000
+
+def run_incremental(mocker, now_ms, mode="incremental"):
+    mocker.patch.object(export_description_lambda, 'now_millis', return_value=now_ms)
+    return lambda_handler({"mode": mode}, {})
+
+def test_incremental_export_bootstraps_a_snapshot_then_writes_deltas(stand_ins, mocker):
+    table, s3_client = stand_ins
+    table.load(stamp_change(make_item(i), T0 + i) for i in range(30))
+    scan_spy = mocker.spy(table, 'scan')
+
+    response_body = json.loads(run_incremental(mocker, T0 + DAY_MS)["body"])
+    snapshot_rows = read_rows(s3_client, response_body["key"])
+    assert snapshot_rows[0] == INCREMENTAL_CSV_HEADERS
+    assert len(snapshot_rows) == 31
+    scans = scan_spy.call_count
+
+    # Two rows change a day later, one of them just before midnight UTC
+    table.put_item(Item=stamp_change(make_item(3, detailed="Changed."), T0 + 2 * DAY_MS - 1))
+    table.put_item(Item=stamp_change(make_item(30), T0 + 2 * DAY_MS + 5))
+
+    response = run_incremental(mocker, T0 + 3 * DAY_MS)
+    response_body = json.loads(response["body"])
+    delta_rows = read_rows(s3_client, response_body["key"])
+
+    assert response["statusCode"] == 200
+    assert response_body["rows"] == 2
+    assert [row[0] for row in delta_rows[1:]] == ["product-3", "product-30"]
+    assert delta_rows[1][7] == "Changed."
+    # The delta came from the change index, not another scan
+    assert scan_spy.call_count == scans
+    assert table.query_calls > 0
+
+def test_incremental_export_without_changes_only_advances_the_mark(stand_ins, mocker):
+    table, s3_client = stand_ins
+    table.load(stamp_change(make_item(i), T0) for i in range(5))
+    run_incremental(mocker, T0 + DAY_MS)
+    objects = set(s3_client.objects)
+
+    response_body = json.loads(run_incremental(mocker, T0 + 2 * DAY_MS)["body"])
+    manifest = json.loads(s3_client.objects[(BUCKET, "exports/incremental/manifest.json")])
+
+    assert response_body["rows"] == 0
+    assert response_body["key"] is None
+    assert set(s3_client.objects) == objects
+    assert manifest["highWaterMark"] == T0 + 2 * DAY_MS - export_description_lambda.EXPORT_SAFETY_LAG_MS
+    assert manifest["deltas"] == []
+
+def test_writes_inside_the_safety_lag_wait_for_the_next_run(stand_ins, mocker):
+    table, s3_client = stand_ins
+    table.load(stamp_change(make_item(i), T0) for i in range(5))
+    run_incremental(mocker, T0 + DAY_MS)
+
+    now_ms = T0 + 2 * DAY_MS
+    table.put_item(Item=stamp_change(make_item(7), now_ms - 1000))
+    assert json.loads(run_incremental(mocker, now_ms)["body"])["rows"] == 0
+
+    response_body = json.loads(run_incremental(mocker, now_ms + DAY_MS)["body"])
+    assert response_body["rows"] == 1
+
+def test_compaction_folds_deltas_into_a_new_snapshot(stand_ins, mocker):
+    table, s3_client = stand_ins
+    table.load(stamp_change(make_item(i), T0) for i in range(10))
+    run_incremental(mocker, T0 + DAY_MS)
+
+    table.put_item(Item=stamp_change(make_item(2, detailed="First edit."), T0 + DAY_MS + 1))
+    run_incremental(mocker, T0 + 2 * DAY_MS)
+    table.put_item(Item=stamp_change(make_item(2, detailed="Second edit."), T0 + 2 * DAY_MS + 1))
+    table.put_item(Item=stamp_change(make_item(10), T0 + 2 * DAY_MS + 2))
+    run_incremental(mocker, T0 + 3 * DAY_MS)
+
+    response = run_incremental(mocker, T0 + 3 * DAY_MS, mode="compact")
+    response_body = json.loads(response["body"])
+    rows = read_rows(s3_client, response_body["key"])
+    manifest = json.loads(s3_client.objects[(BUCKET, "exports/incremental/manifest.json")])
+
+    assert response["statusCode"] == 200
+    assert response_body["rows"] == 11
+    assert [row[0] for row in rows[1:]] == [f"product-{i}" for i in range(11)]
+    assert rows[3][7] == "Second edit."
+    assert manifest["snapshot"]["key"] == response_body["key"]
+    assert manifest["deltas"] == []
+
+def test_similarity_index_mode_writes_a_loadable_index(stand_ins, tmp_path):
+    table, s3_client = stand_ins
+    table.load([make_item(i) for i in range(12)])
+
+    response = lambda_handler({"mode": "similarity-index"}, None)
+    index = load_index(f"s3://{BUCKET}/similarity/index.bin", S3Service(s3_client=s3_client), local_dir=str(tmp_path))
+    score, entry = index.search(make_item(3)["metadata"], ("short", "detailed"))
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["entries"] == 12
+    assert len(index) == 12
+    assert score > 0.99 and entry["metadata"]["title"] == "Product 3"
+
+def test_similarity_index_mode_stops_at_the_entry_cap(stand_ins, mocker, tmp_path):
+    table, s3_client = stand_ins
+    table.load([make_item(i) for i in range(12)])
+    mocker.patch.object(export_description_lambda, 'EXPORT_SIMILARITY_INDEX_MAX_ENTRIES', 5)
+
+    response = lambda_handler({"mode": "similarity-index"}, None)
+    index = load_index(f"s3://{BUCKET}/similarity/index.bin", S3Service(s3_client=s3_client), local_dir=str(tmp_path))
+
+    assert json.loads(response["body"])["entries"] == 5
+    assert len(index) == 5
@@ -0,0 +1,109 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import generate_description_lambda
+from product_generator.lambda_handlers.generate_description_lambda import lambda_handler
+from product_generator.local.fakes import FakeBedrockClient
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.generation_cache import GenerationCache
+
+def product(title, **overrides):
+    return {
+        "title": title,
+        "category": "Kitchen Appliances",
+        "features": ["Wi-Fi", "Voice Control"],
+        "audience": "Coffee Lovers",
+        **overrides
+    }
+
+@pytest.fixture
+def fake_client(mocker):
+    # Echo the product title back so results can be matched to their inputs
+    def generation(native_request):
+        title = native_request["prompt"].split("for a ")[1].split(" in the ")[0]
+        return f"The {title} is great. Buy it now."
+
+    client = FakeBedrockClient(latency=lambda: 0.001, generation=generation)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+    return client
+
+def test_batch_preserves_order_and_reports_per_item_errors(fake_client):
+    titles = [f"Coffee Maker {i}" for i in range(10)]
+    products = [product(title) for title in titles]
+    products.insert(3, product("Kettle Poster", format="poster"))
+    products.insert(7, {"title": "Missing Fields"})
+
+    event = {"body": json.dumps({"products": products, "format": "short", "max_concurrency": 4})}
+
+    response = lambda_handler(event, {})
+    response_body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert response_body["succeeded"] == 10
+    assert response_body["failed"] == 2
+
+    results = response_body["results"]
+    assert [r["index"] for r in results] == list(range(12))
+    assert results[3]["status"] == "failed"
+    assert "Unsupported format type" in results[3]["error"]
+    assert results[7]["status"] == "failed"
+    assert "Missing required product metadata" in results[7]["error"]
+
+    succeeded = [r for r in results if r["status"] == "succeeded"]
+    assert [r["descriptions"]["short"] for r in succeeded] == [f"The {t} is great." for t in titles]
+
+def test_per_item_format_overrides_batch_default(fake_client):
+    event = {"body": json.dumps({
+        "products": [product("Mug"), product("Kettle", format="all")],
+        "format": "short"
+    })}
+
+    response_body = json.loads(lambda_handler(event, {})["body"])
+
+    assert set(response_body["results"][0]["descriptions"]) == {"short"}
+    assert set(response_body["results"][1]["descriptions"]) == {"short", "detailed", "social", "seo"}
+
+def test_batch_rejects_empty_and_oversized_requests(fake_client):
+    response = lambda_handler({"body": json.dumps({"products": []})}, {})
+    assert response["statusCode"] == 400
+
+    too_many = [product(f"Mug {i}") for i in range(generate_description_lambda.BATCH_MAX_ITEMS + 1)]
+    response = lambda_handler({"body": json.dumps({"products": too_many})}, {})
+    assert response["statusCode"] == 400
+    assert "Batch too large" in json.loads(response["body"])["message"]
+    assert fake_client.calls == 0
+
+def test_batch_rejects_a_non_numeric_max_concurrency(fake_client):
+    for value in (None, "fast", [4]):
+        body = {"products": [product("Mug")], "max_concurrency": value}
+        response = lambda_handler({"body": json.dumps(body)}, {})
+
+        assert response["statusCode"] == 400
+        assert json.loads(response["body"])["message"] == "'max_concurrency' must be an integer."
+    assert fake_client.calls == 0
+
+def test_batch_storage_is_dispatched_in_one_invocation(fake_client, mocker):
+    lambda_client = mocker.MagicMock()
+    mocker.patch('product_generator.lambda_handlers.generate_description_lambda.get_client', return_value=lambda_client)
+    mocker.patch.object(generate_description_lambda, 'STORE_DESCRIPTION_LAMBDA_ARN', "arn:store")
+    context = mocker.MagicMock(get_remaining_time_in_millis=lambda: 1000)
+
+    event = {"body": json.dumps({
+        "products": [product("Mug"), product("Kettle"), product("Toaster", store_result=False)],
+        "store_result": True
+    })}
+
+    lambda_handler(event, context)
+
+    lambda_client.invoke.assert_called_once()
+    payload = json.loads(lambda_client.invoke.call_args.kwargs["Payload"])
+    assert [item["productId"] for item in payload["items"]] == ["mug", "kettle"]
@@ -1,14 +1,32 @@
 import json
+import re
 import pytest
 
 # Adjust sys.path to allow importing modules from src/
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
 
+from product_generator.lambda_handlers import generate_description_lambda
 from product_generator.lambda_handlers.generate_description_lambda import lambda_handler
+from product_generator.local.fakes import FakeBedrockClient, FakeDynamoDBResource, FakeDynamoDBTable, bedrock_error
 from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.description_store import DescriptionStore
+from product_generator.services.dynamodb_service import DynamoDBService, now_millis
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.services.resilience import ModelUnavailableError, ResilientInvoker
+from product_generator.services.similarity_index import SimilarityIndex
 from product_generator.utils.description_formatter import DescriptionFormatter
+from product_generator.utils.metrics import InMemorySink
+from product_generator.utils.prompt_builder import MAX_GEN_LEN
+
+PRODUCT = {
+    "title": "Smart Coffee Maker",
+    "category": "Kitchen Appliances",
+    "features": ["Wi-Fi", "Voice Control"],
+    "audience": "Coffee Lovers"
+}
 
 # Fixture to mock BedrockService and DescriptionFormatter
 @pytest.fixture
@@ -89,6 +107,68 @@ def test_successful_short_generation(mock_services):
     mock_bedrock_service_instance.invoke_model.assert_called_once()
     mock_description_formatter_instance.get_short_description.assert_called_once()
 
+def test_short_format_asks_for_a_short_generation(mocker):
+    client = FakeBedrockClient()
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+    invoke_model = mocker.spy(client, "invoke_model")
+
+    response = lambda_handler({"body": json.dumps({**PRODUCT, "format": "short"})}, {})
+    native_request = json.loads(invoke_model.call_args.kwargs["body"])
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["short"] == "Meet the product you have been waiting for."
+    assert native_request["max_gen_len"] == MAX_GEN_LEN["short"]
+    assert "Human:" not in native_request["prompt"]
+
+def test_cache_headers_count_only_the_current_request(mocker):
+    client = FakeBedrockClient()
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+    event = {"body": json.dumps({**PRODUCT, "format": "short"})}
+
+    first = lambda_handler(event, {})
+    second = lambda_handler(event, {})
+
+    assert (first["headers"]["X-Cache-Hits"], first["headers"]["X-Cache-Misses"]) == ("0", "1")
+    # The warm module's cache has seen two lookups; this request made one
+    assert (second["headers"]["X-Cache-Hits"], second["headers"]["X-Cache-Misses"]) == ("1", "0")
+    assert second["headers"]["X-Model-Calls"] == "0"
+    assert client.calls == 1
+
+@pytest.mark.parametrize("format_type", ["social", "seo"])
+def test_metadata_formats_skip_the_model_call(mocker, format_type):
+    client = FakeBedrockClient()
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+
+    response = lambda_handler({"body": json.dumps({**PRODUCT, "format": format_type})}, {})
+    formatter = DescriptionFormatter("", PRODUCT)
+    expected = formatter.get_social_caption() if format_type == "social" else formatter.get_seo_rich_description()
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {format_type: expected}
+    assert client.calls == 0
+
+def test_oversized_product_is_rejected_before_the_model_call(mock_services, mocker):
+    mock_bedrock_service_instance, _ = mock_services
+    mocker.patch('product_generator.utils.prompt_builder.PROMPT_OVERSIZE_POLICY', "reject")
+    product = {**PRODUCT, "features": [f"Feature number {i}" for i in range(1000)]}
+
+    response = lambda_handler({"body": json.dumps(product)}, {})
+
+    assert response["statusCode"] == 400
+    mock_bedrock_service_instance.invoke_model.assert_not_called()
+
 def test_missing_required_metadata(mock_services):
     mock_bedrock_service_instance, _ = mock_services
 
@@ -144,3 +224,279 @@ def test_bedrock_service_exception(mock_services):
     assert "Failed to generate description" in response_body["message"]
     mock_bedrock_service_instance.invoke_model.assert_called_once()
 
+def test_open_circuit_returns_503_with_retry_after(mock_services):
+    mock_bedrock_service_instance, _ = mock_services
+
+    mock_bedrock_service_instance.invoke_model.side_effect = ModelUnavailableError(
+        "Model is temporarily unavailable (circuit open).", retry_after=12.4
+    )
+
+    event = {
+        "body": json.dumps({
+            "title": "Smart Coffee Maker",
+            "category": "Kitchen Appliances",
+            "features": ["Wi-Fi", "Voice Control"],
+            "audience": "Coffee Lovers",
+            "format": "detailed"
+        })
+    }
+
+    response = lambda_handler(event, {})
+    response_body = json.loads(response["body"])
+
+    assert response["statusCode"] == 503
+    assert response["headers"]["Retry-After"] == "12"
+    assert response_body["error"] == "ModelUnavailable"
+
+
+def test_refresh_cache_invalidates_before_generation(mock_services):
+    mock_bedrock_service_instance, mock_description_formatter_instance = mock_services
+
+    mock_bedrock_service_instance.invoke_model.return_value = "Fresh description."
+    mock_description_formatter_instance.get_detailed_description.return_value = "Fresh description."
+
+    event = {
+        "body": json.dumps({
+            "title": "Smart Coffee Maker",
+            "category": "Kitchen Appliances",
+            "features": ["Wi-Fi", "Voice Control"],
+            "audience": "Coffee Lovers",
+            "format": "detailed",
+            "refresh_cache": True
+        })
+    }
+    context = {}
+
+    response = lambda_handler(event, context)
+
+    assert response["statusCode"] == 200
+    assert "X-Cache-Hits" in response["headers"]
+    assert "X-Cache-Misses" in response["headers"]
+    mock_bedrock_service_instance.invalidate_cached.assert_called_once()
+    mock_bedrock_service_instance.invoke_model.assert_called_once()
+
+def test_all_formats_come_from_one_structured_generation(mocker):
+    generation = json.dumps({
+        "short": "A coffee maker that listens.",
+        "detailed": "The Smart Coffee Maker brews on your schedule.",
+        "social": "Coffee, on command. #SmartHome #Coffee",
+        "seo": "Smart Coffee Maker with Wi-Fi and voice control for kitchen appliances shoppers."
+    })
+    client = FakeBedrockClient(generation=generation)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+
+    event = {"body": json.dumps({**PRODUCT, "format": "all"})}
+    response = lambda_handler(event, {})
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == json.loads(generation)
+    assert response["headers"]["X-Model-Calls"] == "1"
+    assert int(response["headers"]["X-Generation-Tokens"]) > 0
+    assert client.calls == 1
+
+def test_unparseable_structured_generation_falls_back_to_formatter(mocker):
+    generation = "The Smart Coffee Maker brews on your schedule. It listens to your voice."
+    client = FakeBedrockClient(generation=generation)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+
+    event = {"body": json.dumps({**PRODUCT, "format": "all"})}
+    response = lambda_handler(event, {})
+
+    formatter = DescriptionFormatter(generation, {k: PRODUCT[k] for k in ("title", "category", "features", "audience")})
+    assert json.loads(response["body"]) == {
+        "short": formatter.get_short_description(),
+        "detailed": formatter.get_detailed_description(),
+        "social": formatter.get_social_caption(),
+        "seo": formatter.get_seo_rich_description(),
+    }
+    assert client.calls == 1
+
+def test_each_request_emits_one_emf_record_with_stages_usage_and_outcomes(mocker):
+    sink = InMemorySink()
+    client = FakeBedrockClient(errors=[bedrock_error("ThrottlingException")])
+    mocker.patch.object(generate_description_lambda, 'default_sink', sink)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(
+            client=client, invoker=ResilientInvoker(sleep=lambda seconds: None), **kwargs
+        )
+    )
+
+    event = {"body": json.dumps({**PRODUCT, "format": "detailed"})}
+    lambda_handler(event, {})
+    lambda_handler(event, {})
+
+    first, second = sink.records
+    directive = first["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Dimensions"] == [["Operation"]]
+    assert {"ParseTime", "PromptBuildTime", "ModelTime", "FormatTime", "TotalTime"} <= {m["Name"] for m in directive["Metrics"]}
+    assert all(first[m["Name"]] >= 0 for m in directive["Metrics"])
+    assert first["Operation"] == "Generate"
+    assert first["StatusCode"] == 200
+    assert first["Format"] == "detailed"
+    assert first["ModelCalls"] == 1
+    assert first["ModelRetries"] == 1
+    assert first["PromptTokens"] > 0 and first["GenerationTokens"] > 0
+    assert first["CacheMisses"] == 1
+    # The repeat is served from the cache
+    assert second["ModelCalls"] == 0
+    assert second["CacheHits"] == 1
+
+def test_payload_logging_can_be_sampled_out(mock_services, mocker):
+    mock_bedrock_service_instance, mock_description_formatter_instance = mock_services
+    mock_bedrock_service_instance.invoke_model.return_value = "A description."
+    mock_description_formatter_instance.get_detailed_description.return_value = "A description."
+    mocker.patch('product_generator.utils.metrics.PAYLOAD_LOG_SAMPLE_RATE', 0.0)
+
+    lambda_handler({"body": json.dumps(PRODUCT)}, {})
+
+    logged = " ".join(str(call.args[0]) for call in generate_description_lambda.logger.info.call_args_list)
+    assert "Received event" not in logged
+    assert "Full Generated Description" not in logged
+
+def stored_product_table(updated_at):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    table.load([{"productId": "smart-coffee-maker", "formatType": "short", "timestamp": updated_at,
+                 "updatedAt": updated_at, "metadata": PRODUCT, "descriptions": {"short": "Stored short copy."}}])
+    return table
+
+def test_fresh_stored_description_is_served_without_a_model_call(mocker):
+    sink = InMemorySink()
+    client = FakeBedrockClient()
+    table = stored_product_table(now_millis())
+    mocker.patch.object(generate_description_lambda, 'default_sink', sink)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch.object(generate_description_lambda, 'description_store', DescriptionStore(
+        table.name, dynamodb_service=DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]))
+    ))
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+
+    stored = lambda_handler({"body": json.dumps({**PRODUCT, "format": "short"})}, {})
+    changed = lambda_handler({"body": json.dumps({**PRODUCT, "format": "short", "audience": "Baristas"})}, {})
+    refreshed = lambda_handler({"body": json.dumps({**PRODUCT, "format": "short", "refresh_cache": True})}, {})
+
+    assert stored["statusCode"] == 200
+    assert stored["headers"]["X-Description-Source"] == "stored"
+    assert json.loads(stored["body"]) == {"short": "Stored short copy."}
+    assert sink.records[0]["Source"] == "stored" and sink.records[0]["StoredHits"] == 1
+    # Different metadata or an explicit refresh still generates
+    assert "X-Description-Source" not in changed["headers"]
+    assert "X-Description-Source" not in refreshed["headers"]
+    assert client.calls == 2
+
+def test_stale_stored_description_is_regenerated(mocker):
+    client = FakeBedrockClient()
+    table = stored_product_table(now_millis() - 2000 * 1000)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch.object(generate_description_lambda, 'STORED_DESCRIPTION_MAX_AGE_SECONDS', 1000)
+    mocker.patch.object(generate_description_lambda, 'description_store', DescriptionStore(
+        table.name, dynamodb_service=DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]))
+    ))
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+
+    response = lambda_handler({"body": json.dumps({**PRODUCT, "format": "short"})}, {})
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["short"] != "Stored short copy."
+    assert client.calls == 1
+
+JACKET = {"title": "Alpine Shell Jacket Red", "category": "Outerwear",
+          "features": ["Waterproof", "Breathable membrane", "Two zip pockets"], "audience": "Hikers"}
+
+def describe_titled_product(native_request):
+    # Names the product the prompt asks about, so substitutions are visible
+    title = re.search(r"for a (.+?) in the", native_request["prompt"]).group(1)
+    return f"The {title} keeps you dry on every trail. Built for long days outdoors."
+
+@pytest.fixture
+def similarity_stand_ins(mocker):
+    sink = InMemorySink()
+    client = FakeBedrockClient(generation=describe_titled_product)
+    mocker.patch.object(generate_description_lambda, 'default_sink', sink)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch.object(generate_description_lambda, 'similarity_index', SimilarityIndex())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+    return client, sink
+
+def test_colour_variant_reuses_the_nearest_description_without_a_model_call(similarity_stand_ins):
+    client, sink = similarity_stand_ins
+
+    first = lambda_handler({"body": json.dumps({**JACKET, "format": "detailed"})}, {})
+    second = lambda_handler({"body": json.dumps({**JACKET, "title": "Alpine Shell Jacket Blue",
+                                                 "format": "detailed"})}, {})
+    original = json.loads(first["body"])["detailed"]
+
+    assert "Alpine Shell Jacket Red" in original
+    assert client.calls == 1
+    assert second["headers"]["X-Description-Source"] == "similar"
+    assert float(second["headers"]["X-Similarity-Score"]) >= generate_description_lambda.SIMILARITY_THRESHOLD
+    assert json.loads(second["body"])["detailed"] == original.replace("Alpine Shell Jacket Red", "Alpine Shell Jacket Blue")
+    assert sink.records[0]["SimilarityMisses"] == 1
+    assert sink.records[1]["SimilarityHits"] == 1
+    assert sink.records[1]["Source"] == "similar"
+    assert "SimilarityLatencySaved" in sink.records[1]
+
+def test_adapt_mode_makes_one_budgeted_rewrite_call(similarity_stand_ins, mocker):
+    client, _ = similarity_stand_ins
+    mocker.patch.object(generate_description_lambda, 'SIMILARITY_REUSE_MODE', "adapt")
+    invoke_model = mocker.spy(client, "invoke_model")
+    service_invoke = mocker.spy(BedrockService, "invoke_model")
+
+    lambda_handler({"body": json.dumps({**JACKET, "format": "detailed"})}, {})
+    response = lambda_handler({"body": json.dumps({**JACKET, "title": "Alpine Shell Jacket Blue",
+                                                   "format": "detailed"})}, {})
+    native_request = json.loads(invoke_model.call_args.kwargs["body"])
+
+    assert response["headers"]["X-Description-Source"] == "similar"
+    assert client.calls == 2
+    assert "Rewrite it for a Alpine Shell Jacket Blue" in native_request["prompt"]
+    # Routed and budgeted as a generation of the requested format
+    assert service_invoke.call_args.kwargs["format_type"] == "detailed"
+
+def test_adapt_mode_rewrites_every_format_in_one_structured_call(similarity_stand_ins, mocker):
+    client, _ = similarity_stand_ins
+    mocker.patch.object(generate_description_lambda, 'SIMILARITY_REUSE_MODE', "adapt")
+    mocker.patch.object(generate_description_lambda, 'STRUCTURED_OUTPUT', True)
+    copy = {"short": "A red shell.", "detailed": "A red shell for wet hikes.", "social": "Red. #hiking",
+            "seo": "Red shell jacket for hikers."}
+    client.generation = lambda native_request: json.dumps(copy)
+    invoke_model = mocker.spy(client, "invoke_model")
+
+    lambda_handler({"body": json.dumps({**JACKET, "format": "all"})}, {})
+    response = lambda_handler({"body": json.dumps({**JACKET, "title": "Alpine Shell Jacket Blue",
+                                                   "format": "all"})}, {})
+    prompt = json.loads(invoke_model.call_args.kwargs["body"])["prompt"]
+
+    assert response["headers"]["X-Description-Source"] == "similar"
+    assert client.calls == 2
+    assert "Rewrite it for a Alpine Shell Jacket Blue" in prompt and json.dumps(copy) in prompt
+    assert json.loads(response["body"]) == copy
+
+def test_unrelated_products_and_opt_outs_are_generated(similarity_stand_ins):
+    client, _ = similarity_stand_ins
+
+    lambda_handler({"body": json.dumps({**JACKET, "format": "short"})}, {})
+    lambda_handler({"body": json.dumps({**PRODUCT, "format": "short"})}, {})
+    opted_out = lambda_handler({"body": json.dumps({**JACKET, "title": "Alpine Shell Jacket Blue",
+                                                    "format": "short", "use_similar": False})}, {})
+
+    assert client.calls == 3
+    assert "X-Description-Source" not in opted_out["headers"]
@@ -0,0 +1,247 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import ingest_catalog_lambda
+from product_generator.lambda_handlers.ingest_catalog_lambda import checkpoint_key, lambda_handler, parse_features
+from product_generator.local.fakes import (
+    FakeBedrockClient,
+    FakeDynamoDBResource,
+    FakeDynamoDBTable,
+    FakeS3Client,
+    bedrock_error,
+)
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.services.resilience import ResilientInvoker
+from product_generator.services.s3_service import S3Service
+
+BUCKET = "ingestion-bucket"
+
+CSV_FEED = (
+    "\ufeffproductId,title,category,features,audience\r\n"
+    "sku-1,Desk Lamp,Lighting,\"Dimmable, USB-C\",Readers\r\n"
+    "\r\n"
+    "sku-2,Floor Lamp,Lighting,\"[\"\"Tall\"\", \"\"Warm light\"\"]\",Families\r\n"
+    "sku-3,\"Lamp, with\nnewline\",Lighting,Bright,Students\r\n"
+    "sku-4,Broken Lamp,Lighting,Bright,Students,extra\r\n"
+    "sku-5,Wall Lamp,Lighting,Slim,Renters\r\n"
+)
+
+class Context:
+    # Remaining time drops by step_ms on every check
+    invoked_function_arn = None
+
+    def __init__(self, remaining_ms, step_ms=0):
+        self.remaining_ms = remaining_ms
+        self.step_ms = step_ms
+
+    def get_remaining_time_in_millis(self):
+        remaining, self.remaining_ms = self.remaining_ms, self.remaining_ms - self.step_ms
+        return remaining
+
+def jsonl_feed(count):
+    return "".join(
+        json.dumps({"productId": f"sku-{i}", "title": f"Lamp {i}", "category": "Lighting",
+                    "features": ["Dimmable"], "audience": "Readers"}) + "\n"
+        for i in range(count)
+    )
+
+@pytest.fixture
+def stand_ins(mocker):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    s3_client = FakeS3Client()
+    bedrock_client = FakeBedrockClient()
+    mocker.patch.object(ingest_catalog_lambda, 'INGEST_S3_BUCKET', BUCKET)
+    mocker.patch.object(ingest_catalog_lambda, 'PRODUCT_DESCRIPTIONS_TABLE', table.name)
+    mocker.patch.object(ingest_catalog_lambda, 'INGEST_TIME_RESERVE_MS', 1000)
+    mocker.patch.object(ingest_catalog_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.ingest_catalog_lambda.DynamoDBService',
+        side_effect=lambda name, **kwargs: DynamoDBService(name, dynamodb=FakeDynamoDBResource([table]), **kwargs)
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.ingest_catalog_lambda.S3Service',
+        side_effect=lambda: S3Service(s3_client=s3_client)
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.ingest_catalog_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(
+            client=bedrock_client, invoker=ResilientInvoker(max_attempts=1, sleep=lambda seconds: None), **kwargs
+        )
+    )
+    return table, s3_client, bedrock_client
+
+def result_rows(s3_client, job_id):
+    rows = []
+    for (bucket, key), data in sorted(s3_client.objects.items()):
+        if key.startswith(f"ingestion/{job_id}/results/"):
+            rows.extend(json.loads(line) for line in data.decode("utf-8").splitlines())
+    return rows
+
+def test_csv_feed_is_generated_stored_and_written_back(stand_ins):
+    table, s3_client, _ = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.csv", Body=CSV_FEED)
+
+    response = lambda_handler({"key": "feeds/catalog.csv", "jobId": "csv-job", "chunkSize": 2}, None)
+    response_body = json.loads(response["body"])
+    rows = result_rows(s3_client, "csv-job")
+
+    assert response["statusCode"] == 200
+    assert response_body["status"] == "completed"
+    assert (response_body["records"], response_body["succeeded"], response_body["failed"]) == (5, 4, 1)
+    assert response_body["chunks"] == 3
+    assert [row["record"] for row in rows] == [0, 1, 2, 3, 4]
+    assert [row.get("productId") for row in rows] == ["sku-1", "sku-2", "sku-3", None, "sku-5"]
+    assert rows[3]["status"] == "failed" and "6 fields" in rows[3]["error"]
+    assert all(row["stored"] for row in rows if row["status"] == "succeeded")
+
+    stored = table.get_item(Key={"productId": "sku-2", "formatType": "detailed"})["Item"]
+    assert stored["metadata"]["features"] == ["Tall", "Warm light"]
+    assert "updatedAt" in stored
+    assert table.get_item(Key={"productId": "sku-3", "formatType": "detailed"})["Item"]["metadata"]["title"] == \
+        "Lamp, with\nnewline"
+    assert len(table) == 4
+
+def test_timed_out_job_resumes_from_checkpoint(stand_ins):
+    table, s3_client, bedrock_client = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.jsonl", Body=jsonl_feed(10))
+
+    # Enough time for two chunks, then the reserve is reached
+    first = lambda_handler({"key": "feeds/catalog.jsonl", "jobId": "resume-job", "chunkSize": 3},
+                           Context(remaining_ms=1500, step_ms=1000))
+    first_body = json.loads(first["body"])
+    checkpoint = json.loads(s3_client.objects[(BUCKET, checkpoint_key("resume-job"))])
+
+    assert first["statusCode"] == 202
+    assert first_body["status"] == "running"
+    assert first_body["records"] == 6
+    assert checkpoint["records"] == 6
+    assert checkpoint["offset"] == len(jsonl_feed(6).encode("utf-8"))
+
+    second = lambda_handler({"jobId": "resume-job"}, Context(remaining_ms=60000))
+    second_body = json.loads(second["body"])
+
+    assert second["statusCode"] == 200
+    assert second_body["records"] == 10
+    assert second_body["succeeded"] == 10
+    assert [row["productId"] for row in result_rows(s3_client, "resume-job")] == [f"sku-{i}" for i in range(10)]
+    # No record was generated twice
+    assert bedrock_client.calls == 10
+    assert len(table) == 10
+
+    # A finished job only reports its state
+    again = lambda_handler({"jobId": "resume-job"}, None)
+    assert again["statusCode"] == 200
+    assert bedrock_client.calls == 10
+
+def test_throttled_chunk_pauses_without_advancing(stand_ins):
+    table, s3_client, bedrock_client = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.jsonl", Body=jsonl_feed(4))
+    bedrock_client.errors = [None, None] + [bedrock_error("ThrottlingException")] * 2
+
+    response = lambda_handler({"key": "feeds/catalog.jsonl", "jobId": "paused-job", "chunkSize": 2,
+                               "maxConcurrency": 1}, None)
+    response_body = json.loads(response["body"])
+
+    assert response["statusCode"] == 503
+    assert "Retry-After" in response["headers"]
+    assert response_body["status"] == "paused"
+    assert response_body["records"] == 2
+
+    # Once the model recovers the paused chunk is generated, not skipped
+    response = lambda_handler({"jobId": "paused-job"}, None)
+    assert json.loads(response["body"])["succeeded"] == 4
+    assert len(table) == 4
+
+def test_checkpoint_holds_at_first_retryable_failure(stand_ins):
+    table, s3_client, bedrock_client = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.jsonl", Body=jsonl_feed(3))
+    bedrock_client.errors = [None, bedrock_error("ThrottlingException"), None]
+
+    response = lambda_handler({"key": "feeds/catalog.jsonl", "jobId": "held-job", "chunkSize": 3,
+                               "maxConcurrency": 1}, None)
+    checkpoint = json.loads(s3_client.objects[(BUCKET, checkpoint_key("held-job"))])
+
+    assert response["statusCode"] == 503
+    assert checkpoint["status"] == "paused"
+    assert checkpoint["records"] == 1
+    assert checkpoint["offset"] == len(jsonl_feed(1).encode("utf-8"))
+
+    # The throttled product and the one after it are generated on resume, each recorded once
+    response = lambda_handler({"jobId": "held-job"}, None)
+    assert json.loads(response["body"])["succeeded"] == 3
+    assert [row["record"] for row in result_rows(s3_client, "held-job")] == [0, 1, 2]
+    assert all(row["status"] == "succeeded" for row in result_rows(s3_client, "held-job"))
+    assert len(table) == 3
+
+class DeployedContext(Context):
+    invoked_function_arn = "arn:aws:lambda:us-east-1:123456789012:function:IngestCatalog"
+
+def test_paused_job_reinvokes_itself_to_wait_out_the_pause(stand_ins, mocker):
+    _, s3_client, bedrock_client = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.jsonl", Body=jsonl_feed(2))
+    bedrock_client.errors = [bedrock_error("ThrottlingException")] * 2
+    lambda_client = mocker.MagicMock()
+    mocker.patch.object(ingest_catalog_lambda, 'get_client', return_value=lambda_client)
+    sleep = mocker.patch.object(ingest_catalog_lambda.time, 'sleep')
+
+    response = lambda_handler({"key": "feeds/catalog.jsonl", "jobId": "wait-job", "maxConcurrency": 1},
+                              DeployedContext(remaining_ms=60000))
+    payload = json.loads(lambda_client.invoke.call_args.kwargs["Payload"])
+
+    assert response["statusCode"] == 202
+    assert json.loads(response["body"])["continued"] is True
+    assert payload == {"jobId": "wait-job", "resumeAfterSeconds": ingest_catalog_lambda.INGEST_PAUSE_BASE_SECONDS}
+
+    response = lambda_handler(payload, DeployedContext(remaining_ms=60000))
+
+    sleep.assert_called_once_with(ingest_catalog_lambda.INGEST_PAUSE_BASE_SECONDS)
+    assert json.loads(response["body"])["status"] == "completed"
+
+def test_paused_job_stops_reinvoking_after_max_pauses(stand_ins, mocker):
+    _, s3_client, bedrock_client = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.jsonl", Body=jsonl_feed(1))
+    bedrock_client.errors = lambda call: bedrock_error("ThrottlingException")
+    lambda_client = mocker.MagicMock()
+    mocker.patch.object(ingest_catalog_lambda, 'get_client', return_value=lambda_client)
+    mocker.patch.object(ingest_catalog_lambda.time, 'sleep')
+    mocker.patch.object(ingest_catalog_lambda, 'INGEST_MAX_PAUSES', 2)
+
+    event = {"key": "feeds/catalog.jsonl", "jobId": "stuck-job"}
+    for _ in range(3):
+        response = lambda_handler(event, DeployedContext(remaining_ms=60000))
+        event = json.loads(lambda_client.invoke.call_args.kwargs["Payload"])
+
+    assert lambda_client.invoke.call_count == 2
+    assert response["statusCode"] == 503
+    assert json.loads(response["body"])["continued"] is False
+
+def test_backfill_job_stores_with_batch_writes(stand_ins):
+    table, s3_client, _ = stand_ins
+    s3_client.put_object(Bucket=BUCKET, Key="feeds/catalog.jsonl", Body=jsonl_feed(30))
+
+    response = lambda_handler({"key": "feeds/catalog.jsonl", "jobId": "backfill-job", "chunkSize": 30,
+                               "backfill": True}, None)
+
+    assert json.loads(response["body"])["succeeded"] == 30
+    assert all(row["stored"] for row in result_rows(s3_client, "backfill-job"))
+    assert len(table) == 30
+    assert table.put_calls == 0
+
+def test_new_job_requires_a_feed(stand_ins):
+    response = lambda_handler({"jobId": "missing"}, None)
+    assert response["statusCode"] == 400
+
+    response = lambda_handler({"key": "feeds/catalog.txt"}, None)
+    assert response["statusCode"] == 400
+
+def test_parse_features_accepts_lists_json_and_commas():
+    assert parse_features('["A, with comma", "B"]') == ["A, with comma", "B"]
+    assert parse_features("A, B,, C ") == ["A", "B", "C"]
+    assert parse_features(["A"]) == ["A"]
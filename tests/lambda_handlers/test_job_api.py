@@ -0,0 +1,162 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import generate_description_lambda, job_status_lambda, job_worker_lambda
+from product_generator.local.fakes import FakeBedrockClient, FakeDynamoDBResource, FakeDynamoDBTable, FakeSQSClient, bedrock_error
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.services.job_store import JobStore
+from product_generator.services.queue_service import QueueService
+from product_generator.services.resilience import ResilientInvoker
+
+PRODUCT = {
+    "title": "Smart Coffee Maker",
+    "category": "Kitchen Appliances",
+    "features": ["Wi-Fi", "Voice Control"],
+    "audience": "Coffee Lovers"
+}
+
+@pytest.fixture
+def stand_ins(mocker):
+    table = FakeDynamoDBTable("Jobs", key_schema=("jobId",))
+    job_store = JobStore(table.name, dynamodb_service=DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table])))
+    sqs_client = FakeSQSClient(max_receive_count=10)
+    bedrock_client = FakeBedrockClient()
+    for module in (generate_description_lambda, job_status_lambda, job_worker_lambda):
+        mocker.patch.object(module, 'job_store', job_store)
+    mocker.patch.object(generate_description_lambda, 'JOB_QUEUE_URL', "https://sqs.local/jobs")
+    mocker.patch.object(job_worker_lambda, 'JOB_QUEUE_URL', "https://sqs.local/jobs")
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.QueueService',
+        side_effect=lambda url: QueueService(url, sqs_client=sqs_client)
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.job_worker_lambda.QueueService',
+        side_effect=lambda url: QueueService(url, sqs_client=sqs_client)
+    )
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(
+            client=bedrock_client, invoker=ResilientInvoker(max_attempts=1, sleep=lambda seconds: None), **kwargs
+        )
+    )
+    return sqs_client, bedrock_client
+
+def submit(body):
+    response = generate_description_lambda.lambda_handler({"body": json.dumps({**body, "async": True})}, {})
+    assert response["statusCode"] == 202
+    return json.loads(response["body"])["jobId"]
+
+def status(job_id, wait=None):
+    event = {"pathParameters": {"jobId": job_id}}
+    if wait is not None:
+        event["queryStringParameters"] = {"wait": str(wait)}
+    response = job_status_lambda.lambda_handler(event, None)
+    return response, json.loads(response["body"])
+
+def test_async_job_is_queued_then_generated_by_the_worker(stand_ins):
+    sqs_client, bedrock_client = stand_ins
+
+    job_id = submit({**PRODUCT, "format": "short"})
+    queued_response, queued = status(job_id)
+
+    assert bedrock_client.calls == 0
+    assert queued["status"] == "queued"
+    assert queued_response["headers"]["Retry-After"] == "2"
+
+    sqs_client.deliver(job_worker_lambda.lambda_handler)
+    response, job = status(job_id, wait=5)
+
+    assert response["statusCode"] == 200
+    assert job["status"] == "succeeded"
+    assert job["statusCode"] == 200
+    assert job["result"] == {"short": "Meet the product you have been waiting for."}
+    assert job["attempts"] == 1
+    assert "request" not in job
+
+def test_requests_with_float_values_can_be_queued(stand_ins):
+    sqs_client, _ = stand_ins
+
+    job_id = submit({**PRODUCT, "format": "short", "features": ["Wi-Fi"], "priceHint": 19.99})
+    sqs_client.deliver(job_worker_lambda.lambda_handler)
+
+    assert status(job_id)[1]["status"] == "succeeded"
+
+def test_many_jobs_are_drained_in_batches(stand_ins):
+    sqs_client, bedrock_client = stand_ins
+
+    job_ids = [submit({**PRODUCT, "title": f"Coffee Maker {i}"}) for i in range(12)]
+    invocations = sqs_client.deliver(job_worker_lambda.lambda_handler, batch_size=4)
+
+    assert invocations == 3
+    assert all(status(job_id)[1]["status"] == "succeeded" for job_id in job_ids)
+    assert bedrock_client.calls == 12
+
+def test_throttled_job_is_requeued_and_retried(stand_ins):
+    sqs_client, bedrock_client = stand_ins
+    bedrock_client.errors = [bedrock_error("ThrottlingException")]
+
+    job_id = submit(PRODUCT)
+    sqs_client.deliver(job_worker_lambda.lambda_handler)
+    _, job = status(job_id)
+
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 2
+    # Redelivered after a short backoff rather than the queue's visibility timeout
+    assert 5 <= sqs_client.visibility_timeouts["message-1"] <= 10
+
+def test_invalid_request_fails_the_job_without_retries(stand_ins, mocker):
+    sqs_client, _ = stand_ins
+
+    job_id = submit({"title": "Only a title"})
+    sqs_client.deliver(job_worker_lambda.lambda_handler)
+    _, job = status(job_id)
+
+    assert job["status"] == "failed"
+    assert job["statusCode"] == 400
+    assert "Missing required product metadata" in job["error"]
+    assert job["attempts"] == 1
+
+def test_redelivered_message_for_a_finished_job_is_ignored(stand_ins):
+    sqs_client, bedrock_client = stand_ins
+
+    job_id = submit(PRODUCT)
+    message = dict(sqs_client.messages[0])
+    sqs_client.deliver(job_worker_lambda.lambda_handler)
+    sqs_client.messages.append({**message, "receiveCount": 0})
+    sqs_client.deliver(job_worker_lambda.lambda_handler)
+
+    assert bedrock_client.calls == 1
+    assert status(job_id)[1]["attempts"] == 1
+
+def test_duplicate_delivery_of_a_running_job_is_left_for_later(stand_ins):
+    sqs_client, bedrock_client = stand_ins
+
+    job_id = submit(PRODUCT)
+    # Another worker picked the job up a moment ago
+    job_worker_lambda.job_store.start(job_id)
+    response = job_worker_lambda.lambda_handler({"Records": [
+        {"messageId": "m-1", "body": json.dumps({"item": {"jobId": job_id}})}
+    ]}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-1"}]}
+    assert bedrock_client.calls == 0
+    assert status(job_id)[1]["attempts"] == 1
+
+def test_unknown_job_is_404(stand_ins):
+    response, _ = status("missing")
+    assert response["statusCode"] == 404
+
+def test_async_mode_needs_a_configured_queue(stand_ins, mocker):
+    mocker.patch.object(generate_description_lambda, 'JOB_QUEUE_URL', None)
+
+    response = generate_description_lambda.lambda_handler({"body": json.dumps({**PRODUCT, "async": True})}, {})
+
+    assert response["statusCode"] == 400
@@ -0,0 +1,95 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import read_description_lambda
+from product_generator.lambda_handlers.read_description_lambda import etag_matches, lambda_handler
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable
+from product_generator.services.description_store import DescriptionStore
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.generation_cache import GenerationCache
+
+METADATA = {"title": "Desk Lamp", "category": "Lighting", "features": ["Dimmable"], "audience": "Readers"}
+DESCRIPTIONS = {"short": "A lamp.", "detailed": "A dimmable desk lamp.", "social": "Lamp! #light", "seo": "Desk lamp"}
+
+@pytest.fixture
+def table(mocker):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    table.load([
+        {"productId": "desk-lamp", "formatType": "all", "timestamp": 1, "updatedAt": 1,
+         "metadata": METADATA, "descriptions": DESCRIPTIONS},
+        {"productId": "floor-lamp", "formatType": "seo", "timestamp": 2, "updatedAt": 2,
+         "metadata": {**METADATA, "title": "Floor Lamp"}, "descriptions": {"seo": "Floor lamp"}},
+    ])
+    mocker.patch.object(read_description_lambda, 'description_store', DescriptionStore(
+        table.name,
+        cache=GenerationCache(),
+        dynamodb_service=DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table])),
+    ))
+    return table
+
+def test_single_product_returns_only_the_requested_format(table):
+    response = lambda_handler({"pathParameters": {"productId": "desk-lamp"},
+                               "queryStringParameters": {"format": "short"}}, None)
+    response_body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert response_body["descriptions"] == {"short": "A lamp."}
+    assert response_body["metadata"] == METADATA
+    assert response["headers"]["ETag"].startswith('"')
+    assert "max-age=" in response["headers"]["Cache-Control"]
+
+def test_matching_if_none_match_gets_a_304(table):
+    event = {"pathParameters": {"productId": "desk-lamp"}}
+    etag = lambda_handler(event, None)["headers"]["ETag"]
+
+    response = lambda_handler({**event, "headers": {"if-none-match": f'"other", W/{etag}'}}, None)
+
+    assert response["statusCode"] == 304
+    assert response["body"] == ""
+    assert response["headers"]["ETag"] == etag
+
+def test_repeat_reads_are_served_from_the_container_cache(table, mocker):
+    resource = read_description_lambda.description_store.service.dynamodb
+    event = {"pathParameters": {"productId": "desk-lamp"}, "queryStringParameters": {"format": "detailed"}}
+
+    lambda_handler(event, None)
+    lambda_handler(event, None)
+
+    assert resource.batch_get_calls == 1
+
+def test_unknown_product_is_404_and_unknown_format_is_400(table):
+    missing = lambda_handler({"pathParameters": {"productId": "nope"}}, None)
+    bad_format = lambda_handler({"pathParameters": {"productId": "desk-lamp"},
+                                 "queryStringParameters": {"format": "haiku"}}, None)
+
+    assert missing["statusCode"] == 404
+    assert bad_format["statusCode"] == 400
+
+def test_batch_read_reports_found_and_missing_products(table):
+    response = lambda_handler({"queryStringParameters": {"productIds": "desk-lamp, floor-lamp,nope",
+                                                         "format": "seo"}}, None)
+    response_body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert [item["productId"] for item in response_body["items"]] == ["desk-lamp", "floor-lamp"]
+    assert [item["descriptions"]["seo"] for item in response_body["items"]] == ["Desk lamp", "Floor lamp"]
+    assert response_body["missing"] == ["nope"]
+
+def test_batch_read_is_capped(table, mocker):
+    mocker.patch.object(read_description_lambda, 'READ_MAX_PRODUCTS', 2)
+
+    response = lambda_handler({"queryStringParameters": {"productIds": "a,b,c"}}, None)
+
+    assert response["statusCode"] == 400
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
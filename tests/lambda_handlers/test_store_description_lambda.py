@@ -0,0 +1,174 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import store_description_lambda
+from product_generator.lambda_handlers.store_description_lambda import lambda_handler
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable, FakeSQSClient
+from product_generator.services.dynamodb_service import DynamoDBService, change_bucket
+from product_generator.services.queue_service import QueueService
+
+def make_item(i, **overrides):
+    return {
+        "productId": f"product-{i}",
+        "timestamp": i,
+        "metadata": {"title": f"Product {i}", "category": "Home", "features": ["Durable"], "audience": "Everyone"},
+        "descriptions": {"short": "Short."},
+        "formatType": "short",
+        **overrides
+    }
+
+@pytest.fixture
+def table(mocker):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    resource = FakeDynamoDBResource([table])
+    mocker.patch.object(store_description_lambda, 'PRODUCT_DESCRIPTIONS_TABLE', table.name)
+    mocker.patch(
+        'product_generator.lambda_handlers.store_description_lambda.DynamoDBService',
+        side_effect=lambda name, **kwargs: DynamoDBService(name, dynamodb=resource, **kwargs)
+    )
+    table.resource = resource
+    return table
+
+def test_single_item_payload_is_still_supported(table):
+    response = lambda_handler({"item": make_item(1)}, {})
+
+    assert response["statusCode"] == 200
+    assert len(table) == 1
+
+def test_float_timestamps_are_rejected_before_reaching_dynamodb(table):
+    response = lambda_handler({"item": make_item(1, timestamp=1.5)}, {})
+    results = json.loads(lambda_handler({"items": [make_item(2, timestamp=2.0), make_item(3)]}, {})["body"])["results"]
+
+    assert response["statusCode"] == 400
+    assert [r["status"] for r in results] == ["failed", "stored"]
+    assert table.put_calls == 1
+
+def test_items_payload_is_written_with_per_item_results(table):
+    items = [make_item(i) for i in range(30)]
+    items[4] = {"productId": "broken"}
+
+    response = lambda_handler({"items": items}, {})
+    response_body = json.loads(response["body"])
+
+    assert response["statusCode"] == 207
+    assert response_body["stored"] == 29
+    assert response_body["results"][4]["status"] == "failed"
+    # One batched read of the stored versions, then conditional puts
+    assert table.resource.batch_get_calls == 1
+    assert len(table) == 29
+
+def test_unconditional_items_payload_is_batch_written(table):
+    table.load([make_item(0, timestamp=5)])
+    items = [make_item(i) for i in range(60)]
+    items[7] = {"productId": "broken"}
+
+    response_body = json.loads(lambda_handler({"items": items, "conditional": False}, {})["body"])
+
+    # The pre-read still skips what is already newer; the rest go out 25 per call
+    assert response_body["results"][0] == {"index": 0, "status": "skipped", "reason": "stale"}
+    assert response_body["results"][7]["status"] == "failed"
+    assert response_body["stored"] == 58
+    assert table.resource.batch_write_calls == 3
+    assert table.put_calls == 0
+    assert "updatedAt" in table.peek({"productId": "product-1", "formatType": "short"})
+
+def test_duplicate_keys_in_one_batch_keep_the_last_item(table):
+    items = [make_item(1, descriptions={"short": "Old."}), make_item(1, descriptions={"short": "New."})]
+
+    response_body = json.loads(lambda_handler({"items": items}, {})["body"])
+
+    assert [r["status"] for r in response_body["results"]] == ["stored", "stored"]
+    assert table.get_item(Key={"productId": "product-1", "formatType": "short"})["Item"]["descriptions"]["short"] == "New."
+
+def test_sqs_batch_reports_only_failed_messages(table):
+    records = [
+        {"messageId": "m-1", "body": json.dumps({"item": make_item(1)})},
+        {"messageId": "m-2", "body": "not json"},
+        {"messageId": "m-3", "body": json.dumps(make_item(3))},
+        {"messageId": "m-4", "body": json.dumps({"item": {"productId": "broken"}})},
+    ]
+
+    response = lambda_handler({"Records": records}, {})
+
+    assert sorted(f["itemIdentifier"] for f in response["batchItemFailures"]) == ["m-2", "m-4"]
+    assert len(table) == 2
+
+def test_sqs_batch_fails_every_message_on_unexpected_error(table, mocker):
+    mocker.patch.object(table, 'put_item', side_effect=RuntimeError("boom"))
+    records = [{"messageId": "m-1", "body": json.dumps({"item": make_item(1)})}]
+
+    response = lambda_handler({"Records": records}, {})
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-1"}]}
+
+def test_failed_queue_messages_are_redelivered_then_dead_lettered(table):
+    sqs_client = FakeSQSClient(max_receive_count=3)
+    QueueService("https://sqs.local/storage", sqs_client=sqs_client).send_items([make_item(1), {"productId": "broken"}])
+
+    invocations = sqs_client.deliver(lambda_handler, batch_size=10)
+
+    assert invocations == 3
+    assert len(table) == 1
+    assert [json.loads(m["body"])["item"] for m in sqs_client.dead_letters] == [{"productId": "broken"}]
+
+def test_stored_items_are_stamped_for_change_tracking(table):
+    lambda_handler({"items": [make_item(1), make_item(2)]}, {})
+    lambda_handler({"item": make_item(3)}, {})
+
+    for i in (1, 2, 3):
+        stored = table.get_item(Key={"productId": f"product-{i}", "formatType": "short"})["Item"]
+        assert isinstance(stored["updatedAt"], int)
+        assert stored["changeBucket"] == change_bucket(stored["updatedAt"])
+
+def test_rewriting_the_same_content_is_skipped(table):
+    lambda_handler({"items": [make_item(1), make_item(2)]}, {})
+    first = table.peek({"productId": "product-1", "formatType": "short"})
+
+    # A retried invoke, and a regeneration with identical text
+    response_body = json.loads(lambda_handler({"items": [make_item(1), make_item(2, timestamp=50)]}, {})["body"])
+
+    assert response_body["skipped"] == 2
+    assert [r["reason"] for r in response_body["results"]] == ["unchanged", "unchanged"]
+    assert table.put_calls == 2
+    assert table.peek({"productId": "product-1", "formatType": "short"}) == first
+
+def test_out_of_order_writes_do_not_replace_newer_content(table):
+    lambda_handler({"item": make_item(1, timestamp=200, descriptions={"short": "Newer."})}, {})
+
+    response = lambda_handler({"item": make_item(1, timestamp=100, descriptions={"short": "Older."})}, {})
+
+    assert json.loads(response["body"])["skipped"] == "stale"
+    assert table.peek({"productId": "product-1", "formatType": "short"})["descriptions"]["short"] == "Newer."
+
+def test_conditional_put_rejects_a_write_that_lost_a_race(table, mocker):
+    # The version read happened before a newer copy landed
+    mocker.patch.object(store_description_lambda, 'stored_versions', return_value={})
+    lambda_handler({"item": make_item(1, timestamp=200, descriptions={"short": "Newer."})}, {})
+
+    outcome = store_description_lambda.store_items(
+        DynamoDBService(table.name, dynamodb=table.resource),
+        [make_item(1, timestamp=100, descriptions={"short": "Older."})]
+    )[0]
+
+    assert outcome == {"index": 0, "status": "skipped", "reason": "stale"}
+    assert table.peek({"productId": "product-1", "formatType": "short"})["descriptions"]["short"] == "Newer."
+
+def test_newer_content_replaces_older_and_skips_are_counted(table, mocker):
+    lambda_handler({"items": [make_item(1), make_item(2)]}, {})
+    metrics = mocker.MagicMock()
+
+    outcomes = store_description_lambda.store_items(
+        DynamoDBService(table.name, dynamodb=table.resource),
+        [make_item(1, timestamp=10, descriptions={"short": "Updated."}), make_item(2), make_item(3)],
+        metrics
+    )
+
+    assert [o["status"] for o in outcomes] == ["stored", "skipped", "stored"]
+    assert table.peek({"productId": "product-1", "formatType": "short"})["descriptions"]["short"] == "Updated."
+    counts = {call.args[0]: call.args[1] for call in metrics.add.call_args_list}
+    assert counts == {"Stored": 2, "SkippedUnchanged": 1, "SkippedStale": 0, "StoreFailed": 0}
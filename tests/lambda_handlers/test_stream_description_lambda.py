@@ -0,0 +1,109 @@
+import json
+import time
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tools')))
+
+from product_generator.lambda_handlers import stream_description_lambda
+from product_generator.lambda_handlers.stream_description_lambda import lambda_handler, stream_handler
+from product_generator.local.fakes import FakeBedrockClient, bedrock_error
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.services.resilience import ResilientInvoker
+from product_generator.utils.description_formatter import DescriptionFormatter
+
+GENERATION = (
+    "The Smart Coffee Maker brews a perfect cup every morning. "
+    "It connects to your home Wi-Fi and answers to your voice. "
+    "Schedule brews, adjust strength and get notified when your coffee is ready. "
+    "It is the easiest way to start the day."
+)
+FIRST_BYTE_LATENCY = 0.05
+CHUNK_LATENCY = 0.005
+
+def make_event(format_type):
+    return {
+        "body": json.dumps({
+            "title": "Smart Coffee Maker",
+            "category": "Kitchen Appliances",
+            "features": ["Wi-Fi", "Voice Control"],
+            "audience": "Coffee Lovers",
+            "format": format_type
+        })
+    }
+
+@pytest.fixture
+def fake_client(mocker):
+    client = FakeBedrockClient(latency=FIRST_BYTE_LATENCY, generation=GENERATION, chunk_latency=CHUNK_LATENCY)
+    mocker.patch.object(stream_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.stream_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+    return client
+
+def timed_events(event):
+    start = time.perf_counter()
+    timeline = []
+    for line in stream_handler(event, {}):
+        timeline.append((time.perf_counter() - start, json.loads(line)))
+    return timeline
+
+def test_short_description_is_sent_before_generation_finishes(fake_client):
+    timeline = timed_events(make_event("all"))
+
+    short_at, short_event = next((t, e) for t, e in timeline if e["event"] == "short")
+    done_at, done_event = timeline[-1]
+    formatter = DescriptionFormatter(GENERATION, {})
+
+    assert short_event["short"] == formatter.get_short_description()
+    assert done_event["event"] == "done"
+    assert done_event["descriptions"]["short"] == short_event["short"]
+    assert done_event["descriptions"]["detailed"] == GENERATION
+    # Time to first useful byte is bounded by the first sentence, not the whole generation
+    assert short_at < done_at / 2
+
+def test_short_format_stops_reading_the_stream_early(fake_client):
+    timeline = timed_events(make_event("short"))
+    events = [e["event"] for _, e in timeline]
+    full_stream_seconds = FIRST_BYTE_LATENCY + CHUNK_LATENCY * (len(GENERATION.split(" ")) - 1)
+
+    assert events == ["short", "done"]
+    assert timeline[-1][1]["descriptions"] == {"short": "The Smart Coffee Maker brews a perfect cup every morning."}
+    assert timeline[-1][0] < full_stream_seconds * 0.6
+
+def test_tokens_reassemble_full_generation(fake_client):
+    tokens = [e["text"] for _, e in timed_events(make_event("detailed")) if e["event"] == "token"]
+
+    assert "".join(tokens) == GENERATION
+
+def test_buffered_handler_returns_ndjson_and_validates(fake_client):
+    response = lambda_handler(make_event("seo"), {})
+    lines = [json.loads(line) for line in response["body"].splitlines()]
+
+    assert response["statusCode"] == 200
+    assert lines[-1]["event"] == "done"
+    assert "seo" in lines[-1]["descriptions"]
+    assert fake_client.calls == 0
+
+    response = lambda_handler({"body": json.dumps({"title": "Mug"})}, {})
+    assert response["statusCode"] == 400
+
+def test_buffered_handler_reports_throttling_status(mocker):
+    client = FakeBedrockClient(errors=lambda call: bedrock_error("ThrottlingException"))
+    mocker.patch.object(stream_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.stream_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(
+            client=client, invoker=ResilientInvoker(max_attempts=2, sleep=lambda seconds: None), **kwargs
+        )
+    )
+
+    response = lambda_handler(make_event("detailed"), {})
+
+    assert response["statusCode"] == 429
+    assert json.loads(response["body"])["error"] == "ModelThrottled"
+    assert client.calls == 2
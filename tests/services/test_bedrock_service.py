@@ -6,19 +6,21 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
 
-from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.bedrock_service import BedrockService, parse_structured_generation
+from product_generator.services.generation_cache import GenerationCache
+from product_generator.services.resilience import ModelInvocationError
 
-# Fixture to mock the boto3 client for bedrock-runtime
+# Fixture to mock the registry's bedrock-runtime client
 @pytest.fixture
 def mock_bedrock_runtime_client(mocker):
     mock_client = mocker.MagicMock()
     mocker.patch(
-        'product_generator.services.bedrock_service.boto3.client',
+        'product_generator.services.bedrock_service.get_client',
         return_value=mock_client
     )
     return mock_client
 
-# Fixture to create an instance of BedrockService for each test, after boto3 is patched
+# Fixture to create an instance of BedrockService for each test, after the client is patched
 @pytest.fixture
 def bedrock_service_instance(mock_bedrock_runtime_client):
     return BedrockService(region="us-east-2")
@@ -42,7 +44,7 @@ def test_invoke_model_success(bedrock_service_instance, mock_bedrock_runtime_cli
     assert kwargs["modelId"] == "meta.llama3-3-70b-instruct-v1:0"
 
 # Test handling of ClientError from boto3
-def test_invoke_model_client_error(bedrock_service_instance, mock_bedrock_runtime_client, capsys):
+def test_invoke_model_client_error(bedrock_service_instance, mock_bedrock_runtime_client):
     # Configure the mock client to raise a ClientError
     mock_bedrock_runtime_client.invoke_model.side_effect = ClientError(
         {"Error": {"Code": "ValidationException", "Message": "Invalid request"}},
@@ -51,30 +53,56 @@ def test_invoke_model_client_error(bedrock_service_instance, mock_bedrock_runtim
 
     prompt = "Generate a description."
 
-    # Expect the function to exit and print an error message
-    with pytest.raises(SystemExit) as pytest_wrapped_e:
+    # Expect a structured error instead of the process exiting
+    with pytest.raises(ModelInvocationError) as pytest_wrapped_e:
         bedrock_service_instance.invoke_model(prompt)
 
-    assert pytest_wrapped_e.type == SystemExit
-    assert pytest_wrapped_e.value.code == 1 # Check the exit code
-
-    # Capture stdout/stderr to check the printed error message
-    captured = capsys.readouterr()
-    assert "ERROR: Can't invoke 'meta.llama3-3-70b-instruct-v1:0'. Reason:" in captured.out
+    assert "Can't invoke 'meta.llama3-3-70b-instruct-v1:0'. Reason:" in str(pytest_wrapped_e.value)
+    assert pytest_wrapped_e.value.retryable is False
+    # A bad request is not retried
+    mock_bedrock_runtime_client.invoke_model.assert_called_once()
 
 # Test handling of generic Exception
-def test_invoke_model_generic_error(bedrock_service_instance, mock_bedrock_runtime_client, capsys):
+def test_invoke_model_generic_error(bedrock_service_instance, mock_bedrock_runtime_client):
     # Configure the mock client to raise a generic Exception
     mock_bedrock_runtime_client.invoke_model.side_effect = Exception("Something went wrong")
 
     prompt = "Generate a description."
 
-    with pytest.raises(SystemExit) as pytest_wrapped_e:
+    with pytest.raises(ModelInvocationError) as pytest_wrapped_e:
         bedrock_service_instance.invoke_model(prompt)
 
-    assert pytest_wrapped_e.type == SystemExit
-    assert pytest_wrapped_e.value.code == 1
+    assert "Can't invoke 'meta.llama3-3-70b-instruct-v1:0'. Reason: Something went wrong" in str(pytest_wrapped_e.value)
+
 
-    captured = capsys.readouterr()
-    assert "ERROR: Can't invoke 'meta.llama3-3-70b-instruct-v1:0'. Reason:" in captured.out
+def test_parse_structured_generation_tolerates_preamble_and_drops_invalid_fields():
+    text = 'Here is the JSON:\n```json\n{"short": "A mug.", "detailed": "  ", "social": 3}\n```'
 
+    assert parse_structured_generation(text, ("short", "detailed", "social")) == {"short": "A mug."}
+    assert parse_structured_generation("No JSON here.", ("short",)) == {}
+    assert parse_structured_generation('{"short": "Truncated', ("short",)) == {}
+
+def test_invoke_model_structured_caches_only_complete_results(mock_bedrock_runtime_client, mocker):
+    generations = iter(['{"short": "A mug."}', '{"short": "A mug.", "seo": "Buy a mug."}'])
+    mock_bedrock_runtime_client.invoke_model.side_effect = lambda **kwargs: {
+        "body": mocker.MagicMock(read=lambda: json.dumps({
+            "generation": next(generations), "prompt_token_count": 10, "generation_token_count": 5
+        }).encode('utf-8'))
+    }
+    bedrock_service = BedrockService(region="us-east-2", cache=GenerationCache())
+
+    fields, _ = bedrock_service.invoke_model_structured("Describe a mug.", ("short", "seo"))
+    assert fields == {"short": "A mug."}
+
+    # The incomplete result was not cached, so the model is asked again
+    fields, _ = bedrock_service.invoke_model_structured("Describe a mug.", ("short", "seo"))
+    assert fields == {"short": "A mug.", "seo": "Buy a mug."}
+    fields, _ = bedrock_service.invoke_model_structured("Describe a mug.", ("short", "seo"))
+
+    assert mock_bedrock_runtime_client.invoke_model.call_count == 2
+    usage = bedrock_service.usage_snapshot()
+    assert usage["calls"] == 2
+    assert usage["prompt_tokens"] == 20
+    assert usage["generation_tokens"] == 10
+    args, kwargs = mock_bedrock_runtime_client.invoke_model.call_args
+    assert json.loads(kwargs["body"])["max_gen_len"] == bedrock_service.structured_max_gen_len
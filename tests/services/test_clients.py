@@ -0,0 +1,44 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.services import clients
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    clients.reset()
+    yield
+    clients.reset()
+
+def test_clients_are_created_once_per_service_and_region():
+    first = clients.get_client("s3", region_name="us-east-2")
+
+    assert clients.get_client("s3", region_name="us-east-2") is first
+    assert clients.get_client("s3", region_name="us-west-2") is not first
+
+def test_resources_are_reused():
+    assert clients.get_resource("dynamodb", region_name="us-east-2") is clients.get_resource("dynamodb", region_name="us-east-2")
+
+def test_clients_use_pooled_keep_alive_config():
+    config = clients.get_client("bedrock-runtime", region_name="us-east-2").meta.config
+
+    assert config.tcp_keepalive is True
+    assert config.max_pool_connections == clients.MAX_POOL_CONNECTIONS
+    # A hung generation gives up before the 30 s function timeout
+    assert config.read_timeout == clients.BEDROCK_READ_TIMEOUT < 30
+
+def test_registered_stand_in_is_returned():
+    stand_in = object()
+    clients.register("sqs", client=stand_in)
+
+    assert clients.get_client("sqs") is stand_in
+
+def test_installed_session_builds_each_client_once(mocker):
+    session = mocker.MagicMock()
+    clients.use_session(session)
+
+    assert clients.get_client("s3") is clients.get_client("s3")
+    session.client.assert_called_once()
+    assert clients.get_resource("dynamodb") is session.resource.return_value
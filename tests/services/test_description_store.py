@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable
+from product_generator.services.description_store import DescriptionStore, merge_record
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.generation_cache import GenerationCache
+
+def make_store(items, cache=None):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    table.load(items)
+    resource = FakeDynamoDBResource([table])
+    return DescriptionStore(table.name, cache=cache, dynamodb_service=DynamoDBService(table.name, dynamodb=resource)), resource
+
+METADATA = {"title": "Lamp", "category": "Lighting", "features": ["Dimmable"], "audience": "Readers"}
+
+def test_merge_keeps_the_freshest_copy_of_each_format():
+    items = [
+        {"productId": "p", "formatType": "all", "updatedAt": 5, "metadata": METADATA,
+         "descriptions": {"short": "old short", "seo": "all seo"}},
+        {"productId": "p", "formatType": "short", "updatedAt": 9, "metadata": METADATA,
+         "descriptions": {"short": "new short"}},
+    ]
+
+    record = merge_record("p", "all", items + [{"metadata": METADATA, "descriptions": {"detailed": "d", "social": "s"}}])
+
+    assert record["descriptions"] == {"short": "new short", "detailed": "d", "social": "s", "seo": "all seo"}
+    assert record["updatedAt"] == 9
+    assert record["metadata"] == METADATA
+    assert merge_record("p", "all", items) is None
+
+def test_stale_copies_for_older_metadata_are_never_merged():
+    changed = {**METADATA, "features": ["Dimmable", "USB-C"]}
+    items = [
+        {"productId": "p", "formatType": "all", "updatedAt": 5, "metadata": METADATA,
+         "descriptions": {"short": "old", "detailed": "old", "social": "old", "seo": "old"}},
+        {"productId": "p", "formatType": "short", "updatedAt": 9, "metadata": changed,
+         "descriptions": {"short": "new short"}},
+    ]
+
+    # The newest copy is for the changed metadata, which has no "all" set
+    assert merge_record("p", "all", items) is None
+    assert merge_record("p", "all", items, changed) is None
+    assert merge_record("p", "short", items, changed)["descriptions"] == {"short": "new short"}
+    # Asking for the old metadata only ever gets the old copy
+    assert merge_record("p", "short", items, METADATA)["descriptions"] == {"short": "old"}
+
+def test_lookup_projects_only_the_requested_format():
+    store, _ = make_store([{"productId": "p", "formatType": "all", "timestamp": 1, "metadata": {},
+                            "descriptions": {"short": "s", "detailed": "d", "social": "x", "seo": "y"}}])
+
+    record = store.lookup("p", "short")
+
+    assert record["descriptions"] == {"short": "s"}
+    assert record["updatedAt"] == 1
+
+def test_lookup_many_reads_through_the_cache_and_retries_unprocessed_keys():
+    items = [{"productId": f"p{i}", "formatType": "seo", "timestamp": i, "metadata": {},
+              "descriptions": {"seo": f"seo {i}"}} for i in range(30)]
+    store, resource = make_store(items, cache=GenerationCache())
+    resource.unprocessed_rate = 0.3
+    ids = [f"p{i}" for i in range(30)] + ["missing"]
+
+    first = store.lookup_many(ids, "seo")
+    calls = resource.batch_get_calls
+    second = store.lookup_many(ids[:30], "seo")
+
+    assert sorted(first) == sorted(ids[:30])
+    assert first["p7"]["descriptions"] == {"seo": "seo 7"}
+    # 31 products x 2 candidate keys need at least one retry at this rate
+    assert calls > 1
+    assert second == {product_id: first[product_id] for product_id in ids[:30]}
+    assert resource.batch_get_calls == calls
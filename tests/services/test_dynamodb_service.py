@@ -0,0 +1,154 @@
+import pytest
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable
+from product_generator.services.dynamodb_service import DynamoDBService, change_buckets, stamp_change
+
+def make_items(count):
+    return [{"productId": f"product-{i}", "formatType": "all", "timestamp": i} for i in range(count)]
+
+def make_service(**resource_kwargs):
+    table = FakeDynamoDBTable("ProductDescriptions")
+    resource = FakeDynamoDBResource([table], **resource_kwargs)
+    return DynamoDBService(table.name, dynamodb=resource), resource, table
+
+def test_batch_write_uses_chunks_of_25():
+    dynamodb_service, resource, table = make_service()
+
+    outcomes = dynamodb_service.batch_write_items(make_items(60))
+
+    assert resource.batch_write_calls == 3
+    assert len(table) == 60
+    assert [o["index"] for o in outcomes] == list(range(60))
+    assert all(o["status"] == "stored" for o in outcomes)
+
+def test_unprocessed_items_are_retried_with_backoff():
+    dynamodb_service, resource, table = make_service(unprocessed_rate=0.5, seed=7)
+    delays = []
+
+    outcomes = dynamodb_service.batch_write_items(make_items(25), max_attempts=20, sleep=delays.append)
+
+    assert all(o["status"] == "stored" for o in outcomes)
+    assert len(table) == 25
+    assert resource.batch_write_calls == len(delays) + 1
+    # Full jitter keeps every delay under the exponential cap
+    assert all(0 <= delay <= min(2.0, 0.05 * 2 ** (attempt + 1)) for attempt, delay in enumerate(delays))
+
+def test_items_still_unprocessed_after_max_attempts_are_reported():
+    dynamodb_service, _, table = make_service(unprocessed_rate=1.0)
+
+    outcomes = dynamodb_service.batch_write_items(make_items(3), max_attempts=3, sleep=lambda _: None)
+
+    assert [o["status"] for o in outcomes] == ["failed"] * 3
+    assert len(table) == 0
+
+def test_throttled_batch_call_is_retried(mocker):
+    dynamodb_service, resource, table = make_service()
+    original = resource.batch_write_item
+    throttle = ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "slow down"}}, "BatchWriteItem")
+    calls = []
+
+    def flaky(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise throttle
+        return original(**kwargs)
+
+    mocker.patch.object(resource, 'batch_write_item', side_effect=flaky)
+
+    outcomes = dynamodb_service.batch_write_items(make_items(2), sleep=lambda _: None)
+
+    assert [o["status"] for o in outcomes] == ["stored", "stored"]
+    assert len(calls) == 2
+
+def test_unprocessed_items_with_decimal_numbers_are_matched(mocker):
+    dynamodb_service, resource, _ = make_service()
+    items = make_items(2)
+    responses = [
+        {"UnprocessedItems": {"ProductDescriptions": [{"PutRequest": {"Item": {**items[1], "timestamp": Decimal("1")}}}]}},
+        {"UnprocessedItems": {}},
+    ]
+    mocker.patch.object(resource, 'batch_write_item', side_effect=responses)
+
+    outcomes = dynamodb_service.batch_write_items(items, sleep=lambda _: None)
+
+    assert [o["status"] for o in outcomes] == ["stored", "stored"]
+    assert len(resource.batch_write_item.call_args_list[1].kwargs["RequestItems"]["ProductDescriptions"]) == 1
+
+def test_buffered_batch_writer_flushes_on_size_and_exit():
+    dynamodb_service, resource, table = make_service()
+
+    with dynamodb_service.batch_writer() as writer:
+        for item in make_items(30):
+            writer.put_item(item)
+        assert resource.batch_write_calls == 1
+
+    assert resource.batch_write_calls == 2
+    assert len(table) == 30
+    assert [o["index"] for o in writer.outcomes] == list(range(30))
+
+def test_changed_since_pages_spans_day_buckets_and_excludes_the_lower_bound():
+    table = FakeDynamoDBTable("ProductDescriptions", page_size=3, indexes={"ChangesByDay": ("changeBucket", "updatedAt")})
+    dynamodb_service = DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]))
+    midnight = 1_709_337_600_000  # 2024-03-02T00:00:00Z
+    # One item per hour from 6h before to 6h after midnight
+    table.load(stamp_change(item, midnight + (i - 6) * 3_600_000) for i, item in enumerate(make_items(13)))
+
+    since, until = midnight - 3 * 3_600_000, midnight + 2 * 3_600_000
+    changed = [item["timestamp"] for page in dynamodb_service.changed_since_pages(since, until) for item in page]
+
+    assert change_buckets(since, until) == ["2024-03-01", "2024-03-02"]
+    assert changed == [4, 5, 6, 7, 8]
+
+def test_batch_get_projects_and_retries_unprocessed_keys():
+    dynamodb_service, resource, table = make_service(unprocessed_rate=0.5, seed=3)
+    table.load([{**item, "descriptions": {"short": "s", "detailed": "d"}} for item in make_items(150)])
+    keys = [{"productId": f"product-{i}", "formatType": "all"} for i in range(150)]
+    delays = []
+
+    items = dynamodb_service.batch_get_items(keys, ["productId", "descriptions.short"], max_attempts=20,
+                                             sleep=delays.append)
+
+    assert len(items) == 150
+    assert all(item == {"productId": item["productId"], "descriptions": {"short": "s"}} for item in items)
+    assert resource.batch_get_calls == len(delays) + 2
+    # Full jitter keeps every delay under the exponential cap
+    assert all(0 <= delay <= min(2.0, 0.05 * 2 ** (attempt + 1)) for attempt, delay in enumerate(delays))
+
+def test_batch_get_raises_when_keys_stay_unprocessed():
+    dynamodb_service, _, table = make_service(unprocessed_rate=1.0)
+    table.load(make_items(2))
+
+    with pytest.raises(RuntimeError):
+        dynamodb_service.batch_get_items([{"productId": "product-0", "formatType": "all"}], max_attempts=3,
+                                         sleep=lambda seconds: None)
+
+def test_batch_get_retries_throttles_but_raises_other_errors(mocker):
+    dynamodb_service, resource, table = make_service()
+    table.load(make_items(2))
+    original = resource.batch_get_item
+    throttle = ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "BatchGetItem")
+    denied = ClientError({"Error": {"Code": "AccessDeniedException", "Message": "no"}}, "BatchGetItem")
+    keys = [{"productId": "product-0", "formatType": "all"}]
+    calls = []
+
+    def flaky(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise throttle
+        return original(**kwargs)
+
+    mocker.patch.object(resource, 'batch_get_item', side_effect=flaky)
+    assert len(dynamodb_service.batch_get_items(keys, sleep=lambda _: None)) == 1
+    assert len(calls) == 2
+
+    mocker.patch.object(resource, 'batch_get_item', side_effect=denied)
+    with pytest.raises(ClientError):
+        dynamodb_service.batch_get_items(keys, sleep=lambda _: None)
+    assert resource.batch_get_item.call_count == 1
@@ -0,0 +1,101 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.generation_cache import GenerationCache, InMemoryCacheTier, make_cache_key
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def mock_bedrock_runtime_client(mocker):
+    mock_client = mocker.MagicMock()
+    mock_client.invoke_model.side_effect = lambda **kwargs: {
+        "body": mocker.MagicMock(read=lambda: json.dumps({"generation": "Generated text."}).encode('utf-8'))
+    }
+    mocker.patch(
+        'product_generator.services.bedrock_service.get_client',
+        return_value=mock_client
+    )
+    return mock_client
+
+def test_cache_key_normalizes_whitespace_and_includes_parameters():
+    key = make_cache_key("Write  a\n description ", "model-a", 512, 0.5)
+
+    assert key == make_cache_key("Write a description", "model-a", 512, 0.5)
+    assert key != make_cache_key("Write a description", "model-b", 512, 0.5)
+    assert key != make_cache_key("Write a description", "model-a", 256, 0.5)
+    assert key != make_cache_key("Write a description", "model-a", 512, 0.7)
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = GenerationCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = GenerationCache(ttl_seconds=60, clock=clock)
+    cache.put("a", "A")
+
+    clock.now += 61
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+def test_shared_tier_hit_is_promoted_to_local_tier():
+    shared_tier = InMemoryCacheTier()
+    GenerationCache(shared_tier=shared_tier).put("a", "A")
+
+    # A fresh container only sees the entry through the shared tier
+    cache = GenerationCache(shared_tier=shared_tier)
+    assert cache.get("a") == "A"
+    assert cache.get("a") == "A"
+
+    stats = cache.stats()
+    assert stats["shared_hits"] == 1
+    assert stats["local_hits"] == 1
+    assert stats["hits"] == 2
+
+def test_invalidate_removes_entry_from_both_tiers():
+    shared_tier = InMemoryCacheTier()
+    cache = GenerationCache(shared_tier=shared_tier)
+    cache.put("a", "A")
+
+    cache.invalidate("a")
+
+    assert shared_tier.get("a") is None
+    assert cache.get("a") is None
+
+def test_bedrock_service_only_invokes_model_on_miss(mock_bedrock_runtime_client):
+    cache = GenerationCache()
+    bedrock_service = BedrockService(region="us-east-2", cache=cache)
+
+    assert bedrock_service.invoke_model("Describe a mug.") == "Generated text."
+    assert bedrock_service.invoke_model("Describe  a mug.") == "Generated text."
+
+    mock_bedrock_runtime_client.invoke_model.assert_called_once()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_bedrock_service_invalidate_forces_new_generation(mock_bedrock_runtime_client):
+    bedrock_service = BedrockService(region="us-east-2", cache=GenerationCache())
+
+    bedrock_service.invoke_model("Describe a mug.")
+    bedrock_service.invalidate_cached("Describe a mug.")
+    bedrock_service.invoke_model("Describe a mug.")
+
+    assert mock_bedrock_runtime_client.invoke_model.call_count == 2
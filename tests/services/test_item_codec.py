@@ -0,0 +1,68 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.item_codec import PACKED_ATTRIBUTE, CompactItemCodec, unpack_item
+
+def make_item(i=0):
+    return {
+        "productId": f"product-{i}",
+        "formatType": "all",
+        "timestamp": i,
+        "updatedAt": i,
+        "metadata": {"title": f"Product {i}", "category": "Home", "features": ["Durable", "Light"],
+                     "audience": "Everyone"},
+        "descriptions": {"short": "Short.", "detailed": "A detailed description. " * 40,
+                         "social": "Social!", "seo": "SEO."},
+    }
+
+class Binary:
+    # Shape of boto3.dynamodb.types.Binary, which wraps binary attributes on read
+    def __init__(self, value):
+        self.value = value
+
+def test_packed_item_keeps_hot_attributes_and_round_trips():
+    item = make_item()
+    packed = CompactItemCodec().pack_item(item)
+
+    assert set(packed) == {"productId", "formatType", "timestamp", "updatedAt", PACKED_ATTRIBUTE}
+    assert len(packed[PACKED_ATTRIBUTE]) < len(item["descriptions"]["detailed"]) / 2
+    assert unpack_item(packed) == item
+    assert unpack_item({**packed, PACKED_ATTRIBUTE: Binary(packed[PACKED_ATTRIBUTE])}) == item
+
+def test_small_and_plain_items_are_left_alone():
+    small = {**make_item(), "descriptions": {"short": "Short."}}
+
+    assert CompactItemCodec(min_bytes=1024).pack_item(small) == small
+    assert unpack_item(small) is small
+
+def test_zstd_items_round_trip():
+    pytest.importorskip("zstandard")
+    item = make_item()
+    assert unpack_item(CompactItemCodec("zstd").pack_item(item)) == item
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        CompactItemCodec("brotli")
+
+def test_service_packs_writes_and_unpacks_every_read_path():
+    table = FakeDynamoDBTable("ProductDescriptions")
+    service = DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]), codec=CompactItemCodec())
+    items = [make_item(i) for i in range(3)]
+
+    for item in items:
+        service.put_item(item)
+    fetched = service.batch_get_items([{"productId": "product-1", "formatType": "all"}],
+                                      ["productId", "descriptions.short"])
+
+    assert all(PACKED_ATTRIBUTE in table.peek({"productId": f"product-{i}", "formatType": "all"}) for i in range(3))
+    assert sorted(service.scan_items(), key=lambda item: item["timestamp"]) == items
+    # Projections apply to the unpacked attributes
+    assert fetched == [{"productId": "product-1", "descriptions": {"short": "Short."}}]
+    # A reader without a codec still unpacks
+    assert list(DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table])).scan_items())[0] == items[0]
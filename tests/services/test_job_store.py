@@ -0,0 +1,133 @@
+import pytest
+from decimal import Decimal
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.local.fakes import FakeDynamoDBResource, FakeDynamoDBTable
+from product_generator.services.dynamodb_service import DynamoDBService
+from product_generator.services.job_store import JobBusyError, JobConflictError, JobStore, job_request, job_view, wait_for_job
+
+def make_store():
+    table = FakeDynamoDBTable("Jobs", key_schema=("jobId",))
+    service = DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]))
+    return JobStore(table.name, dynamodb_service=service, clock=lambda: 1000), table
+
+def test_job_moves_through_its_states():
+    store, _ = make_store()
+    job = store.create({"title": "Lamp"}, job_id="job-1")
+
+    running = store.start("job-1")
+    done = store.succeed("job-1", {"detailed": "A lamp."})
+
+    assert job["status"] == "queued" and job["attempts"] == 0
+    assert running["status"] == "running" and running["attempts"] == 1
+    assert done["status"] == "succeeded"
+    assert job_view(store.get("job-1")) == {"jobId": "job-1", "status": "succeeded", "createdAt": 1000,
+                                            "updatedAt": 1000, "attempts": 1, "statusCode": 200,
+                                            "result": {"detailed": "A lamp."}}
+
+def test_requests_and_results_keep_their_floats():
+    store, _ = make_store()
+    store.create({"title": "Lamp", "priceHint": 19.99}, job_id="job-1")
+    store.start("job-1")
+    store.succeed("job-1", {"score": Decimal("0.5")})
+
+    job = store.get("job-1")
+    assert job_request(job) == {"title": "Lamp", "priceHint": 19.99}
+    assert job_view(job)["result"] == {"score": 0.5}
+
+def test_finished_jobs_cannot_be_restarted_or_overwritten():
+    store, _ = make_store()
+    store.create({}, job_id="job-1")
+    store.start("job-1")
+    store.fail("job-1", "Bad input.", 400)
+
+    assert store.start("job-1") is None
+    assert store.succeed("job-1", {}) is None
+    assert store.get("job-1")["error"] == "Bad input."
+    assert store.start("unknown") is None
+
+def test_requeued_job_counts_each_attempt():
+    store, _ = make_store()
+    store.create({}, job_id="job-1")
+    store.start("job-1")
+    store.requeue("job-1", "Throttled.")
+
+    assert store.get("job-1")["status"] == "queued"
+    assert store.start("job-1")["attempts"] == 2
+
+def test_running_job_is_only_taken_over_once_its_lease_runs_out():
+    now = [1000]
+    table = FakeDynamoDBTable("Jobs", key_schema=("jobId",))
+    service = DynamoDBService(table.name, dynamodb=FakeDynamoDBResource([table]))
+    store = JobStore(table.name, lease_seconds=60, dynamodb_service=service, clock=lambda: now[0])
+    store.create({}, job_id="job-1")
+    store.start("job-1")
+
+    now[0] += 59_000
+    with pytest.raises(JobBusyError):
+        store.start("job-1")
+    now[0] += 1_000
+    taken_over = store.start("job-1")
+
+    assert taken_over["status"] == "running" and taken_over["attempts"] == 2
+
+def test_duplicate_job_ids_are_rejected():
+    store, _ = make_store()
+    store.create({}, job_id="job-1")
+
+    with pytest.raises(Exception):
+        store.create({}, job_id="job-1")
+
+def test_concurrent_change_is_retried_then_reported(mocker):
+    store, table = make_store()
+    store.create({}, job_id="job-1")
+    real_get = store.get
+
+    def get_then_bump(job_id):
+        # Another worker writes between this worker's read and its write
+        job = real_get(job_id)
+        table.put_item(Item={**job, "version": int(job["version"]) + 1})
+        return job
+
+    mocker.patch.object(store, "get", side_effect=get_then_bump)
+
+    with pytest.raises(JobConflictError):
+        store.transition("job-1", "running")
+
+def test_wait_for_job_long_polls_until_the_job_finishes():
+    store, _ = make_store()
+    store.create({}, job_id="job-1")
+    store.start("job-1")
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+        if len(sleeps) == 3:
+            store.succeed("job-1", {"short": "Done."})
+
+    job = wait_for_job(store, "job-1", 10, clock=lambda: now[0], sleep=sleep)
+    timed_out = wait_for_job(store, "job-1", 0, clock=lambda: now[0], sleep=sleep)
+
+    assert job["status"] == "succeeded"
+    # Backs off between reads
+    assert sleeps == [0.25, 0.5, 1.0]
+    assert timed_out["status"] == "succeeded"
+
+def test_wait_for_job_gives_up_at_the_deadline():
+    store, _ = make_store()
+    store.create({}, job_id="job-1")
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    job = wait_for_job(store, "job-1", 5, clock=lambda: now[0], sleep=sleep)
+
+    assert job["status"] == "queued"
+    assert now[0] == pytest.approx(5)
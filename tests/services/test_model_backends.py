@@ -0,0 +1,105 @@
+import json
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.local.fakes import FakeBackend, FakeBedrockClient, bedrock_error
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.model_backends import (
+    Llama3Backend,
+    Llama3SmallBackend,
+    MistralBackend,
+    ModelRouter,
+    backend_for,
+)
+from product_generator.services.resilience import ModelInvocationError, ResilientInvoker
+
+def make_router(**kwargs):
+    return ModelRouter([backend_for(Llama3Backend.model_id), backend_for(Llama3SmallBackend.model_id)], **kwargs)
+
+def test_each_backend_uses_its_own_template_and_parser():
+    client = FakeBedrockClient(generation="A sturdy mug.")
+
+    llama = Llama3Backend()
+    assert "<|start_header_id|>user<|end_header_id|>" in json.loads(llama.build_request_payload("Hi"))["prompt"]
+    assert llama.invoke(client, "Hi")[0] == "A sturdy mug."
+
+    mistral = MistralBackend()
+    native_request = json.loads(mistral.build_request_payload("Hi", max_gen_len=64))
+    assert native_request["prompt"] == "<s>[INST] Hi [/INST]"
+    assert native_request["max_tokens"] == 64
+    assert mistral.invoke(client, "Hi") == ("A sturdy mug.", 0, 0)
+    assert "".join(mistral.open_stream(client, "Hi")) == "A sturdy mug."
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        backend_for("acme.unknown-model")
+
+def test_router_sends_short_formats_to_the_cheaper_model():
+    router = make_router()
+
+    assert router.choose("short").model_id == Llama3SmallBackend.model_id
+    assert router.choose("social").model_id == Llama3SmallBackend.model_id
+    assert router.choose("detailed").model_id == Llama3Backend.model_id
+    assert router.choose("all").model_id == Llama3Backend.model_id
+    # A length budget past the small model's limit needs the large one
+    assert router.choose("short", max_gen_len=1024).model_id == Llama3Backend.model_id
+
+def test_router_avoids_models_with_high_error_rate_or_latency():
+    router = make_router(max_latency_ms=500)
+    small = Llama3SmallBackend.model_id
+
+    for _ in range(3):
+        router.record(small, 100, success=False)
+    assert router.choose("short").model_id == Llama3Backend.model_id
+
+    # Recovers once successes pull the error rate back under the limit
+    for _ in range(10):
+        router.record(small, 100, success=True)
+    assert router.choose("short").model_id == small
+
+    for _ in range(20):
+        router.record(small, 2000, success=True)
+    assert router.choose("short").model_id == Llama3Backend.model_id
+
+def test_bedrock_service_routes_and_feeds_back_failures():
+    large = FakeBackend("fake.large", input_cost_per_1k=1.0, output_cost_per_1k=1.0, generation="Large.")
+    small = FakeBackend(
+        "fake.small", formats=("short",), input_cost_per_1k=0.1, output_cost_per_1k=0.1,
+        generation="Small.", errors=lambda call: bedrock_error("ModelNotReadyException") if call <= 2 else None
+    )
+    router = ModelRouter([large, small], max_error_rate=0.3)
+    bedrock_service = BedrockService(
+        client=FakeBedrockClient(), router=router, invoker=ResilientInvoker(max_attempts=1)
+    )
+
+    assert bedrock_service.invoke_model("Describe a mug.", format_type="detailed") == "Large."
+    with pytest.raises(ModelInvocationError):
+        bedrock_service.invoke_model("Describe a mug.", format_type="short")
+    with pytest.raises(ModelInvocationError):
+        bedrock_service.invoke_model("Describe a mug.", format_type="short")
+
+    # The small model's error rate is now over the limit, so short goes to the large one
+    assert bedrock_service.invoke_model("Describe a mug.", format_type="short") == "Large."
+    assert small.calls == 2
+    assert router.stats()["fake.small"]["error_rate"] > 0.3
+
+def test_router_retries_a_skipped_model_after_it_has_rested():
+    now = [0.0]
+    router = make_router(retry_after_seconds=30, clock=lambda: now[0])
+    small = Llama3SmallBackend.model_id
+
+    for _ in range(3):
+        router.record(small, 100, success=False)
+    assert router.choose("short").model_id == Llama3Backend.model_id
+
+    now[0] += 31
+    assert router.choose("short").model_id == small
+
+def test_stop_sequences_reach_models_that_accept_them():
+    assert json.loads(MistralBackend().build_request_payload("Hi", 64, stop=(". ",)))["stop"] == [". "]
+    # The Bedrock Llama API has no stop parameter
+    assert "stop" not in json.loads(Llama3Backend().build_request_payload("Hi", 64, stop=(". ",)))
@@ -0,0 +1,41 @@
+import json
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.local.fakes import FakeSQSClient
+from product_generator.services.queue_service import QueueService
+
+def test_send_items_uses_batches_of_ten():
+    sqs_client = FakeSQSClient()
+    queue_service = QueueService("https://sqs.local/storage", sqs_client=sqs_client)
+
+    failed = queue_service.send_items([{"productId": f"p-{i}"} for i in range(23)])
+
+    assert failed == []
+    assert sqs_client.send_calls == 3
+    assert [json.loads(m["body"])["item"]["productId"] for m in sqs_client.messages] == [f"p-{i}" for i in range(23)]
+
+def test_rejected_entries_are_retried_then_reported(mocker):
+    sqs_client = mocker.MagicMock()
+    sqs_client.send_message_batch.side_effect = [
+        {"Successful": [{"Id": "0"}], "Failed": [{"Id": "1", "Message": "throttled"}]},
+        {"Successful": [], "Failed": [{"Id": "1", "Message": "throttled"}]},
+    ]
+    queue_service = QueueService("https://sqs.local/storage", sqs_client=sqs_client)
+
+    failed = queue_service.send_items([{"productId": "a"}, {"productId": "b"}], max_attempts=2)
+
+    assert failed == [1]
+    retry_entries = sqs_client.send_message_batch.call_args_list[1].kwargs["Entries"]
+    assert [entry["Id"] for entry in retry_entries] == ["1"]
+
+def test_delay_redelivery_changes_the_message_visibility():
+    sqs_client = FakeSQSClient()
+    queue_service = QueueService("https://sqs.local/jobs", sqs_client=sqs_client)
+
+    assert queue_service.delay_redelivery("message-1/1", 30)
+    assert not queue_service.delay_redelivery("message-1/1", 50_000)
+    assert sqs_client.visibility_timeouts == {"message-1": 30}
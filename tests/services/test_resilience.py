@@ -0,0 +1,129 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from botocore.exceptions import ReadTimeoutError
+
+from product_generator.local.fakes import FakeBedrockClient, bedrock_error
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.resilience import (
+    CircuitBreaker,
+    ModelInvocationError,
+    ModelThrottledError,
+    ModelTimeoutError,
+    ModelUnavailableError,
+    ResilientInvoker,
+    TokenBucket,
+)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_service(errors, clock=None, max_attempts=4, failure_threshold=5, rate_limiter=None):
+    clock = clock or FakeClock()
+    invoker = ResilientInvoker(
+        rate_limiter=rate_limiter,
+        circuit_breaker=CircuitBreaker(failure_threshold=failure_threshold, recovery_timeout=30, clock=clock),
+        max_attempts=max_attempts,
+        sleep=clock.sleep,
+    )
+    client = FakeBedrockClient(generation="Generated text.", errors=errors)
+    return BedrockService(client=client, invoker=invoker), client
+
+def test_throttles_are_retried_until_success():
+    bedrock_service, client = make_service([bedrock_error("ThrottlingException")] * 2)
+
+    assert bedrock_service.invoke_model("Describe a mug.") == "Generated text."
+    assert client.calls == 3
+    assert bedrock_service.invoker.retries == 2
+
+def test_exhausted_retries_raise_structured_error():
+    bedrock_service, client = make_service(lambda call: bedrock_error("ThrottlingException"), max_attempts=3)
+
+    with pytest.raises(ModelThrottledError) as error:
+        bedrock_service.invoke_model("Describe a mug.")
+
+    assert client.calls == 3
+    assert error.value.status_code == 429
+
+def test_timeouts_are_retried_and_classified():
+    timeout = ReadTimeoutError(endpoint_url="https://bedrock-runtime")
+    bedrock_service, client = make_service(lambda call: timeout, max_attempts=2)
+
+    with pytest.raises(ModelTimeoutError):
+        bedrock_service.invoke_model("Describe a mug.")
+    assert client.calls == 2
+
+def test_validation_errors_are_not_retried():
+    bedrock_service, client = make_service([bedrock_error("ValidationException")])
+
+    with pytest.raises(ModelInvocationError) as error:
+        bedrock_service.invoke_model("Describe a mug.")
+
+    assert not error.value.retryable
+    assert client.calls == 1
+
+def test_circuit_opens_and_fails_fast_then_recovers():
+    clock = FakeClock()
+    failing = {"on": True}
+    bedrock_service, client = make_service(
+        lambda call: bedrock_error("ServiceUnavailableException") if failing["on"] else None,
+        clock=clock, max_attempts=1, failure_threshold=3
+    )
+
+    for _ in range(3):
+        with pytest.raises(ModelUnavailableError):
+            bedrock_service.invoke_model("Describe a mug.")
+    assert bedrock_service.invoker.circuit_breaker.state == CircuitBreaker.OPEN
+
+    # While open, calls never reach the client
+    with pytest.raises(ModelUnavailableError) as error:
+        bedrock_service.invoke_model("Describe a mug.")
+    assert client.calls == 3
+    assert error.value.status_code == 503
+    assert error.value.retry_after == 30
+
+    # After the recovery timeout a single trial call closes the circuit again
+    clock.now += 31
+    failing["on"] = False
+    assert bedrock_service.invoke_model("Describe a mug.") == "Generated text."
+    assert bedrock_service.invoker.circuit_breaker.state == CircuitBreaker.CLOSED
+
+def test_streaming_open_is_retried_on_throttle():
+    bedrock_service, client = make_service([bedrock_error("ThrottlingException", "InvokeModelWithResponseStream")])
+
+    assert "".join(bedrock_service.invoke_model_stream("Describe a mug.")) == "Generated text."
+    assert client.calls == 2
+
+def test_token_bucket_waits_for_tokens_and_sheds_past_timeout():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.1)
+
+    start = clock.now
+    assert bucket.acquire(timeout=1)
+    assert clock.now - start == pytest.approx(0.5)
+
+def test_token_bucket_rate_adapts_to_throttling():
+    bucket = TokenBucket(rate=4, capacity=4, min_rate=1, increase_step=0.5, clock=FakeClock())
+
+    bucket.on_throttle()
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == 1
+
+    bucket.on_success()
+    assert bucket.rate == 1.5
@@ -0,0 +1,141 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.services import similarity_index as similarity_module
+from product_generator.services.similarity_index import (
+    SimilarityIndex,
+    embed,
+    substitute,
+    substitution_pairs,
+)
+
+JACKET = {"title": "Alpine Shell Jacket Red", "category": "Outerwear",
+          "features": ["Waterproof", "Breathable membrane", "Two zip pockets"], "audience": "Hikers"}
+DESCRIPTIONS = {"short": "The Alpine Shell Jacket Red keeps hikers dry.",
+                "detailed": "The Alpine Shell Jacket Red is waterproof, with a breathable membrane."}
+
+def variant(**changes):
+    return {**JACKET, **changes}
+
+def test_embedding_ignores_case_punctuation_and_order():
+    reordered = variant(title="alpine shell jacket, RED", features=list(reversed(JACKET["features"])))
+    assert list(embed(reordered)) == pytest.approx(list(embed(JACKET)))
+
+def test_colour_variants_are_near_duplicates_and_other_products_are_not():
+    index = SimilarityIndex()
+    index.add(JACKET, DESCRIPTIONS)
+
+    blue = index.search(variant(title="Alpine Shell Jacket Blue"), ("short",), threshold=0.9)
+    tent = index.search({"title": "Dome Tent", "category": "Camping", "features": ["Two person", "Freestanding"],
+                         "audience": "Campers"}, ("short",), threshold=0.9)
+
+    assert blue is not None and 0.9 <= blue[0] < 1.0
+    assert tent is None
+
+def test_search_skips_entries_without_the_requested_formats():
+    index = SimilarityIndex()
+    index.add(JACKET, {"short": "Only short."})
+
+    assert index.search(JACKET, ("detailed",)) is None
+    assert index.search(JACKET, ("short",))[1]["descriptions"] == {"short": "Only short."}
+
+def test_substitution_swaps_title_and_paired_features():
+    target = variant(title="Alpine Shell Jacket Blue", features=["Waterproof", "Breathable membrane", "Chest pocket"])
+    pairs = substitution_pairs(JACKET, target)
+
+    assert substitute("The Alpine Shell Jacket Red has two zip pockets.", pairs) == \
+        "The Alpine Shell Jacket Blue has Chest pocket."
+    # A dropped feature has nothing to pair with
+    assert substitution_pairs(JACKET, variant(features=["Waterproof"])) is None
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_saved_index_loads_with_added_entries_kept_separately(tmp_path, monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(similarity_module, "numpy", None)
+    index = SimilarityIndex()
+    index.add(JACKET, DESCRIPTIONS)
+    index.add(variant(title="Trail Runner Shoe", category="Footwear"), {"short": "Shoes."})
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+
+    loaded = SimilarityIndex.load(path)
+    loaded.add(variant(title="Alpine Shell Jacket Green"), {"short": "Green."})
+
+    assert len(loaded) == 3
+    assert loaded.search(JACKET, ("detailed",))[1]["descriptions"] == DESCRIPTIONS
+    assert loaded.search(variant(title="Alpine Shell Jacket Green"), ())[1]["descriptions"] == {"short": "Green."}
+
+def test_index_stops_growing_at_max_entries():
+    index = SimilarityIndex(max_entries=1)
+    assert index.add(JACKET, DESCRIPTIONS)
+    assert not index.add(variant(title="Other"), DESCRIPTIONS)
+    assert len(index) == 1
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_load_reads_entries_lazily_and_keeps_to_max_entries(tmp_path, monkeypatch, mocker, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(similarity_module, "numpy", None)
+    index = SimilarityIndex()
+    titles = ["Alpine Shell Jacket Red", "Trail Runner Shoe", "Dome Tent"]
+    for title in titles:
+        index.add(variant(title=title), {"short": title})
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+    loads = mocker.spy(similarity_module.json, "loads")
+
+    loaded = SimilarityIndex.load(path, max_entries=2)
+    assert loads.call_count == 0
+    match = loaded.search(variant(title="Trail Runner Shoe"), ("short",), threshold=0.99)
+
+    assert len(loaded) == 2
+    assert match[1]["descriptions"] == {"short": "Trail Runner Shoe"}
+    # Only the returned entry was decoded
+    assert loads.call_count == 1
+    assert loaded.search(variant(title="Dome Tent"), (), threshold=0.99) is None
+    assert not loaded.add(JACKET, DESCRIPTIONS)
+
+def test_fallback_maps_vectors_and_caps_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity_module, "numpy", None)
+    monkeypatch.setattr(similarity_module, "FALLBACK_MAX_ENTRIES", 2)
+    index = SimilarityIndex(max_entries=2)
+    index.add(JACKET, DESCRIPTIONS)
+    index.add(variant(title="Trail Runner Shoe"), {"short": "Shoes."})
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+
+    loaded = SimilarityIndex.load(path, max_entries=100)
+
+    # Vectors are read from the mapping, not copied
+    assert isinstance(loaded._base_vectors, memoryview)
+    assert loaded.max_entries == 2
+    assert loaded.search(JACKET, ("detailed",))[1]["descriptions"] == DESCRIPTIONS
+
+def test_ann_search_scores_only_bucket_candidates(tmp_path):
+    pytest.importorskip("numpy")
+    index = SimilarityIndex()
+    titles = [f"Catalog Item {n}" for n in range(200)]
+    for title in titles:
+        index.add({"title": title, "category": f"Category {title}"}, {"short": title})
+    index.add(JACKET, DESCRIPTIONS)
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+
+    loaded = SimilarityIndex.load(path, ann=True)
+    scored = len(loaded._ann_index.candidates(embed(variant(title="Alpine Shell Jacket Blue"))))
+    match = loaded.search(variant(title="Alpine Shell Jacket Blue"), ("short",), threshold=0.9)
+
+    assert scored < len(loaded)
+    assert match[1]["descriptions"] == DESCRIPTIONS
+    assert loaded.search(JACKET, ())[1]["descriptions"] == \
+        SimilarityIndex.load(path).search(JACKET, ())[1]["descriptions"]
+
+def test_ann_without_numpy_scans_every_entry(monkeypatch):
+    monkeypatch.setattr(similarity_module, "numpy", None)
+    assert not SimilarityIndex(ann=True).ann
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'tools')))
+
+from product_generator.lambda_handlers import generate_description_lambda
+from product_generator.local.fakes import FakeBedrockClient, FakeDynamoDBTable
+from product_generator.services.bedrock_service import BedrockService
+from product_generator.services.generation_cache import GenerationCache, InMemoryCacheTier
+from product_generator.services.single_flight import DynamoDBLease, InMemoryLease, SingleFlight
+
+N = 16
+
+def run_concurrently(fn, n=N):
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(index):
+        barrier.wait()
+        results[index] = fn(index)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_single_flight_shares_one_call_and_its_errors():
+    single_flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return "result"
+
+    assert run_concurrently(lambda i: single_flight.do("key", slow)) == ["result"] * N
+    assert len(calls) == 1
+    assert single_flight.shared == N - 1
+
+    def failing():
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    def call(i):
+        try:
+            single_flight.do("key", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    assert run_concurrently(call) == ["boom"] * N
+
+def test_concurrent_identical_requests_make_one_model_call(mocker):
+    client = FakeBedrockClient(latency=0.1)
+    mocker.patch.object(generate_description_lambda, 'generation_cache', GenerationCache())
+    mocker.patch(
+        'product_generator.lambda_handlers.generate_description_lambda.BedrockService',
+        side_effect=lambda **kwargs: BedrockService(client=client, **kwargs)
+    )
+    event = {"body": json.dumps({
+        "title": "Smart Coffee Maker",
+        "category": "Kitchen Appliances",
+        "features": ["Wi-Fi", "Voice Control"],
+        "audience": "Coffee Lovers",
+        "format": "detailed"
+    })}
+
+    responses = run_concurrently(lambda i: generate_description_lambda.lambda_handler(event, {}))
+
+    assert all(response["statusCode"] == 200 for response in responses)
+    assert len({response["body"] for response in responses}) == 1
+    assert client.calls == 1
+
+def test_followers_in_other_containers_wait_for_the_leader():
+    client = FakeBedrockClient(latency=0.2)
+    shared_tier = InMemoryCacheTier()
+    lease = InMemoryLease(poll_interval=0.01)
+    # Two "containers": separate in-process caches and single-flight groups
+    containers = [
+        BedrockService(client=client, cache=GenerationCache(shared_tier=shared_tier),
+                       single_flight=SingleFlight(), lease=lease)
+        for _ in range(2)
+    ]
+
+    results = run_concurrently(lambda i: containers[i % 2].invoke_model("Describe a mug."))
+
+    assert len(set(results)) == 1
+    assert client.calls == 1
+
+def test_follower_generates_itself_when_the_leader_gives_up():
+    client = FakeBedrockClient(generation="Fresh text.")
+    lease = InMemoryLease(lease_seconds=0.05, poll_interval=0.01)
+    bedrock_service = BedrockService(client=client, cache=GenerationCache(), lease=lease)
+
+    # Another container took the lease and never produced a result
+    lease.acquire(bedrock_service.cache_key("Describe a mug."))
+
+    assert bedrock_service.invoke_model("Describe a mug.") == "Fresh text."
+    assert client.calls == 1
+
+def test_follower_polling_counts_as_a_single_cache_lookup():
+    client = FakeBedrockClient()
+    shared_tier = InMemoryCacheTier()
+    lease = InMemoryLease(poll_interval=0.01)
+    cache = GenerationCache(shared_tier=shared_tier)
+    bedrock_service = BedrockService(client=client, cache=cache, lease=lease)
+    key = bedrock_service.cache_key("Describe a mug.")
+    owner = lease.acquire(key)
+
+    def leader():
+        # Another container generates for a while, then hands the result over
+        time.sleep(0.1)
+        GenerationCache(shared_tier=shared_tier).put(key, "Shared text.")
+        lease.release(key, owner)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    text = bedrock_service.invoke_model("Describe a mug.")
+    thread.join()
+
+    assert text == "Shared text."
+    assert client.calls == 0
+    # The first lookup missed; the whole wait adds one shared hit
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["shared_hits"] == 1
+
+def test_dynamodb_lease_is_exclusive_until_released_or_expired():
+    now = [1000.0]
+    lease = DynamoDBLease("GenerationCache", lease_seconds=30, clock=lambda: now[0])
+    lease._table = FakeDynamoDBTable("GenerationCache", key_schema=("cacheKey",))
+
+    owner = lease.acquire("key")
+    assert owner is not None
+    assert lease.acquire("key") is None
+    assert lease.is_held("key")
+
+    # Only the owner can release it
+    lease.release("key", "someone-else")
+    assert lease.is_held("key")
+    lease.release("key", owner)
+    assert not lease.is_held("key")
+
+    assert lease.acquire("key") is not None
+    now[0] += 31
+    assert lease.acquire("key") is not None
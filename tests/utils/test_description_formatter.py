@@ -0,0 +1,91 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.utils.description_formatter import DescriptionFormatter, format_batch
+
+TEXTS = [
+    "A sturdy mug. It keeps coffee hot.",
+    "No sentence boundary here",
+    "Ends with a period.",
+    " ".join(["word"] * 40) + ". Second sentence.",
+    "",
+]
+
+def chunked(text, size):
+    return (text[i:i + size] for i in range(0, len(text), size))
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_stream_short_description_matches_full_text(text, chunk_size):
+    expected = DescriptionFormatter(text, {}).get_short_description()
+
+    assert DescriptionFormatter.short_description_from_stream(chunked(text, chunk_size)) == expected
+
+def test_stream_short_description_stops_consuming_at_first_sentence():
+    consumed = []
+
+    def chunks():
+        for chunk in ["First", " one.", " Second", " one."]:
+            consumed.append(chunk)
+            yield chunk
+
+    assert DescriptionFormatter.short_description_from_stream(chunks()) == "First one."
+    assert consumed == ["First", " one.", " Second"]
+
+METADATA = [
+    {"title": "Smart Mug", "category": "Kitchen", "features": ["Heated", "App Control"], "audience": "Commuters"},
+    {"title": "Lamp", "category": "Lighting", "features": [], "audience": "Readers"},
+    {},
+    {"title": "A Very Long Product Title For A Lamp", "category": "Home & Garden Lighting",
+     "features": ["Dimmable", "USB-C", "Warm White", "Timer", "dimmable"], "audience": "Everyone"},
+]
+
+def legacy_seo(metadata):
+    # The original formatter: keywords always built, then the text truncated
+    title = metadata.get("title", "product")
+    category = metadata.get("category", "category")
+    features = metadata.get("features", [])
+    keywords = ", ".join(sorted({title.lower(), category.lower(), *(f.lower() for f in features)}))
+    return (f"Buy the best {title} in the {category}. Key features include: {', '.join(features)}. "
+            f"Experience quality and innovation with our {title}. Keywords: {keywords}.")[:160]
+
+@pytest.mark.parametrize("metadata", METADATA)
+def test_seo_description_matches_original_output(metadata):
+    assert DescriptionFormatter("", metadata).get_seo_rich_description() == legacy_seo(metadata)
+
+@pytest.mark.parametrize("text", TEXTS + ["  Padded text. More.  "])
+def test_short_description_matches_first_sentence_rule(text):
+    first = text.split(". ")[0]
+    if len(first.split()) > 30:
+        first = " ".join(first.split()[:30]) + "..."
+
+    assert DescriptionFormatter(text, {}).get_short_description() == first.strip() + "."
+
+def test_social_caption_uses_first_feature():
+    caption = DescriptionFormatter("", METADATA[0]).get_social_caption()
+
+    assert caption == "Discover the amazing Smart Mug! Featuring heated and more. Get yours today! #SmartMug #Innovation"
+
+def test_format_batch_matches_per_item_methods():
+    pairs = [(text, metadata) for text in TEXTS + ["  Padded text. More.  "] for metadata in METADATA]
+
+    results = format_batch(pairs)
+
+    for (text, metadata), result in zip(pairs, results):
+        formatter = DescriptionFormatter(text, metadata)
+        assert result == {
+            "short": formatter.get_short_description(),
+            "detailed": formatter.get_detailed_description(),
+            "social": formatter.get_social_caption(),
+            "seo": formatter.get_seo_rich_description(),
+        }
+
+def test_format_batch_returns_only_requested_formats():
+    results = format_batch([("One. Two.", METADATA[0])], formats=["short", "seo"])
+
+    assert list(results[0]) == ["short", "seo"]
+    with pytest.raises(ValueError):
+        format_batch([("One.", METADATA[0])], formats=["poster"])
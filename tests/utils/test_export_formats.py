@@ -0,0 +1,88 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from decimal import Decimal
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.utils.export_formats import EXPORT_FORMATS, ParquetFormat, export_format_for
+from product_generator.utils.export_schema import DESCRIPTION_SCHEMA
+
+# Numbers come back from DynamoDB as Decimal
+ITEM = {
+    "productId": "product-1",
+    "formatType": "all",
+    "timestamp": Decimal("1700000000000"),
+    "metadata": {"title": "Mug", "category": "Home", "features": ["Durable", "Light"], "audience": "Everyone"},
+    "descriptions": {"short": "A mug, \"really\".", "detailed": "Line one.\nLine two."}
+}
+
+class Sink:
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data.encode("utf-8") if isinstance(data, str) else data
+        return len(data)
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+def test_schema_flattens_items_for_csv_and_typed_records():
+    assert DESCRIPTION_SCHEMA.csv_row(ITEM) == [
+        "product-1", Decimal("1700000000000"), "Mug", "Home", "Durable, Light", "Everyone",
+        "A mug, \"really\".", "Line one.\nLine two.", "", ""
+    ]
+    record = DESCRIPTION_SCHEMA.record(ITEM)
+    assert record["timestamp"] == 1700000000000
+    assert record["features"] == ["Durable", "Light"]
+    assert record["seo_description"] is None
+
+@pytest.mark.parametrize("name", ["csv", "csv.gz"])
+def test_csv_formats_round_trip(name):
+    sink = Sink()
+    assert EXPORT_FORMATS[name].write(sink, [[ITEM], [ITEM]], DESCRIPTION_SCHEMA) == 2
+
+    data = gzip.decompress(sink.data) if name.endswith(".gz") else bytes(sink.data)
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"))))
+    assert rows[0] == DESCRIPTION_SCHEMA.names
+    assert rows[1][7] == "Line one.\nLine two."
+    assert len(rows) == 3
+
+def test_json_lines_keep_types():
+    sink = Sink()
+    EXPORT_FORMATS["jsonl.gz"].write(sink, [[ITEM]], DESCRIPTION_SCHEMA)
+
+    lines = gzip.decompress(sink.data).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [DESCRIPTION_SCHEMA.record(ITEM)]
+
+def test_compressed_header_and_parts_concatenate():
+    header, part = Sink(), Sink()
+    EXPORT_FORMATS["csv.gz"].write(header, [], DESCRIPTION_SCHEMA)
+    EXPORT_FORMATS["csv.gz"].write(part, [[ITEM]], DESCRIPTION_SCHEMA, include_header=False)
+
+    rows = list(csv.reader(io.StringIO(gzip.decompress(header.data + part.data).decode("utf-8"))))
+    assert rows[0] == DESCRIPTION_SCHEMA.names
+    assert rows[1][0] == "product-1"
+
+def test_parquet_is_written_in_row_groups():
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = Sink()
+
+    ParquetFormat(row_group_rows=2).write(sink, [[ITEM] * 3, [ITEM] * 2], DESCRIPTION_SCHEMA)
+
+    parquet_file = pq.ParquetFile(io.BytesIO(bytes(sink.data)))
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.read().to_pylist()[0] == DESCRIPTION_SCHEMA.record(ITEM)
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        export_format_for("xlsx")
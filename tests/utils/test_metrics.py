@@ -0,0 +1,63 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.utils.metrics import InMemorySink, RequestMetrics, payload_logging_sampled
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_timers_and_counts_accumulate_into_one_emf_record():
+    sink = InMemorySink()
+    clock = FakeClock()
+    metrics = RequestMetrics(sink, namespace="Test", dimensions={"Operation": "Generate"}, clock=clock)
+
+    for seconds in (0.010, 0.030):
+        with metrics.timer("Model"):
+            clock.now += seconds
+    metrics.add("PromptTokens", 12)
+    metrics.add("PromptTokens", 8)
+    metrics.put_property("Format", "short")
+    metrics.flush()
+
+    (record,) = sink.records
+    assert record["_aws"]["CloudWatchMetrics"] == [{
+        "Namespace": "Test",
+        "Dimensions": [["Operation"]],
+        "Metrics": [{"Name": "ModelTime", "Unit": "Milliseconds"}, {"Name": "PromptTokens", "Unit": "Count"}],
+    }]
+    assert record["ModelTime"] == pytest.approx(40.0)
+    assert record["PromptTokens"] == 20
+    assert record["Operation"] == "Generate"
+    assert record["Format"] == "short"
+
+def test_timer_records_even_when_the_stage_fails():
+    clock = FakeClock()
+    metrics = RequestMetrics(clock=clock)
+
+    with pytest.raises(RuntimeError):
+        with metrics.timer("Model"):
+            clock.now += 0.5
+            raise RuntimeError("boom")
+
+    assert metrics.value("ModelTime") == pytest.approx(500.0)
+
+def test_sink_failures_never_reach_the_request():
+    class BrokenSink:
+        def emit(self, record):
+            raise OSError("stdout closed")
+
+    metrics = RequestMetrics(BrokenSink())
+    metrics.add("ModelCalls", 1)
+    metrics.flush()
+
+def test_payload_logging_sample_rate():
+    assert payload_logging_sampled(1.0) is True
+    assert payload_logging_sampled(0.0) is False
+    assert RequestMetrics(log_payloads=False).log_payloads is False
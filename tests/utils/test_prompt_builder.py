@@ -0,0 +1,60 @@
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src')))
+
+from product_generator.utils.prompt_builder import (
+    MAX_GEN_LEN,
+    STRUCTURED_MAX_GEN_LEN,
+    estimate_tokens,
+    plan_prompt,
+)
+
+PRODUCT = {
+    "title": "Smart Mug",
+    "category": "Kitchen",
+    "features": ["Heated", "App Control"],
+    "audience": "Commuters",
+}
+
+def test_budgets_and_stop_sequences_follow_the_format():
+    short = plan_prompt(PRODUCT, "short")
+    detailed = plan_prompt(PRODUCT, "detailed")
+    structured = plan_prompt(PRODUCT, "all", structured=True)
+
+    assert short.max_gen_len == MAX_GEN_LEN["short"] < detailed.max_gen_len
+    assert short.stop == (". ",)
+    assert detailed.stop == ()
+    assert structured.max_gen_len == STRUCTURED_MAX_GEN_LEN
+    assert "JSON object" in structured.text
+
+def test_templates_are_plain_instructions():
+    prompt = plan_prompt(PRODUCT, "detailed")
+
+    assert "Human:" not in prompt.text and "Assistant:" not in prompt.text
+    assert "Smart Mug" in prompt.text and "Heated, App Control" in prompt.text
+    assert prompt.input_tokens == estimate_tokens(prompt.text)
+
+def test_oversized_feature_lists_are_truncated_from_the_end():
+    product = {**PRODUCT, "features": [f"Feature number {i}" for i in range(200)]}
+
+    prompt = plan_prompt(product, "detailed", max_input_tokens=100)
+
+    assert prompt.input_tokens <= 100
+    assert 0 < prompt.dropped_features < 200
+    assert "Feature number 0," in prompt.text
+    assert "Feature number 199" not in prompt.text
+    # Dropping one fewer feature would not have fit
+    kept = 200 - prompt.dropped_features
+    assert estimate_tokens(plan_prompt({**product, "features": product["features"][:kept + 1]}, "detailed",
+                                       max_input_tokens=10_000).text) > 100
+
+def test_oversized_prompts_can_be_rejected():
+    product = {**PRODUCT, "features": [f"Feature number {i}" for i in range(200)]}
+
+    with pytest.raises(ValueError):
+        plan_prompt(product, "detailed", max_input_tokens=100, policy="reject")
+    # Truncation cannot help when a single feature is already too large
+    with pytest.raises(ValueError):
+        plan_prompt({**PRODUCT, "features": ["x" * 2000]}, "detailed", max_input_tokens=100)
@@ -0,0 +1,392 @@
+import argparse
+import base64
+import importlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from product_generator.local.fakes import (
+    FakeBedrockClient,
+    FakeDynamoDBResource,
+    FakeDynamoDBTable,
+    FakeLambdaClient,
+    FakeS3Client,
+)
+from product_generator.local.load_harness import lognormal_latency, patched, percentile, quiet_logging, stored_item
+from product_generator.services import clients
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Local stand-in for the deployed stack: a threaded HTTP server emulating API
+# Gateway's proxy integration in front of the unmodified Lambda handlers, with
+# Bedrock, DynamoDB, S3 and Lambda itself replaced by the in-memory fakes.
+#
+#   PYTHONPATH=src:tools python -m product_generator.local.dev_server --port 3000 --bedrock-latency-ms 800 --seed-items 1000
+#   curl -X POST localhost:3000/generate -d '{"title": "Lamp", "category": "Lighting", "format": "short", ...}'
+#
+# Routes follow template.yaml. POST /_local/invoke/{function} invokes any
+# function directly (the store path, ingestion) and GET /_local/stats reports
+# per-function invocations, cold starts, throttles and latency.
+#
+# Handlers share one process, so module state (clients, caches, the model
+# router) is shared the way a single warm container shares it. Containers are
+# still counted per function: a request that finds no idle container starts a
+# new one (paying --cold-start-ms), so the stats show how many containers the
+# offered concurrency would keep warm.
+
+TABLE_NAME = "ProductDescriptions"
+BUCKET_NAME = "local-exports"
+
+# function name -> (handler module, timeout in seconds), as in template.yaml
+FUNCTIONS = {
+    "GenerateDescriptionLambda": ("generate_description_lambda", 30),
+    "StoreDescriptionLambda": ("store_description_lambda", 30),
+    "ExportDescriptionLambda": ("export_description_lambda", 30),
+    "ReadDescriptionLambda": ("read_description_lambda", 10),
+    "IngestCatalogLambda": ("ingest_catalog_lambda", 900),
+}
+
+# (method, resource, function name)
+ROUTES = [
+    ("POST", "/generate", "GenerateDescriptionLambda"),
+    ("GET", "/export-csv", "ExportDescriptionLambda"),
+    ("GET", "/descriptions/{productId}", "ReadDescriptionLambda"),
+    ("GET", "/descriptions", "ReadDescriptionLambda"),
+]
+
+# API Gateway gives up on an integration after 29 s
+INTEGRATION_TIMEOUT_SECONDS = 29
+
+def route_pattern(resource):
+    # "/descriptions/{productId}" -> a regex with one named group per path parameter
+    return re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", resource) + "$")
+
+def match_route(method, path, routes=ROUTES):
+    for route_method, resource, function_name in routes:
+        if route_method != method:
+            continue
+        match = route_pattern(resource).match(path)
+        if match:
+            return resource, function_name, {k: unquote(v) for k, v in match.groupdict().items()}
+    return None
+
+def api_event(method, path, resource, query, headers, body, path_parameters):
+    # REST API (v1) proxy integration event
+    query_lists = parse_qs(query, keep_blank_values=True)
+    return {
+        "resource": resource,
+        "path": path,
+        "httpMethod": method,
+        "headers": dict(headers),
+        "multiValueHeaders": {name: [value] for name, value in headers.items()},
+        "queryStringParameters": {k: v[-1] for k, v in query_lists.items()} or None,
+        "multiValueQueryStringParameters": query_lists or None,
+        "pathParameters": path_parameters or None,
+        "stageVariables": None,
+        "requestContext": {
+            "requestId": uuid.uuid4().hex,
+            "stage": "local",
+            "httpMethod": method,
+            "path": path,
+            "resourcePath": resource,
+        },
+        "body": body,
+        "isBase64Encoded": False,
+    }
+
+class FunctionContext:
+    # Lambda context stand-in; the remaining time counts down from the function's timeout
+    def __init__(self, function_name, timeout_seconds):
+        self.function_name = function_name
+        self.invoked_function_arn = function_name
+        self.aws_request_id = uuid.uuid4().hex
+        self.memory_limit_in_mb = 128
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+class Throttled(Exception):
+    pass
+
+class LocalFunction:
+    # One function's containers. Each invocation takes an idle container or
+    # starts a new one; with reserved_concurrency set, invocations beyond it
+    # are throttled as Lambda would.
+    def __init__(self, name, handler, timeout_seconds, cold_start_seconds=0.0, reserved_concurrency=None):
+        self.name = name
+        self.handler = handler
+        self.timeout_seconds = timeout_seconds
+        self.cold_start_seconds = cold_start_seconds
+        self.reserved_concurrency = reserved_concurrency
+        self.invocations = 0
+        self.cold_starts = 0
+        self.throttles = 0
+        self.errors = 0
+        self.durations_ms = []
+        self._idle = []
+        self._running = 0
+        self._peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, event, context=None):
+        # Returns (result, cold_start)
+        with self._lock:
+            if self.reserved_concurrency is not None and self._running >= self.reserved_concurrency:
+                self.throttles += 1
+                raise Throttled(f"Rate exceeded for {self.name}.")
+            self._running += 1
+            self._peak = max(self._peak, self._running)
+            self.invocations += 1
+            cold_start = not self._idle
+            container = self._idle.pop() if self._idle else self.cold_starts + 1
+            if cold_start:
+                self.cold_starts += 1
+        start = time.perf_counter()
+        try:
+            if cold_start and self.cold_start_seconds:
+                time.sleep(self.cold_start_seconds)
+            result = self.handler(event, context or FunctionContext(self.name, self.timeout_seconds))
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._running -= 1
+                self._idle.append(container)
+                self.durations_ms.append(elapsed_ms)
+        return result, cold_start
+
+    def stats(self):
+        with self._lock:
+            durations = sorted(self.durations_ms)
+            return {
+                "invocations": self.invocations,
+                "coldStarts": self.cold_starts,
+                "peakConcurrency": self._peak,
+                "throttles": self.throttles,
+                "errors": self.errors,
+                "p50_ms": round(percentile(durations, 50), 3),
+                "p95_ms": round(percentile(durations, 95), 3),
+                "p99_ms": round(percentile(durations, 99), 3),
+            }
+
+class LocalStack:
+    # The fakes, the handler modules pointed at them, and one LocalFunction per function
+    def __init__(self, bedrock_latency_ms=20.0, bedrock_jitter=0.25, dynamodb_latency_ms=2.0, s3_latency_ms=2.0,
+                 invoke_latency_ms=5.0, cold_start_ms=0.0, reserved_concurrency=None, seed_items=0,
+                 metrics=False, seed=0):
+        from product_generator.services import bedrock_service
+        from product_generator.services.dynamodb_service import (
+            CHANGE_BUCKET_ATTRIBUTE, CHANGE_INDEX_NAME, CHANGE_TIME_ATTRIBUTE
+        )
+
+        self.table = FakeDynamoDBTable(
+            TABLE_NAME, latency=lognormal_latency(dynamodb_latency_ms, 0.2, seed),
+            indexes={CHANGE_INDEX_NAME: (CHANGE_BUCKET_ATTRIBUTE, CHANGE_TIME_ATTRIBUTE)},
+        )
+        self.table.load(stored_item(i) for i in range(seed_items))
+        self.dynamodb = FakeDynamoDBResource([self.table], latency=lognormal_latency(dynamodb_latency_ms, 0.2, seed))
+        self.s3_client = FakeS3Client(latency=s3_latency_ms / 1000)
+        self.bedrock_client = FakeBedrockClient(latency=lognormal_latency(bedrock_latency_ms, bedrock_jitter, seed))
+        self.lambda_client = FakeLambdaClient(
+            latency=invoke_latency_ms / 1000,
+            context_factory=lambda name: FunctionContext(name, FUNCTIONS[name][1]),
+        )
+        self.metrics = metrics
+        self.functions = {}
+        self._bedrock_region = bedrock_service.BEDROCK_REGION
+        self._cold_start_seconds = cold_start_ms / 1000
+        self._reserved_concurrency = reserved_concurrency
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        clients.register("bedrock-runtime", client=self.bedrock_client, region_name=self._bedrock_region)
+        clients.register("dynamodb", resource=self.dynamodb)
+        clients.register("s3", client=self.s3_client)
+        clients.register("lambda", client=self.lambda_client)
+        for name, (module_name, timeout_seconds) in FUNCTIONS.items():
+            module = importlib.import_module(f"product_generator.lambda_handlers.{module_name}")
+            self._stack.enter_context(self._configure(module_name, module))
+            function = LocalFunction(name, module.lambda_handler, timeout_seconds,
+                                     self._cold_start_seconds, self._reserved_concurrency)
+            self.functions[name] = function
+            # Async invokes of a function land on its containers too
+            self.lambda_client.functions[name] = lambda event, context, function=function: function.invoke(
+                event, context)[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        self.lambda_client.shutdown()
+        self._stack.close()
+        clients.reset()
+
+    def _configure(self, module_name, module):
+        # Module globals a deployed function would have read from its environment
+        from product_generator.services.description_store import DescriptionStore
+        from product_generator.services.generation_cache import GenerationCache
+
+        values = {"PRODUCT_DESCRIPTIONS_TABLE": TABLE_NAME}
+        if module_name == "generate_description_lambda":
+            values.update(STORE_DESCRIPTION_LAMBDA_ARN="StoreDescriptionLambda", STORAGE_QUEUE_URL=None,
+                          description_store=DescriptionStore(TABLE_NAME), generation_cache=GenerationCache())
+        elif module_name == "read_description_lambda":
+            values.update(description_store=DescriptionStore(
+                TABLE_NAME, cache=GenerationCache(ttl_seconds=module.READ_CACHE_TTL_SECONDS)))
+        elif module_name == "export_description_lambda":
+            values.update(EXPORTS_S3_BUCKET=BUCKET_NAME)
+        elif module_name == "ingest_catalog_lambda":
+            values.update(INGEST_S3_BUCKET=BUCKET_NAME, generation_cache=GenerationCache())
+        if not self.metrics and hasattr(module, "default_sink"):
+            values["default_sink"] = None
+        return patched(module, **values)
+
+    def wait_for_async(self):
+        self.lambda_client.wait()
+
+    def stats(self):
+        return {
+            "functions": {name: function.stats() for name, function in self.functions.items()},
+            "asyncInvokes": self.lambda_client.calls,
+            "asyncErrors": len(self.lambda_client.errors),
+            "tableItems": len(self.table),
+            "bedrockCalls": self.bedrock_client.calls,
+        }
+
+class ApiGatewayHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so load generators can reuse connections
+    protocol_version = "HTTP/1.1"
+    server_version = "LocalApiGateway"
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        stack = self.server.local_stack
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else None
+
+        if url.path == "/_local/stats" and method == "GET":
+            return self.respond(200, {"Content-Type": "application/json"}, json.dumps(stack.stats()))
+        if url.path.startswith("/_local/invoke/") and method == "POST":
+            name = url.path[len("/_local/invoke/"):]
+            if name not in stack.functions:
+                return self.respond(404, {}, json.dumps({"message": f"Unknown function: {name}."}))
+            return self.invoke(stack.functions[name], json.loads(body or "{}"), raw=True)
+
+        route = match_route(method, url.path)
+        if route is None:
+            # What API Gateway answers for an unknown resource or method
+            return self.respond(403, {}, json.dumps({"message": "Missing Authentication Token"}))
+        resource, function_name, path_parameters = route
+        headers = {name: value for name, value in self.headers.items()}
+        event = api_event(method, url.path, resource, url.query, headers, body, path_parameters)
+        self.invoke(stack.functions[function_name], event)
+
+    def invoke(self, function, event, raw=False):
+        try:
+            start = time.perf_counter()
+            result, cold_start = function.invoke(event)
+            elapsed = time.perf_counter() - start
+        except Throttled as e:
+            return self.respond(429, {}, json.dumps({"message": str(e)}))
+        except Exception as e:
+            logger.error("%s failed: %s", function.name, e)
+            return self.respond(502, {}, json.dumps({"message": "Internal server error"}))
+
+        local_headers = {"X-Local-Cold-Start": str(cold_start).lower(),
+                         "X-Local-Duration-Ms": f"{elapsed * 1000:.1f}"}
+        if raw:
+            return self.respond(200, {**local_headers, "Content-Type": "application/json"},
+                                json.dumps(result, default=str))
+        # The answer API Gateway would have sent once its limit passed
+        if elapsed > INTEGRATION_TIMEOUT_SECONDS:
+            return self.respond(504, local_headers, json.dumps({"message": "Endpoint request timed out"}))
+        if not isinstance(result, dict) or "statusCode" not in result:
+            return self.respond(502, local_headers, json.dumps({"message": "Internal server error"}))
+
+        body = result.get("body") or ""
+        data = base64.b64decode(body) if result.get("isBase64Encoded") else body.encode("utf-8")
+        headers = {**local_headers, "Content-Type": "application/json", **(result.get("headers") or {})}
+        self.respond(result["statusCode"], headers, data)
+
+    def respond(self, status_code, headers, body):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+@contextmanager
+def serve(local_stack, host="127.0.0.1", port=3000):
+    # Serves on a background thread; yields the server (server.server_address has the bound port)
+    server = ThreadingHTTPServer((host, port), ApiGatewayHandler)
+    server.daemon_threads = True
+    server.local_stack = local_stack
+    thread = threading.Thread(target=server.serve_forever, name="local-api", daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API locally against in-memory AWS stand-ins.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--bedrock-latency-ms", type=float, default=20.0)
+    parser.add_argument("--bedrock-jitter", type=float, default=0.25, help="Lognormal sigma of model latency")
+    parser.add_argument("--dynamodb-latency-ms", type=float, default=2.0)
+    parser.add_argument("--s3-latency-ms", type=float, default=2.0)
+    parser.add_argument("--invoke-latency-ms", type=float, default=5.0, help="Delay before an async invoke runs")
+    parser.add_argument("--cold-start-ms", type=float, default=0.0, help="Extra time a new container takes")
+    parser.add_argument("--reserved-concurrency", type=int, help="Per-function limit; excess requests get 429")
+    parser.add_argument("--seed-items", type=int, default=0, help="Descriptions to preload into the table")
+    parser.add_argument("--metrics", action="store_true", help="Print the handlers' EMF records")
+    parser.add_argument("--verbose", action="store_true", help="Keep the handlers' INFO logging")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    local_stack = LocalStack(
+        bedrock_latency_ms=args.bedrock_latency_ms, bedrock_jitter=args.bedrock_jitter,
+        dynamodb_latency_ms=args.dynamodb_latency_ms, s3_latency_ms=args.s3_latency_ms,
+        invoke_latency_ms=args.invoke_latency_ms, cold_start_ms=args.cold_start_ms,
+        reserved_concurrency=args.reserved_concurrency, seed_items=args.seed_items, metrics=args.metrics,
+    )
+    with ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(quiet_logging())
+        stack.enter_context(local_stack)
+        server = stack.enter_context(serve(local_stack, args.host, args.port))
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port} (Ctrl+C to stop)", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(local_stack.stats(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,659 @@
+import copy
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
+
+from botocore.exceptions import ClientError
+
+from product_generator.services.model_backends import ModelBackend
+
+# In-memory stand-ins for the AWS clients used by the services, for tests,
+# benchmarks and local runs. Latency can be a number of seconds or a
+# zero-argument callable returning one, so callers can inject distributions.
+
+DEFAULT_GENERATION = (
+    "Meet the product you have been waiting for. "
+    "It combines thoughtful design with everyday practicality. "
+    "Built to last, it is ready for whatever your day brings."
+)
+
+def _reject_floats(value):
+    # boto3's serializer refuses floats before a request is sent
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        for v in value.values():
+            _reject_floats(v)
+    elif isinstance(value, (list, tuple, set)):
+        for v in value:
+            _reject_floats(v)
+
+def _sleep(latency):
+    seconds = latency() if callable(latency) else latency
+    if seconds:
+        time.sleep(seconds)
+
+
+def _injected_error(errors, call_number):
+    # errors is a list consumed one entry per call (None lets the call succeed),
+    # or a callable taking the call number and returning an exception or None
+    if callable(errors):
+        return errors(call_number)
+    if errors:
+        return errors.pop(0)
+    return None
+
+def _word_tokens(text):
+    # Word-by-word stream tokens, keeping the separating whitespace on each token
+    tokens = [word + " " for word in text.split(" ")]
+    tokens[-1] = tokens[-1][:-1]
+    return tokens
+
+def _condition_holds(condition, item):
+    # Evaluates the subset of boto3 condition objects the services use
+    expression = condition.get_expression()
+    operator = expression["operator"]
+    values = expression["values"]
+    if operator == "OR":
+        return any(_condition_holds(value, item) for value in values)
+    if operator == "AND":
+        return all(_condition_holds(value, item) for value in values)
+    if operator == "NOT":
+        return not _condition_holds(values[0], item)
+
+    name = values[0].name
+    if operator == "BETWEEN":
+        return name in item and values[1] <= item[name] <= values[2]
+    if operator == "attribute_not_exists":
+        return name not in item
+    if operator == "attribute_exists":
+        return name in item
+    if name not in item:
+        return False
+    comparisons = {
+        "=": lambda a, b: a == b,
+        "<>": lambda a, b: a != b,
+        "<": lambda a, b: a < b,
+        "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b,
+        ">=": lambda a, b: a >= b,
+    }
+    if operator not in comparisons:
+        raise NotImplementedError(f"Condition operator not supported by the fake: {operator}")
+    return comparisons[operator](item[name], values[1])
+
+def _project(item, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+    # Applies a ProjectionExpression of (possibly nested) attribute paths
+    if item is None or not ProjectionExpression:
+        return copy.deepcopy(item)
+    names = ExpressionAttributeNames or {}
+    projected = {}
+    for path in ProjectionExpression.split(","):
+        parts = [names.get(part, part) for part in path.strip().split(".")]
+        source, target = item, projected
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if source is None:
+                break
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = copy.deepcopy(source[parts[-1]])
+    return projected
+
+def bedrock_error(code, operation="InvokeModel"):
+    # Builds the ClientError botocore raises for a Bedrock error code, e.g. "ThrottlingException"
+    return ClientError({"Error": {"Code": code, "Message": f"Injected {code}"}}, operation)
+
+
+class FakeBedrockClient:
+    def __init__(self, latency=0.0, generation=DEFAULT_GENERATION, chunk_latency=0.0, errors=None):
+        # latency is paid before the first byte; chunk_latency between streamed tokens
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        # Either a fixed string or a callable taking the native request dict
+        self.generation = generation
+        # Injected failures, see _injected_error
+        self.errors = list(errors) if isinstance(errors, (list, tuple)) else errors
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self._start_call()
+        _sleep(self.latency)
+
+        native_request = json.loads(body)
+        text = self._generate(native_request)
+        if modelId.startswith("mistral."):
+            payload = {"outputs": [{"text": text, "stop_reason": "stop"}]}
+        else:
+            payload = {
+                "generation": text,
+                "prompt_token_count": len(native_request.get("prompt", "")) // 4,
+                "generation_token_count": len(text) // 4,
+                "stop_reason": "stop",
+            }
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        self._start_call()
+        native_request = json.loads(body)
+        return {"body": self._stream_events(native_request, mistral=modelId.startswith("mistral."))}
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+            error = _injected_error(self.errors, self.calls)
+        if error is not None:
+            raise error
+
+    def _generate(self, native_request):
+        # Honours the request's stop sequences and output budget (Llama's
+        # max_gen_len or Mistral's max_tokens), at 4 characters per token
+        text = self.generation(native_request) if callable(self.generation) else self.generation
+        for stop in native_request.get("stop") or ():
+            text = text.split(stop, 1)[0]
+        budget = native_request.get("max_gen_len") or native_request.get("max_tokens")
+        return text[:budget * 4] if budget else text
+
+    def _stream_events(self, native_request, mistral=False):
+        _sleep(self.latency)
+        tokens = _word_tokens(self._generate(native_request))
+        for index, token in enumerate(tokens):
+            if index:
+                _sleep(self.chunk_latency)
+            stop_reason = "stop" if index == len(tokens) - 1 else None
+            if mistral:
+                payload = {"outputs": [{"text": token, "stop_reason": stop_reason}]}
+            else:
+                payload = {"generation": token, "stop_reason": stop_reason}
+                if stop_reason:
+                    payload["generation_token_count"] = len(tokens)
+            yield {"chunk": {"bytes": json.dumps(payload).encode("utf-8")}}
+
+
+class FakeBackend(ModelBackend):
+    # Deterministic offline model backend: ignores the client, answers after
+    # the configured latency and fails as configured, so routing can be tested
+    # and benchmarked without Bedrock. Same latency/errors options as FakeBedrockClient.
+    def __init__(self, model_id="local.fake", formats=ModelBackend.formats, max_output_tokens=2048,
+                 input_cost_per_1k=0.0, output_cost_per_1k=0.0, latency=0.0, errors=None,
+                 generation=DEFAULT_GENERATION, max_gen_len=512, temperature=0.5):
+        super().__init__(model_id, max_gen_len, temperature)
+        self.formats = formats
+        self.max_output_tokens = max_output_tokens
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+        self.latency = latency
+        self.errors = list(errors) if isinstance(errors, (list, tuple)) else errors
+        # Either a fixed string or a callable taking the prompt
+        self.generation = generation
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def build_request_payload(self, prompt, max_gen_len=None, stop=()):
+        return json.dumps({"prompt": prompt, "max_gen_len": max_gen_len or self.max_gen_len})
+
+    def invoke(self, client, prompt, max_gen_len=None, stop=()):
+        text = self._respond(prompt)
+        return text, len(prompt) // 4, len(text) // 4
+
+    def open_stream(self, client, prompt, max_gen_len=None, stop=()):
+        return iter(_word_tokens(self._respond(prompt)))
+
+    def _respond(self, prompt):
+        with self._lock:
+            self.calls += 1
+            error = _injected_error(self.errors, self.calls)
+        _sleep(self.latency)
+        if error is not None:
+            raise error
+        return self.generation(prompt) if callable(self.generation) else self.generation
+
+
+class FakeDynamoDBTable:
+    # Mimics the boto3 Table resource for the calls the services make. Scans are
+    # paginated by item count (page_size) in place of DynamoDB's 1 MB page limit.
+    def __init__(self, name, key_schema=("productId", "formatType"), page_size=1000, latency=0.0, indexes=None):
+        self.name = name
+        self.key_schema = key_schema
+        # Secondary indexes: name -> (hash key, range key); items lacking either are not indexed
+        self.indexes = indexes or {}
+        self.query_calls = 0
+        self.scan_calls = 0
+        self.get_calls = 0
+        self.put_calls = 0
+        self.delete_calls = 0
+        self.page_size = page_size
+        self.latency = latency
+        self._items = {}
+        # Scan order: keys in insertion order plus their positions, for ExclusiveStartKey lookups
+        self._order = []
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def load(self, items):
+        # Bulk seeding without per-item copies, for large synthetic tables
+        with self._lock:
+            for item in items:
+                self._store(item)
+
+    def put_item(self, Item, ConditionExpression=None, **kwargs):
+        # Conditions are boto3.dynamodb.conditions objects, as the services pass them
+        _reject_floats(Item)
+        _sleep(self.latency)
+        with self._lock:
+            self.put_calls += 1
+            self._check_condition(ConditionExpression, self._items.get(self._key(Item)), "PutItem")
+            self._store(copy.deepcopy(Item))
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        _sleep(self.latency)
+        with self._lock:
+            self.get_calls += 1
+            item = self._items.get(self._key(Key))
+        return {"Item": _project(item, **kwargs)} if item is not None else {}
+
+    def peek(self, key):
+        # Reads without counting or latency, for assertions
+        with self._lock:
+            return self._items.get(self._key(key))
+
+    def delete_item(self, Key, ConditionExpression=None, **kwargs):
+        _sleep(self.latency)
+        with self._lock:
+            self.delete_calls += 1
+            self._check_condition(ConditionExpression, self._items.get(self._key(Key)), "DeleteItem")
+            self._items.pop(self._key(Key), None)
+        return {}
+
+    def _check_condition(self, condition, existing, operation):
+        if condition is not None and not _condition_holds(condition, existing or {}):
+            raise ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}},
+                operation
+            )
+
+    def remove(self, key):
+        with self._lock:
+            self._items.pop(self._key(key), None)
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, Segment=None, TotalSegments=None, **kwargs):
+        _sleep(self.latency)
+        limit = min(Limit or self.page_size, self.page_size)
+        with self._lock:
+            self.scan_calls += 1
+            position = 0
+            if ExclusiveStartKey is not None:
+                position = self._positions[self._key(ExclusiveStartKey)] + 1
+            page = []
+            while position < len(self._order) and len(page) < limit:
+                key = self._order[position]
+                item = self._items.get(key)
+                if item is not None and (TotalSegments is None or self._segment(key, TotalSegments) == Segment):
+                    page.append(item)
+                position += 1
+            last_key = self._order[position - 1] if position < len(self._order) else None
+
+        response = {"Items": page, "Count": len(page), "ScannedCount": len(page)}
+        if last_key is not None:
+            response["LastEvaluatedKey"] = dict(zip(self.key_schema, last_key))
+        return response
+
+    def query(self, KeyConditionExpression, IndexName=None, Limit=None, ExclusiveStartKey=None, **kwargs):
+        # Key conditions are boto3 condition objects; results come back in range key order
+        _sleep(self.latency)
+        hash_key, range_key = self.indexes[IndexName] if IndexName else self.key_schema
+        limit = min(Limit or self.page_size, self.page_size)
+        with self._lock:
+            self.query_calls += 1
+            matches = [
+                item for item in self._items.values()
+                if hash_key in item and range_key in item and _condition_holds(KeyConditionExpression, item)
+            ]
+        matches.sort(key=lambda item: (item[range_key], self._key(item)))
+
+        start = 0
+        if ExclusiveStartKey is not None:
+            start_key = self._key(ExclusiveStartKey)
+            start = next(i for i, item in enumerate(matches) if self._key(item) == start_key) + 1
+        page = matches[start:start + limit]
+
+        response = {"Items": page, "Count": len(page), "ScannedCount": len(page)}
+        if start + limit < len(matches):
+            last = page[-1]
+            response["LastEvaluatedKey"] = {k: last[k] for k in (*self.key_schema, hash_key, range_key)}
+        return response
+
+    def _key(self, item):
+        return tuple(item[k] for k in self.key_schema)
+
+    @staticmethod
+    def _segment(key, total_segments):
+        # Stable assignment of items to parallel scan segments
+        return zlib.crc32(repr(key).encode("utf-8")) % total_segments
+
+    def _store(self, item):
+        key = self._key(item)
+        if key not in self._positions:
+            self._positions[key] = len(self._order)
+            self._order.append(key)
+        self._items[key] = item
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FakeDynamoDBResource:
+    # unprocessed_rate is the fraction of BatchWriteItem requests (and
+    # BatchGetItem keys) handed back as unprocessed, as DynamoDB does when a
+    # table is throttled.
+    def __init__(self, tables=None, unprocessed_rate=0.0, seed=0, latency=0.0):
+        self.tables = {table.name: table for table in (tables or [])}
+        self.unprocessed_rate = unprocessed_rate
+        self.latency = latency
+        self.batch_write_calls = 0
+        self.batch_get_calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeDynamoDBTable(name)
+        return self.tables[name]
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise ClientError(
+                {"Error": {"Code": "ValidationException", "Message": "Too many items requested for the BatchWriteItem call"}},
+                "BatchWriteItem"
+            )
+        _reject_floats(RequestItems)
+        _sleep(self.latency)
+        with self._lock:
+            self.batch_write_calls += 1
+
+        unprocessed = {}
+        for table_name, requests in RequestItems.items():
+            table = self.Table(table_name)
+            for request in requests:
+                with self._lock:
+                    throttled = self._random.random() < self.unprocessed_rate
+                if throttled:
+                    unprocessed.setdefault(table_name, []).append(copy.deepcopy(request))
+                elif "PutRequest" in request:
+                    table.load([copy.deepcopy(request["PutRequest"]["Item"])])
+                else:
+                    table.remove(request["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": unprocessed}
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        if sum(len(request["Keys"]) for request in RequestItems.values()) > 100:
+            raise ClientError(
+                {"Error": {"Code": "ValidationException", "Message": "Too many items requested for the BatchGetItem call"}},
+                "BatchGetItem"
+            )
+        _sleep(self.latency)
+        with self._lock:
+            self.batch_get_calls += 1
+
+        responses = {}
+        unprocessed = {}
+        for table_name, request in RequestItems.items():
+            table = self.Table(table_name)
+            found = responses.setdefault(table_name, [])
+            for key in request["Keys"]:
+                with self._lock:
+                    throttled = self._random.random() < self.unprocessed_rate
+                if throttled:
+                    entry = unprocessed.setdefault(table_name, {k: v for k, v in request.items() if k != "Keys"})
+                    entry.setdefault("Keys", []).append(copy.deepcopy(key))
+                    continue
+                item = table.peek(key)
+                if item is not None:
+                    found.append(_project(item, **request))
+        return {"Responses": responses, "UnprocessedKeys": unprocessed}
+
+
+class FakeStreamingBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, amt=None):
+        return self._stream.read(amt)
+
+    def iter_chunks(self, chunk_size=1024):
+        while True:
+            chunk = self._stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def iter_lines(self, chunk_size=1024, keepends=False):
+        for line in self._stream:
+            yield line if keepends else line.rstrip(b"\r\n")
+
+    def close(self):
+        self._stream.close()
+
+
+class FakeS3Client:
+    # With keep_data=False only object sizes are recorded, so memory benchmarks
+    # measure the writer rather than the stand-in.
+    def __init__(self, keep_data=True, latency=0.0):
+        self.keep_data = keep_data
+        self.latency = latency
+        self.objects = {}
+        self.object_sizes = {}
+        self.part_sizes = {}
+        # Every request, whatever the operation
+        self.calls = 0
+        self._uploads = {}
+        self._lock = threading.Lock()
+        self._next_upload = 0
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None, **kwargs):
+        self._count()
+        _sleep(self.latency)
+        data = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        if IfNoneMatch == "*":
+            # Conditional create: the check and the write are one step, as in S3
+            with self._lock:
+                if (Bucket, Key) in self.object_sizes:
+                    raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": f"{Key} exists"}},
+                                      "PutObject")
+                self.object_sizes[(Bucket, Key)] = len(data)
+        self._save(Bucket, Key, [data])
+        return {"ETag": f'"{len(data)}"'}
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self._count()
+        _sleep(self.latency)
+        with self._lock:
+            data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": f"{Key} does not exist"}}, "GetObject")
+        if Range:
+            # Only the "bytes=start-" and "bytes=start-end" forms
+            start, _, end = Range[len("bytes="):].partition("-")
+            data = data[int(start):int(end) + 1 if end else None]
+        return {"Body": FakeStreamingBody(data), "ContentLength": len(data)}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._count()
+        with self._lock:
+            self._next_upload += 1
+            upload_id = f"upload-{self._next_upload}"
+            self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._count()
+        _sleep(self.latency)
+        with self._lock:
+            self._uploads[UploadId][PartNumber] = bytes(Body) if self.keep_data else len(Body)
+        return {"ETag": f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._count()
+        with self._lock:
+            parts = self._uploads.pop(UploadId)
+        ordered = [parts[part["PartNumber"]] for part in MultipartUpload["Parts"]]
+        self.part_sizes[(Bucket, Key)] = [p if isinstance(p, int) else len(p) for p in ordered]
+        self._save(Bucket, Key, ordered)
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._count()
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _save(self, bucket, key, parts):
+        size = sum(p if isinstance(p, int) else len(p) for p in parts)
+        with self._lock:
+            self.object_sizes[(bucket, key)] = size
+            if self.keep_data:
+                self.objects[(bucket, key)] = b"".join(parts)
+
+
+class FakeSQSClient:
+    # Single-process stand-in for SQS. deliver() plays the part of the Lambda
+    # event source mapping: it hands batches to a handler, deletes the messages
+    # that succeeded and makes reported failures visible again, moving them to
+    # dead_letters after max_receive_count attempts. Visibility changes are
+    # recorded in visibility_timeouts (message id -> seconds) but not waited on.
+    def __init__(self, max_receive_count=5):
+        self.max_receive_count = max_receive_count
+        self.messages = []
+        self.dead_letters = []
+        self.visibility_timeouts = {}
+        self.send_calls = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def send_message_batch(self, QueueUrl, Entries, **kwargs):
+        if len(Entries) > 10:
+            raise ClientError(
+                {"Error": {"Code": "TooManyEntriesInBatchRequest", "Message": "Maximum 10 entries"}},
+                "SendMessageBatch"
+            )
+        successful = []
+        with self._lock:
+            self.send_calls += 1
+            for entry in Entries:
+                self._next_id += 1
+                message_id = f"message-{self._next_id}"
+                self.messages.append({"messageId": message_id, "body": entry["MessageBody"], "receiveCount": 0})
+                successful.append({"Id": entry["Id"], "MessageId": message_id})
+        return {"Successful": successful, "Failed": []}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout, **kwargs):
+        if not 0 <= VisibilityTimeout <= 43200:
+            raise ClientError(
+                {"Error": {"Code": "InvalidParameterValue", "Message": "VisibilityTimeout must be 0 to 43200"}},
+                "ChangeMessageVisibility"
+            )
+        with self._lock:
+            self.visibility_timeouts[ReceiptHandle.rsplit("/", 1)[0]] = VisibilityTimeout
+        return {}
+
+    def deliver(self, handler, batch_size=10, context=None):
+        # Returns the number of handler invocations it took to drain the queue
+        invocations = 0
+        while True:
+            with self._lock:
+                batch, self.messages = self.messages[:batch_size], self.messages[batch_size:]
+            if not batch:
+                return invocations
+            for message in batch:
+                message["receiveCount"] += 1
+
+            invocations += 1
+            event = {"Records": [
+                {"messageId": m["messageId"], "receiptHandle": f"{m['messageId']}/{m['receiveCount']}",
+                 "body": m["body"], "eventSource": "aws:sqs"} for m in batch
+            ]}
+            response = handler(event, context) or {}
+            failed_ids = {f["itemIdentifier"] for f in response.get("batchItemFailures", [])}
+
+            with self._lock:
+                for message in batch:
+                    if message["messageId"] not in failed_ids:
+                        continue
+                    if message["receiveCount"] >= self.max_receive_count:
+                        self.dead_letters.append(message)
+                    else:
+                        self.messages.append(message)
+
+
+class FakeLambdaClient:
+    # Stand-in for the Lambda client's invoke. functions maps a function name
+    # or ARN to a handler(event, context) callable. "Event" invokes are queued
+    # on background threads after the configured latency, as Lambda's async
+    # invoke queue would run them; "RequestResponse" invokes run inline.
+    # Errors of async invokes are kept in errors rather than retried.
+    def __init__(self, functions=None, latency=0.0, max_workers=4, context_factory=None):
+        self.functions = dict(functions or {})
+        self.latency = latency
+        self.context_factory = context_factory or (lambda function_name: None)
+        self.calls = 0
+        self.errors = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def invoke(self, FunctionName, InvocationType="RequestResponse", Payload=b"{}", **kwargs):
+        handler = self.functions.get(FunctionName)
+        if handler is None:
+            raise ClientError(
+                {"Error": {"Code": "ResourceNotFoundException", "Message": f"Function not found: {FunctionName}"}},
+                "Invoke"
+            )
+        event = json.loads(Payload or b"{}")
+        with self._lock:
+            self.calls += 1
+        if InvocationType == "Event":
+            future = self._executor.submit(self._run, FunctionName, handler, event)
+            with self._lock:
+                self._pending.add(future)
+            future.add_done_callback(self._finished)
+            return {"StatusCode": 202, "Payload": FakeStreamingBody(b"")}
+        _sleep(self.latency)
+        result = handler(event, self.context_factory(FunctionName))
+        return {"StatusCode": 200, "Payload": FakeStreamingBody(json.dumps(result, default=str).encode("utf-8"))}
+
+    def wait(self):
+        # Blocks until the queued async invokes (and any they queue) have run
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                return
+            wait_for_futures(pending)
+
+    def shutdown(self):
+        self.wait()
+        self._executor.shutdown()
+
+    def _run(self, function_name, handler, event):
+        _sleep(self.latency)
+        try:
+            handler(event, self.context_factory(function_name))
+        except Exception as e:
+            with self._lock:
+                self.errors.append((function_name, e))
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending.discard(future)
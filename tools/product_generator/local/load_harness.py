@@ -0,0 +1,457 @@
+import argparse
+import json
+import logging
+import math
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from product_generator.local.fakes import (
+    FakeBedrockClient,
+    FakeDynamoDBResource,
+    FakeDynamoDBTable,
+    FakeS3Client,
+    FakeSQSClient,
+    bedrock_error,
+)
+from product_generator.services import clients
+from product_generator.services.s3_service import MIN_PART_SIZE
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Offline load test for the generate, store and export handlers. The handlers
+# run unmodified; their AWS clients are local stand-ins (installed through the
+# client registry) with configurable latency and error distributions.
+#
+#   PYTHONPATH=src:tools python -m product_generator.local.load_harness --requests 200 --concurrency 8
+#   PYTHONPATH=src:tools python -m product_generator.local.load_harness --baseline tests/benchmarks/load_baseline.json
+#
+# Per scenario it reports p50/p95/p99 latency, throughput, peak traced memory
+# per request and, from the generate handler's EMF records, mean stage times.
+# It also counts the requests the handlers made of each stand-in and the
+# clients they built (a cold container's setup work); for a given profile these
+# counters are exact. Against a baseline, a counter that differs fails the run,
+# as does a timing past the tolerance unless --counters-only is given.
+
+TABLE_NAME = "ProductDescriptions"
+BUCKET_NAME = "load-test-exports"
+QUEUE_URL = "https://sqs.local/load-test-storage"
+
+# Lower is better for every compared metric except throughput
+COMPARED_METRICS = {"p50_ms": False, "p95_ms": False, "throughput_rps": True, "alloc_kib_per_request": False}
+COUNTERS = ("model_calls", "dynamodb_requests", "s3_requests", "sqs_requests", "client_builds")
+
+class LoadProfile:
+    def __init__(self, requests=200, concurrency=8, bedrock_latency_ms=20.0, bedrock_jitter=0.25,
+                 bedrock_error_rate=0.0, dynamodb_latency_ms=2.0, dynamodb_unprocessed_rate=0.0,
+                 s3_latency_ms=2.0, export_items=2000, store_batch_size=25, allocation_samples=20, seed=0):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.bedrock_latency_ms = bedrock_latency_ms
+        # Spread of the lognormal model latency (sigma); 0 gives a constant
+        self.bedrock_jitter = bedrock_jitter
+        self.bedrock_error_rate = bedrock_error_rate
+        self.dynamodb_latency_ms = dynamodb_latency_ms
+        self.dynamodb_unprocessed_rate = dynamodb_unprocessed_rate
+        self.s3_latency_ms = s3_latency_ms
+        self.export_items = export_items
+        self.store_batch_size = store_batch_size
+        self.allocation_samples = allocation_samples
+        self.seed = seed
+
+def lognormal_latency(median_ms, sigma=0.0, seed=0):
+    # Latency callable for the fakes, in seconds. Lognormal keeps the long
+    # right tail real service latencies have.
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def sample():
+        if sigma <= 0:
+            return median_ms / 1000
+        with lock:
+            return median_ms * math.exp(rng.gauss(0, sigma)) / 1000
+    return sample
+
+def random_errors(rate, code="ThrottlingException", seed=0):
+    # errors callable for FakeBedrockClient: fails roughly `rate` of the calls
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def maybe_error(call_number):
+        with lock:
+            failed = rng.random() < rate
+        return bedrock_error(code) if failed else None
+    return maybe_error
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+@contextmanager
+def patched(module, **values):
+    originals = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+@contextmanager
+def quiet_logging():
+    # Per-request INFO logging would dominate the measurements. The modules
+    # set their own levels, so logging is disabled globally instead.
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+def product(i):
+    return {
+        "title": f"Load Test Lamp {i}",
+        "category": "Lighting",
+        "features": ["Dimmable", "USB-C"],
+        "audience": "Readers",
+    }
+
+def stored_item(i):
+    return {
+        "productId": f"load-test-lamp-{i}",
+        "formatType": "all",
+        "timestamp": 1_700_000_000_000 + i,
+        "metadata": product(i),
+        "descriptions": {
+            "short": "A dimmable lamp.",
+            "detailed": "A dimmable reading lamp with USB-C charging. " * 4,
+            "social": "Read later. #Lighting",
+            "seo": "Dimmable USB-C reading lamp."
+        }
+    }
+
+class StandInSession:
+    # Takes the place of the client registry's boto3 session, building the
+    # stand-ins and counting each build
+    def __init__(self):
+        self.clients = {}
+        self.resources = {}
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def client(self, service_name, region_name=None, config=None):
+        with self._lock:
+            self.builds += 1
+        return self.clients[service_name]
+
+    def resource(self, service_name, region_name=None, config=None):
+        with self._lock:
+            self.builds += 1
+        return self.resources[service_name]
+
+def dynamodb_requests(resource):
+    return resource.batch_write_calls + resource.batch_get_calls + sum(
+        table.get_calls + table.put_calls + table.delete_calls + table.query_calls + table.scan_calls
+        for table in resource.tables.values()
+    )
+
+class Scenario:
+    # A handler plus its requests. setup() is a context manager installing the
+    # stand-ins in self.session; invoke(i) runs request i and returns the
+    # handler's response.
+    name = None
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.session = None
+
+    def install(self, clients_by_service=None, resources_by_service=None):
+        self.session = StandInSession()
+        self.session.clients.update(clients_by_service or {})
+        self.session.resources.update(resources_by_service or {})
+        clients.use_session(self.session)
+
+    def counters(self):
+        session = self.session
+        return {
+            "model_calls": sum(c.calls for name, c in session.clients.items() if name == "bedrock-runtime"),
+            "dynamodb_requests": sum(dynamodb_requests(r) for name, r in session.resources.items()
+                                     if name == "dynamodb"),
+            "s3_requests": sum(c.calls for name, c in session.clients.items() if name == "s3"),
+            "sqs_requests": sum(c.send_calls for name, c in session.clients.items() if name == "sqs"),
+            "client_builds": session.builds,
+        }
+
+    def setup(self):
+        raise NotImplementedError
+
+    def invoke(self, i):
+        raise NotImplementedError
+
+    def succeeded(self, response):
+        return response.get("statusCode") == 200
+
+class GenerateScenario(Scenario):
+    name = "generate"
+
+    def __init__(self, profile, format_type="detailed", store_result=True):
+        super().__init__(profile)
+        self.format_type = format_type
+        self.store_result = store_result
+        self.metrics_sink = None
+
+    @contextmanager
+    def setup(self):
+        from product_generator.lambda_handlers import generate_description_lambda as handler
+        from product_generator.services.generation_cache import GenerationCache
+        from product_generator.utils.metrics import InMemorySink
+
+        profile = self.profile
+        bedrock_client = FakeBedrockClient(
+            latency=lognormal_latency(profile.bedrock_latency_ms, profile.bedrock_jitter, profile.seed),
+            errors=random_errors(profile.bedrock_error_rate, seed=profile.seed) if profile.bedrock_error_rate else None,
+        )
+        self.install({"bedrock-runtime": bedrock_client, "sqs": FakeSQSClient()})
+        self.metrics_sink = InMemorySink()
+        with patched(handler, generation_cache=GenerationCache(), default_sink=self.metrics_sink,
+                     STORAGE_QUEUE_URL=QUEUE_URL):
+            yield
+
+    def invoke(self, i):
+        from product_generator.lambda_handlers.generate_description_lambda import lambda_handler
+        body = {**product(i), "format": self.format_type, "store_result": self.store_result}
+        return lambda_handler({"body": json.dumps(body)}, None)
+
+    def stage_means(self):
+        # Mean per-request stage time from the handler's own EMF records
+        records = self.metrics_sink.records if self.metrics_sink else []
+        stages = {}
+        for record in records:
+            for metric in record["_aws"]["CloudWatchMetrics"][0]["Metrics"]:
+                if metric["Unit"] == "Milliseconds":
+                    stages.setdefault(metric["Name"], []).append(record[metric["Name"]])
+        return {name: round(sum(values) / len(values), 3) for name, values in sorted(stages.items())}
+
+class StoreScenario(Scenario):
+    # Each request is one SQS batch of store_batch_size messages
+    name = "store"
+
+    @contextmanager
+    def setup(self):
+        from product_generator.lambda_handlers import store_description_lambda as handler
+
+        profile = self.profile
+        # Conditional puts go through the table, batch reads through the resource
+        table = FakeDynamoDBTable(TABLE_NAME, latency=lognormal_latency(profile.dynamodb_latency_ms, 0.2, profile.seed))
+        dynamodb = FakeDynamoDBResource(
+            [table], unprocessed_rate=profile.dynamodb_unprocessed_rate, seed=profile.seed,
+            latency=lognormal_latency(profile.dynamodb_latency_ms, 0.2, profile.seed),
+        )
+        self.install(resources_by_service={"dynamodb": dynamodb})
+        with patched(handler, PRODUCT_DESCRIPTIONS_TABLE=TABLE_NAME):
+            yield
+
+    def invoke(self, i):
+        from product_generator.lambda_handlers.store_description_lambda import lambda_handler
+        size = self.profile.store_batch_size
+        records = [
+            {"messageId": f"message-{i}-{n}", "body": json.dumps({"item": stored_item(i * size + n)})}
+            for n in range(size)
+        ]
+        return lambda_handler({"Records": records}, None)
+
+    def succeeded(self, response):
+        return not response.get("batchItemFailures")
+
+class ExportScenario(Scenario):
+    # Each request is a full CSV export of a table holding export_items items
+    name = "export"
+
+    @contextmanager
+    def setup(self):
+        from product_generator.lambda_handlers import export_description_lambda as handler
+
+        profile = self.profile
+        table = FakeDynamoDBTable(TABLE_NAME, page_size=500, latency=profile.dynamodb_latency_ms / 1000)
+        table.load(stored_item(i) for i in range(profile.export_items))
+        self.install({"s3": FakeS3Client(keep_data=False, latency=profile.s3_latency_ms / 1000)},
+                     {"dynamodb": FakeDynamoDBResource([table])})
+        with patched(handler, PRODUCT_DESCRIPTIONS_TABLE=TABLE_NAME, EXPORTS_S3_BUCKET=BUCKET_NAME,
+                     EXPORT_PART_SIZE=MIN_PART_SIZE):
+            yield
+
+    def invoke(self, i):
+        from product_generator.lambda_handlers.export_description_lambda import lambda_handler
+        return lambda_handler({}, None)
+
+def measure_allocations(scenario, samples):
+    # Peak traced memory per request, measured sequentially so concurrent
+    # requests do not inflate each other's peaks
+    if samples <= 0:
+        return 0.0
+    tracemalloc.start()
+    try:
+        peaks = []
+        for i in range(samples):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            scenario.invoke(1_000_000 + i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+def run_scenario(scenario, requests=None, concurrency=None):
+    profile = scenario.profile
+    requests = profile.requests if requests is None else requests
+    concurrency = profile.concurrency if concurrency is None else concurrency
+    latencies = [0.0] * requests
+    failures = [0]
+    failures_lock = threading.Lock()
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            ok = scenario.succeeded(scenario.invoke(i))
+        except Exception as e:
+            logger.error("Request %d failed: %s", i, e)
+            ok = False
+        latencies[i] = (time.perf_counter() - start) * 1000
+        if not ok:
+            with failures_lock:
+                failures[0] += 1
+
+    with quiet_logging(), scenario.setup():
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, range(requests)))
+        elapsed = time.perf_counter() - start
+        alloc_kib = measure_allocations(scenario, min(profile.allocation_samples, requests))
+        stages = scenario.stage_means() if isinstance(scenario, GenerateScenario) else {}
+        counters = scenario.counters()
+    clients.reset()
+
+    ordered = sorted(latencies)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "failures": failures[0],
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "alloc_kib_per_request": round(alloc_kib, 1),
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+        "stages_ms": stages,
+        "counters": counters,
+    }
+
+def default_scenarios(profile):
+    # Store runs at most two consumers, like the queue's MaximumConcurrency in
+    # template.yaml. Export requests are whole-table exports, so far fewer are run.
+    return [
+        (GenerateScenario(profile), {}),
+        (StoreScenario(profile), {"concurrency": min(profile.concurrency, 2)}),
+        (ExportScenario(profile), {"requests": max(1, profile.requests // 20), "concurrency": 1}),
+    ]
+
+def run_all(profile, scenarios=None):
+    results = {}
+    for scenario, overrides in scenarios or default_scenarios(profile):
+        results[scenario.name] = run_scenario(scenario, **overrides)
+    return results
+
+def compare_to_baseline(results, baseline, tolerance=0.25, tolerances=None, timings=True):
+    # Returns one message per counter that differs from the baseline and, with
+    # timings, per metric that regressed by more than its tolerance (a fraction
+    # of the baseline value); tolerances overrides it per metric
+    tolerances = tolerances or {}
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        for counter, value in expected.get("counters", {}).items():
+            if actual["counters"].get(counter) != value:
+                regressions.append(f"{name}.{counter}: {actual['counters'].get(counter)} vs baseline {value}")
+        if not timings:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in expected or not expected[metric]:
+                continue
+            ratio = actual[metric] / expected[metric]
+            allowed = tolerances.get(metric, tolerance)
+            regressed = ratio < 1 - allowed if higher_is_better else ratio > 1 + allowed
+            if regressed:
+                regressions.append(f"{name}.{metric}: {actual[metric]} vs baseline {expected[metric]} "
+                                   f"({ratio - 1:+.0%}, tolerance {allowed:.0%})")
+    return regressions
+
+def format_report(results):
+    lines = [f"{'scenario':10} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>9} {'KiB/req':>9} {'rss MiB':>8} fail"]
+    for name, r in results.items():
+        lines.append(f"{name:10} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['throughput_rps']:9.1f} "
+                     f"{r['alloc_kib_per_request']:9.1f} {r['peak_rss_mib']:8.1f} {r['failures']}")
+        if r["stages_ms"]:
+            lines.append("           stages: " + ", ".join(f"{k}={v:.2f}ms" for k, v in r["stages_ms"].items()))
+        lines.append("           counters: " + ", ".join(f"{k}={v}" for k, v in r["counters"].items()))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the description handlers.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bedrock-latency-ms", type=float, default=20.0)
+    parser.add_argument("--bedrock-jitter", type=float, default=0.25)
+    parser.add_argument("--bedrock-error-rate", type=float, default=0.0)
+    parser.add_argument("--dynamodb-latency-ms", type=float, default=2.0)
+    parser.add_argument("--dynamodb-unprocessed-rate", type=float, default=0.0)
+    parser.add_argument("--s3-latency-ms", type=float, default=2.0)
+    parser.add_argument("--export-items", type=int, default=2000)
+    parser.add_argument("--baseline", help="JSON file of expected results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--counters-only", action="store_true", help="Compare only the exact counters")
+    parser.add_argument("--write-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    profile = LoadProfile(
+        requests=args.requests, concurrency=args.concurrency,
+        bedrock_latency_ms=args.bedrock_latency_ms, bedrock_jitter=args.bedrock_jitter,
+        bedrock_error_rate=args.bedrock_error_rate, dynamodb_latency_ms=args.dynamodb_latency_ms,
+        dynamodb_unprocessed_rate=args.dynamodb_unprocessed_rate, s3_latency_ms=args.s3_latency_ms,
+        export_items=args.export_items,
+    )
+    results = run_all(profile)
+    print(format_report(results))
+
+    if args.baseline and args.write_baseline:
+        # The profile is stored alongside so the baseline can be reproduced
+        with open(args.baseline, "w") as baseline_file:
+            json.dump({"profile": vars(profile), **results}, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}.")
+    elif args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_to_baseline(results, json.load(baseline_file), args.tolerance,
+                                              timings=not args.counters_only)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+
+from product_generator.local.fakes import FakeBedrockClient, FakeDynamoDBResource, FakeDynamoDBTable, FakeS3Client
+from product_generator.local.load_harness import lognormal_latency, patched, product, quiet_logging
+from product_generator.services import clients
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Runs a bulk ingestion job end to end against the local stand-ins: a
+# synthetic feed is put in a fake bucket and the ingestion handler is invoked
+# again and again, as its self re-invocation would be, until the job completes.
+#
+#   PYTHONPATH=src:tools python -m product_generator.local.run_ingest --rows 500 --feed-format csv --timeout-ms 300
+
+BUCKET_NAME = "local-ingestion"
+TABLE_NAME = "ProductDescriptions"
+
+class LocalContext:
+    # Lambda context stand-in whose remaining time counts down from timeout_ms
+    invoked_function_arn = None
+
+    def __init__(self, timeout_ms):
+        self.timeout_ms = timeout_ms
+        self.aws_request_id = "local"
+        self._start = time.monotonic()
+
+    def get_remaining_time_in_millis(self):
+        return int(self.timeout_ms - (time.monotonic() - self._start) * 1000)
+
+def feed_body(rows, feed_format):
+    if feed_format == "jsonl":
+        return "".join(json.dumps({"productId": f"sku-{i}", **product(i)}) + "\n" for i in range(rows))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["productId", "title", "category", "features", "audience"])
+    for i in range(rows):
+        item = product(i)
+        writer.writerow([f"sku-{i}", item["title"], item["category"], ", ".join(item["features"]), item["audience"]])
+    return buffer.getvalue()
+
+def run_local(rows=200, feed_format="csv", chunk_size=25, max_concurrency=8, bedrock_latency_ms=20.0,
+              timeout_ms=None, reserve_ms=0, max_invocations=1000):
+    # Returns the final response body plus the number of invocations it took
+    # and the number of items that reached the table
+    from product_generator.lambda_handlers import ingest_catalog_lambda as handler
+    from product_generator.services import bedrock_service
+    from product_generator.services.generation_cache import GenerationCache
+
+    s3_client = FakeS3Client()
+    table = FakeDynamoDBTable(TABLE_NAME)
+    clients.register("s3", client=s3_client)
+    clients.register("dynamodb", resource=FakeDynamoDBResource([table]))
+    clients.register("bedrock-runtime", client=FakeBedrockClient(latency=lognormal_latency(bedrock_latency_ms)),
+                     region_name=bedrock_service.BEDROCK_REGION)
+
+    feed_key = f"feeds/catalog.{feed_format}"
+    s3_client.put_object(Bucket=BUCKET_NAME, Key=feed_key, Body=feed_body(rows, feed_format))
+
+    event = {"bucket": BUCKET_NAME, "key": feed_key, "jobId": "local-job", "chunkSize": chunk_size,
+             "maxConcurrency": max_concurrency}
+    with patched(handler, INGEST_S3_BUCKET=BUCKET_NAME, PRODUCT_DESCRIPTIONS_TABLE=TABLE_NAME,
+                 INGEST_MAX_CONCURRENCY=max(max_concurrency, 1), INGEST_TIME_RESERVE_MS=reserve_ms,
+                 INGEST_CONTINUE_ASYNC=False, generation_cache=GenerationCache(), default_sink=None):
+        for invocation in range(1, max_invocations + 1):
+            context = LocalContext(timeout_ms) if timeout_ms else None
+            response = handler.lambda_handler(event, context)
+            body = json.loads(response["body"])
+            if response["statusCode"] != 202:
+                break
+            # Carries on from the checkpoint, like the self re-invocation does
+            event = {"jobId": body["jobId"]}
+    return {**body, "statusCode": response["statusCode"], "invocations": invocation, "tableItems": len(table)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a bulk ingestion job against local stand-ins.")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--feed-format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bedrock-latency-ms", type=float, default=20.0)
+    parser.add_argument("--timeout-ms", type=int, help="Simulated Lambda timeout per invocation")
+    parser.add_argument("--reserve-ms", type=int, default=0, help="Time kept back for the last chunk")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with quiet_logging():
+        summary = run_local(rows=args.rows, feed_format=args.feed_format, chunk_size=args.chunk_size,
+                            max_concurrency=args.concurrency, bedrock_latency_ms=args.bedrock_latency_ms,
+                            timeout_ms=args.timeout_ms, reserve_ms=args.reserve_ms)
+    summary["elapsedSeconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["status"] == "completed" else 1
+
+if __name__ == "__main__":
+    sys.exit(main())